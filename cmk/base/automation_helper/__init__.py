@@ -24,6 +24,7 @@ from cmk.checkengine.plugins import AgentBasedPlugins
 from cmk.utils.caching import cache_manager
 from cmk.utils.paths import omd_root
 from cmk.utils.redis import get_redis_client
+from cmk.utils.rulesets.ruleset_matcher import MatchingHostsCache
 
 from ._app import make_application
 from ._cache import Cache
@@ -36,6 +37,10 @@ from ._watcher import run as run_watcher
 _RELATIVE_RUN_DIRECTORY = Path("tmp", "run")
 _RELATIVE_LOG_DIRECTORY = Path("var", "log", "automation-helper")
 
+# Survives the config reloads: After a reload, only the hosts and rule conditions which changed
+# have to be evaluated again.
+_MATCHING_HOSTS_CACHE = MatchingHostsCache(maxsize=10_000)
+
 
 def main() -> int:
     try:
@@ -131,7 +136,9 @@ def _reset_global_multiprocessing_start_method_to_platform_default() -> None:
 def _reload_automation_config(plugins: AgentBasedPlugins) -> config.LoadingResult:
     cache_manager.clear()
     discovery_rulesets = extract_known_discovery_rulesets(plugins)
-    return config.load(discovery_rulesets, validate_hosts=False)
+    return config.load(
+        discovery_rulesets, validate_hosts=False, matching_hosts_cache=_MATCHING_HOSTS_CACHE
+    )
 
 
 def _clear_caches_before_each_call(config_cache: ConfigCache) -> None:
@@ -159,7 +159,7 @@ from cmk.checkengine.plugins import (
 )
 from cmk.checkengine.submitters import ServiceDetails, ServiceState
 from cmk.checkengine.summarize import summarize
-from cmk.checkengine.value_store import AllValueStoresStore, ValueStoreManager
+from cmk.checkengine.value_store import AllValueStoresStore, journal_path, ValueStoreManager
 from cmk.discover_plugins import discover_families, PluginGroup
 from cmk.fetchers import (
     Mode,
@@ -1644,6 +1644,9 @@ class AutomationRenameHosts(Automation):
         for d in ["cache", "counters"]:
             if self._rename_host_file(str(tmp_dir / d), oldname, newname):
                 actions.append(d)
+        self._rename_host_file(
+            str(counters_dir), journal_path(Path(oldname)).name, journal_path(Path(newname)).name
+        )
 
         actions.extend(move_piggyback_for_host_rename(cmk.utils.paths.omd_root, oldname, newname))
 
@@ -2497,6 +2500,7 @@ class AutomationDeleteHosts(ABCDeleteHosts, Automation):
             f"{precompiled_hostchecks_dir / hostname}.py",
             f"{autochecks_dir}/{hostname}.mk",
             f"{counters_dir / hostname}",
+            f"{journal_path(counters_dir / hostname)}",
             f"{discovered_host_labels_dir}/{hostname}.mk",
             f"{tcp_cache_dir / hostname}",
             f"{var_dir}/persisted/{hostname}",
@@ -2551,6 +2555,7 @@ class AutomationDeleteHostsKnownRemote(ABCDeleteHosts, Automation):
             f"{precompiled_hostchecks_dir / hostname}.py",
             f"{autochecks_dir}/{hostname}.mk",
             f"{counters_dir / hostname}",
+            f"{journal_path(counters_dir / hostname)}",
             f"{tcp_cache_dir / hostname}",
             f"{var_dir}/persisted/{hostname}",
         ]
@@ -13,6 +13,7 @@ import logging
 import socket
 import time
 from collections.abc import Callable, Container, Iterable, Iterator, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Final, Literal, Protocol
@@ -41,7 +42,7 @@ from cmk.base.sources import (
     SpecialAgentSource,
 )
 from cmk.ccc import tty
-from cmk.ccc.cpu_tracking import CPUTracker, Snapshot
+from cmk.ccc.cpu_tracking import apportion, CPUTracker, Snapshot
 from cmk.ccc.exceptions import MKTimeout
 from cmk.ccc.hostaddress import HostAddress, HostName
 from cmk.checkengine.checkerplugin import AggregatedResult, CheckerPlugin, ConfiguredService
@@ -152,6 +153,7 @@ def _fetch_all(
     simulation: bool,
     file_cache_options: FileCacheOptions,
     mode: Mode,
+    max_concurrency: int = 1,
 ) -> Sequence[
     tuple[
         SourceInfo,
@@ -160,15 +162,62 @@ def _fetch_all(
     ]
 ]:
     console.verbose(f"{tty.yellow}+{tty.normal} FETCHING DATA")
-    return [
-        _do_fetch(
-            trigger,
+    jobs = (
+        (
             source.source_info(),
             source.file_cache(simulation=simulation, file_cache_options=file_cache_options),
             source.fetcher(),
-            mode=mode,
         )
         for source in sources
+    )
+    if max_concurrency <= 1:
+        return [
+            _do_fetch(trigger, source_info, file_cache, fetcher, mode=mode)
+            for source_info, file_cache, fetcher in jobs
+        ]
+    return _fetch_concurrently(trigger, list(jobs), mode=mode, max_concurrency=max_concurrency)
+
+
+def _fetch_concurrently(
+    trigger: FetcherTrigger,
+    jobs: Sequence[tuple[SourceInfo, FileCache, Fetcher]],
+    *,
+    mode: Mode,
+    max_concurrency: int,
+) -> Sequence[
+    tuple[
+        SourceInfo,
+        result.Result[AgentRawData | SNMPRawData, Exception],
+        Snapshot,
+    ]
+]:
+    """Fetch the sources of a host in threads, for the sources mostly waiting for I/O
+
+    Overlapping in time, the durations of the sources would add up to more than
+    the fetching took. The CPU times of the sources are taken from their threads,
+    the total times are split among them in proportion to that.
+
+    A timeout of the check only interrupts waiting for the sources, the ones
+    already being fetched end on their own.
+    """
+    executor = ThreadPoolExecutor(
+        max_workers=max(1, min(max_concurrency, len(jobs))), thread_name_prefix="fetch"
+    )
+    try:
+        with CPUTracker(console.debug) as tracker:
+            fetched = list(
+                executor.map(
+                    lambda job: _do_fetch(trigger, *job, mode=mode, per_thread=True),
+                    jobs,
+                )
+            )
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return [
+        (source_info, raw_data, duration)
+        for (source_info, raw_data, _duration), duration in zip(
+            fetched, apportion(tracker.duration, [duration for _s, _r, duration in fetched])
+        )
     ]
 
 
@@ -179,13 +228,14 @@ def _do_fetch(
     fetcher: Fetcher,
     *,
     mode: Mode,
+    per_thread: bool = False,
 ) -> tuple[
     SourceInfo,
     result.Result[AgentRawData | SNMPRawData, Exception],
     Snapshot,
 ]:
     console.debug(f"  Source: {source_info}")
-    with CPUTracker(console.debug) as tracker:
+    with CPUTracker(console.debug, per_thread=per_thread) as tracker:
         raw_data = trigger.get_raw_data(file_cache, fetcher, mode)
     return source_info, raw_data, tracker.duration
 
@@ -371,6 +421,7 @@ class CMKFetcher:
         password_store_file: Path,
         simulation_mode: bool,
         max_cachefile_age: MaxAge | None = None,
+        max_concurrent_fetches: int = 1,
     ) -> None:
         self.config_cache: Final = config_cache
         self.make_trigger: Final = make_trigger
@@ -387,6 +438,7 @@ class CMKFetcher:
         self.password_store_file: Final = password_store_file
         self.simulation_mode: Final = simulation_mode
         self.max_cachefile_age: Final = max_cachefile_age
+        self.max_concurrent_fetches: Final = max_concurrent_fetches
 
     def __call__(
         self, host_name: HostName, *, ip_address: HostAddress | None
@@ -490,6 +542,7 @@ class CMKFetcher:
             simulation=self.simulation_mode,
             file_cache_options=self.file_cache_options,
             mode=self.mode,
+            max_concurrency=self.max_concurrent_fetches,
         )
 
 
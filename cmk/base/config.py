@@ -561,6 +561,7 @@ def load(
     discovery_rulesets: Iterable[RuleSetName],
     with_conf_d: bool = True,
     validate_hosts: bool = True,
+    matching_hosts_cache: ruleset_matcher.MatchingHostsCache | None = None,
 ) -> LoadingResult:
     _initialize_config()
 
@@ -568,7 +569,7 @@ def load(
 
     _initialize_derived_config_variables()
 
-    loading_result = _perform_post_config_loading_actions(discovery_rulesets)
+    loading_result = _perform_post_config_loading_actions(discovery_rulesets, matching_hosts_cache)
 
     if validate_hosts:
         hosts_config = loading_result.config_cache.hosts_config
@@ -617,6 +618,7 @@ def _initialize_config() -> None:
 
 def _perform_post_config_loading_actions(
     discovery_rulesets: Iterable[RuleSetName],
+    matching_hosts_cache: ruleset_matcher.MatchingHostsCache | None = None,
 ) -> LoadingResult:
     """These tasks must be performed after loading the Check_MK base configuration"""
     # First cleanup things (needed for e.g. reloading the config)
@@ -688,9 +690,10 @@ def _perform_post_config_loading_actions(
         cmc_influxdb_service_metrics=cmc_influxdb_service_metrics,
         cmc_log_levels=cmc_log_levels,
         cluster_max_cachefile_age=cluster_max_cachefile_age,
+        service_match_cache_size=service_match_cache_size,
     )
 
-    config_cache = ConfigCache(loaded_config).initialize()
+    config_cache = ConfigCache(loaded_config, matching_hosts_cache).initialize()
     _globally_cache_config_cache(config_cache)
     return LoadingResult(
         loaded_config=loaded_config,
@@ -1476,9 +1479,15 @@ class AutochecksConfigurer:
 
 
 class ConfigCache:
-    def __init__(self, loaded_config: LoadedConfigFragment) -> None:
+    def __init__(
+        self,
+        loaded_config: LoadedConfigFragment,
+        matching_hosts_cache: ruleset_matcher.MatchingHostsCache | None = None,
+    ) -> None:
         super().__init__()
         self._loaded_config: Final = loaded_config
+        # Outlives this config cache, see MatchingHostsCache
+        self._matching_hosts_cache: Final = matching_hosts_cache
         self.hosts_config = Hosts(hosts=(), clusters=(), shadow_hosts=())
         self.__enforced_services_table: dict[
             HostName,
@@ -1548,6 +1557,8 @@ class ConfigCache:
                     self.hosts_config.shadow_hosts,
                 )
             ),
+            matching_hosts_cache=self._matching_hosts_cache,
+            service_match_cache_size=self._loaded_config.service_match_cache_size,
         )
         builtin_host_labels = {
             hostname: get_builtin_host_labels(self._site_of_host(hostname))
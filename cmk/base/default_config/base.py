@@ -61,6 +61,9 @@ piggyback_translation: Sequence[RuleSpec[Mapping[str, object]]] = []
 # Ruleset for translating service names
 service_description_translation: Sequence[RuleSpec[Mapping[str, object]]] = []
 simulation_mode = False
+# Number of sources of a host fetched at the same time. The sources are fetched in
+# threads, a timeout of the check does not interrupt the ones already running.
+max_concurrent_fetches_per_host = 1
 fake_dns: str | None = None
 perfdata_format: Literal["pnp", "standard"] = "pnp"
 check_mk_perfdata_with_times = True
@@ -69,6 +72,8 @@ debug_log = False  # deprecated
 monitoring_host: str | None = None  # deprecated
 max_num_processes = 50
 fallback_agent_output_encoding = "latin-1"
+# Maximum number of cached service rule matches per process (None: unbounded)
+service_match_cache_size: int | None = None
 stored_passwords: dict[str, Password] = {}
 # Collection of predefined rule conditions. For the moment this setting is only stored
 # in this config domain but not used by the base code. The WATO logic for writing out
@@ -96,7 +96,7 @@ from cmk.checkengine.plugins import (
 from cmk.checkengine.sectionparser import SectionPlugin
 from cmk.checkengine.submitters import get_submitter, ServiceState
 from cmk.checkengine.summarize import summarize, SummarizerFunction
-from cmk.checkengine.value_store import AllValueStoresStore, ValueStoreManager
+from cmk.checkengine.value_store import AllValueStoresStore, journal_path, ValueStoreManager
 from cmk.discover_plugins import discover_families, PluginGroup
 from cmk.fetchers import Mode as FetchMode
 from cmk.fetchers import NoSelectedSNMPSections, SNMPFetcherConfig, TLSConfig
@@ -320,8 +320,8 @@ def _handle_fetcher_options(
     if options.get("no-tcp", False):
         file_cache_options = dataclasses.replace(file_cache_options, tcp_use_only_cache=True)
 
-    if options.get("usewalk", False):
-        snmp_factory.force_stored_walks()
+    if options.get("usewalk", False) or options.get("usewalk-index", False):
+        snmp_factory.force_stored_walks(indexed=bool(options.get("usewalk-index", False)))
         global _enforce_localhost
         _enforce_localhost = True
 
@@ -347,6 +347,11 @@ _FETCHER_OPTIONS: Final = [
         long_option="usewalk",
         short_help="Use snmpwalk stored with --snmpwalk",
     ),
+    Option(
+        long_option="usewalk-index",
+        short_help="Like --usewalk, but serve the stored walks through a persistent "
+        "index next to the walk files",
+    ),
 ]
 
 _SNMP_BACKEND_OPTION: Final = Option(
@@ -1377,6 +1382,7 @@ def mode_flush(hosts: list[HostName]) -> None:
         # counters
         try:
             (cmk.utils.paths.counters_dir / host).unlink()
+            journal_path(cmk.utils.paths.counters_dir / host).unlink(missing_ok=True)
             print_(tty.bold + tty.blue + " counters")
             flushed = True
         except OSError:
@@ -2203,6 +2209,7 @@ def mode_check_discovery(options: Mapping[str, object], hostname: HostName) -> i
         or ip_lookup.make_lookup_mgmt_board_ip_address(ip_lookup_config),
         mode=FetchMode.DISCOVERY,
         simulation_mode=config.simulation_mode,
+        max_concurrent_fetches=config.max_concurrent_fetches_per_host,
         max_cachefile_age=MaxAge(
             checking=config.check_max_cachefile_age,
             discovery=discovery_file_cache_max_age,
@@ -2428,6 +2435,7 @@ _DiscoveryOptions = TypedDict(
         "no-cache": Literal[True],
         "no-tcp": Literal[True],
         "usewalk": Literal[True],
+        "usewalk-index": Literal[True],
         "detect-sections": frozenset[SectionName],
         "plugins": frozenset[CheckPluginName],
         "detect-plugins": frozenset[str],
@@ -2680,6 +2688,7 @@ _CheckingOptions = TypedDict(
         "no-cache": Literal[True],
         "no-tcp": Literal[True],
         "usewalk": Literal[True],
+        "usewalk-index": Literal[True],
         "no-submit": bool,
         "perfdata": bool,
         "detect-sections": frozenset[SectionName],
@@ -2815,6 +2824,7 @@ def run_checking(
             FetchMode.CHECKING if selected_sections is NO_SELECTION else FetchMode.FORCE_SECTIONS
         ),
         simulation_mode=config.simulation_mode,
+        max_concurrent_fetches=config.max_concurrent_fetches_per_host,
         password_store_file=password_store_file,
     )
     parser = CMKParser(
@@ -2983,6 +2993,7 @@ _InventoryOptions = TypedDict(
         "no-cache": Literal[True],
         "no-tcp": Literal[True],
         "usewalk": Literal[True],
+        "usewalk-index": Literal[True],
         "force": bool,
         "detect-sections": frozenset[SectionName],
         "plugins": frozenset[InventoryPluginName],
@@ -4,7 +4,6 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 from __future__ import annotations
 
-import ast
 from collections import defaultdict
 from collections.abc import Callable, Iterable, Mapping, Sequence
 from typing import NamedTuple, Protocol
@@ -12,7 +11,7 @@ from typing import NamedTuple, Protocol
 import cmk.utils.paths
 from cmk.ccc.exceptions import MKGeneralException
 from cmk.ccc.hostaddress import HostName
-from cmk.ccc.store import ObjectStore
+from cmk.ccc.store import DimSerializer, MarshalSerializer, ObjectStore
 from cmk.checkengine.plugins import AutocheckEntry, CheckPluginName, ServiceID
 from cmk.utils.servicename import ServiceName
 
@@ -39,13 +38,19 @@ _GetEffectiveHost = Callable[[HostName, AutocheckEntry], HostName]
 
 
 class _AutochecksSerializer:
+    """Keeps one entry per line in the Python literal, which is read by older versions"""
+
     @staticmethod
     def serialize(entries: Sequence[AutocheckEntry]) -> bytes:
-        return ("[\n%s]\n" % "".join(f"  {e.dump()!r},\n" for e in entries)).encode("utf-8")
+        raw_entries = [e.dump() for e in entries]
+        return MarshalSerializer.serialize(
+            raw_entries,
+            ("[\n%s]\n" % "".join(f"  {e!r},\n" for e in raw_entries)).encode("utf-8"),
+        )
 
     @staticmethod
     def deserialize(raw: bytes) -> Sequence[AutocheckEntry]:
-        return [AutocheckEntry.load(d) for d in ast.literal_eval(raw.decode("utf-8"))]
+        return [AutocheckEntry.load(d) for d in DimSerializer.deserialize(raw)]
 
 
 class AutochecksStore:
@@ -32,6 +32,8 @@ from ._sectionstore import SectionStore
 class SectionWithHeader(NamedTuple):
     header: SectionMarker
     section: list[AgentRawData]
+    # (start, end) of the parts of the raw data with the lines not split yet
+    body: list[tuple[int, int]]
 
 
 MutableSection = list[SectionWithHeader]
@@ -91,6 +93,7 @@ class ParserState(abc.ABC):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         self.hostname: Final = hostname
         self.sections = sections
@@ -98,11 +101,23 @@ class ParserState(abc.ABC):
         self.translation: Final = translation
         self.encoding_fallback: Final = encoding_fallback
         self._logger: Final = logger
+        # The host sections to keep, the others are skipped right away.
+        # Piggybacked sections are always kept, they are passed on as a whole.
+        self.selection: Final = selection
 
     @abc.abstractmethod
     def do_action(self, line: bytes) -> ParserState:
         raise NotImplementedError()
 
+    def on_body(self, start: int, end: int) -> ParserState:
+        """Handle the lines between two markers, raw_data[start:end]
+
+        The lines are only split up when they are needed, see `split_body`.
+        Apart from that, this is equivalent to calling `do_action` for every
+        line.
+        """
+        return self
+
     @abc.abstractmethod
     def on_section_header(self, section_header: SectionMarker) -> ParserState:
         raise NotImplementedError()
@@ -128,12 +143,17 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_host_section_parser(
         self,
         section_header: SectionMarker,
-    ) -> HostSectionParser:
+    ) -> ParserState:
+        if self.selection is not NO_SELECTION and section_header.name not in self.selection:
+            # Skip the section without even looking at its lines.
+            self._logger.debug("%s / Not selected, skipping", section_header)
+            return self.to_noop_parser()
         self._logger.debug(
             "%s / Transition %s -> %s",
             section_header,
@@ -141,7 +161,7 @@ class ParserState(abc.ABC):
             HostSectionParser.__name__,
         )
         if not self.sections or self.sections[-1].header != section_header:
-            self.sections.append(SectionWithHeader(section_header, []))
+            self.sections.append(SectionWithHeader(section_header, [], []))
         return HostSectionParser(
             self.hostname,
             self.sections,
@@ -150,6 +170,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_parser(
@@ -171,6 +192,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_section_parser(
@@ -189,7 +211,7 @@ class ParserState(abc.ABC):
             not self.piggyback_sections[current_host]
             or self.piggyback_sections[current_host][-1].header != section_header
         ):
-            self.piggyback_sections[current_host].append(SectionWithHeader(section_header, []))
+            self.piggyback_sections[current_host].append(SectionWithHeader(section_header, [], []))
         return PiggybackSectionParser(
             self.hostname,
             self.sections,
@@ -199,6 +221,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_noop_parser(
@@ -213,6 +236,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_piggyback_ignore_parser(self) -> PiggybackIgnoreParser:
@@ -223,6 +247,7 @@ class ParserState(abc.ABC):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=self.selection,
         )
 
     def to_error(self, line: bytes) -> ParserState:
@@ -301,6 +326,7 @@ class PiggybackParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -309,6 +335,7 @@ class PiggybackParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
 
@@ -347,6 +374,7 @@ class PiggybackSectionParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -355,6 +383,7 @@ class PiggybackSectionParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
         self.current_section: Final = current_section
@@ -363,6 +392,10 @@ class PiggybackSectionParser(ParserState):
         self.piggyback_sections[self.current_host][-1].section.append(AgentRawData(line))
         return self
 
+    def on_body(self, start: int, end: int) -> ParserState:
+        self.piggyback_sections[self.current_host][-1].body.append((start, end))
+        return self
+
     def on_piggyback_header(self, piggyback_header: PiggybackMarker) -> ParserState:
         if piggyback_header.should_be_ignored():
             return self.to_piggyback_ignore_parser()
@@ -390,6 +423,7 @@ class PiggybackNOOPParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -398,6 +432,7 @@ class PiggybackNOOPParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_host: Final = current_host
 
@@ -456,6 +491,7 @@ class HostSectionParser(ParserState):
         translation: TranslationOptions,
         encoding_fallback: str,
         logger: logging.Logger,
+        selection: SectionNameCollection = NO_SELECTION,
     ) -> None:
         super().__init__(
             hostname,
@@ -464,6 +500,7 @@ class HostSectionParser(ParserState):
             translation=translation,
             encoding_fallback=encoding_fallback,
             logger=logger,
+            selection=selection,
         )
         self.current_section: Final = current_section
 
@@ -473,6 +510,10 @@ class HostSectionParser(ParserState):
         )
         return self
 
+    def on_body(self, start: int, end: int) -> ParserState:
+        self.sections[-1].body.append((start, end))
+        return self
+
     def on_piggyback_header(self, piggyback_header: PiggybackMarker) -> ParserState:
         if piggyback_header.hostname == self.hostname:
             # Unpiggybacked "normal" host
@@ -548,7 +589,13 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         raw_data: AgentRawData,
         selection: SectionNameCollection,
     ) -> tuple[ImmutableSection, Mapping[PiggybackMarker, ImmutableSection]]:
-        """Split agent output in chunks, splits lines by whitespaces."""
+        """Split agent output in chunks, splits lines by whitespaces.
+
+        Only the marker lines go through the parser states one by one.  The
+        lines in between are handed over as slices of the raw data and only
+        split up at the end.  The host sections not in the selection are
+        skipped by the parser states right away.
+        """
         parser: ParserState = NOOPParser(
             self.hostname,
             [],
@@ -556,13 +603,17 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             translation=self.translation,
             encoding_fallback=self.encoding_fallback,
             logger=self._logger,
+            selection=selection,
         )
-        for line in raw_data.split(b"\n"):
-            parser = parser(line.rstrip(b"\r"))
+        for is_marker, start, end in split_at_markers(raw_data):
+            parser = parser(raw_data[start:end]) if is_marker else parser.on_body(start, end)
 
-        return parser.sections if selection is NO_SELECTION else [
-            s for s in parser.sections if s.header.name in selection
-        ], parser.piggyback_sections
+        for section in parser.sections:
+            split_body(raw_data, section, strip=not section.header.nostrip)
+        for piggybacked_sections in parser.piggyback_sections.values():
+            for section in piggybacked_sections:
+                split_body(raw_data, section, strip=False)
+        return parser.sections, parser.piggyback_sections
 
     def _make_piggybacked_sections(
         self,
@@ -575,7 +626,7 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
             cached_at: int,
             cache_for: int,
         ) -> Iterator[bytes]:
-            for header, content in sections:
+            for header, content, _body in sections:
                 if header.cached is not None or header.persist is not None:
                     yield str(header).encode(header.encoding)
                 else:
@@ -605,17 +656,58 @@ class AgentParser(Parser[AgentRawData, AgentRawDataSection]):
         }
 
 
+def split_at_markers(raw_data: bytes) -> Iterator[tuple[bool, int, int]]:
+    """Find the marker lines (section and piggyback headers and footers)
+
+    Yields (True, start, end) for the marker lines (without the line break)
+    and (False, start, end) for the data in between.
+    """
+    size = len(raw_data)
+    body_start = 0
+    line_start = 0 if raw_data.startswith(b"<<<") else _next_candidate(raw_data, 0)
+    while line_start != -1:
+        line_end = raw_data.find(b"\n", line_start)
+        if line_end == -1:
+            line_end = size
+        marker_end = line_end
+        while marker_end > line_start and raw_data[marker_end - 1] == 13:  # b"\r"
+            marker_end -= 1
+        if raw_data.endswith(b">>>", line_start, marker_end):
+            if body_start < line_start:
+                yield False, body_start, line_start
+            yield True, line_start, marker_end
+            body_start = line_end + 1
+        line_start = _next_candidate(raw_data, line_end)
+    if body_start < size:
+        yield False, body_start, size
+
+
+def _next_candidate(raw_data: bytes, pos: int) -> int:
+    """The start of the next line starting like a marker"""
+    return -1 if (newline := raw_data.find(b"\n<<<", pos)) == -1 else newline + 1
+
+
+def split_body(raw_data: bytes, section: SectionWithHeader, *, strip: bool) -> None:
+    """Add the lines of the not yet split parts of the raw data to the section"""
+    for start, end in section.body:
+        for line in raw_data[start:end].split(b"\n"):
+            if not (line := line.rstrip(b"\r")) or line.isspace():
+                continue
+            section.section.append(AgentRawData(line.strip() if strip else line))
+    section.body.clear()
+
+
 def make_section_info(
     raw_sections: ImmutableSection,
 ) -> Mapping[SectionName, SectionMarker]:
-    return {header.name: header for header, _ in raw_sections}
+    return {header.name: header for header, *_rest in raw_sections}
 
 
 def make_decoded_sections(
     sections: ImmutableSection,
 ) -> Mapping[SectionName, list[AgentRawDataSectionElem]]:
     out: MutableMapping[SectionName, list[AgentRawDataSectionElem]] = {}
-    for header, content in sections:
+    for header, content, _body in sections:
         out.setdefault(header.name, []).extend(header.parse_line(line) for line in content)
     return out
 
@@ -14,7 +14,7 @@ from typing import Any, Final, Generic, NamedTuple, Self, TypeVar
 from cmk.ccc import debug
 from cmk.ccc.hostaddress import HostName
 from cmk.helper_interface import SourceType
-from cmk.piggyback.backend import store_piggyback_raw_data
+from cmk.piggyback.backend import store_piggyback_segment
 
 from .fetcher import HostKey
 from .parser import HostSections
@@ -207,7 +207,7 @@ def store_piggybacked_sections(
             # management board (SNMP or IPMI) does not support piggybacking
             continue
         now = time.time()
-        store_piggyback_raw_data(
+        store_piggyback_segment(
             host_key.hostname,
             host_sections.piggybacked_raw_data,
             message_timestamp=now,
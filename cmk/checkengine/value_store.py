@@ -29,9 +29,21 @@ type _ServiceID = tuple[object, _Item]
 type _SerializedValueStore = Mapping[str, str]
 
 
+# Compact the journal once it is bigger than the compacted file and this
+_COMPACTION_MIN_SIZE: Final = 64 * 1024
+
+
+def journal_path(path: Path) -> Path:
+    """The journal of the changes made to the value stores in the file"""
+    return path.parent / f".{path.name}.journal"
+
+
 @dataclass(frozen=True)
 class _LastState:
-    timestamp: float
+    # modification time (ns), size and inode of the compacted file
+    signature: tuple[int, int, int] | None
+    # bytes of the journal applied to the data
+    journal_size: int
     data: Mapping[ValueStoreKey, _SerializedValueStore]
 
 
@@ -40,6 +52,11 @@ class AllValueStoresStore:
 
     Make sure to only update the values we want to update,
     and not to overwrite the whole file.
+
+    The value stores are kept in a compacted file, a JSON list of all of them,
+    and a journal with one JSON line per changed value store. Updating only
+    appends the changed value stores to the journal. Once the journal gets
+    bigger than the compacted file, both are compacted into a new file.
     """
 
     def __init__(
@@ -49,6 +66,7 @@ class AllValueStoresStore:
         log_debug: Callable[[str], object] | None = None,
     ) -> None:
         self.path: Final = path
+        self.journal_path: Final = journal_path(path)
         self._log_debug: Final = (
             lambda x: logger.debug("value store: %s", x) if log_debug is None else log_debug
         )
@@ -60,55 +78,126 @@ class AllValueStoresStore:
 
     @staticmethod
     def _deserialize(raw: str) -> Mapping[ValueStoreKey, _SerializedValueStore]:
-        return {
-            (HostName(hn), str(cn), None if i is None else str(i)): v
-            for (hn, cn, i), v in json.loads(raw)
-        }
+        return dict(map(AllValueStoresStore._deserialize_item, json.loads(raw)))
 
-    def load(self) -> Mapping[ValueStoreKey, _SerializedValueStore]:
-        self._log_debug("loading from disk")
+    @staticmethod
+    def _deserialize_item(
+        item: tuple[tuple[str, str, str | None], _SerializedValueStore],
+    ) -> tuple[ValueStoreKey, _SerializedValueStore]:
+        (hn, cn, i), v = item
+        return (HostName(hn), str(cn), None if i is None else str(i)), v
+
+    def _signature(self) -> tuple[int, int, int] | None:
         try:
-            self._last_known_state = _LastState(
-                self.path.stat().st_mtime,
-                (
-                    data := (
-                        self._deserialize(content)
-                        if (content := store.load_text_from_file(self.path, lock=False).strip())
-                        else {}
-                    )
-                ),
-            )
+            stat = self.path.stat()
         except FileNotFoundError:
-            self._last_known_state = None
-            data = {}
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
 
+    def load(self) -> Mapping[ValueStoreKey, _SerializedValueStore]:
+        self._log_debug("loading from disk")
+        while True:
+            signature = self._signature()
+            data = (
+                {**self._deserialize(content)}
+                if signature is not None
+                and (content := store.load_text_from_file(self.path, lock=False).strip())
+                else {}
+            )
+            journal_size = self._apply_journal(data, 0)
+            # Another process may have compacted the files in the meantime
+            if self._signature() == signature:
+                break
+        self._last_known_state = _LastState(signature, journal_size, data)
         return data
 
+    def _apply_journal(self, data: dict[ValueStoreKey, _SerializedValueStore], offset: int) -> int:
+        """Apply the complete lines of the journal after the offset, returns the new offset
+
+        A line may be incomplete or broken if a process crashed while writing it.
+        """
+        try:
+            with self.journal_path.open("rb") as journal:
+                journal.seek(offset)
+                raw = journal.read()
+        except FileNotFoundError:
+            return 0
+        complete = raw[: raw.rfind(b"\n") + 1]
+        for line in complete.splitlines():
+            try:
+                key, value = self._deserialize_item(json.loads(line))
+            except ValueError:
+                self._log_debug("skipping broken journal entry")
+                continue
+            data[key] = value
+        return offset + len(complete)
+
+    def _refresh(self) -> _LastState:
+        """The current state of the stored values, only reading what changed"""
+        if (
+            (state := self._last_known_state) is None
+            or (signature := self._signature()) is None
+            or signature != state.signature
+        ):
+            self.load()
+            assert self._last_known_state is not None
+            return self._last_known_state
+
+        data = {**state.data}
+        if (journal_size := self._apply_journal(data, state.journal_size)) == state.journal_size:
+            self._log_debug("already loaded")
+            return state
+        self._log_debug("loading changes from disk")
+        self._last_known_state = _LastState(signature, journal_size, data)
+        return self._last_known_state
+
     def update(self, updated: Mapping[ValueStoreKey, _SerializedValueStore]) -> None:
         """Re-load and write the changes of the stored values
 
-        This method will reload the values from disk, apply the changes
-        as specified by the argument, and then write the result to disk.
+        This method will reload the changed values from disk, apply the changes
+        as specified by the argument, and then append the value stores differing
+        from the stored ones to the journal.
         """
         self._log_debug("updating")
 
         self.path.parent.mkdir(parents=True, exist_ok=True)
 
-        with store.locked(self.path):
-            if (
-                self._last_known_state is not None
-                and self.path.stat().st_mtime == self._last_known_state.timestamp
-            ):
-                self._log_debug("already loaded")
-                data = self._last_known_state.data
-            else:
-                self._log_debug("loading from disk")
-                data = self.load()
-
-            self._log_debug("writing to disk")
-            new_data = {**data, **updated}
-            store.save_text_to_file(self.path, self._serialize(new_data))
-            self._last_known_state = _LastState(timestamp=self.path.stat().st_mtime, data=new_data)
+        # The compacted file is replaced when compacting, so it can not be locked.
+        with store.locked(self.journal_path):
+            state = self._refresh()
+            if not (changed := {k: v for k, v in updated.items() if state.data.get(k) != v}):
+                self._log_debug("nothing changed")
+                return
+
+            self._log_debug("appending to journal")
+            with self.journal_path.open("ab") as journal:
+                # Terminate the line left incomplete by a crashed process
+                prefix = b"\n" if journal.tell() != state.journal_size else b""
+                journal.write(
+                    prefix + b"".join(json.dumps(item).encode() + b"\n" for item in changed.items())
+                )
+                journal_size = journal.tell()
+            data = {**state.data, **changed}
+            self._last_known_state = _LastState(state.signature, journal_size, data)
+
+            compacted_size = 0 if state.signature is None else state.signature[1]
+            if journal_size > max(compacted_size, _COMPACTION_MIN_SIZE):
+                self._compact(data)
+
+    def _compact(self, data: Mapping[ValueStoreKey, _SerializedValueStore]) -> None:
+        """Write the value stores to a new compacted file and remove the journal
+
+        This has to be the last thing done while holding the lock: Removing the
+        journal releases its lock for every other process. Crashing before
+        removing it is harmless, its entries are already contained in the new
+        file.
+        """
+        self._log_debug("compacting")
+        compacted = self.path.with_name(f".{self.path.name}.compacted")
+        store.save_text_to_file(compacted, self._serialize(data))
+        compacted.replace(self.path)
+        self.journal_path.unlink(missing_ok=True)
+        self._last_known_state = _LastState(self._signature(), 0, data)
 
 
 class _ValueStore(MutableMapping[str, object]):
@@ -130,6 +219,9 @@ class _ValueStore(MutableMapping[str, object]):
     ```
 
     For now we just trust the users to not mess up the `repr` implementation.
+
+    Values that were only read and can not be modified in place keep their
+    serialized form, only the other accessed values are serialized again.
     """
 
     def __init__(self, initial_data: Mapping[str, str]) -> None:
@@ -137,6 +229,8 @@ class _ValueStore(MutableMapping[str, object]):
         self._raw_serializer: Final = repr
         self._deserialize: Final = literal_eval
         self._accessed: dict[str, object] = {}
+        # accessed keys whose values are known to match their serialized form
+        self._clean: set[str] = set()
 
     def _serialize(self, value: object) -> str:  # TODO: reconsider
         try:
@@ -161,7 +255,10 @@ class _ValueStore(MutableMapping[str, object]):
             return self._accessed[key]
         except KeyError:
             pass
-        return self._accessed.setdefault(key, self._deserialize(self._serialized[key]))
+        value = self._accessed[key] = self._deserialize(self._serialized[key])
+        if _is_immutable(value):
+            self._clean.add(key)
+        return value
 
     def __setitem__(self, key: str, value: object) -> None:
         """
@@ -169,6 +266,7 @@ class _ValueStore(MutableMapping[str, object]):
         but that will not allow users to keep a reference to the object and modify it.
         """
         self._accessed[self._validate_key(key)] = value
+        self._clean.discard(key)
 
     def __delitem__(self, key: str) -> None:
         key = self._validate_key(key)
@@ -176,6 +274,7 @@ class _ValueStore(MutableMapping[str, object]):
             raise KeyError(key)
         self._serialized.pop(key, None)
         self._accessed.pop(key, None)
+        self._clean.discard(key)
 
     def __iter__(self) -> Iterator[str]:
         return iter(self._serialized | self._accessed)
@@ -184,7 +283,16 @@ class _ValueStore(MutableMapping[str, object]):
         return sum(1 for _ in self)
 
     def export(self) -> Mapping[str, str]:
-        return self._serialized | {k: self._serialize(v) for k, v in self._accessed.items()}
+        return self._serialized | {
+            k: self._serialize(v) for k, v in self._accessed.items() if k not in self._clean
+        }
+
+
+def _is_immutable(value: object) -> bool:
+    """Whether the value returned by literal_eval can not be modified in place"""
+    if isinstance(value, tuple | frozenset):
+        return all(map(_is_immutable, value))
+    return value is None or isinstance(value, str | bytes | int | float | complex)
 
 
 class ValueStoreManager:
@@ -235,5 +343,11 @@ class ValueStoreManager:
             self.active_service_interface = old_sif
 
     def save(self) -> None:
-        """Write all accessed value stores to disk"""
-        self._store.update({k: vs.export() for k, vs in self._accessed_stores.items()})
+        """Write the changed value stores to disk"""
+        self._store.update(
+            {
+                k: exported
+                for k, vs in self._accessed_stores.items()
+                if (exported := vs.export()) != self._all_stores.get(k)
+            }
+        )
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Storage of the open events of the event daemon
+
+The events are kept in the order of their creation, just like the plain list
+the event status used before.  In addition to that, the events are indexed
+by id, by rule, by (host, core host) and by (rule, host, application), so
+that counting, cancelling and the event limits don't need to scan all open
+events for every incoming message.
+
+The indexed fields of an event may only be changed in place when the store
+is told about it afterwards via :meth:`EventStore.reindex`.  The lookups by
+rule and host return live views of the indexes, which must not be iterated
+further once events have been added, removed or reindexed.
+"""
+
+from collections.abc import Collection, Iterable, Iterator, Mapping
+from typing import Final
+
+from cmk.ccc.hostaddress import HostName
+
+from .event import Event
+
+type HostKey = tuple[HostName, HostName | None]
+type RuleHostApplicationKey = tuple[str | None, HostName, str]
+type _IndexKeys = tuple[str | None, HostKey, RuleHostApplicationKey]
+
+_NO_EVENTS: Final[Mapping[int, Event]] = {}
+
+
+def _index_keys(event: Event) -> _IndexKeys:
+    host = event.get("host", HostName(""))
+    application = event.get("application", "")
+    return (
+        event.get("rule_id"),
+        (host, event.get("core_host")),
+        (event.get("rule_id"), host, application),
+    )
+
+
+class EventStore:
+    def __init__(self, events: Iterable[Event] = ()) -> None:
+        # All buckets are dicts keyed by the event id. Dicts keep insertion
+        # order, so every bucket lists its events from the oldest to the newest.
+        self._events: Final[dict[int, Event]] = {}
+        self._by_rule: Final[dict[str | None, dict[int, Event]]] = {}
+        self._by_host: Final[dict[HostKey, dict[int, Event]]] = {}
+        self._by_rule_host_application: Final[dict[RuleHostApplicationKey, dict[int, Event]]] = {}
+        # position of the event in the creation order and its current index keys
+        self._sequence: Final[dict[int, int]] = {}
+        self._keys: Final[dict[int, _IndexKeys]] = {}
+        self._next_sequence = 0
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(list(self._events.values()))
+
+    def as_list(self) -> list[Event]:
+        return list(self._events.values())
+
+    def add(self, event: Event) -> None:
+        """Add the event as the newest one, an event with the same id is replaced"""
+        eid = event["id"]
+        if eid in self._events:
+            # Only an old status file could contain the same id twice
+            self._unindex(eid)
+            del self._events[eid]
+        self._events[eid] = event
+        self._sequence[eid] = self._next_sequence
+        self._next_sequence += 1
+        self._index(eid, event)
+
+    def remove(self, event: Event) -> None:
+        """Remove the event, raises ValueError when it is not stored (like list.remove)"""
+        eid = event.get("id", -1)
+        if self._events.get(eid) is not event:
+            raise ValueError(f"Event {eid} is not stored")
+        self._unindex(eid)
+        del self._events[eid]
+        del self._sequence[eid]
+
+    def reindex(self, event: Event) -> None:
+        """Update the indexes after the host, core host, application or rule of an event changed"""
+        eid = event["id"]
+        if self._events.get(eid) is not event or self._keys[eid] == _index_keys(event):
+            return
+        self._unindex(eid)
+        self._index(eid, event)
+
+    def get(self, eid: int) -> Event | None:
+        return self._events.get(eid)
+
+    def oldest(self) -> Event | None:
+        return next(iter(self._events.values()), None)
+
+    def of_rule(self, rule_id: str | None) -> Collection[Event]:
+        return self._by_rule.get(rule_id, _NO_EVENTS).values()
+
+    def of_host(self, host: HostName, core_host: HostName | None) -> Collection[Event]:
+        return self._by_host.get((host, core_host), _NO_EVENTS).values()
+
+    def of_rule_host_application(
+        self, rule_id: str | None, host: HostName, application: str
+    ) -> Collection[Event]:
+        return self._by_rule_host_application.get((rule_id, host, application), _NO_EVENTS).values()
+
+    def _index(self, eid: int, event: Event) -> None:
+        keys = _index_keys(event)
+        self._keys[eid] = keys
+        rule_key, host_key, rule_host_application_key = keys
+        self._add_to_bucket(self._by_rule.setdefault(rule_key, {}), eid, event)
+        self._add_to_bucket(self._by_host.setdefault(host_key, {}), eid, event)
+        self._add_to_bucket(
+            self._by_rule_host_application.setdefault(rule_host_application_key, {}), eid, event
+        )
+
+    def _add_to_bucket(self, bucket: dict[int, Event], eid: int, event: Event) -> None:
+        needs_sorting = (
+            bool(bucket) and self._sequence[next(reversed(bucket))] > self._sequence[eid]
+        )
+        bucket[eid] = event
+        if needs_sorting:
+            # only happens when an older event has been re-indexed into this bucket
+            ordered = sorted(bucket.items(), key=lambda item: self._sequence[item[0]])
+            bucket.clear()
+            bucket.update(ordered)
+
+    def _unindex(self, eid: int) -> None:
+        rule_key, host_key, rule_host_application_key = self._keys.pop(eid)
+        _discard(self._by_rule, rule_key, eid)
+        _discard(self._by_host, host_key, eid)
+        _discard(self._by_rule_host_application, rule_host_application_key, eid)
+
+
+def _discard[K](index: dict[K, dict[int, Event]], key: K, eid: int) -> None:
+    bucket = index[key]
+    del bucket[eid]
+    if not bucket:
+        del index[key]
@@ -5,22 +5,37 @@
 
 import itertools
 import shlex
+import struct
 import subprocess
 import threading
 import time
+from collections import OrderedDict
 from collections.abc import Callable, Iterable, Sequence
 from logging import Logger
 from pathlib import Path
 from typing import Any
 
+from cmk.ccc import store
+from cmk.ccc.exceptions import MKGeneralException
 from cmk.utils.log import VERBOSE
 
 from .config import Config
 from .event import Event, scrub_string
 from .history import _log_event, ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab
+from .history_index import (
+    HistoryFileIndex,
+    index_path_for,
+    INDEXED_COLUMNS,
+    read_header,
+    read_lines,
+    TimeRange,
+)
 from .query import Columns, OperatorName, QueryFilter, QueryGET
 from .settings import Settings
 
+# The indexes of the youngest history files, which are the ones queried most
+_MAX_CACHED_INDEXES = 8
+
 
 class FileHistory(History):
     def __init__(
@@ -37,10 +52,20 @@ class FileHistory(History):
         self._event_columns = event_columns
         self._history_columns = history_columns
         self._lock = threading.Lock()
+        # Protects the cached indexes, which are only saved during the housekeeping
+        self._index_lock = threading.Lock()
+        self._indexes: OrderedDict[Path, HistoryFileIndex] = OrderedDict()
         self._active_history_period = ActiveHistoryPeriod()
+        # The event columns follow time, what, who and addinfo in the history lines.
+        event_column_names = [colname for colname, _defval in event_columns]
+        self._field_positions = {
+            colname: 4 + event_column_names.index(colname) for colname in INDEXED_COLUMNS
+        }
 
     def flush(self) -> None:
         _expire_logfiles(self._settings, self._config, self._logger, self._lock, True)
+        with self._index_lock:
+            self._indexes.clear()
 
     def add(self, event: Event, what: HistoryWhat, who: str = "", addinfo: str = "") -> None:
         """Make a new entry in the event history.
@@ -91,6 +116,9 @@ class FileHistory(History):
             _least_upper_bound_for_filters(time_filters),
         )
         self._logger.debug("time range: %r", time_range)
+        use_index = time_range != (None, None) or any(
+            f.column_name in INDEXED_COLUMNS for f in filters
+        )
 
         # We do not want to open all files. So our strategy is:
         # look for "time" filters and first apply the filter to
@@ -113,12 +141,27 @@ class FileHistory(History):
             if not _intersects(time_range, _get_logfile_timespan(path)):
                 self._logger.debug("skipping history file %s because of time filters", path)
                 continue
-            tac = f"nl -b a {shlex.quote(str(path))} | tac"  # Process younger lines first
-            cmd = " | ".join([tac] + grep_pipeline)
-            self._logger.debug("preprocessing history file with command [%s]", cmd)
-            new_entries = parse_history_file(
-                self._history_columns, path, query.filter_row, cmd, limit, self._logger
-            )
+            if use_index and (candidates := self._candidates(path, time_range, filters)):
+                index, linenos = candidates
+                self._logger.debug(
+                    "reading %d of %d lines of history file %s", len(linenos), len(index), path
+                )
+                new_entries = parse_indexed_history_file(
+                    self._history_columns,
+                    path,
+                    index,
+                    linenos,
+                    query.filter_row,
+                    limit,
+                    self._logger,
+                )
+            else:
+                tac = f"nl -b a {shlex.quote(str(path))} | tac"  # Process younger lines first
+                cmd = " | ".join([tac] + grep_pipeline)
+                self._logger.debug("preprocessing history file with command [%s]", cmd)
+                new_entries = parse_history_file(
+                    self._history_columns, path, query.filter_row, cmd, limit, self._logger
+                )
             history_entries += new_entries
             if limit is not None:
                 limit -= len(new_entries)
@@ -126,10 +169,80 @@ class FileHistory(History):
 
     def housekeeping(self) -> None:
         _expire_logfiles(self._settings, self._config, self._logger, self._lock, False)
+        self._update_indexes()
 
     def close(self) -> None:
         pass
 
+    def _update_indexes(self) -> None:
+        """Save the indexes of the history files, including the lines appended since last time"""
+        try:
+            paths = set(self._settings.paths.history_dir.value.glob("*.log"))
+            with self._index_lock:
+                for path in self._indexes.keys() - paths:
+                    del self._indexes[path]
+                for path in paths:
+                    stat = path.stat()
+                    index_path = index_path_for(path)
+                    if read_header(index_path) == (stat.st_ino, stat.st_size):
+                        continue
+                    if (index := self._up_to_date_index(path)) is None:
+                        continue
+                    try:
+                        store.save_bytes_to_file(index_path, index.serialize())
+                    except MKGeneralException as e:
+                        # Not fatal, the lines are indexed again next time.
+                        self._logger.debug("Cannot write history index %s: %s", index_path, e)
+        except Exception as e:
+            if self._settings.options.debug:
+                raise
+            self._logger.warning("Error updating history indexes: %s", e)
+
+    def _candidates(
+        self, path: Path, time_range: TimeRange, filters: Iterable[QueryFilter]
+    ) -> tuple[HistoryFileIndex, list[int]] | None:
+        with self._index_lock:
+            if (index := self._up_to_date_index(path)) is None:
+                return None
+            return index, index.candidates(time_range, filters)
+
+    def _up_to_date_index(self, path: Path) -> HistoryFileIndex | None:
+        """The index of a history file including the lines appended since it has been built
+
+        Must be called with the index lock held. The index is taken from the cache or from the
+        index file, only the bytes appended since then are read from the history file.
+        """
+        try:
+            stat = path.stat()
+        except OSError:
+            return None  # expired in the meantime
+        index = self._indexes.pop(path, None)
+        if index is None or index.inode != stat.st_ino or index.size > stat.st_size:
+            index = self._load_index(path)
+        if index is None or index.inode != stat.st_ino or index.size > stat.st_size:
+            index = HistoryFileIndex.empty(stat.st_ino)
+
+        if index.size < stat.st_size:
+            with path.open("rb") as f:
+                f.seek(index.size)
+                data = f.read(stat.st_size - index.size)
+            index.update(data, self._field_positions)
+
+        self._indexes[path] = index
+        while len(self._indexes) > _MAX_CACHED_INDEXES:
+            self._indexes.popitem(last=False)
+        return index
+
+    def _load_index(self, path: Path) -> HistoryFileIndex | None:
+        index_path = index_path_for(path)
+        try:
+            return HistoryFileIndex.deserialize(index_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, struct.error) as e:
+            self._logger.warning("Ignoring invalid history index %s: %s", index_path, e)
+            return None
+
 
 def _expire_logfiles(
     settings: Settings, config: Config, logger: Logger, lock_history: threading.Lock, flush: bool
@@ -151,6 +264,7 @@ def _expire_logfiles(
                         "Deleting log file %s (age %s)", path, _date_and_time(path.stat().st_mtime)
                     )
                     path.unlink()
+                    index_path_for(path).unlink(missing_ok=True)
         except Exception as e:
             if settings.options.debug:
                 raise
@@ -295,6 +409,31 @@ def parse_history_file(
     return entries
 
 
+def parse_indexed_history_file(
+    history_columns: Sequence[tuple[str, Any]],
+    path: Path,
+    index: HistoryFileIndex,
+    linenos: Sequence[int],
+    filter_row: Callable[[Sequence[Any]], bool],
+    limit: int | None,
+    logger: Logger,
+) -> list[Any]:
+    """Like parse_history_file(), but only reads the given lines via the index of the file"""
+    entries: list[Any] = []
+    for lineno, line in read_lines(path, index, linenos):
+        if limit is not None and len(entries) > limit:
+            break
+        try:
+            parts: list[Any] = [lineno + 1, *line.decode("utf-8").split("\t")]
+            convert_history_line(history_columns, parts)
+            if filter_row(parts):
+                entries.append(parts)
+        except Exception:
+            logger.exception("Invalid line '%s' in history file %s", line, path)
+
+    return entries
+
+
 def parse_history_file_python(
     history_columns: Sequence[tuple[str, Any]],
     path: Path,
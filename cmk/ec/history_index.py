@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Sidecar indexes for the history files of the file history backend
+
+Every history file gets an index file next to it (".<name>.idx"), which
+contains
+
+* the byte offset of every line, so that single lines can be read directly,
+* a sparse time index: the minimum and maximum history time per block of
+  lines,
+* the event ID of every line: The IDs are nearly unique, posting lists would
+  mostly consist of a single line, and
+* posting lists: the lines by host and application.
+
+History files are only ever appended to, so an index can be brought up to
+date by indexing the lines appended since it has been written.  Incomplete
+lines at the end of the file (a concurrent write) are not indexed yet.
+
+Index layout (all integers little endian)::
+
+    header    magic, version, inode of the history file, number of bytes
+              indexed, number of lines
+    offsets   start of every line, uint64
+    times     (minimum, maximum) history time per block of lines, double
+    ids       event ID of every line, int64
+
+followed by the posting lists of every string column::
+
+    header    number of values, length of the values
+    values    the values, UTF-8, separated by newlines
+    counts    number of lines per value, uint32
+    entries   line numbers of the posting lists of all values, uint32
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator, Mapping, Sequence
+from pathlib import Path
+from typing import Any, Final, Self
+
+from .query import QueryFilter
+
+_MAGIC: Final = b"CMKHIDX"
+_VERSION: Final = 2
+_HEADER: Final = struct.Struct("<7sBQQQ")
+_POSTINGS_HEADER: Final = struct.Struct("<QQ")
+
+# Number of lines per entry of the sparse time index
+BLOCK_SIZE: Final = 64
+
+# The indexed columns and how to get from the text in the history file to the column value.
+# Integer columns are indexed by the value of every line, string columns by posting lists.
+INDEXED_COLUMNS: Final[Mapping[str, type]] = {
+    "event_id": int,
+    "event_host": str,
+    "event_application": str,
+}
+_ID_COLUMNS: Final = tuple(column for column, type_ in INDEXED_COLUMNS.items() if type_ is int)
+_POSTING_COLUMNS: Final = tuple(
+    column for column, type_ in INDEXED_COLUMNS.items() if type_ is not int
+)
+
+# Lines with an integer value which can't be stored, these are always candidates
+_NO_ID: Final = -(2**63)
+
+type TimeRange = tuple[float | None, float | None]
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(f".{path.name}.idx")
+
+
+class HistoryFileIndex:
+    def __init__(
+        self,
+        *,
+        inode: int,
+        size: int,
+        offsets: array[int],
+        times: array[float],
+        ids: dict[str, array[int]],
+        postings: dict[str, dict[str, array[int]]],
+    ) -> None:
+        self.inode: Final = inode
+        # Number of bytes indexed, always the end of a line
+        self.size = size
+        # Start of every line
+        self.offsets: Final = offsets
+        # (minimum, maximum) history time for every block of BLOCK_SIZE lines
+        self.times: Final = times
+        # integer column -> value of every line
+        self.ids: Final = ids
+        # string column -> value -> line numbers (0-based, ascending)
+        self.postings: Final = postings
+
+    @classmethod
+    def empty(cls, inode: int) -> Self:
+        return cls(
+            inode=inode,
+            size=0,
+            offsets=array("Q"),
+            times=array("d"),
+            ids={column: array("q") for column in _ID_COLUMNS},
+            postings={column: {} for column in _POSTING_COLUMNS},
+        )
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def update(self, data: bytes, field_positions: Mapping[str, int]) -> bool:
+        """Index the complete lines of data, which has been appended at self.size
+
+        field_positions are the positions of the indexed columns in the lines.
+        Returns whether anything has been indexed.
+        """
+        end = data.rfind(b"\n") + 1
+        if end == 0:
+            return False
+        max_split = max(field_positions.values()) + 1
+        start = 0
+        while start < end:
+            line_end = data.index(b"\n", start) + 1
+            self._add_line(data[start:line_end], start, field_positions, max_split)
+            start = line_end
+        self.size += end
+        return True
+
+    def _add_line(
+        self, line: bytes, start: int, field_positions: Mapping[str, int], max_split: int
+    ) -> None:
+        lineno = len(self.offsets)
+        self.offsets.append(self.size + start)
+        fields = line.rstrip(b"\n").split(b"\t", max_split)
+        try:
+            history_time = float(fields[0])
+        except ValueError:
+            # Can't be pruned by time, so the block must always be read.
+            history_time = math.nan
+        self._add_time(lineno, history_time)
+        for column in _ID_COLUMNS:
+            self.ids[column].append(_parse_id(fields, field_positions[column]))
+        for column in _POSTING_COLUMNS:
+            if (position := field_positions[column]) < len(fields):
+                value = fields[position].decode("utf-8", errors="replace")
+                self.postings[column].setdefault(value, array("I")).append(lineno)
+
+    def _add_time(self, lineno: int, history_time: float) -> None:
+        low, high = (
+            (-math.inf, math.inf) if math.isnan(history_time) else (history_time, history_time)
+        )
+        if lineno % BLOCK_SIZE == 0:
+            self.times.extend((low, high))
+        else:
+            self.times[-2] = min(self.times[-2], low)
+            self.times[-1] = max(self.times[-1], high)
+
+    def candidates(self, time_range: TimeRange, filters: Iterable[QueryFilter]) -> list[int]:
+        """The line numbers (0-based) which may match the filters, youngest lines first
+
+        Filters on the indexed columns are evaluated exactly on the values of
+        the posting lists, the time range is applied to whole blocks of lines.
+        The result may contain lines not matching the filters, but it never
+        misses a matching one.
+        """
+        lines: set[int] | None = None
+        for f in filters:
+            if f.column_name not in INDEXED_COLUMNS:
+                continue
+            matching = set(self._lines_with_matching_value(f))
+            lines = matching if lines is None else lines & matching
+            if not lines:
+                return []
+
+        blocks = [
+            nr
+            for nr in range(len(self.times) // 2)
+            if _intersects(time_range, (self.times[2 * nr], self.times[2 * nr + 1]))
+        ]
+        if lines is None:
+            return [
+                lineno
+                for nr in reversed(blocks)
+                for lineno in reversed(_block_lines(nr, len(self)))
+            ]
+        wanted_blocks = set(blocks)
+        return sorted((n for n in lines if n // BLOCK_SIZE in wanted_blocks), reverse=True)
+
+    def _lines_with_matching_value(self, f: QueryFilter) -> Iterator[int]:
+        if f.column_name in self.ids:
+            yield from self._lines_with_matching_id(f)
+            return
+        for value, lines in self.postings[f.column_name].items():
+            try:
+                matches = f.predicate(value)
+            except Exception:
+                matches = True  # let the real filtering decide
+            if matches:
+                yield from lines
+
+    def _lines_with_matching_id(self, f: QueryFilter) -> Iterator[int]:
+        ids = self.ids[f.column_name]
+        yield from _find_all(ids, _NO_ID)
+        if f.operator_name == "=" and type(f.argument) is int:
+            yield from _find_all(ids, f.argument)
+            return
+        matching = set()
+        for value in set(ids) - {_NO_ID}:
+            try:
+                matches = f.predicate(value)
+            except Exception:
+                matches = True  # let the real filtering decide
+            if matches:
+                matching.add(value)
+        yield from (lineno for lineno, value in enumerate(ids) if value in matching)
+
+    def serialize(self) -> bytes:
+        chunks = [
+            _HEADER.pack(_MAGIC, _VERSION, self.inode, self.size, len(self.offsets)),
+            _to_le_bytes(self.offsets),
+            _to_le_bytes(self.times),
+            *(_to_le_bytes(self.ids[column]) for column in _ID_COLUMNS),
+        ]
+        for column in _POSTING_COLUMNS:
+            values = self.postings[column]
+            raw_values = "\n".join(values).encode("utf-8")
+            chunks.extend(
+                (
+                    _POSTINGS_HEADER.pack(len(values), len(raw_values)),
+                    raw_values,
+                    _to_le_bytes(array("I", (len(lines) for lines in values.values()))),
+                    *(_to_le_bytes(lines) for lines in values.values()),
+                )
+            )
+        return b"".join(chunks)
+
+    @classmethod
+    def deserialize(cls, raw: bytes) -> Self:
+        magic, version, inode, size, num_lines = _HEADER.unpack_from(raw)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("invalid history index header")
+
+        offset = _HEADER.size
+        offsets = _from_le_bytes("Q", raw, offset, num_lines)
+        offset += offsets.itemsize * len(offsets)
+        times = _from_le_bytes("d", raw, offset, 2 * math.ceil(num_lines / BLOCK_SIZE))
+        offset += times.itemsize * len(times)
+        ids = {}
+        for column in _ID_COLUMNS:
+            ids[column] = _from_le_bytes("q", raw, offset, num_lines)
+            offset += ids[column].itemsize * num_lines
+
+        postings: dict[str, dict[str, array[int]]] = {}
+        for column in _POSTING_COLUMNS:
+            num_values, values_length = _POSTINGS_HEADER.unpack_from(raw, offset)
+            offset += _POSTINGS_HEADER.size
+            values = raw[offset : offset + values_length].decode("utf-8").split("\n")
+            offset += values_length
+            counts = _from_le_bytes("I", raw, offset, num_values)
+            offset += counts.itemsize * num_values
+            entries = _from_le_bytes("I", raw, offset, sum(counts))
+            offset += entries.itemsize * len(entries)
+            postings[column] = {}
+            start = 0
+            for value, count in zip(values[:num_values], counts):
+                postings[column][value] = entries[start : start + count]
+                start += count
+        return cls(inode=inode, size=size, offsets=offsets, times=times, ids=ids, postings=postings)
+
+
+def read_header(path: Path) -> tuple[int, int] | None:
+    """Return the inode and the number of indexed bytes of an index file, if it is valid"""
+    try:
+        with path.open("rb") as f:
+            magic, version, inode, size, *_rest = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    return (inode, size) if magic == _MAGIC and version == _VERSION else None
+
+
+def read_lines(
+    path: Path, index: HistoryFileIndex, linenos: Sequence[int]
+) -> Iterator[tuple[int, bytes]]:
+    """Read the given lines of the history file, the line numbers must be descending"""
+    with path.open("rb") as f:
+        for first, last in _runs(linenos):
+            start = index.offsets[first]
+            end = index.offsets[last + 1] if last + 1 < len(index) else index.size
+            f.seek(start)
+            lines = f.read(end - start).split(b"\n")[:-1]
+            yield from zip(range(last, first - 1, -1), reversed(lines))
+
+
+def _runs(linenos: Sequence[int]) -> Iterator[tuple[int, int]]:
+    """Group descending line numbers into ranges of consecutive lines (first, last)"""
+    pos = 0
+    while pos < len(linenos):
+        last = linenos[pos]
+        while pos + 1 < len(linenos) and linenos[pos + 1] == linenos[pos] - 1:
+            pos += 1
+        yield linenos[pos], last
+        pos += 1
+
+
+def _parse_id(fields: Sequence[bytes], position: int) -> int:
+    try:
+        value = int(fields[position])
+    except (IndexError, ValueError):
+        return _NO_ID  # can't be converted when reading the line either
+    return value if _NO_ID < value < 2**63 else _NO_ID
+
+
+def _find_all(ids: array[int], value: int) -> Iterator[int]:
+    """The positions of the value in the array, found without converting the items"""
+    if not _NO_ID <= value < 2**63:
+        return
+    raw = ids.tobytes()
+    needle = array(ids.typecode, (value,)).tobytes()
+    pos = raw.find(needle)
+    while pos >= 0:
+        if pos % ids.itemsize == 0:
+            yield pos // ids.itemsize
+            pos = raw.find(needle, pos + ids.itemsize)
+        else:
+            pos = raw.find(needle, pos + 1)
+
+
+def _block_lines(nr: int, num_lines: int) -> range:
+    return range(nr * BLOCK_SIZE, min((nr + 1) * BLOCK_SIZE, num_lines))
+
+
+def _intersects(interval1: TimeRange, interval2: tuple[float, float]) -> bool:
+    lo1, hi1 = interval1
+    lo2, hi2 = interval2
+    return (hi1 is None or lo2 <= hi1) and (lo1 is None or lo1 <= hi2)
+
+
+def _to_le_bytes(values: array[Any]) -> bytes:
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le_bytes(typecode: str, raw: bytes, offset: int, count: int) -> array[Any]:
+    values: array[Any] = array(typecode)
+    end = offset + count * values.itemsize
+    if end > len(raw):
+        raise ValueError("truncated history index")
+    values.frombytes(raw[offset:end])
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Batched ingestion of UDP syslog messages
+
+Without ingestion workers, the event server thread receives and parses the
+UDP syslog datagrams one by one in its select loop, and the kernel drops
+datagrams whenever the socket buffer overflows in the meantime.  With
+ingestion workers, the UDP syslog socket is taken out of that loop:
+
+* A reader thread waits for the socket via epoll and drains it without
+  blocking in batches of up to ``batch_size`` datagrams.
+* The batches are put into a queue of at most ``queue_length`` batches.  If
+  the queue is full, the batch is dropped and counted instead of stalling
+  the reader.
+* A dispatcher thread has the queued batches parsed by a pool of worker
+  processes.
+* The parsed events are handed back to the event server thread, which is
+  still the only one doing rule matching and touching the event state.  The
+  batches are handed back in the order they were received, no matter which
+  worker finishes first, since the rules depend on the order of the events.  The
+  wakeup file descriptor becomes readable whenever parsed events are
+  waiting, so it can simply be added to the select loop.
+
+Note that the worker processes do not log the parsing of messages even if
+rule debugging is enabled.
+"""
+
+from __future__ import annotations
+
+import functools
+import multiprocessing
+import os
+import queue
+import select
+import socket
+import threading
+from collections import deque
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future, ProcessPoolExecutor
+from logging import Logger
+from typing import Final
+
+from .event import create_event_from_syslog_message, Event
+from .perfcounters import lerp
+from .query import Columns
+
+type Address = tuple[str, int]
+type Datagram = tuple[bytes, Address]
+
+
+def parse_datagrams(datagrams: Sequence[Datagram]) -> list[Event]:
+    """Parse a batch of syslog datagrams, this runs in the worker processes"""
+    return [
+        create_event_from_syslog_message(message, address, None) for message, address in datagrams
+    ]
+
+
+class SyslogIngestion:
+    def __init__(
+        self,
+        *,
+        sock: socket.socket,
+        parse_address: Callable[[object], Address],
+        workers: int,
+        batch_size: int,
+        queue_length: int,
+        logger: Logger,
+    ) -> None:
+        self._socket: Final = sock
+        self._parse_address: Final = parse_address
+        self._workers: Final = workers
+        self._batch_size: Final = batch_size
+        self._queue_length: Final = queue_length
+        self._logger: Final = logger.getChild("ingestion")
+
+        # None is the signal for the dispatcher to stop
+        self._queue: Final[queue.Queue[list[Datagram] | None]] = queue.Queue(queue_length)
+        # Bounds the number of batches handed to the pool but not parsed yet
+        self._in_flight: Final = threading.BoundedSemaphore(2 * workers)
+        self._results: Final[deque[list[Event]]] = deque()
+        # Parsed batches waiting for their predecessors, by sequence number
+        self._reorder_buffer: Final[dict[int, list[Event]]] = {}
+        self._next_sequence = 0
+        self._reorder_lock: Final = threading.Lock()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        os.set_blocking(self._wakeup_write, False)
+
+        self._terminate: Final = threading.Event()
+        self._pool: ProcessPoolExecutor | None = None
+        self._reader: threading.Thread | None = None
+        self._dispatcher: threading.Thread | None = None
+
+        self._lock: Final = threading.Lock()
+        self._batches = 0
+        self._average_batch_size = 0.0
+        self._drops = 0
+
+    @property
+    def wakeup_fd(self) -> int:
+        return self._wakeup_read
+
+    def start(self) -> None:
+        self._logger.info(
+            "Starting %d syslog ingestion workers (batch size %d, queue length %d)",
+            self._workers,
+            self._batch_size,
+            self._queue_length,
+        )
+        self._socket.setblocking(False)
+        # Forking a process with running threads is asking for trouble.
+        self._pool = ProcessPoolExecutor(
+            max_workers=self._workers, mp_context=multiprocessing.get_context("forkserver")
+        )
+        self._dispatcher = threading.Thread(
+            target=self._dispatch, name="SyslogDispatcher", daemon=True
+        )
+        self._dispatcher.start()
+        self._reader = threading.Thread(target=self._read, name="SyslogReader", daemon=True)
+        self._reader.start()
+
+    def stop(self) -> None:
+        self._terminate.set()
+        if self._reader is not None:
+            self._reader.join()
+        if self._dispatcher is not None:
+            self._queue.put(None)
+            self._dispatcher.join()
+        if self._pool is not None:
+            self._pool.shutdown(wait=True, cancel_futures=True)
+        self._socket.setblocking(True)
+        os.close(self._wakeup_read)
+        os.close(self._wakeup_write)
+
+    def pop_events(self) -> list[Event]:
+        """Return the events parsed so far, to be called when the wakeup FD is readable"""
+        try:
+            while os.read(self._wakeup_read, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        events: list[Event] = []
+        while self._results:
+            events.extend(self._results.popleft())
+        return events
+
+    def _read(self) -> None:
+        with select.epoll() as epoll:
+            epoll.register(self._socket.fileno(), select.EPOLLIN)
+            while not self._terminate.is_set():
+                try:
+                    if not epoll.poll(1):
+                        continue
+                except InterruptedError:
+                    continue
+                while batch := self._receive_batch():
+                    self._enqueue(batch)
+
+    def _receive_batch(self) -> list[Datagram]:
+        batch: list[Datagram] = []
+        while len(batch) < self._batch_size:
+            try:
+                message, address = self._socket.recvfrom(4096)
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._logger.exception("Exception during syslog socket_udp recvfrom")
+                break
+            try:
+                batch.append((message, self._parse_address(address)))
+            except ValueError as e:
+                self._logger.warning("Skipping syslog message: %s", e)
+        return batch
+
+    def _enqueue(self, batch: list[Datagram]) -> None:
+        try:
+            self._queue.put_nowait(batch)
+        except queue.Full:
+            with self._lock:
+                self._drops += len(batch)
+            return
+        with self._lock:
+            self._batches += 1
+            self._average_batch_size = (
+                lerp(len(batch), self._average_batch_size, 0.99)
+                if self._batches > 1
+                else float(len(batch))
+            )
+
+    def _dispatch(self) -> None:
+        assert self._pool is not None
+        sequence = 0
+        while (batch := self._queue.get()) is not None:
+            self._in_flight.acquire()
+            try:
+                future = self._pool.submit(parse_datagrams, batch)
+            except RuntimeError:  # pool is broken or shut down
+                self._logger.exception("Cannot parse syslog messages")
+                self._in_flight.release()
+                with self._lock:
+                    self._drops += len(batch)
+                continue
+            future.add_done_callback(functools.partial(self._collect, sequence, len(batch)))
+            sequence += 1
+
+    def _collect(self, sequence: int, num_messages: int, future: Future[list[Event]]) -> None:
+        self._in_flight.release()
+        try:
+            events = future.result()
+        except Exception:
+            self._logger.exception("Cannot parse syslog messages")
+            with self._lock:
+                self._drops += num_messages
+            # Still take its place in the sequence, so the following batches are released
+            events = []
+        with self._reorder_lock:
+            self._reorder_buffer[sequence] = events
+            released = False
+            while (ready := self._reorder_buffer.pop(self._next_sequence, None)) is not None:
+                self._results.append(ready)
+                self._next_sequence += 1
+                released = True
+        if not released:
+            return
+        try:
+            os.write(self._wakeup_write, b"\0")
+        except BlockingIOError:
+            pass  # pipe is full, so the event server will wake up anyway
+
+    @classmethod
+    def status_columns(cls) -> Columns:
+        # Please note: status_columns() and get_status() need to produce lists with exact same column order
+        return [
+            ("status_ingestion_workers", 0),
+            ("status_ingestion_batch_size", 0),
+            ("status_ingestion_queue_length", 0),
+            ("status_ingestion_queue_size", 0),
+            ("status_ingestion_batches", 0),
+            ("status_ingestion_average_batch_size", 0.0),
+            ("status_ingestion_drops", 0),
+        ]
+
+    def get_status(self) -> Sequence[object]:
+        with self._lock:
+            return [
+                self._workers,
+                self._batch_size,
+                self._queue_length,
+                self._queue.qsize(),
+                self._batches,
+                self._average_batch_size,
+                self._drops,
+            ]
@@ -28,7 +28,7 @@ import sys
 import threading
 import time
 import traceback
-from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
 from logging import DEBUG, getLogger, Logger
 from pathlib import Path
 from types import FrameType
@@ -62,12 +62,14 @@ from .config import (
 from .core_queries import HostInfo, query_hosts_scheduled_downtime_depth
 from .crash_reporting import ECCrashReport
 from .event import create_events_from_syslog_messages, Event, scrub_string
+from .event_store import EventStore
 from .helpers import ECLock, parse_bytes_into_syslog_messages
 from .history import ActiveHistoryPeriod, get_logfile, History, HistoryWhat, quote_tab, TimedHistory
 from .history_file import FileHistory
 from .history_mongo import MongoDBHistory
 from .history_sqlite import SQLiteHistory, SQLiteSettings
 from .host_config import HostConfig
+from .ingestion import SyslogIngestion
 from .perfcounters import Perfcounters
 from .query import (
     Columns,
@@ -79,6 +81,7 @@ from .query import (
     QueryREPLICATE,
     StatusTable,
 )
+from .rule_index import RuleIndex
 from .rule_matcher import compile_rule, match, MatchFailure, MatchResult, MatchSuccess, RuleMatcher
 from .rule_packs import load_active_config
 from .settings import create_settings, FileDescriptor, PortNumber, Settings
@@ -384,10 +387,14 @@ class EventServer(ECServerThread):
         self._syslog_udp: socket.socket | None = None
         self._syslog_tcp: socket.socket | None = None
         self._snmp_trap_socket: socket.socket | None = None
+        self._ingestion: SyslogIngestion | None = None
 
         self._rules: list[Rule] = []
         self._rule_by_id: dict[str | None, Rule] = {}
         self._rule_hash: dict[int, dict[int, Any]] = {}
+        self._rule_index = RuleIndex([])
+        # the rules of _rule_hash as bit masks of the rule index
+        self._rule_hash_masks: dict[int, dict[int, int]] = {}
         self._hash_stats: list[list[int]] = []  # facility/priority
         for _unused_facility in range(32):
             self._hash_stats.append([0] * 8)
@@ -428,6 +435,7 @@ class EventServer(ECServerThread):
                 Perfcounters.status_columns(),
                 cls._replication_columns(),
                 cls._event_limit_columns(),
+                SyslogIngestion.status_columns(),
             )
         )
 
@@ -465,6 +473,7 @@ class EventServer(ECServerThread):
                 *self._perfcounters.get_status(),
                 *self._add_replication_status(),
                 *self._add_event_limit_status(),
+                *self._add_ingestion_status(),
             ]
         ]
 
@@ -498,6 +507,11 @@ class EventServer(ECServerThread):
             self.is_overall_event_limit_active(),
         ]
 
+    def _add_ingestion_status(self) -> Sequence[object]:
+        if (ingestion := self._ingestion) is not None:
+            return ingestion.get_status()
+        return [default for _name, default in SyslogIngestion.status_columns()]
+
     def create_pipe(self) -> None:
         path = self.settings.paths.event_pipe.value
         with contextlib.suppress(Exception):
@@ -655,10 +669,37 @@ class EventServer(ECServerThread):
         return os.open(str(self.settings.paths.event_pipe.value), os.O_RDWR | os.O_NONBLOCK)
 
     def serve(self) -> None:
+        if self._syslog_udp is None or self.settings.options.syslog_workers == 0:
+            self._serve(None)
+            return
+        ingestion = SyslogIngestion(
+            sock=self._syslog_udp,
+            parse_address=lambda address: parse_address("syslog socket (UDP)", address),
+            workers=self.settings.options.syslog_workers,
+            batch_size=self.settings.options.syslog_batch_size,
+            queue_length=self.settings.options.syslog_queue_length,
+            logger=self._logger,
+        )
+        ingestion.start()
+        self._ingestion = ingestion
+        try:
+            self._serve(ingestion)
+        finally:
+            self._ingestion = None
+            ingestion.stop()
+
+    def _serve(self, ingestion: SyslogIngestion | None) -> None:
         pipe = self.open_pipe()
-        # We just read()/recvfrom() these, so we create no new FDs via them.
+        # We just read()/recvfrom() these, so we create no new FDs via them. The UDP syslog socket
+        # is read by the ingestion threads, if any, and they wake us up when events are parsed.
         pipe_and_datagram_sockets = [
-            f for f in (pipe, self._syslog_udp, self._snmp_trap_socket) if f is not None
+            f
+            for f in (
+                pipe,
+                self._syslog_udp if ingestion is None else ingestion.wakeup_fd,
+                self._snmp_trap_socket,
+            )
+            if f is not None
         ]
         # We use accept() on these FDs, so we must be careful to avoid creating too many additional
         # FDs. We use an arbitrary limit below (less than the usual 1024 FD_SETSIZE limit), so we
@@ -736,8 +777,12 @@ class EventServer(ECServerThread):
                 )
                 self.process_syslog_messages(messages, None)
 
+            # Process events parsed by the syslog ingestion workers
+            if ingestion is not None and ingestion.wakeup_fd in readable:
+                self.process_potential_event_instrumented(ingestion.pop_events())
+
             # Read events from builtin syslog server
-            if self._syslog_udp is not None and self._syslog_udp in readable:
+            if ingestion is None and self._syslog_udp is not None and self._syslog_udp in readable:
                 message, address = self._syslog_udp.recvfrom(4096)
                 self.process_syslog_messages(
                     [message], parse_address("syslog socket (UDP)", address)
@@ -1180,6 +1225,15 @@ class EventServer(ECServerThread):
                         ):
                             count_unspecific += 1
 
+        self._rule_index = RuleIndex(self._rules)
+        self._perfcounters.forget_rule_times({rule["id"] for rule in self._rules})
+        self._rule_hash_masks = {
+            facility: {
+                priority: self._rule_index.mask_of(rules) for priority, rules in prio_hash.items()
+            }
+            for facility, prio_hash in self._rule_hash.items()
+        }
+
         self._logger.info(
             "Compiled %d active rules (ignoring %d disabled rules)", count_rules, count_disabled
         )
@@ -1190,6 +1244,9 @@ class EventServer(ECServerThread):
                 len(self._rules) - count_unspecific,
                 count_unspecific,
             )
+            self._logger.info(
+                "Rule index: %d combined message patterns", self._rule_index.num_message_groups
+            )
             for facility in list(range(23)) + [31]:
                 if facility in self._rule_hash:
                     stats = [
@@ -1254,6 +1311,13 @@ class EventServer(ECServerThread):
             )
 
     def process_potential_event(self, event: Event) -> None:
+        rule_times: list[tuple[str, float]] = []
+        try:
+            self._process_potential_event(event, rule_times)
+        finally:
+            self._perfcounters.count_rule_times(rule_times)
+
+    def _process_potential_event(self, event: Event, rule_times: list[tuple[str, float]]) -> None:
         self.do_translate_hostname(event)
 
         # Log all incoming messages into a syslog-like text file if that is enabled
@@ -1261,9 +1325,19 @@ class EventServer(ECServerThread):
             self.log_message(event)
 
         # Rule optimizer
+        rule_candidates: Iterable[Rule]
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
-            rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
+            if self._config["debug_rules"]:
+                # Show the outcome of all rules in the debug log
+                rule_candidates = self._rule_hash.get(event["facility"], {}).get(
+                    event["priority"], []
+                )
+            else:
+                rule_candidates = self._rule_index.candidates(
+                    event,
+                    self._rule_hash_masks.get(event["facility"], {}).get(event["priority"], 0),
+                )
         else:
             rule_candidates = self._rules
 
@@ -1273,6 +1347,7 @@ class EventServer(ECServerThread):
                 continue  # still in the rule pack that we want to skip
             skip_pack = None  # new pack, reset skipping
 
+            before = time.perf_counter()
             try:
                 result = self.event_rule_matches(rule, event)
             except Exception as e:
@@ -1280,6 +1355,7 @@ class EventServer(ECServerThread):
                     reason=f"Rule would match, but due to inverted matching does not. {e}"
                 )
                 self._logger.exception(result.reason)
+            rule_times.append((rule["id"], time.perf_counter() - before))
 
             if isinstance(result, MatchSuccess):
                 self._perfcounters.count("rule_hits")
@@ -1925,14 +2001,23 @@ class StatusTableRules(StatusTable):
     columns: Columns = [
         ("rule_id", ""),
         ("rule_hits", 0),
+        ("rule_tries", 0),
+        ("rule_average_match_time", 0.0),
     ]
 
-    def __init__(self, logger: Logger, event_status: EventStatus) -> None:
+    def __init__(
+        self, logger: Logger, event_status: EventStatus, perfcounters: Perfcounters
+    ) -> None:
         super().__init__(logger)
         self._event_status = event_status
+        self._perfcounters = perfcounters
 
     def _enumerate(self, query: QueryGET) -> Iterable[Sequence[object]]:
-        return self._event_status.get_rule_stats()
+        rule_hits = dict(self._event_status.get_rule_stats())
+        rule_times = self._perfcounters.get_rule_times()
+        for rule_id in sorted(rule_hits.keys() | rule_times.keys()):
+            tries, average_time = rule_times.get(rule_id, (0, 0.0))
+            yield rule_id, rule_hits.get(rule_id, 0), tries, average_time
 
 
 class StatusTableStatus(StatusTable):
@@ -1993,7 +2078,7 @@ class StatusServer(ECServerThread):
 
         self._table_events = StatusTableEvents(logger, event_status)
         self._table_history = StatusTableHistory(logger, history)
-        self._table_rules = StatusTableRules(logger, event_status)
+        self._table_rules = StatusTableRules(logger, event_status, perfcounters)
         self._table_status = StatusTableStatus(logger, event_server)
         self._perfcounters = perfcounters
         self._lock_configuration = lock_configuration
@@ -2266,9 +2351,7 @@ class StatusServer(ECServerThread):
             raise MKClientError("Wrong number of arguments for DELETE")
         event_ids, user = arguments
         ids = {int(event_id) for event_id in event_ids.split(",")}
-        self._event_status.delete_events_by(
-            lambda event: event["id"] in ids, user, self._event_server._get_rule_by_id
-        )
+        self._event_status.delete_events_by_ids(ids, user, self._event_server._get_rule_by_id)
 
     def handle_command_delete_events_of_host(self, arguments: list[str]) -> None:
         if len(arguments) != 2:
@@ -2589,8 +2672,7 @@ class EventStatus:
         self._history = history
 
     def flush(self) -> None:
-        # TODO: Improve types!
-        self._events: list[Event] = []
+        self._events = EventStore()
         self._next_event_id = 1
         self._rule_stats: dict[str, int] = {}
         # needed for expecting rules
@@ -2603,14 +2685,10 @@ class EventStatus:
         # - number of rule misses
 
     def events(self) -> list[Event]:
-        # TODO: Improve type!
-        return self._events
+        return self._events.as_list()
 
     def event(self, eid: int) -> Event | None:
-        for event in self._events:
-            if event["id"] == eid:
-                return event
-        return None
+        return self._events.get(eid)
 
     def interval_start(self, rule_id: str, interval: ExpectInterval) -> int:
         """
@@ -2666,14 +2744,14 @@ class EventStatus:
     def pack_status(self) -> PackedEventStatus:
         return PackedEventStatus(
             next_event_id=self._next_event_id,
-            events=self._events,
+            events=self._events.as_list(),
             rule_stats=self._rule_stats,
             interval_starts=self._interval_starts,
         )
 
     def unpack_status(self, status: PackedEventStatus) -> None:
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = EventStore(status["events"])
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
 
@@ -2705,16 +2783,18 @@ class EventStatus:
             try:
                 status = ast.literal_eval(path.read_text(encoding="utf-8"))
                 self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
+                events = status["events"]
                 self._rule_stats = status["rule_stats"]
                 self._interval_starts = status.get("interval_starts", {})
                 self._logger.info("Loaded event state from %s.", path)
             except Exception:
                 self._logger.exception("Error loading event state from %s", path)
                 raise
+        else:
+            events = self._events.as_list()
 
         # Add new columns and fix broken events
-        for event in self._events:
+        for event in events:
             event.setdefault("ipaddress", "")
             event.setdefault("host", HostName(""))
             event.setdefault("application", "")
@@ -2723,6 +2803,11 @@ class EventStatus:
             if "core_host" not in event:
                 event_server.add_core_host_to_event(event)
                 event["host_in_downtime"] = False
+        self._events = EventStore(events)
+        if len(self._events) < len(events):
+            self._logger.warning(
+                "Replaced %d events with duplicate ids", len(events) - len(self._events)
+            )
 
         # core_host is needed to initialize the status
         self._initialize_event_limit_status()
@@ -2763,7 +2848,7 @@ class EventStatus:
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
+        self._events.add(event)
         self.num_existing_events += 1
         self._count_event_add(event)
         self._history.add(event, "NEW")
@@ -2787,28 +2872,27 @@ class EventStatus:
     def remove_oldest_event(self, ty: LimitKind, event: Event) -> None:
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            oldest_event = self._events[0]
-            self.remove_event(oldest_event, "AUTODELETE")
+            if (oldest_event := self._events.oldest()) is not None:
+                self.remove_event(oldest_event, "AUTODELETE")
         elif ty == "by_rule" and event["rule_id"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of rule "%s"', event["rule_id"])
             self._remove_oldest_event_of_rule(event["rule_id"])
         elif ty == "by_host" and event["host"] is not None:
             self._logger.log(VERBOSE, '  Removing oldest event of host "%s"', event["host"])
-            self._remove_oldest_event_of_host(event["host"])
+            self._remove_oldest_event_of_host(event["host"], event["core_host"])
 
     # protected by self.lock
     def _remove_oldest_event_of_rule(self, rule_id: str) -> None:
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event, "AUTODELETE")
-                return
+        for event in self._events.of_rule(rule_id):
+            self.remove_event(event, "AUTODELETE")
+            return
 
     # protected by self.lock
-    def _remove_oldest_event_of_host(self, hostname: str) -> None:
-        for event in self._events:
-            if event["host"] == hostname:
-                self.remove_event(event, "AUTODELETE")
-                return
+    def _remove_oldest_event_of_host(self, hostname: HostName, core_host: HostName | None) -> None:
+        # Same key as num_existing_events_by_host, which triggered the removal
+        for event in self._events.of_host(hostname, core_host):
+            self.remove_event(event, "AUTODELETE")
+            return
 
     # protected by self.lock
     def get_num_existing_events_by(self, ty: LimitKind, event: Event) -> int:
@@ -2836,10 +2920,8 @@ class EventStatus:
         """
         with self.lock:
             to_delete = []
-            for event in self._events:
-                if event["rule_id"] == rule["id"] and self.cancelling_match(
-                    match_groups, new_event, event, rule
-                ):
+            for event in self._cancelling_candidates(match_groups, new_event, rule):
+                if self.cancelling_match(match_groups, new_event, event, rule):
                     # Fill a few fields of the cancelled event with data from
                     # the cancelling event so that action scripts have useful
                     # values and the logfile entry if more relevant.
@@ -2886,11 +2968,20 @@ class EventStatus:
             for e in to_delete:
                 self.remove_event(e, "CANCELLED")
 
-    def cancelling_match(
-        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
-    ) -> bool:
-        debug = self._config["debug_rules"]
+    def _cancelling_candidates(
+        self, match_groups: MatchGroups, new_event: Event, rule: Rule
+    ) -> Collection[Event]:
+        if self._config["debug_rules"]:
+            # Let cancelling_match() explain why each event of the rule is not cancelled
+            return self._events.of_rule(rule["id"])
+        host = self._cancelling_host(match_groups, new_event, rule)
+        if "cancel_application" in rule:
+            return [e for e in self._events.of_rule(rule["id"]) if e["host"] == host]
+        application = self._cancelling_application(match_groups, new_event, rule)
+        return self._events.of_rule_host_application(rule["id"], host, application)
 
+    @staticmethod
+    def _cancelling_host(match_groups: MatchGroups, new_event: Event, rule: Rule) -> HostName:
         # The match_groups of the canceling match only contain the *_ok match groups
         # Since the rewrite definitions are based on the positive match, we need to
         # create some missing keys. O.o
@@ -2905,6 +2996,21 @@ class EventStatus:
         host = new_event["host"]
         if "set_host" in rule:
             host = HostName(replace_groups(rule["set_host"], host, match_groups))
+        return host
+
+    @staticmethod
+    def _cancelling_application(match_groups: MatchGroups, new_event: Event, rule: Rule) -> str:
+        application = new_event["application"]
+        if "set_application" in rule:
+            application = replace_groups(rule["set_application"], application, match_groups)
+        return application
+
+    def cancelling_match(
+        self, match_groups: MatchGroups, new_event: Event, event: Event, rule: Rule
+    ) -> bool:
+        debug = self._config["debug_rules"]
+
+        host = self._cancelling_host(match_groups, new_event, rule)
 
         if event["host"] != host:
             if debug:
@@ -2919,9 +3025,7 @@ class EventStatus:
         # The same for the application. But in case there is cancelling based on the application
         # configured in the rule, then don't check for different applications.
         if "cancel_application" not in rule:
-            application = new_event["application"]
-            if "set_application" in rule:
-                application = replace_groups(rule["set_application"], application, match_groups)
+            application = self._cancelling_application(match_groups, new_event, rule)
             if event["application"] != application:
                 if debug:
                     self._logger.info(
@@ -3011,10 +3115,12 @@ class EventStatus:
                 preserve["contact"] = found["contact"]
         found.update(event)
         found.update(preserve)
+        # The host and application of the found event may have changed
+        self._events.reindex(found)
 
     def count_expected_event(self, event_server: EventServer, event: Event) -> None:
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
+        for ev in self._events.of_rule(event["rule_id"]):
+            if ev["phase"] == "counting":
                 self.count_event_up(ev, event)
                 return
 
@@ -3031,31 +3137,37 @@ class EventStatus:
         since the event has been created because the count was too
         low in the specified period of time.
         """
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
+        if count["separate_host"] and count["separate_application"]:
+            candidates = self._events.of_rule_host_application(
+                event["rule_id"], event["host"], event["application"]
+            )
+        else:
+            candidates = self._events.of_rule(event["rule_id"])
 
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+        for ev in candidates:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_host"] and ev["host"] != event["host"]:
+                continue  # treat events with separated hosts separately
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                count_duration = count.get("count_duration")
-                if count_duration is not None and ev["first"] + count_duration < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
+
+            count_duration = count.get("count_duration")
+            if count_duration is not None and ev["first"] + count_duration < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self.count_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3071,18 +3183,32 @@ class EventStatus:
     def delete_events_by(
         self, predicate: Callable[[Event], bool], user: str, get_rule: Callable[[str], Rule | None]
     ) -> None:
-        for event in self._events[:]:
+        for event in self._events:
             if predicate(event):
-                event["phase"] = "closed"
-                if user:
-                    event["owner"] = user
-                self.remove_event(event, "DELETE", user)
-                rule_id = event["rule_id"]
-                if event["id"] + 1 == self._next_event_id and rule_id in self._interval_starts:
-                    event_rule = get_rule(rule_id)
-                    if event_rule is not None and "expect" in event_rule:
-                        self.clear_interval_start(rule_id)
-                        self.interval_start(rule_id, event_rule["expect"]["interval"])
+                self._delete_event(event, user, get_rule)
+
+    def delete_events_by_ids(
+        self, ids: Iterable[int], user: str, get_rule: Callable[[str], Rule | None]
+    ) -> None:
+        for event in sorted(
+            (e for eid in set(ids) if (e := self._events.get(eid)) is not None),
+            key=lambda e: e["id"],
+        ):
+            self._delete_event(event, user, get_rule)
+
+    def _delete_event(
+        self, event: Event, user: str, get_rule: Callable[[str], Rule | None]
+    ) -> None:
+        event["phase"] = "closed"
+        if user:
+            event["owner"] = user
+        self.remove_event(event, "DELETE", user)
+        rule_id = event["rule_id"]
+        if event["id"] + 1 == self._next_event_id and rule_id in self._interval_starts:
+            event_rule = get_rule(rule_id)
+            if event_rule is not None and "expect" in event_rule:
+                self.clear_interval_start(rule_id)
+                self.interval_start(rule_id, event_rule["expect"]["interval"])
 
     def get_events(self) -> Iterable[Event]:
         return self._events
@@ -5,7 +5,7 @@
 from __future__ import annotations
 
 import time
-from collections.abc import Mapping, Sequence
+from collections.abc import Container, Iterable, Mapping, Sequence
 from logging import Logger
 
 from .helpers import ECLock
@@ -47,6 +47,8 @@ class Perfcounters:
         self._rates: dict[str, float] = {}
         self._average_rates: dict[str, float] = {}
         self._times: dict[str, float] = {}
+        # rule ID -> (number of tries, average matching time)
+        self._rule_times: dict[str, tuple[int, float]] = {}
         self._last_statistics: float | None = None
 
         self._logger = logger.getChild("Perfcounters")
@@ -62,6 +64,30 @@ class Perfcounters:
             else:
                 self._times[counter] = ptime
 
+    def count_rule_times(self, rule_times: Iterable[tuple[str, float]]) -> None:
+        """Account for the matching times of the rules tried for one event"""
+        with self._lock:
+            for rule_id, ptime in rule_times:
+                if rule_id in self._rule_times:
+                    tries, average = self._rule_times[rule_id]
+                    self._rule_times[rule_id] = (
+                        tries + 1,
+                        lerp(ptime, average, self._weights["processing"]),
+                    )
+                else:
+                    self._rule_times[rule_id] = (1, ptime)
+
+    def forget_rule_times(self, rule_ids: Container[str]) -> None:
+        """Drop the matching times of rules which are not configured anymore"""
+        with self._lock:
+            self._rule_times = {
+                rule_id: times for rule_id, times in self._rule_times.items() if rule_id in rule_ids
+            }
+
+    def get_rule_times(self) -> Mapping[str, tuple[int, float]]:
+        with self._lock:
+            return dict(self._rule_times)
+
     def do_statistics(self) -> None:
         with self._lock:
             now = time.time()
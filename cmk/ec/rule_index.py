@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Dispatch index for the rules of the event console
+
+The index answers the question "which rules can possibly match this event?"
+cheaply, so that the (expensive) rule matcher only needs to look at those.
+Every rule is represented by one bit (its position in the rule list), and
+each of the dimensions below yields a bit mask of the rules that are still
+possible for a given event:
+
+* host: literal host patterns, looked up in a dict
+* application: literal application patterns (infix match)
+* IP address: the networks of all rules by prefix length
+* message: the message patterns of all rules of a rule pack are combined
+  into a single alternation of named groups.  If it does not match, none
+  of those rules can match.
+
+Rules that cannot be indexed in some dimension (e.g. a regex host pattern
+or inverted matching) are always possible in that dimension.  The index
+never rules out a rule that would match, so first match and pack skipping
+are unaffected: the candidates are returned in the original rule order.
+"""
+
+from __future__ import annotations
+
+import ipaddress
+import re
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass
+from typing import Final
+
+from .config import Rule, TextPattern
+from .event import Event
+
+# Constructs that break when a pattern is embedded into a larger pattern:
+# named groups, group references, conditionals and global inline flags.
+_NOT_COMBINABLE: Final = re.compile(r"\(\?P[<=]|\\[1-9]|\\g<|\(\?\(|^\(\?[aiLmsux]+\)")
+
+
+type _Network = ipaddress.IPv4Network | ipaddress.IPv6Network
+
+
+@dataclass(frozen=True)
+class _MessageGroup:
+    pattern: re.Pattern[str]
+    mask: int
+
+
+class RuleIndex:
+    def __init__(self, rules: Sequence[Rule]) -> None:
+        self._rules: Final = list(rules)
+        self._positions: Final = {id(rule): nr for nr, rule in enumerate(self._rules)}
+
+        self._any_host = 0
+        self._by_host: dict[str, int] = {}
+        self._any_application = 0
+        self._by_application: dict[str, int] = {}
+        self._any_ip = 0
+        # networks by IP version and prefix length
+        self._by_network: dict[tuple[int, int], dict[_Network, int]] = {}
+        self._any_message = 0
+        self._by_message_literal: dict[str, int] = {}
+        self._message_groups: list[_MessageGroup] = []
+
+        pack_patterns: dict[str, list[tuple[int, re.Pattern[str]]]] = {}
+        for nr, rule in enumerate(self._rules):
+            bit = 1 << nr
+            if rule.get("invert_matching"):
+                self._any_host |= bit
+                self._any_application |= bit
+                self._any_ip |= bit
+                self._any_message |= bit
+                continue
+            self._index_host(bit, rule)
+            self._index_application(bit, rule)
+            self._index_ip(bit, rule)
+            self._index_message(nr, rule, pack_patterns)
+
+        for patterns in pack_patterns.values():
+            self._combine(patterns)
+
+    @property
+    def num_message_groups(self) -> int:
+        return len(self._message_groups)
+
+    def mask_of(self, rules: Iterable[Rule]) -> int:
+        mask = 0
+        for rule in rules:
+            mask |= 1 << self._positions[id(rule)]
+        return mask
+
+    def candidates(self, event: Event, preselected: int) -> Iterator[Rule]:
+        """The rules out of the preselected ones that may match, in rule order"""
+        possible = preselected & self._host_mask(event)
+        if possible:
+            possible &= self._application_mask(event)
+        if possible:
+            possible &= self._ip_mask(event)
+        if possible:
+            possible &= self._message_mask(event, possible)
+
+        while possible:
+            lowest = possible & -possible
+            yield self._rules[lowest.bit_length() - 1]
+            possible ^= lowest
+
+    def _index_host(self, bit: int, rule: Rule) -> None:
+        pattern = rule.get("match_host")
+        if isinstance(pattern, str):
+            self._by_host[pattern] = self._by_host.get(pattern, 0) | bit
+        else:
+            self._any_host |= bit
+
+    def _index_application(self, bit: int, rule: Rule) -> None:
+        pattern = rule.get("match_application")
+        # With cancel_application, a non matching application may still cancel
+        if isinstance(pattern, str) and "cancel_application" not in rule:
+            self._by_application[pattern] = self._by_application.get(pattern, 0) | bit
+        else:
+            self._any_application |= bit
+
+    def _index_ip(self, bit: int, rule: Rule) -> None:
+        if "match_ipaddress" not in rule:
+            self._any_ip |= bit
+            return
+        try:
+            network = ipaddress.ip_network(rule["match_ipaddress"], strict=False)
+        except ValueError:
+            return  # never matches
+        if int(network.netmask) == 0:
+            self._any_ip |= bit
+        else:
+            networks = self._by_network.setdefault((network.version, network.prefixlen), {})
+            networks[network] = networks.get(network, 0) | bit
+
+    def _index_message(
+        self, nr: int, rule: Rule, pack_patterns: dict[str, list[tuple[int, re.Pattern[str]]]]
+    ) -> None:
+        bit = 1 << nr
+        patterns: list[TextPattern] = [rule["match"]] if "match" in rule else []
+        if not patterns:
+            self._any_message |= bit
+            return
+        if "match_ok" in rule:
+            patterns.append(rule["match_ok"])
+
+        if any(not isinstance(p, str) and _NOT_COMBINABLE.search(p.pattern) for p in patterns):
+            self._any_message |= bit
+            return
+
+        for pattern in patterns:
+            if isinstance(pattern, str):
+                self._by_message_literal[pattern] = self._by_message_literal.get(pattern, 0) | bit
+            else:
+                pack_patterns.setdefault(rule["pack"], []).append((nr, pattern))
+
+    def _combine(self, patterns: Sequence[tuple[int, re.Pattern[str]]]) -> None:
+        mask = 0
+        for nr, _pattern in patterns:
+            mask |= 1 << nr
+        try:
+            combined = re.compile(
+                "|".join(f"(?P<r{nr}_{i}>{p.pattern})" for i, (nr, p) in enumerate(patterns)),
+                re.IGNORECASE,
+            )
+        except re.error:
+            # Should not happen, but better safe than sorry: always try these rules
+            self._any_message |= mask
+            return
+        self._message_groups.append(_MessageGroup(pattern=combined, mask=mask))
+
+    def _host_mask(self, event: Event) -> int:
+        return self._any_host | self._by_host.get(event["host"].lower(), 0)
+
+    def _application_mask(self, event: Event) -> int:
+        mask = self._any_application
+        if self._by_application:
+            application = event["application"].lower()
+            for pattern, rules in self._by_application.items():
+                if pattern in application:
+                    mask |= rules
+        return mask
+
+    def _ip_mask(self, event: Event) -> int:
+        mask = self._any_ip
+        if self._by_network:
+            try:
+                address = ipaddress.ip_address(event["ipaddress"])
+            except ValueError:
+                return mask  # invalid address never matches
+            for (version, prefixlen), networks in self._by_network.items():
+                if address.version == version:
+                    network = ipaddress.ip_network((address, prefixlen), strict=False)
+                    mask |= networks.get(network, 0)
+        return mask
+
+    def _message_mask(self, event: Event, possible: int) -> int:
+        mask = self._any_message
+        text = event["text"]
+        if self._by_message_literal:
+            lower_text = text.lower()
+            for pattern, rules in self._by_message_literal.items():
+                if rules & possible and pattern in lower_text:
+                    mask |= rules
+        for group in self._message_groups:
+            if group.mask & possible & ~mask and group.pattern.search(text):
+                mask |= group.mask
+        return mask
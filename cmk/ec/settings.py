@@ -167,6 +167,33 @@ class ECArgumentParser(ArgumentParser):
                 % port_numbers.syslog_tcp.value
             ),
         )
+        self.add_argument(
+            "--syslog-workers",
+            metavar="N",
+            type=self._non_negative_int,
+            default=0,
+            help=(
+                "parse the messages of the built-in UDP syslog server in N worker processes "
+                "(default: 0, i.e. parse them in the event server thread)"
+            ),
+        )
+        self.add_argument(
+            "--syslog-batch-size",
+            metavar="N",
+            type=self._positive_int,
+            default=256,
+            help="maximum number of UDP syslog messages handed to a worker at once (default: 256)",
+        )
+        self.add_argument(
+            "--syslog-queue-length",
+            metavar="N",
+            type=self._positive_int,
+            default=64,
+            help=(
+                "maximum number of UDP syslog message batches waiting for a worker, "
+                "further batches are dropped (default: 64)"
+            ),
+        )
         self.add_argument("--snmptrap", action="store_true", help="enable built-in snmptrap server")
         self.add_argument(
             "--snmptrap-fd",
@@ -211,6 +238,26 @@ class ECArgumentParser(ArgumentParser):
             raise ArgumentTypeError(f"invalid file descriptor value: {repr(value)}") from e
         return FileDescriptor(file_desc)
 
+    @staticmethod
+    def _non_negative_int(value: str) -> int:
+        try:
+            number = int(value)
+            if number < 0:
+                raise ValueError
+        except ValueError as e:
+            raise ArgumentTypeError(f"invalid non-negative number: {repr(value)}") from e
+        return number
+
+    @staticmethod
+    def _positive_int(value: str) -> int:
+        try:
+            number = int(value)
+            if number <= 0:
+                raise ValueError
+        except ValueError as e:
+            raise ArgumentTypeError(f"invalid positive number: {repr(value)}") from e
+        return number
+
 
 # a communication endpoint, e.g. for syslog or SNMP
 EndPoint = PortNumber | FileDescriptor
@@ -236,6 +283,9 @@ class Options(NamedTuple):
     syslog_udp: EndPoint | None
     syslog_tcp: EndPoint | None
     snmptrap_udp: EndPoint | None
+    syslog_workers: int
+    syslog_batch_size: int
+    syslog_queue_length: int
     foreground: bool
     debug: bool
     profile_status: bool
@@ -260,6 +310,9 @@ def create_settings(version: str, omd_root: Path, argv: Sequence[str]) -> Settin
         syslog_udp=_endpoint(args.syslog, args.syslog_fd, port_numbers.syslog_udp),
         syslog_tcp=_endpoint(args.syslog_tcp, args.syslog_tcp_fd, port_numbers.syslog_tcp),
         snmptrap_udp=_endpoint(args.snmptrap, args.snmptrap_fd, port_numbers.snmptrap_udp),
+        syslog_workers=args.syslog_workers,
+        syslog_batch_size=args.syslog_batch_size,
+        syslog_queue_length=args.syslog_queue_length,
         foreground=args.foreground,
         debug=args.debug,
         profile_status=args.profile_status,
@@ -28,5 +28,7 @@ from ._snmp import SNMPSectionMeta as SNMPSectionMeta
 from ._tcp import TCPFetcher as TCPFetcher
 from ._tcp import TCPFetcherConfig as TCPFetcherConfig
 from ._tcp import TLSConfig as TLSConfig
+from ._tcp_bulk import fetch_bulk as fetch_bulk
+from ._tcp_bulk import fetch_bulk_async as fetch_bulk_async
 from ._trigger import FetcherTrigger as FetcherTrigger
 from ._trigger import PlainFetcherTrigger as PlainFetcherTrigger
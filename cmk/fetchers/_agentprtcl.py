@@ -38,7 +38,7 @@ class TransportProtocol(Enum):
 
     @classmethod
     def from_bytes(cls, data: Buffer) -> Self:
-        return cls(memoryview(data)[:2])
+        return cls(bytes(memoryview(data)[:2]))
 
 
 class Version(Enum):
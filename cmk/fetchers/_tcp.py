@@ -54,7 +54,17 @@ def recvall(sock: socket.socket, flags: int = 0) -> bytes:
     return bytes(buffer)
 
 
-def wrap_tls(sock: socket.socket, server_hostname: str, *, tls_config: TLSConfig) -> ssl.SSLSocket:
+def make_socket(family: socket.AddressFamily) -> socket.socket:
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    # For an explanation on these options have a look at tcp(7) (man tcp)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 120)  # start after
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)  # wait between
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)  # how many tries
+    return sock
+
+
+def make_tls_context(tls_config: TLSConfig) -> ssl.SSLContext:
     # Create a helpful error message if CA store is missing. Avoid silently falling back to the system's.
     try:
         cadata = tls_config.ca_store.read_text()
@@ -66,11 +76,70 @@ def wrap_tls(sock: socket.socket, server_hostname: str, *, tls_config: TLSConfig
     try:
         ctx = ssl.create_default_context(cadata=cadata)
         ctx.load_cert_chain(certfile=tls_config.site_crt)
+        return ctx
+    except ssl.SSLError as e:
+        raise FetcherError("Error establishing TLS connection") from e
+
+
+def wrap_tls(sock: socket.socket, server_hostname: str, *, tls_config: TLSConfig) -> ssl.SSLSocket:
+    ctx = make_tls_context(tls_config)
+    try:
         return ctx.wrap_socket(sock, server_hostname=server_hostname)
     except ssl.SSLError as e:
         raise FetcherError("Error establishing TLS connection") from e
 
 
+def expected_server_name(uuid_file: Path) -> str | None:
+    """The UUID of the registered agent controller, the name of its TLS certificate"""
+    try:
+        return str(uuid_file.readlink())
+    except FileNotFoundError:
+        # so we have no registration. This might be fine.
+        return None
+
+
+def unpack_tls_payload(
+    raw_agent_data: Buffer, address: tuple[HostAddress, int]
+) -> tuple[TransportProtocol, Buffer]:
+    """The protocol and the data of the message sent by the controller via TLS"""
+    try:
+        agent_data = AgentCtlMessage.from_bytes(raw_agent_data).payload
+    except ValueError as e:
+        raise FetcherError(f"Failed to deserialize versioned agent data: {e!r}") from e
+
+    if len(memoryview(agent_data)) <= 2:
+        raise FetcherError("Empty payload from controller at %s:%d" % address)
+
+    try:
+        # I don't understand that recursive protocol thing.
+        protocol = TransportProtocol.from_bytes(agent_data)
+    except ValueError:
+        raise FetcherError(f"Unknown transport protocol: {bytes(memoryview(agent_data)[:2])!r}")
+
+    return protocol, memoryview(agent_data)[2:]
+
+
+def decode_agent_data(
+    protocol: TransportProtocol, output: Buffer, pre_shared_secret: str | None
+) -> AgentRawData:
+    """The agent output, decrypted if the protocol requires it"""
+    if not memoryview(output):
+        return AgentRawData(b"")  # nothing to to, validation will fail
+
+    if protocol is TransportProtocol.PLAIN:
+        return AgentRawData(protocol.value + output)  # bring back stolen bytes
+
+    if pre_shared_secret is None:
+        raise FetcherError("Data is encrypted but no secret is known")
+
+    try:
+        return AgentRawData(decrypt_by_agent_protocol(pre_shared_secret, protocol, output))
+    except MKTimeout:
+        raise
+    except Exception as e:
+        raise FetcherError("Failed to decrypt agent output: %r" % e) from e
+
+
 @dataclass(frozen=True)
 class TCPFetcherConfig:
     """Configuration for TCP fetchers"""
@@ -155,12 +224,7 @@ class TCPFetcher(Fetcher[AgentRawData]):
             self.timeout,
         )
         self.close()
-        self._socket = socket.socket(self.family, socket.SOCK_STREAM)
-        # For an explanation on these options have a look at tcp(7) (man tcp)
-        self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
-        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 120)  # start after
-        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)  # wait between
-        self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 3)  # how many tries
+        self._socket = make_socket(self.family)
         try:
             self._socket.settimeout(self.timeout)
             self._socket.connect(self.address)
@@ -184,16 +248,9 @@ class TCPFetcher(Fetcher[AgentRawData]):
         if sock is None:
             raise OSError(errno.ENOTCONN, os.strerror(errno.ENOTCONN))
 
-        agent_data = self._get_agent_data(sock, self._get_uuid_as_expected_server_name())
+        agent_data = self._get_agent_data(sock, expected_server_name(self.uuid_file))
         return agent_data
 
-    def _get_uuid_as_expected_server_name(self) -> str | None:
-        try:
-            return str(self.uuid_file.readlink())
-        except FileNotFoundError:
-            # so we have no registration. This might be fine.
-            return None
-
     def _from_tls(
         self, sock: socket.socket, server_hostname: str
     ) -> tuple[TransportProtocol, Buffer]:
@@ -201,22 +258,9 @@ class TCPFetcher(Fetcher[AgentRawData]):
         with wrap_tls(sock, server_hostname, tls_config=self.tls_config) as ssock:
             self._logger.debug("Reading data from agent")
             raw_agent_data = recvall(ssock)
-        try:
-            agent_data = AgentCtlMessage.from_bytes(raw_agent_data).payload
-        except ValueError as e:
-            raise FetcherError(f"Failed to deserialize versioned agent data: {e!r}") from e
-
-        if len(memoryview(agent_data)) <= 2:
-            raise FetcherError("Empty payload from controller at %s:%d" % self.address)
-
-        try:
-            # I don't understand that recursive protocol thing.
-            protocol = TransportProtocol.from_bytes(agent_data)
-        except ValueError:
-            raise FetcherError(f"Unknown transport protocol: {bytes(memoryview(agent_data)[:2])!r}")
-
+        protocol, output = unpack_tls_payload(raw_agent_data, self.address)
         self._logger.debug("Detected transport protocol: %s", protocol)
-        return protocol, memoryview(agent_data)[2:]
+        return protocol, output
 
     def _get_agent_data(self, sock: socket.socket, server_hostname: str | None) -> AgentRawData:
         try:
@@ -246,19 +290,4 @@ class TCPFetcher(Fetcher[AgentRawData]):
             self._logger.debug("Reading data from agent")
             output = recvall(sock, socket.MSG_WAITALL)
 
-        if not memoryview(output):
-            return AgentRawData(b"")  # nothing to to, validation will fail
-
-        if protocol is TransportProtocol.PLAIN:
-            return AgentRawData(protocol.value + output)  # bring back stolen bytes
-
-        if (secret := self.pre_shared_secret) is None:
-            raise FetcherError("Data is encrypted but no secret is known")
-
-        self._logger.debug("Try to decrypt output")
-        try:
-            return AgentRawData(decrypt_by_agent_protocol(secret, protocol, output))
-        except MKTimeout:
-            raise
-        except Exception as e:
-            raise FetcherError("Failed to decrypt agent output: %r" % e) from e
+        return decode_agent_data(protocol, output, self.pre_shared_secret)
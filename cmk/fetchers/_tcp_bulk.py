@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Fetch the agents of many hosts at once
+
+A TCPFetcher blocks on its socket, so the number of agents polled at the same
+time is bound by the number of fetcher processes. The bulk fetcher polls the
+agents of many hosts concurrently in one process. It takes the TCPFetchers of
+the hosts as their configuration and reads and writes their file caches just
+like the FetcherTrigger does.
+
+Every worker receives into its own buffers and reuses them for all of its
+hosts.
+"""
+
+import asyncio
+import functools
+import socket
+import ssl
+from collections.abc import Callable, Sequence
+from typing import Final
+
+import cmk.ccc.resulttype as result
+from cmk.ccc.exceptions import MKTimeout
+from cmk.helper_interface import AgentRawData, FetcherError
+
+from ._abstract import Mode
+from ._agentprtcl import TransportProtocol, validate_agent_protocol
+from ._tcp import (
+    decode_agent_data,
+    expected_server_name,
+    make_socket,
+    make_tls_context,
+    TCPFetcher,
+    TLSConfig,
+    unpack_tls_payload,
+)
+from .filecache import FileCache
+
+__all__ = ["fetch_bulk", "fetch_bulk_async"]
+
+# Initial size of the receive buffers, they grow with the largest agent output
+_BUFFER_SIZE: Final = 64 * 1024
+# Buffers grown beyond this are dropped after use, not kept by every worker
+_MAX_KEPT_BUFFER_SIZE: Final = 1024 * 1024
+# Size of the buffer for the encrypted TLS records
+_TLS_RECORD_BUFFER_SIZE: Final = 64 * 1024
+
+
+class _ReceiveBuffer:
+    """Allocated on first use, so that idle workers and plain text agents cost nothing"""
+
+    def __init__(self, size: int) -> None:
+        self.size: Final = size
+        self._data = bytearray()
+        self.length = 0
+
+    def free(self, limit: int | None = None) -> memoryview:
+        """The unused part of the buffer to receive into, doubles the buffer if it is full
+
+        Views of the buffer may still be referenced, e.g. by the traceback of an
+        error, so it is replaced instead of resized.
+        """
+        if self.length == len(self._data):
+            grown = bytearray(max(self.size, 2 * len(self._data)))
+            grown[: self.length] = self._data
+            self._data = grown
+        end = len(self._data) if limit is None else min(self.length + limit, len(self._data))
+        return memoryview(self._data)[self.length : end]
+
+    def view(self) -> memoryview:
+        return memoryview(self._data)[: self.length]
+
+    def clear(self) -> None:
+        self.length = 0
+        if len(self._data) > _MAX_KEPT_BUFFER_SIZE:
+            self._data = bytearray()
+
+
+class _Buffers:
+    def __init__(self) -> None:
+        self.received: Final = _ReceiveBuffer(_BUFFER_SIZE)
+        self.decrypted: Final = _ReceiveBuffer(_BUFFER_SIZE)
+
+    @functools.cached_property
+    def tls_records(self) -> memoryview:
+        return memoryview(bytearray(_TLS_RECORD_BUFFER_SIZE))
+
+    def clear(self) -> None:
+        self.received.clear()
+        self.decrypted.clear()
+
+
+def fetch_bulk(
+    jobs: Sequence[tuple[TCPFetcher, FileCache[AgentRawData]]],
+    *,
+    mode: Mode,
+    max_concurrency: int = 1000,
+    timeout: float = 60.0,
+) -> Sequence[result.Result[AgentRawData, Exception]]:
+    """The agent data of the hosts, in the order of the jobs
+
+    The timeout limits the time fetching one host may take, in addition to the
+    connect timeout of its fetcher.
+    """
+    return asyncio.run(
+        fetch_bulk_async(jobs, mode=mode, max_concurrency=max_concurrency, timeout=timeout)
+    )
+
+
+async def fetch_bulk_async(
+    jobs: Sequence[tuple[TCPFetcher, FileCache[AgentRawData]]],
+    *,
+    mode: Mode,
+    max_concurrency: int = 1000,
+    timeout: float = 60.0,
+) -> Sequence[result.Result[AgentRawData, Exception]]:
+    results: list[result.Result[AgentRawData, Exception]] = [
+        result.Error(FetcherError("unknown error"))
+    ] * len(jobs)
+    pending = iter(enumerate(jobs))
+    tls_contexts: dict[TLSConfig, ssl.SSLContext] = {}
+
+    async def worker() -> None:
+        buffers = _Buffers()
+        for index, (fetcher, file_cache) in pending:
+            results[index] = await _get_raw_data(
+                fetcher, file_cache, mode, buffers, tls_contexts, timeout
+            )
+
+    await asyncio.gather(*(worker() for _nr in range(min(max_concurrency, len(jobs)))))
+    return results
+
+
+async def _get_raw_data(
+    fetcher: TCPFetcher,
+    file_cache: FileCache[AgentRawData],
+    mode: Mode,
+    buffers: _Buffers,
+    tls_contexts: dict[TLSConfig, ssl.SSLContext],
+    timeout: float,
+) -> result.Result[AgentRawData, Exception]:
+    """Same as FetcherTrigger.get_raw_data()"""
+    try:
+        if (cached := file_cache.read(mode)) is not None:
+            return result.OK(cached)
+
+        if file_cache.simulation:
+            raise FetcherError(f"{fetcher}: data unavailable in simulation mode")
+
+        buffers.clear()
+        try:
+            async with asyncio.timeout(timeout):
+                raw_data = await _fetch(fetcher, buffers, tls_contexts)
+        except TimeoutError as e:
+            raise FetcherError("Communication failed: timed out") from e
+        except (FetcherError, MKTimeout):
+            raise
+        except Exception as e:
+            raise FetcherError(repr(e) if any(e.args) else type(e).__name__) from e
+
+        await asyncio.to_thread(file_cache.write, raw_data, mode)
+        return result.OK(raw_data)
+
+    except MKTimeout:
+        raise
+
+    except Exception as exc:
+        return result.Error(exc)
+
+
+async def _fetch(
+    fetcher: TCPFetcher, buffers: _Buffers, tls_contexts: dict[TLSConfig, ssl.SSLContext]
+) -> AgentRawData:
+    """Same as TCPFetcher.open() and TCPFetcher._fetch_from_io()"""
+    loop = asyncio.get_running_loop()
+    with make_socket(fetcher.family) as sock:
+        sock.setblocking(False)
+        try:
+            async with asyncio.timeout(fetcher.timeout):
+                await loop.sock_connect(sock, fetcher.address)
+            # The protocol is sent in front of the output or the TLS handshake
+            while buffers.received.length < 2:
+                if not await _recv_into(loop, sock, buffers.received, limit=2):
+                    break
+        except (OSError, TimeoutError) as e:
+            raise FetcherError(f"Communication failed: {str(e) or 'timed out'}") from e
+
+        if not (raw_protocol := bytes(buffers.received.view())):
+            raise FetcherError("Empty output from host %s:%d" % fetcher.address)
+
+        try:
+            protocol = TransportProtocol.from_bytes(raw_protocol)
+        except ValueError:
+            raise FetcherError(f"Unknown transport protocol: {raw_protocol!r}")
+
+        server_hostname = expected_server_name(fetcher.uuid_file)
+        validate_agent_protocol(
+            protocol, fetcher.encryption_handling, is_registered=server_hostname is not None
+        )
+
+        if protocol is TransportProtocol.TLS:
+            if server_hostname is None:
+                raise FetcherError("Agent controller not registered")
+            if (tls_context := tls_contexts.get(fetcher.tls_config)) is None:
+                tls_context = tls_contexts[fetcher.tls_config] = make_tls_context(
+                    fetcher.tls_config
+                )
+            await _recv_tls(loop, sock, tls_context, server_hostname, buffers)
+            protocol, output = unpack_tls_payload(buffers.decrypted.view(), fetcher.address)
+            return decode_agent_data(protocol, output, fetcher.pre_shared_secret)
+
+        buffers.received.length = 0
+        try:
+            while await _recv_into(loop, sock, buffers.received):
+                pass
+        except OSError as e:
+            raise FetcherError(f"Communication failed: {e}") from e
+        return decode_agent_data(protocol, buffers.received.view(), fetcher.pre_shared_secret)
+
+
+async def _recv_into(
+    loop: asyncio.AbstractEventLoop,
+    sock: socket.socket,
+    buffer: _ReceiveBuffer,
+    limit: int | None = None,
+) -> int:
+    with buffer.free(limit) as free:
+        received = await loop.sock_recv_into(sock, free)
+    buffer.length += received
+    return received
+
+
+async def _recv_tls(
+    loop: asyncio.AbstractEventLoop,
+    sock: socket.socket,
+    context: ssl.SSLContext,
+    server_hostname: str,
+    buffers: _Buffers,
+) -> None:
+    """Receive all data sent via TLS into the decrypted buffer"""
+    incoming, outgoing = ssl.MemoryBIO(), ssl.MemoryBIO()
+    try:
+        tls = context.wrap_bio(incoming, outgoing, server_hostname=server_hostname)
+        await _tls_call(loop, sock, tls.do_handshake, incoming, outgoing, buffers.tls_records)
+    except (OSError, ssl.SSLError) as e:
+        raise FetcherError("Error establishing TLS connection") from e
+
+    try:
+        while True:
+            with buffers.decrypted.free() as free:
+                try:
+                    received = await _tls_call(
+                        loop,
+                        sock,
+                        functools.partial(_read_into, tls, free),
+                        incoming,
+                        outgoing,
+                        buffers.tls_records,
+                    )
+                except (ssl.SSLZeroReturnError, ssl.SSLEOFError):
+                    # Closed by the agent, with or without saying so (like suppress_ragged_eofs)
+                    received = 0
+            if not received:
+                return
+            buffers.decrypted.length += received
+    except (OSError, ssl.SSLError) as e:
+        raise FetcherError(f"Communication failed: {e}") from e
+
+
+def _read_into(tls: ssl.SSLObject, buffer: memoryview) -> int:
+    # Any writable buffer is accepted, not only the bytearray of the stubs
+    received: int = tls.read(len(buffer), buffer)  # type: ignore[arg-type,assignment]
+    return received
+
+
+async def _tls_call[T](
+    loop: asyncio.AbstractEventLoop,
+    sock: socket.socket,
+    call: Callable[[], T],
+    incoming: ssl.MemoryBIO,
+    outgoing: ssl.MemoryBIO,
+    records: memoryview,
+) -> T:
+    """Call the method of the SSLObject, moving the records between it and the socket"""
+    while True:
+        try:
+            value = call()
+        except ssl.SSLWantReadError:
+            if outgoing.pending:
+                await loop.sock_sendall(sock, outgoing.read())
+            if received := await loop.sock_recv_into(sock, records):
+                incoming.write(records[:received])
+            else:
+                incoming.write_eof()
+            continue
+        if outgoing.pending:
+            await loop.sock_sendall(sock, outgoing.read())
+        return value
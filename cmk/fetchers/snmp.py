@@ -18,7 +18,7 @@ from cmk.snmplib import (
     SNMPSectionName,
 )
 
-from .snmp_backend import ClassicSNMPBackend, StoredWalkSNMPBackend
+from .snmp_backend import ClassicSNMPBackend, IndexedStoredWalkSNMPBackend, StoredWalkSNMPBackend
 
 inline: ModuleType | None
 try:
@@ -31,11 +31,17 @@ __all__ = ["SNMPPluginStoreItem", "SNMPPluginStore", "make_backend"]
 
 
 _force_stored_walks = False
+_use_walk_index = False
 
 
-def force_stored_walks() -> None:
-    global _force_stored_walks
+def force_stored_walks(*, indexed: bool = False) -> None:
+    global _force_stored_walks, _use_walk_index
     _force_stored_walks = True
+    _use_walk_index = indexed
+
+
+def get_use_walk_index() -> bool:
+    return _use_walk_index
 
 
 def get_force_stored_walks() -> bool:
@@ -53,7 +59,10 @@ def make_backend(
         use_cache = get_force_stored_walks()
 
     if use_cache or snmp_config.snmp_backend is SNMPBackendEnum.STORED_WALK:
-        return StoredWalkSNMPBackend(
+        stored_walk_backend = (
+            IndexedStoredWalkSNMPBackend if get_use_walk_index() else StoredWalkSNMPBackend
+        )
+        return stored_walk_backend(
             snmp_config, logger, path=stored_walk_path / snmp_config.hostname
         )
 
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+# Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Stored walk backend serving the walk file through a persistent index
+
+The plain :class:`StoredWalkSNMPBackend` reads and splits the whole walk
+file for every walked OID.  This backend parses the file once, stores the
+integer OID tuples together with the byte offsets of every record in a
+binary index next to the walk file and serves walks from a memory mapped
+view of the walk file.  The index is invalidated when the walk file changes
+(size or mtime).
+
+Index layout (all integers little endian)::
+
+    header   magic, version, walk mtime_ns, walk size, number of records,
+             number of OID components
+    records  (record start, OID end, record end) per record, uint64
+    lengths  number of OID components per record, uint32
+    oids     flattened OID components, uint32
+"""
+
+import bisect
+import logging
+import mmap
+import struct
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Final, Self
+
+from cmk.ccc import store
+from cmk.ccc.exceptions import MKGeneralException
+from cmk.helper_interface import FetcherError
+from cmk.snmplib import OID, SNMPHostConfig, SNMPRowInfo
+
+from ._utils import strip_snmp_value
+from .stored_walk import StoredWalkSNMPBackend
+
+__all__ = ["IndexedStoredWalkSNMPBackend", "WalkIndex"]
+
+_MAGIC: Final = b"CMKWIDX"
+_VERSION: Final = 1
+_HEADER: Final = struct.Struct("<7sBqqQQ")
+
+
+def index_path_for(walk_path: Path) -> Path:
+    return walk_path.with_name(f".{walk_path.name}.idx")
+
+
+class WalkIndex:
+    """Sorted OID tuples of a walk file along with the byte ranges of their records"""
+
+    def __init__(
+        self,
+        *,
+        mtime_ns: int,
+        size: int,
+        oids: Sequence[tuple[int, ...]],
+        records: array,
+    ) -> None:
+        self.mtime_ns: Final = mtime_ns
+        self.size: Final = size
+        self.oids: Final = oids
+        # (record start, OID end, record end) for every entry in `oids`
+        self.records: Final = records
+
+    def __len__(self) -> int:
+        return len(self.oids)
+
+    @classmethod
+    def build(cls, data: bytes, *, mtime_ns: int) -> Self:
+        entries: list[tuple[tuple[int, ...], int, int, int]] = []
+        start = 0 if data[:1] == b"." else data.find(b"\n.")
+        if start != -1 and data[start : start + 1] == b"\n":
+            start += 1
+        while start != -1 and start < len(data):
+            # Sometimes there are newlines in the data of snmpwalks: such
+            # lines belong to the record of the last OID.
+            end = data.find(b"\n.", start)
+            end = len(data) if end == -1 else end + 1
+            line_end = data.find(b"\n", start, end)
+            line = data[start : end if line_end == -1 else line_end]
+            oid_end = start + len(line.split(None, 1)[0])
+            try:
+                oid = tuple(map(int, data[start + 1 : oid_end].split(b".")))
+            except ValueError:
+                pass  # not an OID, the plain backend cannot find this record either
+            else:
+                entries.append((oid, start, oid_end, end))
+            start = end
+
+        entries.sort(key=lambda e: e[0])
+        records = array("Q")
+        for _oid, rec_start, oid_end, rec_end in entries:
+            records.extend((rec_start, oid_end, rec_end))
+        return cls(
+            mtime_ns=mtime_ns,
+            size=len(data),
+            oids=[e[0] for e in entries],
+            records=records,
+        )
+
+    def serialize(self) -> bytes:
+        lengths = array("I", (len(oid) for oid in self.oids))
+        components = array("I", (c for oid in self.oids for c in oid))
+        return b"".join(
+            (
+                _HEADER.pack(
+                    _MAGIC, _VERSION, self.mtime_ns, self.size, len(self.oids), len(components)
+                ),
+                _to_le_bytes(self.records),
+                _to_le_bytes(lengths),
+                _to_le_bytes(components),
+            )
+        )
+
+    @classmethod
+    def deserialize(cls, raw: bytes) -> Self:
+        magic, version, mtime_ns, size, n_records, n_components = _HEADER.unpack_from(raw)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("invalid walk index header")
+
+        offset = _HEADER.size
+        records = _from_le_bytes("Q", raw, offset, 3 * n_records)
+        offset += records.itemsize * len(records)
+        lengths = _from_le_bytes("I", raw, offset, n_records)
+        offset += lengths.itemsize * len(lengths)
+        components = _from_le_bytes("I", raw, offset, n_components)
+
+        oids = []
+        pos = 0
+        for length in lengths:
+            oids.append(tuple(components[pos : pos + length]))
+            pos += length
+        return cls(mtime_ns=mtime_ns, size=size, oids=oids, records=records)
+
+
+def _to_le_bytes(values: array) -> bytes:
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le_bytes(typecode: str, raw: bytes, offset: int, count: int) -> array:
+    values = array(typecode)
+    end = offset + count * values.itemsize
+    if end > len(raw):
+        raise ValueError("truncated walk index")
+    values.frombytes(raw[offset:end])
+    if struct.pack("=H", 1) != struct.pack("<H", 1):
+        values.byteswap()
+    return values
+
+
+# Index per walk file, shared by all backends of this process.
+_index_cache: dict[Path, WalkIndex] = {}
+
+
+def load_index(walk_path: Path, logger: logging.Logger) -> WalkIndex:
+    """Return an up to date index for the walk file
+
+    The index is taken (in this order) from the process cache, from the index
+    file next to the walk or created from scratch and persisted.
+    """
+    try:
+        stat = walk_path.stat()
+    except OSError:
+        raise FetcherError(f"No snmpwalk file {walk_path}")
+
+    if (index := _index_cache.get(walk_path)) is not None and (
+        index.mtime_ns == stat.st_mtime_ns and index.size == stat.st_size
+    ):
+        return index
+
+    idx_path = index_path_for(walk_path)
+    try:
+        index = WalkIndex.deserialize(idx_path.read_bytes())
+    except (OSError, ValueError, struct.error):
+        index = None
+
+    if index is None or index.mtime_ns != stat.st_mtime_ns or index.size != stat.st_size:
+        logger.debug(f"  Indexing {walk_path}")
+        try:
+            with walk_path.open("rb") as f:
+                index = WalkIndex.build(f.read(), mtime_ns=stat.st_mtime_ns)
+        except OSError:
+            raise FetcherError(f"No snmpwalk file {walk_path}")
+        try:
+            store.save_bytes_to_file(idx_path, index.serialize())
+        except MKGeneralException as e:
+            # Not fatal: we keep the index of this process only.
+            logger.debug(f"  Cannot write walk index {idx_path}: {e}")
+
+    _index_cache[walk_path] = index
+    return index
+
+
+class IndexedStoredWalkSNMPBackend(StoredWalkSNMPBackend):
+    def __init__(self, snmp_config: SNMPHostConfig, logger: logging.Logger, path: Path) -> None:
+        super().__init__(snmp_config, logger, path)
+        self._index: WalkIndex | None = None
+        self._mmap: mmap.mmap | None = None
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+        self._mmap = None
+        self._index = None
+
+    def _open(self) -> tuple[WalkIndex, mmap.mmap | bytes]:
+        index = load_index(self.path, self._logger)
+        if index is not self._index:
+            self.close()
+            self._index = index
+            if index.size:
+                try:
+                    with self.path.open("rb") as f:
+                        self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except OSError:
+                    raise FetcherError(f"No snmpwalk file {self.path}")
+        return index, self._mmap if self._mmap is not None else b""
+
+    def walk(
+        self,
+        /,
+        oid: OID,
+        *,
+        context: object,
+        section_name: object = None,
+        table_base_oid: object = None,
+    ) -> SNMPRowInfo:
+        dot_star = oid.endswith(".*")
+        oid_prefix = oid[:-2] if dot_star else oid
+
+        self._logger.debug(f"  Loading {oid}")
+        try:
+            prefix = StoredWalkSNMPBackend._to_bin_string(oid_prefix)
+        except ValueError:
+            return []
+
+        index, data = self._open()
+        rowinfo = []
+        depth = len(prefix)
+        for pos in range(bisect.bisect_left(index.oids, prefix), len(index)):
+            current = index.oids[pos]
+            if current[:depth] != prefix:
+                break
+            if dot_star and len(current) == depth:
+                continue
+            start, oid_end, end = index.records[3 * pos : 3 * pos + 3]
+            rowinfo.append(
+                (
+                    "." + data[start + 1 : oid_end].decode(),
+                    strip_snmp_value(data[oid_end:end].decode()),
+                )
+            )
+            if dot_star:
+                break
+
+        return rowinfo
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Inverted index of the hosts of all folders for the host search
+
+Searching the hosts of a big tree means computing the effective attributes of
+every host and matching them against the search criteria. The index maps the
+values of the effective attributes to the hosts having them, so a search only
+has to look at the hosts matching its indexed criteria.
+
+The index consists of one shard per folder, each stored in its own file. A
+shard remembers the signature of the hosts file it was created from. Saving
+the hosts of a folder updates its shard, the shards of folders whose hosts
+file was changed otherwise are rebuilt on demand.
+"""
+
+import bisect
+import hashlib
+import pickle
+import re
+import threading
+from collections.abc import Callable, Collection, Iterable, Mapping
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from cmk.ccc import store
+from cmk.ccc.hostaddress import HostName
+from cmk.utils.host_storage import FileSignature
+
+# A string attribute or the members of a collection, e.g. the keys of the labels
+IndexValue = str | tuple[str, ...]
+
+# Regular expression characters ending the literal prefix of a pattern
+_REGEX_SPECIAL: Final = frozenset(".^$*+?{}[]\\|()")
+
+
+class FolderShard(NamedTuple):
+    folder_path: str
+    signature: FileSignature
+    hosts: Mapping[HostName, Mapping[str, IndexValue]]
+
+
+class HostSearchIndex:
+    """Thread safe index of the host attributes, shared by all requests of a process"""
+
+    def __init__(self, shard_dir: Path) -> None:
+        self._shard_dir: Final = shard_dir
+        self._lock: Final = threading.Lock()
+        self._shards: dict[str, FolderShard] = {}
+        self._folder_of: dict[HostName, str] = {}
+        # field -> value -> hosts
+        self._postings: dict[str, dict[str, set[HostName]]] = {}
+        # field -> number of hosts having a value in it
+        self._field_sizes: dict[str, int] = {}
+        # field -> sorted (lower case value, value), built on demand
+        self._sorted_values: dict[str, list[tuple[str, str]]] = {}
+
+    def _shard_path(self, folder_path: str) -> Path:
+        return self._shard_dir / f"{hashlib.sha256(folder_path.encode()).hexdigest()}.pkl"
+
+    def is_current(self, folder_path: str, signature: FileSignature) -> bool:
+        """Whether the folder is indexed for the given state of its hosts file
+
+        The shard written by another process is taken over if it is current.
+        """
+        with self._lock:
+            if (
+                shard := self._shards.get(folder_path)
+            ) is not None and shard.signature == signature:
+                return True
+        try:
+            stored = store.load_object_from_pickle_file(self._shard_path(folder_path), default=None)
+        except (TypeError, ValueError, EOFError, pickle.UnpicklingError):
+            return False
+        if (
+            not isinstance(stored, FolderShard)
+            or stored.folder_path != folder_path
+            or stored.signature != signature
+        ):
+            return False
+        with self._lock:
+            self._apply(stored)
+        return True
+
+    def update(
+        self,
+        folder_path: str,
+        signature: FileSignature,
+        hosts: Mapping[HostName, Mapping[str, IndexValue]],
+    ) -> None:
+        """Replace the hosts of the folder in the index and persist its shard"""
+        shard = FolderShard(folder_path, signature, hosts)
+        with self._lock:
+            self._apply(shard)
+        store.save_bytes_to_file(self._shard_path(folder_path), pickle.dumps(shard))
+
+    def retain(self, folder_paths: Collection[str]) -> None:
+        """Forget the folders not existing anymore"""
+        with self._lock:
+            obsolete = [path for path in self._shards if path not in folder_paths]
+            for folder_path in obsolete:
+                self._remove(folder_path)
+        for folder_path in obsolete:
+            self._shard_path(folder_path).unlink(missing_ok=True)
+
+    def folder_path(self, host_name: HostName) -> str | None:
+        with self._lock:
+            return self._folder_of.get(host_name)
+
+    def hosts_with_value(self, field: str, value: str) -> set[HostName]:
+        with self._lock:
+            return set(self._postings.get(field, {}).get(value, ()))
+
+    def hosts_with_members(self, field: str, members: Iterable[str]) -> set[HostName]:
+        """The hosts having all members in the collection stored in the field"""
+        with self._lock:
+            postings = self._postings.get(field, {})
+            found: set[HostName] | None = None
+            for member in members:
+                hosts = postings.get(member, set())
+                found = set(hosts) if found is None else found & hosts
+                if not found:
+                    return set()
+            return set(self._folder_of) if found is None else found
+
+    def hosts_with_prefix(self, field: str, prefix: str) -> set[HostName]:
+        """The hosts with a value starting with the prefix, ignoring the case"""
+        with self._lock:
+            return self._collect(field, self._values_with_prefix(field, prefix))
+
+    def hosts_matching_regex(self, field: str, pattern: str) -> set[HostName]:
+        """The hosts with a value the pattern can be found in, ignoring the case
+
+        Patterns anchored at the beginning only look at the values starting with
+        their literal prefix.
+        """
+        compiled = re.compile(pattern, re.IGNORECASE)
+        with self._lock:
+            return self._collect(
+                field,
+                (
+                    value
+                    for value in self._values_with_prefix(field, _literal_prefix(pattern))
+                    if compiled.search(value)
+                ),
+            )
+
+    def hosts_matching(self, field: str, matches: Callable[[str], bool]) -> set[HostName]:
+        """The hosts with a value fulfilling the condition, tested once per distinct value"""
+        with self._lock:
+            postings = self._postings.get(field, {})
+            return self._collect(field, [value for value in postings if matches(value)])
+
+    def hosts_without(self, field: str) -> set[HostName]:
+        """The hosts having no value in the field, the index can not tell anything about them"""
+        with self._lock:
+            if self._field_sizes.get(field, 0) == len(self._folder_of):
+                return set()
+            return {
+                host_name
+                for shard in self._shards.values()
+                for host_name, fields in shard.hosts.items()
+                if field not in fields
+            }
+
+    def _collect(self, field: str, values: Iterable[str]) -> set[HostName]:
+        postings = self._postings.get(field, {})
+        found: set[HostName] = set()
+        for value in values:
+            found.update(postings[value])
+        return found
+
+    def _values_with_prefix(self, field: str, prefix: str) -> list[str]:
+        if (values := self._sorted_values.get(field)) is None:
+            values = self._sorted_values[field] = sorted(
+                (value.lower(), value) for value in self._postings.get(field, {})
+            )
+        if not prefix:
+            return [value for _lower, value in values]
+        prefix = prefix.lower()
+        start = bisect.bisect_left(values, (prefix, ""))
+        found = []
+        for lower, value in values[start:]:
+            if not lower.startswith(prefix):
+                break
+            found.append(value)
+        return found
+
+    def _apply(self, shard: FolderShard) -> None:
+        self._remove(shard.folder_path)
+        for host_name in shard.hosts:
+            # A host moved to this folder, but the shard of its former folder is outdated
+            if (former_path := self._folder_of.get(host_name)) is not None:
+                former = self._shards[former_path]
+                self._remove_host(host_name, former.hosts[host_name])
+                self._shards[former_path] = former._replace(
+                    hosts={h: f for h, f in former.hosts.items() if h != host_name}
+                )
+        self._shards[shard.folder_path] = shard
+        for host_name, fields in shard.hosts.items():
+            self._folder_of[host_name] = shard.folder_path
+            for field, value in fields.items():
+                self._field_sizes[field] = self._field_sizes.get(field, 0) + 1
+                postings = self._postings.setdefault(field, {})
+                for member in _members(value):
+                    postings.setdefault(member, set()).add(host_name)
+                self._sorted_values.pop(field, None)
+
+    def _remove(self, folder_path: str) -> None:
+        if (shard := self._shards.pop(folder_path, None)) is None:
+            return
+        for host_name, fields in shard.hosts.items():
+            self._remove_host(host_name, fields)
+
+    def _remove_host(self, host_name: HostName, fields: Mapping[str, IndexValue]) -> None:
+        del self._folder_of[host_name]
+        for field, value in fields.items():
+            self._field_sizes[field] -= 1
+            postings = self._postings[field]
+            for member in _members(value):
+                hosts = postings[member]
+                hosts.discard(host_name)
+                if not hosts:
+                    del postings[member]
+            self._sorted_values.pop(field, None)
+
+
+def _members(value: IndexValue) -> Iterable[str]:
+    return (value,) if isinstance(value, str) else value
+
+
+def _literal_prefix(pattern: str) -> str:
+    """The text every match of an anchored pattern starts with
+
+    >>> _literal_prefix("^web-.*")
+    'web-'
+    >>> _literal_prefix("^db?")
+    'd'
+    >>> _literal_prefix("web")
+    ''
+    """
+    if not pattern.startswith("^") or "|" in pattern:
+        return ""
+    prefix: list[str] = []
+    for char in pattern[1:]:
+        if char in _REGEX_SPECIAL:
+            # A quantifier makes the preceding character optional
+            if char in "*?{" and prefix:
+                prefix.pop()
+            break
+        prefix.append(char)
+    return "".join(prefix)
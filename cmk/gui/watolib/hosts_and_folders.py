@@ -19,6 +19,7 @@ from collections.abc import Awaitable, Callable, Collection, Iterable, Iterator,
 from contextlib import contextmanager, suppress
 from dataclasses import dataclass
 from enum import Enum
+from functools import cache, partial
 from pathlib import Path
 from typing import Any, Final, Literal, NamedTuple, NotRequired, Protocol, Self, TypedDict
 
@@ -69,6 +70,7 @@ from cmk.gui.watolib.config_domain_name import CORE as CORE_DOMAIN
 from cmk.gui.watolib.configuration_bundle_store import is_locked_by_quick_setup
 from cmk.gui.watolib.host_attributes import (
     ABCHostAttribute,
+    ABCHostAttributeText,
     all_host_attributes,
     collect_attributes,
     get_host_attribute_default_value,
@@ -78,7 +80,9 @@ from cmk.gui.watolib.host_attributes import (
     mask_attributes,
     MetaData,
 )
+from cmk.gui.watolib.host_search_index import HostSearchIndex, IndexValue
 from cmk.gui.watolib.objref import ObjectRef, ObjectRefType
+from cmk.gui.watolib.paths import wato_var_dir
 from cmk.gui.watolib.predefined_conditions import PredefinedConditionStore
 from cmk.gui.watolib.sidebar_reload import need_sidebar_reload
 from cmk.gui.watolib.utils import wato_root_dir
@@ -86,6 +90,8 @@ from cmk.utils.global_ident_type import GlobalIdent
 from cmk.utils.host_storage import (
     ABCHostsStorage,
     apply_hosts_file_to_object,
+    CompiledHostsIndex,
+    file_signature,
     FolderAttributesForBase,
     get_all_storage_readers,
     get_host_storage_loaders,
@@ -962,6 +968,8 @@ class FolderTree:
     def __init__(self, root_dir: str | None = None) -> None:
         self._root_dir = _ensure_trailing_slash(root_dir if root_dir else str(wato_root_dir()))
         self._all_host_attributes: dict[str, ABCHostAttribute] | None = None
+        # Number of folders whose hosts had to be loaded from their hosts file
+        self.hosts_index_misses = 0
 
     def all_folders(self) -> Mapping[PathWithoutSlash, Folder]:
         if "wato_folders" not in g:
@@ -1067,6 +1075,34 @@ class FolderTree:
         _update_mapping(self.root_folder(), mapping)
         return mapping
 
+    def compile_hosts_index_if_outdated(self) -> None:
+        """Update the compiled hosts index, once enough folders had to be loaded from their files
+
+        Called after operations on the whole tree: Rewriting the index for every
+        single changed folder would cost more than it saves.
+        """
+        folders = self.all_folders()
+        if self.hosts_index_misses < max(1, len(folders) // _HOSTS_INDEX_COMPILE_RATIO):
+            return
+        try:
+            compiled_hosts_index().compile(
+                (Path(folder.hosts_file_path()) for folder in folders.values()),
+                lambda hosts_file: dict(_load_wato_hosts_from_file(hosts_file.with_suffix(""))),
+            )
+        except (OSError, MKGeneralException) as e:
+            logger.warning("Unable to write the compiled hosts index: %s", e)
+        self.hosts_index_misses = 0
+
+    def host_search_index(self) -> HostSearchIndex:
+        """The host search index, updated for the folders whose hosts file changed otherwise"""
+        index = host_search_index()
+        folders = self.all_folders()
+        for folder in folders.values():
+            if not index.is_current(folder.path(), file_signature(Path(folder.hosts_file_path()))):
+                folder.update_host_search_index()
+        index.retain(folders.keys())
+        return index
+
     def get_root_dir(self) -> PathWithSlash:
         return self._root_dir
 
@@ -1075,6 +1111,45 @@ class FolderTree:
         self._root_dir = _ensure_trailing_slash(root_dir)
 
 
+# The compiled hosts index is updated once this share of the folders had to be loaded from files
+_HOSTS_INDEX_COMPILE_RATIO: Final = 100
+
+
+@cache
+def _process_hosts_index(path: Path) -> CompiledHostsIndex:
+    return CompiledHostsIndex(path)
+
+
+def compiled_hosts_index() -> CompiledHostsIndex:
+    """The index shared by all requests of the process, checked for updates once per request"""
+    if "compiled_hosts_index" not in g:
+        hosts_index = _process_hosts_index(wato_var_dir() / "hosts_index")
+        hosts_index.refresh()
+        g.compiled_hosts_index = hosts_index
+    return g.compiled_hosts_index
+
+
+@cache
+def _process_host_search_index(path: Path) -> HostSearchIndex:
+    return HostSearchIndex(path)
+
+
+def host_search_index() -> HostSearchIndex:
+    """The index shared by all requests of the process, see FolderTree.host_search_index()"""
+    return _process_host_search_index(cmk.utils.paths.tmp_dir / "wato/host_search_index")
+
+
+def _host_search_index_values(host_name: HostName, host: Host) -> dict[str, IndexValue]:
+    """The effective attributes of the host the search can use the index for"""
+    effective = host.effective_attributes()
+    values: dict[str, IndexValue] = {
+        attrname: value for attrname, value in effective.items() if isinstance(value, str)
+    }
+    values[".name"] = str(host_name)
+    values["labels"] = tuple(effective.get("labels", {}))
+    return values
+
+
 # Hope that we can cleanup these request global objects one day
 def folder_tree() -> FolderTree:
     if "folder_tree" not in g:
@@ -1324,23 +1399,18 @@ class Folder(FolderProtocol):
         return Host(self, host_name, wato_hosts["host_attributes"][host_name], cluster_nodes)
 
     def _load_hosts_file(self) -> HostsData | None:
-        variables = get_hosts_file_variables()
-        apply_hosts_file_to_object(
-            Path(self.hosts_file_path_without_extension()),
-            get_host_storage_loaders(active_config.config_storage_format),
-            variables,
-        )
-        return variables
+        return _load_hosts_file_variables(Path(self.hosts_file_path_without_extension()))
 
     def _load_wato_hosts(self) -> WATOHosts | None:
-        if (variables := self._load_hosts_file()) is None:
-            return None
-        return WATOHosts(
-            locked=variables["_lock"],
-            host_attributes=variables["host_attributes"],
-            all_hosts=variables["all_hosts"],
-            clusters=variables["clusters"],
-        )
+        if (compiled := compiled_hosts_index().load(Path(self.hosts_file_path()))) is not None:
+            return WATOHosts(
+                locked=compiled["locked"],
+                host_attributes=compiled["host_attributes"],
+                all_hosts=compiled["all_hosts"],
+                clusters=compiled["clusters"],
+            )
+        self.tree.hosts_index_misses += 1
+        return _load_wato_hosts_from_file(Path(self.hosts_file_path_without_extension()))
 
     def save_hosts(self, *, pprint_value: bool) -> None:
         self.need_unlocked_hosts()
@@ -1353,12 +1423,26 @@ class Folder(FolderProtocol):
                 host.drop_caches()
 
             self._save_hosts_file(pprint_value=pprint_value)
+            self.update_host_search_index()
             if may_use_redis():
                 # Inform redis that the modified-timestamp of the folder has been updated.
                 get_wato_redis_client(self.tree).folder_updated(self.filesystem_path())
 
         call_hook_hosts_changed(self)
 
+    def update_host_search_index(self) -> None:
+        try:
+            host_search_index().update(
+                self.path(),
+                file_signature(Path(self.hosts_file_path())),
+                {
+                    host_name: _host_search_index_values(host_name, host)
+                    for host_name, host in self.hosts().items()
+                },
+            )
+        except (OSError, MKGeneralException) as e:
+            logger.warning("Unable to update the host search index: %s", e)
+
     def _save_hosts_file(self, *, pprint_value: bool) -> None:
         Path(self.filesystem_path()).mkdir(mode=0o770, parents=True, exist_ok=True)
         exposed_folder_attributes_for_base = self._folder_attributes_for_base_config()
@@ -1725,10 +1809,15 @@ class Folder(FolderProtocol):
 
     def all_hosts_recursively(self) -> dict[HostName, Host]:
         hosts: dict[HostName, Host] = {}
+        self._collect_hosts_recursively(hosts)
+        if self.is_root():
+            self.tree.compile_hosts_index_if_outdated()
+        return hosts
+
+    def _collect_hosts_recursively(self, hosts: dict[HostName, Host]) -> None:
         hosts.update(self.hosts())
         for subfolder in self.subfolders():
-            hosts.update(subfolder.all_hosts_recursively())
-        return hosts
+            subfolder._collect_hosts_recursively(hosts)
 
     def subfolders_recursively(self, only_visible: bool = False) -> list[Folder]:
         def _add_folders(folder: Folder, collection: list[Folder]) -> None:
@@ -2828,6 +2917,26 @@ class Folder(FolderProtocol):
             html.show_message(lock_message)
 
 
+def _load_hosts_file_variables(path_without_extension: Path) -> HostsData:
+    variables = get_hosts_file_variables()
+    apply_hosts_file_to_object(
+        path_without_extension,
+        get_host_storage_loaders(active_config.config_storage_format),
+        variables,
+    )
+    return variables
+
+
+def _load_wato_hosts_from_file(path_without_extension: Path) -> WATOHosts:
+    variables = _load_hosts_file_variables(path_without_extension)
+    return WATOHosts(
+        locked=variables["_lock"],
+        host_attributes=variables["host_attributes"],
+        all_hosts=variables["all_hosts"],
+        clusters=variables["clusters"],
+    )
+
+
 def _is_main_folder_path(folder_path: str) -> bool:
     return folder_path == ""
 
@@ -3034,7 +3143,10 @@ class SearchFolder(FolderProtocol):
 
     def hosts(self) -> Mapping[HostName, Host]:
         if self._found_hosts is None:
-            self._found_hosts = self._search_hosts_recursively(self._base_folder)
+            found = self._search_hosts_with_index()
+            self._found_hosts = (
+                self._search_hosts_recursively(self._base_folder) if found is None else found
+            )
         return self._found_hosts
 
     def host_validation_errors(self) -> dict[HostName, list[str]]:
@@ -3165,35 +3277,114 @@ class SearchFolder(FolderProtocol):
         if not in_folder.permissions.may("read"):
             return {}
 
-        found = {}
         host_attributes = self.tree.all_host_attributes()
-        for host_name, host in in_folder.hosts().items():
-            if self._criteria[".name"] and not host_attribute_matches(
-                self._criteria[".name"], host_name
+        return {
+            host_name: host
+            for host_name, host in in_folder.hosts().items()
+            if self._host_matches(host_name, host, host_attributes)
+        }
+
+    def _search_hosts_with_index(self) -> dict[HostName, Host] | None:
+        """Only check the hosts matching the indexed criteria, None if there are none"""
+        host_attributes = self.tree.all_host_attributes()
+        if not (lookups := self._index_lookups(host_attributes)):
+            return None
+
+        index = self.tree.host_search_index()
+        candidates = lookups[0](index)
+        for lookup in lookups[1:]:
+            if not candidates:
+                break
+            candidates &= lookup(index)
+
+        folders = self.tree.all_folders()
+        base_path = self._base_folder.path()
+        found = {}
+        for host_name in sorted(candidates):
+            folder_path = index.folder_path(host_name)
+            if folder_path is None or folder_path not in folders:
+                continue
+            if (
+                base_path
+                and folder_path != base_path
+                and not folder_path.startswith(base_path + "/")
             ):
                 continue
+            folder = folders[folder_path]
+            if not folder.permissions.may("read"):
+                continue
+            if (host := folder.hosts().get(host_name)) is not None and self._host_matches(
+                host_name, host, host_attributes
+            ):
+                found[host_name] = host
+        return found
 
-            # Compute inheritance
-            effective = host.effective_attributes()
+    def _index_lookups(
+        self, host_attributes: Mapping[str, ABCHostAttribute]
+    ) -> list[Callable[[HostSearchIndex], set[HostName]]]:
+        """The lookups of the hosts possibly matching the criteria the index can be used for
 
-            # Check attributes
-            dont_match = False
-            for attrname, attr in host_attributes.items():
-                if attrname in self._criteria and not attr.filter_matches(
-                    self._criteria[attrname], effective.get(attrname), host_name
-                ):
-                    dont_match = True
-                    break
+        Hosts without a string value in an attribute are always candidates, the
+        index does not know how their value would match.
+        """
+        lookups: list[Callable[[HostSearchIndex], set[HostName]]] = []
+        if name_crit := self._criteria[".name"]:
+            lookups.append(partial(_hosts_matching_text, field=".name", crit=name_crit))
+
+        for attrname, attr in host_attributes.items():
+            if not isinstance(crit := self._criteria.get(attrname), str):
+                if attrname == "labels" and isinstance(crit, Mapping | list):
+                    lookups.append(
+                        partial(
+                            HostSearchIndex.hosts_with_members,
+                            field="labels",
+                            members={str(member) for member in crit},
+                        )
+                    )
+                continue
+            if type(attr).filter_matches is ABCHostAttributeText.filter_matches:
+                lookups.append(partial(_hosts_matching_text, field=attrname, crit=crit))
+            elif type(attr).filter_matches is ABCHostAttribute.filter_matches:
+                lookups.append(partial(_hosts_with_value, field=attrname, value=crit))
+        return lookups
+
+    def _host_matches(
+        self, host_name: HostName, host: Host, host_attributes: Mapping[str, ABCHostAttribute]
+    ) -> bool:
+        if self._criteria[".name"] and not host_attribute_matches(
+            self._criteria[".name"], host_name
+        ):
+            return False
 
-            if not dont_match:
-                found[host_name] = host
+        # Compute inheritance
+        effective = host.effective_attributes()
 
-        return found
+        # Check attributes
+        return all(
+            attr.filter_matches(self._criteria[attrname], effective.get(attrname), host_name)
+            for attrname, attr in host_attributes.items()
+            if attrname in self._criteria
+        )
 
     def _invalidate_search(self) -> None:
         self._found_hosts = None
 
 
+def _hosts_matching_text(index: HostSearchIndex, field: str, crit: str) -> set[HostName]:
+    """The hosts possibly matching the criterion of host_attribute_matches()"""
+    if crit.startswith("~"):
+        found = index.hosts_matching_regex(field, crit[1:])
+    else:
+        lower_crit = crit.lower()
+        found = index.hosts_matching(field, lambda value: lower_crit in value.lower())
+    return found | index.hosts_without(field)
+
+
+def _hosts_with_value(index: HostSearchIndex, field: str, value: str) -> set[HostName]:
+    """The hosts possibly matching the criterion of ABCHostAttribute.filter_matches()"""
+    return index.hosts_with_value(field, value) | index.hosts_without(field)
+
+
 def parent_folder_chain(origin: SearchFolder | Folder) -> list[Folder]:
     folders = []
     folder = origin.parent()
@@ -14,6 +14,7 @@ from werkzeug.exceptions import BadRequest
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import safe_join
 
+from cmk.ccc import store
 from cmk.ccc.version import Edition
 from cmk.gui.features import features_registry
 from cmk.gui.flask_app import CheckmkFlaskApp
@@ -54,6 +55,10 @@ def make_wsgi_app(edition: Edition, debug: bool = False, testing: bool = False)
 
     instrument_app_dependencies()
 
+    # Requests read the same configuration files again and again
+    if not testing:
+        store.enable_read_cache()
+
     # NOTE: some schemas are generically generated. On default, for duplicate schema names, we
     # get name+increment which we have deemed fine. We can therefore suppress those warnings.
     # https://github.com/marshmallow-code/apispec/issues/444
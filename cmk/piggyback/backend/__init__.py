@@ -18,4 +18,5 @@ from ._storage import PiggybackMessage as PiggybackMessage
 from ._storage import PiggybackMetaData as PiggybackMetaData
 from ._storage import remove_source_status_file as remove_source_status_file
 from ._storage import store_piggyback_raw_data as store_piggyback_raw_data
+from ._storage import store_piggyback_segment as store_piggyback_segment
 from ._storage import watch_new_messages as watch_new_messages
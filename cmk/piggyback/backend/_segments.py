@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Segment files holding the piggyback payloads of one source
+
+A source piggybacking thousands of hosts would create as many payload files
+every cycle. Instead, all of its payloads are written to one segment file:
+
+    tmp/check_mk/piggyback_segments/SOURCE
+
+The file starts with a header, followed by the length of the index, the
+index itself and the payloads:
+
+    CMKPIGGY1\\n <8 bytes length of the index> {"HOST": [offset, length, last_update], ...}
+
+The index maps the piggybacked hosts to the position of their payloads after
+the index and the time they were received. The payloads are read from a memory
+map of the file, the index of every file is read only once per process.
+
+Changing a segment means reading, modifying and replacing it, so this is done
+while holding the lock of the segment file, see locked_segment(). Locking
+creates an empty file if there is no segment yet, which is read as a segment
+without payloads.
+"""
+
+import contextlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections.abc import Iterable, Iterator, Mapping
+from pathlib import Path
+from typing import Final, NamedTuple
+
+from cmk.ccc import store
+from cmk.ccc.hostaddress import HostName
+
+_MAGIC: Final = b"CMKPIGGY1\n"
+_INDEX_LENGTH: Final = struct.Struct("<Q")
+_PAYLOAD_START: Final = len(_MAGIC) + _INDEX_LENGTH.size
+
+
+class SegmentEntry(NamedTuple):
+    offset: int
+    length: int
+    last_update: int
+
+
+type SegmentIndex = Mapping[HostName, SegmentEntry]
+
+# modification time (ns), size and inode
+type _Signature = tuple[int, int, int]
+
+_index_cache: dict[Path, tuple[_Signature, SegmentIndex]] = {}
+_index_cache_lock: Final = threading.Lock()
+
+
+@contextlib.contextmanager
+def locked_segment(path: Path) -> Iterator[None]:
+    """Lock the segment to change it, without leaving behind the file created for locking"""
+    with store.locked(path):
+        try:
+            yield
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                if not path.stat().st_size:
+                    path.unlink()
+
+
+def read_index(path: Path) -> SegmentIndex:
+    """The index of the segment, empty if it does not exist"""
+    try:
+        with path.open("rb") as segment:
+            return _read_index(path, segment.fileno())
+    except FileNotFoundError:
+        return {}
+
+
+def read_payloads(
+    path: Path, piggybacked_hosts: Iterable[HostName] | None = None
+) -> Mapping[HostName, tuple[int, bytes]]:
+    """The time of the last update and the payload of the hosts, by default of all hosts"""
+    try:
+        with path.open("rb") as segment:
+            index = _read_index(path, segment.fileno())
+            wanted = index.keys() if piggybacked_hosts is None else piggybacked_hosts
+            if not (entries := {h: e for h in wanted if (e := index.get(h)) is not None}):
+                return {}
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return {
+                    host: (entry.last_update, mapped[entry.offset : entry.offset + entry.length])
+                    for host, entry in entries.items()
+                }
+    except FileNotFoundError:
+        return {}
+
+
+def _read_index(path: Path, fd: int) -> SegmentIndex:
+    stat = os.fstat(fd)
+    if not stat.st_size:
+        return {}  # just created by locking it
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    with _index_cache_lock:
+        if (cached := _index_cache.get(path)) is not None and cached[0] == signature:
+            return cached[1]
+
+    header = os.pread(fd, _PAYLOAD_START, 0)
+    if len(header) < _PAYLOAD_START or not header.startswith(_MAGIC):
+        raise ValueError(f"Not a piggyback segment: {path}")
+    (index_length,) = _INDEX_LENGTH.unpack_from(header, len(_MAGIC))
+    # The offsets are relative to the payloads following the index
+    start = _PAYLOAD_START + index_length
+    index = {
+        HostName(host): SegmentEntry(start + offset, length, last_update)
+        for host, (offset, length, last_update) in json.loads(
+            os.pread(fd, index_length, _PAYLOAD_START)
+        ).items()
+    }
+
+    with _index_cache_lock:
+        _index_cache[path] = (signature, index)
+    return index
+
+
+def write_segment(path: Path, payloads: Mapping[HostName, tuple[int, bytes]]) -> None:
+    """Replace the segment with the given payloads, remove it if there are none"""
+    if not payloads:
+        path.unlink(missing_ok=True)
+        return
+
+    index = {}
+    offset = 0
+    for host, (last_update, payload) in payloads.items():
+        index[host] = (offset, len(payload), last_update)
+        offset += len(payload)
+    serialized = json.dumps(index).encode()
+
+    path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+    with tempfile.NamedTemporaryFile(
+        "wb", dir=str(path.parent), prefix=f".{path.name}.new", delete=False
+    ) as tmp:
+        tmp.write(_MAGIC + _INDEX_LENGTH.pack(len(serialized)) + serialized)
+        tmp.writelines(payload for _last_update, payload in payloads.values())
+    os.rename(tmp.name, str(path))
+
+
+def rename_piggybacked_host(path: Path, old_host: HostName, new_host: HostName) -> bool:
+    """Move the payload of the host to its new name, returns whether there was one"""
+    with locked_segment(path):
+        if old_host not in (payloads := read_payloads(path)):
+            return False
+        renamed = {h: p for h, p in payloads.items() if h not in (old_host, new_host)}
+        renamed[new_host] = payloads[old_host]
+        write_segment(path, renamed)
+        return True
@@ -11,7 +11,7 @@ import os
 import shutil
 import tempfile
 import time
-from collections.abc import Collection, Iterable, Iterator, Mapping, Sequence
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
 from dataclasses import asdict, dataclass
 from pathlib import Path
 from typing import Self
@@ -19,7 +19,15 @@ from typing import Self
 from cmk.ccc.hostaddress import HostAddress, HostName
 
 from ._inotify import Event, INotify, Masks
-from ._paths import payload_dir, source_status_dir
+from ._paths import payload_dir, segment_dir, source_status_dir
+from ._segments import (
+    locked_segment,
+    read_index,
+    read_payloads,
+    rename_piggybacked_host,
+    SegmentIndex,
+    write_segment,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -67,6 +75,11 @@ class PiggybackMessage:
 # "source_hostname":
 # - Path(tmp/check_mk/piggyback/HOST/SOURCE).name
 # - Path(tmp/check_mk/piggyback_sources/SOURCE).name
+# - Path(tmp/check_mk/piggyback_segments/SOURCE).name
+#
+# "segment_file":
+# - tmp/check_mk/piggyback_segments/SOURCE
+#   the payloads of all piggybacked hosts of the source, see _segments.py
 
 
 def watch_new_messages(omd_root: Path) -> Iterator[PiggybackMessage]:
@@ -75,10 +88,20 @@ def watch_new_messages(omd_root: Path) -> Iterator[PiggybackMessage]:
     inotify = INotify()
     watch_for_new_piggybacked_hosts = inotify.add_watch(payload_dir(omd_root), Masks.CREATE)
     watch_for_deleted_status_files = inotify.add_watch(source_status_dir(omd_root), Masks.DELETE)
+    segment_dir(omd_root).mkdir(mode=0o770, exist_ok=True, parents=True)
+    watch_for_segments = inotify.add_watch(segment_dir(omd_root), Masks.MOVED_TO)
     for folder in _get_piggybacked_host_folders(omd_root):
         inotify.add_watch(folder, Masks.MOVED_TO)
+    # The last updates of the payloads in the segments we already know about
+    segment_updates: dict[tuple[HostName, HostName], int] = {}
 
     for event in inotify.read_forever():
+        if event.watchee == watch_for_segments:
+            if event.type & Masks.MOVED_TO and not event.name.startswith("."):
+                yield from _make_messages_from_segment(
+                    HostName(event.name), omd_root, segment_updates
+                )
+            continue
         # check if a new piggybacked host folder was created
         if event.watchee == watch_for_new_piggybacked_hosts:
             if event.type & Masks.CREATE:
@@ -125,11 +148,48 @@ def _make_message_from_event(event: Event, omd_root: Path) -> PiggybackMessage |
     )
 
 
+def _make_messages_from_segment(
+    source: HostName, omd_root: Path, known_updates: dict[tuple[HostName, HostName], int]
+) -> Iterator[PiggybackMessage]:
+    """The messages of the segment updated since they were seen the last time"""
+    try:
+        payloads = read_payloads(_get_segment_file_path(source, omd_root))
+    except ValueError as e:
+        logger.warning("Ignoring piggyback segment of '%s': %s", source, e)
+        return
+    last_contact = _get_mtime(_get_source_status_file_path(source, omd_root))
+    for piggybacked, (last_update, raw_data) in payloads.items():
+        if known_updates.get((source, piggybacked)) == last_update:
+            continue
+        known_updates[(source, piggybacked)] = last_update
+        yield PiggybackMessage(
+            PiggybackMetaData(
+                source=source,
+                piggybacked=piggybacked,
+                last_update=last_update,
+                last_contact=last_contact,
+            ),
+            raw_data,
+        )
+
+
 def get_messages_for(
     piggybacked_hostname: HostAddress, omd_root: Path
 ) -> Sequence[PiggybackMessage]:
     """Returns piggyback messages for the given host"""
-    piggyback_meta_data = _get_payload_meta_data(piggybacked_hostname, omd_root)
+    return _newest_per_source(
+        [
+            *_get_messages_from_payload_files(piggybacked_hostname, omd_root),
+            *_get_messages_from_segments(piggybacked_hostname, omd_root),
+        ],
+        lambda message: message.meta,
+    )
+
+
+def _get_messages_from_payload_files(
+    piggybacked_hostname: HostAddress, omd_root: Path
+) -> Sequence[PiggybackMessage]:
+    piggyback_meta_data = _get_payload_files_meta_data(piggybacked_hostname, omd_root)
     logger.debug("%s piggyback files for '%s'.", len(piggyback_meta_data), piggybacked_hostname)
 
     piggyback_data = []
@@ -151,6 +211,49 @@ def get_messages_for(
     return piggyback_data
 
 
+def _get_messages_from_segments(
+    piggybacked_hostname: HostAddress, omd_root: Path
+) -> Sequence[PiggybackMessage]:
+    messages = []
+    for segment_file in _get_segment_files(omd_root):
+        source = HostName(segment_file.name)
+        try:
+            payloads = read_payloads(segment_file, (piggybacked_hostname,))
+        except ValueError as e:
+            logger.warning("Ignoring piggyback segment '%s': %s", segment_file, e)
+            continue
+        for last_update, raw_data in payloads.values():
+            messages.append(
+                PiggybackMessage(
+                    PiggybackMetaData(
+                        source=source,
+                        piggybacked=piggybacked_hostname,
+                        last_update=last_update,
+                        last_contact=_get_mtime(_get_source_status_file_path(source, omd_root)),
+                    ),
+                    raw_data,
+                )
+            )
+    logger.debug("%s piggyback segments for '%s'.", len(messages), piggybacked_hostname)
+    return messages
+
+
+def _newest_per_source[T](
+    items: Iterable[T], get_meta: Callable[[T], PiggybackMetaData]
+) -> list[T]:
+    """The newest item of every source, sorted by source
+
+    The payload files of a source are migrated to its segment, for a short time
+    there may be both.
+    """
+    newest: dict[HostName, tuple[int, T]] = {}
+    for item in items:
+        meta = get_meta(item)
+        if (known := newest.get(meta.source)) is None or meta.last_update >= known[0]:
+            newest[meta.source] = (meta.last_update, item)
+    return [newest[source][1] for source in sorted(newest)]
+
+
 def get_all_current_piggyback_sources(omd_root: Path) -> Collection[HostName]:
     return {
         m.source
@@ -174,23 +277,34 @@ def get_piggybacked_host_with_sources(
     omd_root: Path, piggybacked_hostname: HostName | None = None
 ) -> Mapping[HostAddress, Sequence[PiggybackMetaData]]:
     """Generates all piggyback pig/piggybacked host pairs"""
-    return {
-        piggybacked_host: _get_payload_meta_data(piggybacked_host, omd_root)
-        for piggybacked_host_folder in (
-            [d for d in [payload_dir(omd_root) / piggybacked_hostname] if d.exists()]
-            if piggybacked_hostname
-            else _get_piggybacked_host_folders(omd_root)
+    indexes = _read_segment_indexes(omd_root)
+    if piggybacked_hostname:
+        piggybacked_hosts: Iterable[HostAddress] = [piggybacked_hostname]
+    else:
+        piggybacked_hosts = sorted(
+            {HostAddress(folder.name) for folder in _get_piggybacked_host_folders(omd_root)}.union(
+                *indexes.values()
+            )
         )
-        if (piggybacked_host := HostAddress(piggybacked_host_folder.name))
+    return {
+        piggybacked_host: meta_data
+        for piggybacked_host in piggybacked_hosts
+        if (meta_data := _get_payload_meta_data(piggybacked_host, omd_root, indexes))
     }
 
 
 def _get_piggybacked_hosts_for_source(omd_root: Path, source: HostName) -> Sequence[HostName]:
-    return [
-        HostName(piggybacked_host.name)
-        for piggybacked_host in _get_piggybacked_host_folders(omd_root)
-        if (piggybacked_host / source).exists()
-    ]
+    try:
+        in_segment = read_index(_get_segment_file_path(source, omd_root))
+    except ValueError:
+        in_segment = {}
+    return sorted(
+        {
+            HostName(piggybacked_host.name)
+            for piggybacked_host in _get_piggybacked_host_folders(omd_root)
+            if (piggybacked_host / source).exists()
+        }.union(in_segment)
+    )
 
 
 def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
@@ -242,6 +356,52 @@ def store_piggyback_raw_data(
         )
 
 
+def store_piggyback_segment(
+    source_hostname: HostName,
+    piggybacked_raw_data: Mapping[HostName, Sequence[bytes]],
+    message_timestamp: float,
+    contact_timestamp: float | None,
+    omd_root: Path,
+) -> None:
+    """Like store_piggyback_raw_data, but write the data to the segment of the source
+
+    This creates a single file per source, no matter how many hosts it piggybacks.
+    The payloads of hosts not sent this turn are kept, as are their payload files
+    by store_piggyback_raw_data. The first segment of a source takes over its
+    payload files.
+    """
+    if contact_timestamp is None:
+        logger.debug("Received no piggyback data")
+        remove_source_status_file(source_hostname, omd_root)
+        return
+    logger.debug("Received piggyback data for %d hosts", len(piggybacked_raw_data))
+    status_file_path = _get_source_status_file_path(source_hostname, omd_root)
+    _write_file_with_mtime(file_path=status_file_path, content=b"", mtime=contact_timestamp)
+
+    segment_file_path = _get_segment_file_path(source_hostname, omd_root)
+    with locked_segment(segment_file_path):
+        try:
+            retained = read_payloads(segment_file_path)
+        except ValueError as e:
+            logger.warning("Replacing piggyback segment of '%s': %s", source_hostname, e)
+            retained = {}
+        # A segment is never empty, unless it was just created by locking it
+        payload_files = [] if retained else _get_payload_files_of_source(source_hostname, omd_root)
+        write_segment(
+            segment_file_path,
+            {
+                **_read_payload_files(payload_files),
+                **retained,
+                **{
+                    piggybacked_hostname: (int(message_timestamp), b"%s\n" % b"\n".join(lines))
+                    for piggybacked_hostname, lines in piggybacked_raw_data.items()
+                },
+            },
+        )
+    for payload_file in payload_files:
+        _remove_piggyback_file(payload_file)
+
+
 def _write_file_with_mtime(
     file_path: Path,
     content: bytes,
@@ -272,6 +432,29 @@ def _write_file_with_mtime(
 
 
 def _get_payload_meta_data(
+    piggybacked_hostname: HostName,
+    omd_root: Path,
+    segment_indexes: Mapping[HostName, SegmentIndex],
+) -> Sequence[PiggybackMetaData]:
+    return _newest_per_source(
+        [
+            *_get_payload_files_meta_data(piggybacked_hostname, omd_root),
+            *(
+                PiggybackMetaData(
+                    source=source,
+                    piggybacked=piggybacked_hostname,
+                    last_update=index[piggybacked_hostname].last_update,
+                    last_contact=_get_mtime(_get_source_status_file_path(source, omd_root)),
+                )
+                for source, index in segment_indexes.items()
+                if piggybacked_hostname in index
+            ),
+        ],
+        lambda meta: meta,
+    )
+
+
+def _get_payload_files_meta_data(
     piggybacked_hostname: HostName, omd_root: Path
 ) -> Sequence[PiggybackMetaData]:
     """Gather a list of piggyback files to read for further processing.
@@ -308,6 +491,39 @@ def _get_source_state_files(omd_root: Path) -> Sequence[Path]:
     return _files_in(source_status_dir(omd_root))
 
 
+def _get_segment_files(omd_root: Path) -> Sequence[Path]:
+    return _files_in(segment_dir(omd_root))
+
+
+def _read_segment_indexes(omd_root: Path) -> Mapping[HostName, SegmentIndex]:
+    indexes = {}
+    for segment_file in _get_segment_files(omd_root):
+        try:
+            indexes[HostName(segment_file.name)] = read_index(segment_file)
+        except ValueError as e:
+            logger.warning("Ignoring piggyback segment '%s': %s", segment_file, e)
+    return indexes
+
+
+def _get_payload_files_of_source(source_hostname: HostName, omd_root: Path) -> Sequence[Path]:
+    return [
+        payload_file
+        for piggybacked_host_folder in _get_piggybacked_host_folders(omd_root)
+        if (payload_file := piggybacked_host_folder / source_hostname).exists()
+    ]
+
+
+def _read_payload_files(payload_files: Iterable[Path]) -> Mapping[HostName, tuple[int, bytes]]:
+    payloads = {}
+    for payload_file in payload_files:
+        try:
+            mtime = int(payload_file.stat().st_mtime)
+            payloads[HostName(payload_file.parent.name)] = (mtime, payload_file.read_bytes())
+        except FileNotFoundError:
+            continue
+    return payloads
+
+
 def _files_in(path: Path) -> Sequence[Path]:
     """Return a sorted sequence of files in `path` excluding hidden files.
 
@@ -332,6 +548,10 @@ def _get_piggybacked_file_path(
     return payload_dir(omd_root).joinpath(piggybacked_hostname, source_hostname)
 
 
+def _get_segment_file_path(source_hostname: HostName, omd_root: Path) -> Path:
+    return segment_dir(omd_root) / str(source_hostname)
+
+
 # .
 #   .--clean up------------------------------------------------------------.
 #   |                     _                                                |
@@ -399,6 +619,7 @@ def cleanup_piggyback_files(
 
     _cleanup_old_source_status_files(_get_source_state_files(omd_root), cut_off_timestamp)
     _cleanup_old_piggybacked_files(piggybacked_hosts_settings, cut_off_timestamp)
+    _cleanup_old_segment_payloads(_get_segment_files(omd_root), cut_off_timestamp)
 
 
 def _cleanup_old_source_status_files(
@@ -450,6 +671,36 @@ def _cleanup_old_piggybacked_files(
         )
 
 
+def _cleanup_old_segment_payloads(segment_files: Iterable[Path], cut_off_timestamp: float) -> None:
+    """Remove the payloads exceeding the maximum age from the segments"""
+    for segment_file in segment_files:
+        with locked_segment(segment_file):
+            _cleanup_old_payloads_of_segment(segment_file, cut_off_timestamp)
+
+
+def _cleanup_old_payloads_of_segment(segment_file: Path, cut_off_timestamp: float) -> None:
+    try:
+        if all(e.last_update >= cut_off_timestamp for e in read_index(segment_file).values()):
+            return
+        payloads = read_payloads(segment_file)
+    except ValueError as e:
+        logger.debug("Piggyback segment '%s' is broken (%s). Remove it.", segment_file, e)
+        _remove_piggyback_file(segment_file)
+        return
+
+    current = {
+        piggybacked: (last_update, raw_data)
+        for piggybacked, (last_update, raw_data) in payloads.items()
+        if last_update >= cut_off_timestamp
+    }
+    logger.debug(
+        "Removing %d too old payloads from piggyback segment '%s'.",
+        len(payloads) - len(current),
+        segment_file,
+    )
+    write_segment(segment_file, current)
+
+
 def _get_mtime(path: Path) -> int | None:
     try:
         # Beware:
@@ -492,7 +743,24 @@ def move_for_host_rename(omd_root: Path, old_host: str, new_host: str) -> tuple[
         old_path.rename(new_path)
         yield "piggyback-pig"
 
+    def _rename_in_segments(old_name: str, new_name: str) -> Iterable[str]:
+        for segment_file in _get_segment_files(omd_root):
+            try:
+                renamed = rename_piggybacked_host(
+                    segment_file, HostName(old_name), HostName(new_name)
+                )
+            except ValueError:
+                continue
+            if renamed:
+                yield "piggyback-load"
+
     return tuple(
-        *_rename_piggybacked_dir(old_host, new_host),
-        *_rename_payload_file(piggyback_dir, old_host, new_host),
+        dict.fromkeys(
+            [
+                *_rename_piggybacked_dir(old_host, new_host),
+                *_rename_payload_file(piggyback_dir, old_host, new_host),
+                *_rename_in_segments(old_host, new_host),
+                *_rename_payload_file(segment_dir(omd_root), old_host, new_host),
+            ]
+        )
     )
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Batches of piggyback messages sent to one site at once
+
+Sending every piggyback message on its own takes a round trip to the broker
+per piggybacked host. A batch holds the messages for one destination site
+collected within a short time, packed in a binary envelope and compressed.
+
+The envelope is a sequence of records, one per message:
+
+    <source length: u16> <piggybacked length: u16> <last update: i64>
+    <last contact: i64, -1 for none> <raw data length: u32>
+    <source> <piggybacked> <raw data>
+"""
+
+import json
+import struct
+import time
+import zlib
+from collections.abc import Iterator, Sequence
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Final, Literal, Self
+
+from pydantic import BaseModel, ConfigDict
+
+from cmk.ccc.hostaddress import HostName
+from cmk.messaging import QueueName, RoutingKey
+from cmk.piggyback.backend import PiggybackMessage, PiggybackMetaData
+
+BATCH_QUEUE: Final = QueueName("payload_batch")
+BATCH_ROUTE: Final = RoutingKey("payload_batch")
+
+# Do not get close to the message size limit of the broker
+MAX_BATCH_SIZE: Final = 16 * 1024 * 1024
+
+_RECORD_HEADER: Final = struct.Struct("!HHqqI")
+
+
+class PiggybackBatch(BaseModel):
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    site: str
+    compression: Literal["zlib"]
+    envelope: bytes
+
+    @classmethod
+    def from_messages(cls, site: str, messages: Sequence[PiggybackMessage]) -> Self:
+        return cls(site=site, compression="zlib", envelope=zlib.compress(pack_messages(messages)))
+
+    def messages(self) -> Sequence[PiggybackMessage]:
+        return list(unpack_messages(zlib.decompress(self.envelope)))
+
+
+def pack_messages(messages: Sequence[PiggybackMessage]) -> bytes:
+    records = []
+    for message in messages:
+        source = message.meta.source.encode()
+        piggybacked = message.meta.piggybacked.encode()
+        records.append(
+            _RECORD_HEADER.pack(
+                len(source),
+                len(piggybacked),
+                message.meta.last_update,
+                -1 if message.meta.last_contact is None else message.meta.last_contact,
+                len(message.raw_data),
+            )
+        )
+        records.extend((source, piggybacked, message.raw_data))
+    return b"".join(records)
+
+
+def unpack_messages(envelope: bytes) -> Iterator[PiggybackMessage]:
+    view = memoryview(envelope)
+    offset = 0
+    while offset < len(view):
+        source_length, piggybacked_length, last_update, last_contact, raw_data_length = (
+            _RECORD_HEADER.unpack_from(view, offset)
+        )
+        offset += _RECORD_HEADER.size
+        source = HostName(str(view[offset : (offset := offset + source_length)], "utf-8"))
+        piggybacked = HostName(str(view[offset : (offset := offset + piggybacked_length)], "utf-8"))
+        raw_data = bytes(view[offset : (offset := offset + raw_data_length)])
+        yield PiggybackMessage(
+            PiggybackMetaData(
+                source=source,
+                piggybacked=piggybacked,
+                last_update=last_update,
+                last_contact=None if last_contact == -1 else last_contact,
+            ),
+            raw_data,
+        )
+
+
+@dataclass
+class SiteThroughput:
+    batches: int = 0
+    messages: int = 0
+    # size of the raw data and of the transferred batches
+    raw_bytes: int = 0
+    transferred_bytes: int = 0
+    # time spent packing and sending, or unpacking and storing the batches
+    seconds: float = 0.0
+
+
+class ThroughputMetrics:
+    """Throughput of the batches per site, written to a JSON file now and then"""
+
+    def __init__(self, path: Path, *, interval: float = 60.0) -> None:
+        self.path: Final = path
+        self.interval: Final = interval
+        self.sites: dict[str, SiteThroughput] = {}
+        self._last_save = time.monotonic()
+
+    def record(
+        self, site: str, batch: PiggybackBatch, messages: Sequence[PiggybackMessage], seconds: float
+    ) -> None:
+        throughput = self.sites.setdefault(site, SiteThroughput())
+        throughput.batches += 1
+        throughput.messages += len(messages)
+        throughput.raw_bytes += sum(len(m.raw_data) for m in messages)
+        throughput.transferred_bytes += len(batch.envelope)
+        throughput.seconds += seconds
+        if time.monotonic() - self._last_save >= self.interval:
+            self.save()
+
+    def save(self) -> None:
+        self._last_save = time.monotonic()
+        self.path.parent.mkdir(mode=0o770, exist_ok=True, parents=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(
+            json.dumps({site: asdict(throughput) for site, throughput in self.sites.items()})
+        )
+        tmp_path.rename(self.path)
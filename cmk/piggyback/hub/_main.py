@@ -13,15 +13,18 @@ from itertools import cycle
 from logging import getLogger
 from logging.handlers import WatchedFileHandler
 from multiprocessing import Event as make_event
+from multiprocessing import Process
 from multiprocessing.synchronize import Event
 from pathlib import Path
 
 from cmk.ccc.daemon import daemonize, pid_file_lock
 from cmk.messaging import Channel, DeliveryTag, QueueName, set_logging_level
 
+from ._batch import BATCH_QUEUE, PiggybackBatch
 from ._config import CONFIG_QUEUE, ConfigType, PiggybackHubConfig, save_config
 from ._payload import (
     PiggybackPayload,
+    save_batch_on_message,
     save_payload_on_message,
     send_messages_oneshot,
     SendingPayloadProcess,
@@ -38,6 +41,7 @@ class Arguments:
     log_file: str
     omd_root: str
     omd_site: str
+    batch_window: float
 
 
 def handle_received_config(
@@ -78,6 +82,15 @@ def _parse_arguments(argv: list[str]) -> Arguments:
         help="Run in the foreground instead of daemonizing",
     )
     parser.add_argument("--debug", action="store_true", help="Let Python exceptions come through")
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=0.0,
+        help=(
+            "Send the piggyback data for other sites in compressed batches, collected for"
+            " this many seconds. All sites must support receiving batches. Default: 0 (off)"
+        ),
+    )
     parser.add_argument("pid_file", help="Path to the PID file")
     parser.add_argument("log_file", help="Path to the log file")
     parser.add_argument("omd_root", help="Site root path")
@@ -92,6 +105,7 @@ def _parse_arguments(argv: list[str]) -> Arguments:
         log_file=args.log_file,
         omd_root=args.omd_root,
         omd_site=args.omd_site,
+        batch_window=args.batch_window,
     )
 
 
@@ -112,10 +126,14 @@ def _setup_logging(args: Arguments) -> logging.Logger:
 
 
 def run_piggyback_hub(
-    logger: logging.Logger, omd_root: Path, omd_site: str, crash_report_callback: Callable[[], str]
+    logger: logging.Logger,
+    omd_root: Path,
+    omd_site: str,
+    crash_report_callback: Callable[[], str],
+    batch_window: float = 0.0,
 ) -> int:
     reload_config = make_event()
-    processes = (
+    processes: tuple[Process, ...] = (
         ReceivingProcess(
             logger,
             omd_root,
@@ -126,7 +144,17 @@ def run_piggyback_hub(
             QueueName("payload"),
             message_ttl=600,
         ),
-        SendingPayloadProcess(logger, omd_root, reload_config, crash_report_callback),
+        ReceivingProcess(
+            logger,
+            omd_root,
+            omd_site,
+            PiggybackBatch,
+            save_batch_on_message(logger, omd_root),
+            crash_report_callback,
+            BATCH_QUEUE,
+            message_ttl=600,
+        ),
+        SendingPayloadProcess(logger, omd_root, reload_config, crash_report_callback, batch_window),
         ReceivingProcess(
             logger,
             omd_root,
@@ -185,7 +213,9 @@ def main(crash_report_callback: Callable[[], str], argv: list[str] | None = None
 
     try:
         with pid_file_lock(Path(args.pid_file)):
-            return run_piggyback_hub(logger, omd_root, args.omd_site, crash_report_callback)
+            return run_piggyback_hub(
+                logger, omd_root, args.omd_site, crash_report_callback, args.batch_window
+            )
     except Exception as exc:
         if args.debug:
             raise
@@ -4,3 +4,5 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 RELATIVE_CONFIG_PATH = "etc/check_mk/piggyback_hub.conf"
+RELATIVE_SENDING_METRICS_PATH = "tmp/check_mk/piggyback_hub/sending_metrics.json"
+RELATIVE_RECEIVING_METRICS_PATH = "tmp/check_mk/piggyback_hub/receiving_metrics.json"
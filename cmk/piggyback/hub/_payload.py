@@ -5,11 +5,14 @@
 
 import logging
 import multiprocessing
+import queue
 import signal
+import threading
+import time
 from collections.abc import Callable, Mapping, Sequence
 from multiprocessing.synchronize import Event
 from pathlib import Path
-from typing import Self
+from typing import Final, NoReturn, Self
 
 from pydantic import BaseModel
 
@@ -19,10 +22,13 @@ from cmk.piggyback.backend import (
     get_messages_for,
     PiggybackMessage,
     store_piggyback_raw_data,
+    store_piggyback_segment,
     watch_new_messages,
 )
 
+from ._batch import BATCH_ROUTE, MAX_BATCH_SIZE, PiggybackBatch, ThroughputMetrics
 from ._config import AnnotatedHostName, load_config, PiggybackHubConfig
+from ._paths import RELATIVE_RECEIVING_METRICS_PATH, RELATIVE_SENDING_METRICS_PATH
 from ._utils import make_connection, make_log_and_exit
 
 
@@ -64,13 +70,52 @@ def save_payload_on_message(
     return _on_message
 
 
+def save_batch_on_message(
+    logger: logging.Logger,
+    omd_root: Path,
+) -> Callable[[Channel[PiggybackBatch], DeliveryTag, PiggybackBatch], None]:
+    metrics = ThroughputMetrics(omd_root / RELATIVE_RECEIVING_METRICS_PATH)
+
+    def _on_message(
+        channel: Channel[PiggybackBatch], delivery_tag: DeliveryTag, received: PiggybackBatch
+    ) -> None:
+        start = time.monotonic()
+        messages = received.messages()
+        logger.debug("Received batch of %d payloads from site '%s'", len(messages), received.site)
+        # The messages of a source sent at once share their timestamps
+        grouped: dict[tuple[HostName, int, int | None], dict[HostName, Sequence[bytes]]] = {}
+        for message in messages:
+            grouped.setdefault(
+                (message.meta.source, message.meta.last_update, message.meta.last_contact), {}
+            )[message.meta.piggybacked] = (message.raw_data.removesuffix(b"\n"),)
+        for (source, last_update, last_contact), raw_data in grouped.items():
+            store_piggyback_segment(
+                source_hostname=source,
+                piggybacked_raw_data=raw_data,
+                message_timestamp=last_update,
+                contact_timestamp=last_contact,
+                omd_root=omd_root,
+            )
+        channel.acknowledge(delivery_tag)
+        metrics.record(received.site, received, messages, time.monotonic() - start)
+
+    return _on_message
+
+
 class SendingPayloadProcess(multiprocessing.Process):
+    """Publish the new piggyback messages for the hosts monitored on other sites
+
+    With a batch window, the messages for every site are collected for that many
+    seconds and sent as one PiggybackBatch.
+    """
+
     def __init__(
         self,
         logger: logging.Logger,
         omd_root: Path,
         reload_config: Event,
         crash_report_callback: Callable[[], str],
+        batch_window: float = 0.0,
     ) -> None:
         super().__init__()
         self.logger = logger
@@ -78,7 +123,12 @@ class SendingPayloadProcess(multiprocessing.Process):
         self.site = omd_root.name
         self.reload_config = reload_config
         self.crash_report_callback = crash_report_callback
-        self.task_name = "publishing on queue 'payload'"
+        self.batch_window: Final = batch_window
+        self.task_name = (
+            "publishing on queue 'payload_batch'"
+            if batch_window > 0
+            else "publishing on queue 'payload'"
+        )
 
     def run(self):
         self.logger.info("Starting: %s", self.task_name)
@@ -87,6 +137,10 @@ class SendingPayloadProcess(multiprocessing.Process):
             make_log_and_exit(self.logger.info, f"Terminating: {self.task_name}"),
         )
 
+        if self.batch_window > 0:
+            self._run_batched()
+            return
+
         config = load_config(self.omd_root)
         self.logger.debug("Loaded configuration: %r", config)
 
@@ -114,6 +168,111 @@ class SendingPayloadProcess(multiprocessing.Process):
             self.logger.error(crash_report_msg)
             raise
 
+    def _run_batched(self) -> None:
+        # Watch for new messages in the background, so we can send the batches in time
+        new_messages: queue.SimpleQueue[PiggybackMessage | Exception] = queue.SimpleQueue()
+        threading.Thread(
+            target=self._watch_new_messages,
+            args=(new_messages,),
+            name="watch-piggyback-messages",
+            daemon=True,
+        ).start()
+        metrics = ThroughputMetrics(self.omd_root / RELATIVE_SENDING_METRICS_PATH)
+
+        pending: dict[str, list[PiggybackMessage]] = {}
+        try:
+            while True:
+                with make_connection(self.omd_root, self.site, self.logger, self.task_name) as conn:
+                    try:
+                        config = load_config(self.omd_root)
+                        self.logger.debug("Loaded configuration: %r", config)
+                        channel = conn.channel(PiggybackBatch)
+                        # Send what could not be sent before reconnecting
+                        self._publish_batches(channel, pending, metrics)
+                        self._send_batches(channel, config, new_messages, pending, metrics)
+                    except CMKConnectionError as exc:
+                        self.logger.info("Reconnecting: %s: %s", self.task_name, exc)
+        except CMKConnectionError as exc:
+            self.logger.error("Connection error: %s: %s", self.task_name, exc)
+        except Exception as exc:
+            self.logger.exception("Exception: %s: %s", self.task_name, exc)
+            crash_report_msg = self.crash_report_callback()
+            self.logger.error(crash_report_msg)
+            raise
+
+    def _watch_new_messages(
+        self, new_messages: queue.SimpleQueue[PiggybackMessage | Exception]
+    ) -> None:
+        try:
+            for message in watch_new_messages(self.omd_root):
+                new_messages.put(message)
+        except Exception as exc:
+            # Let the sending loop die, too
+            new_messages.put(exc)
+
+    def _send_batches(
+        self,
+        channel: Channel[PiggybackBatch],
+        config: PiggybackHubConfig,
+        new_messages: queue.SimpleQueue[PiggybackMessage | Exception],
+        pending: dict[str, list[PiggybackMessage]],
+        metrics: ThroughputMetrics,
+    ) -> NoReturn:
+        pending_size: dict[str, int] = {}
+        window_end: float | None = None
+        while True:
+            try:
+                message = new_messages.get(
+                    timeout=None if window_end is None else max(0.0, window_end - time.monotonic())
+                )
+            except queue.Empty:
+                message = None
+            if isinstance(message, Exception):
+                raise message
+
+            if message is not None:
+                config = self._check_for_config_reload(config)
+                site_id = config.locations.get(message.meta.piggybacked, self.site)
+                if site_id != self.site:
+                    pending.setdefault(site_id, []).append(message)
+                    pending_size[site_id] = pending_size.get(site_id, 0) + len(message.raw_data)
+                    if pending_size[site_id] >= MAX_BATCH_SIZE:
+                        del pending_size[site_id]
+                        self._publish_batch(channel, site_id, pending, metrics)
+                    elif window_end is None:
+                        window_end = time.monotonic() + self.batch_window
+
+            # Also checked after a message, the queue is never empty under a steady stream
+            if window_end is not None and time.monotonic() >= window_end:
+                self._publish_batches(channel, pending, metrics)
+                pending_size.clear()
+                window_end = None
+
+    def _publish_batches(
+        self,
+        channel: Channel[PiggybackBatch],
+        pending: dict[str, list[PiggybackMessage]],
+        metrics: ThroughputMetrics,
+    ) -> None:
+        """Publish the pending messages, the ones not sent are left in place"""
+        for site_id in list(pending):
+            self._publish_batch(channel, site_id, pending, metrics)
+
+    def _publish_batch(
+        self,
+        channel: Channel[PiggybackBatch],
+        site_id: str,
+        pending: dict[str, list[PiggybackMessage]],
+        metrics: ThroughputMetrics,
+    ) -> None:
+        start = time.monotonic()
+        batch = PiggybackBatch.from_messages(self.site, pending[site_id])
+        self.logger.debug(
+            "%s: %d payloads to site '%s'", self.task_name.title(), len(pending[site_id]), site_id
+        )
+        channel.publish_for_site(site_id, batch, routing=BATCH_ROUTE)
+        metrics.record(site_id, batch, pending.pop(site_id), time.monotonic() - start)
+
     def _handle_message(
         self,
         channel: Channel[PiggybackPayload],
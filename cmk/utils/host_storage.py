@@ -7,11 +7,14 @@ from __future__ import annotations
 import abc
 import enum
 import io
-from collections.abc import Callable, Mapping, Sequence
+import mmap
+import pickle
+import struct
+from collections.abc import Callable, Iterable, Mapping, Sequence
 from dataclasses import asdict, dataclass
 from functools import cache, lru_cache
 from pathlib import Path
-from typing import Any, Generic, TypedDict, TypeVar
+from typing import Any, Generic, NamedTuple, TypedDict, TypeVar
 
 from cmk.ccc import store
 from cmk.ccc.hostaddress import HostName
@@ -460,3 +463,117 @@ def get_storage_format(format_option: object) -> StorageFormat:
         case str() as format_str:
             return StorageFormat.from_str(format_str)
     raise TypeError(format_option)
+
+
+# (mtime_ns, size, inode) of a file, None if it does not exist
+FileSignature = tuple[int, int, int] | None
+
+_INDEX_MAGIC = b"CMKHIDX1"
+_INDEX_HEADER = struct.Struct("<8sQ")
+
+
+def file_signature(path: Path) -> FileSignature:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class _MappedIndex(NamedTuple):
+    signature: FileSignature
+    data: mmap.mmap
+    # hosts file: (signature of the hosts file, offset, length)
+    directory: dict[str, tuple[FileSignature, int, int]]
+    data_start: int
+
+
+class CompiledHostsIndex:
+    """The hosts data of all folders of a site in one memory mapped file
+
+    Operations on the whole folder tree would otherwise load the hosts file of
+    every single folder. The index holds the pickled data of each folder
+    together with the signature of the folder's hosts file at the time it was
+    loaded, an entry is only used while the hosts file is unchanged::
+
+        header      magic, length of the directory (uint64)
+        directory   pickled {hosts file: (signature, offset, length)}
+        data        the pickled data of the folders, offsets relative to its start
+
+    Only the directory is loaded when the index is mapped, the data of a
+    folder is unpickled when it is asked for. As the file is mapped read only,
+    all processes share its pages.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._mapped: _MappedIndex | None = None
+
+    def refresh(self) -> None:
+        """Map the current version of the index file, in case it has been replaced"""
+        signature = file_signature(self.path)
+        if self._mapped is not None and self._mapped.signature == signature:
+            return
+        # Replaced at once: Other threads may use the index in the meantime.
+        self._mapped = None if signature is None else self._map(signature)
+
+    def _map(self, signature: FileSignature) -> _MappedIndex | None:
+        try:
+            with self.path.open("rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, directory_length = _INDEX_HEADER.unpack_from(data)
+            if magic != _INDEX_MAGIC:
+                return None
+            start = _INDEX_HEADER.size
+            raw_directory = data[start : start + directory_length]
+            directory = pickle.loads(raw_directory)  # nosec B301 # BNS:9a7128
+        except (OSError, ValueError, struct.error, pickle.UnpicklingError, EOFError):
+            # Broken or truncated: Behave as if there was no index, it will be rebuilt.
+            return None
+        return _MappedIndex(signature, data, directory, start + directory_length)
+
+    def load(self, hosts_file: Path) -> HostsData | None:
+        """The data of the folder, None if it is unknown or the hosts file has changed"""
+        if (blob := self._valid_blob(str(hosts_file), file_signature(hosts_file))) is None:
+            return None
+        data: HostsData = pickle.loads(blob)  # nosec B301 # BNS:9a7128
+        return data
+
+    def compile(self, hosts_files: Iterable[Path], load: Callable[[Path], HostsData]) -> int:
+        """Write the index of the folders with the given hosts files
+
+        The data of unchanged folders is taken over from the current index, the
+        others are loaded. Returns the number of loaded folders.
+        """
+        self.refresh()
+        directory: dict[str, tuple[FileSignature, int, int]] = {}
+        blobs: list[bytes] = []
+        offset = 0
+        num_loaded = 0
+        for hosts_file in hosts_files:
+            # Taken before loading: A change in between leaves the entry invalid.
+            signature = file_signature(hosts_file)
+            if (blob := self._valid_blob(str(hosts_file), signature)) is None:
+                blob = pickle.dumps(load(hosts_file), protocol=pickle.HIGHEST_PROTOCOL)
+                num_loaded += 1
+            directory[str(hosts_file)] = (signature, offset, len(blob))
+            blobs.append(blob)
+            offset += len(blob)
+
+        raw_directory = pickle.dumps(directory, protocol=pickle.HIGHEST_PROTOCOL)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        store.save_bytes_to_file(
+            self.path,
+            b"".join([_INDEX_HEADER.pack(_INDEX_MAGIC, len(raw_directory)), raw_directory, *blobs]),
+        )
+        self.refresh()
+        return num_loaded
+
+    def _valid_blob(self, hosts_file: str, signature: FileSignature) -> bytes | None:
+        if (mapped := self._mapped) is None or (entry := mapped.directory.get(hosts_file)) is None:
+            return None
+        indexed_signature, offset, length = entry
+        if indexed_signature != signature:
+            return None
+        start = mapped.data_start + offset
+        return mapped.data[start : start + length]
@@ -10,6 +10,13 @@ from cmk.utils.livestatus_helpers.types import Column, Table
 class Eventconsolerules(Table):
     __tablename__ = 'eventconsolerules'
 
+    rule_average_match_time = Column(
+        'rule_average_match_time',
+        col_type='float',
+        description='The average time in seconds needed to try the rule on a message',
+    )
+    """The average time in seconds needed to try the rule on a message"""
+
     rule_hits = Column(
         'rule_hits',
         col_type='int',
@@ -23,3 +30,10 @@ class Eventconsolerules(Table):
         description='The ID of the rule',
     )
     """The ID of the rule"""
+
+    rule_tries = Column(
+        'rule_tries',
+        col_type='int',
+        description='The times rule was tried on an incoming message',
+    )
+    """The times rule was tried on an incoming message"""
@@ -171,6 +171,55 @@ class Eventconsolestatus(Table):
     )
     """The number of events received since startup of the Event Console"""
 
+    status_ingestion_average_batch_size = Column(
+        'status_ingestion_average_batch_size',
+        col_type='float',
+        description='The average number of UDP syslog messages per batch',
+    )
+    """The average number of UDP syslog messages per batch"""
+
+    status_ingestion_batch_size = Column(
+        'status_ingestion_batch_size',
+        col_type='int',
+        description='The maximum number of UDP syslog messages parsed as one batch',
+    )
+    """The maximum number of UDP syslog messages parsed as one batch"""
+
+    status_ingestion_batches = Column(
+        'status_ingestion_batches',
+        col_type='int',
+        description='The number of UDP syslog message batches received since startup of the Event Console',
+    )
+    """The number of UDP syslog message batches received since startup of the Event Console"""
+
+    status_ingestion_drops = Column(
+        'status_ingestion_drops',
+        col_type='int',
+        description='The number of UDP syslog messages dropped because the ingestion queue was full',
+    )
+    """The number of UDP syslog messages dropped because the ingestion queue was full"""
+
+    status_ingestion_queue_length = Column(
+        'status_ingestion_queue_length',
+        col_type='int',
+        description='The maximum number of UDP syslog message batches waiting for a worker',
+    )
+    """The maximum number of UDP syslog message batches waiting for a worker"""
+
+    status_ingestion_queue_size = Column(
+        'status_ingestion_queue_size',
+        col_type='int',
+        description='The number of UDP syslog message batches currently waiting for a worker',
+    )
+    """The number of UDP syslog message batches currently waiting for a worker"""
+
+    status_ingestion_workers = Column(
+        'status_ingestion_workers',
+        col_type='int',
+        description='The number of worker processes parsing UDP syslog messages (0: parsing in the event server)',
+    )
+    """The number of worker processes parsing UDP syslog messages (0: parsing in the event server)"""
+
     status_message_rate = Column(
         'status_message_rate',
         col_type='float',
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Convert the object files of a site to the fast format of cmk.ccc.store
+
+Reading the marshalled data of the fast format is a lot faster than evaluating
+Python literals. cmk.ccc.store writes the files matching its FAST_OBJECT_FILES
+in this format when saving them, so the files only need to be converted once
+to be read faster right away.
+
+The fast files still contain the Python literal. It is evaluated by other
+versions of Python, e.g. after an update of the site, and by everything else
+reading the files.
+
+    python3 -m cmk.utils.object_files convert [PATH ...]
+    python3 -m cmk.utils.object_files benchmark [PATH ...]
+
+Without paths the files of the site matching the FAST_OBJECT_FILES are used.
+Files not matching them are converted back to Python literals.
+"""
+
+import argparse
+import sys
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+import cmk.utils.paths
+from cmk.ccc import store
+from cmk.ccc.exceptions import MKGeneralException
+
+
+def site_object_files(omd_root: Path) -> list[Path]:
+    return sorted(
+        {
+            path
+            for base_dir in {_base_dir(omd_root, pattern) for pattern in store.FAST_OBJECT_FILES}
+            for path in base_dir.rglob("*")
+            if store.is_fast_object_file(path) and path.is_file()
+        }
+    )
+
+
+def _base_dir(omd_root: Path, pattern: str) -> Path:
+    """The directory containing all files matching the pattern"""
+    base_dir = omd_root
+    for part in Path(pattern).parent.parts:
+        if "*" in part:
+            break
+        base_dir /= part
+    return base_dir
+
+
+def convert_object_files(paths: Iterable[Path]) -> tuple[int, list[str]]:
+    """Convert the files, returns the number of converted files and the errors"""
+    converted = 0
+    errors = []
+    for path in paths:
+        try:
+            converted += store.convert_object_file(path)
+        except (MKGeneralException, SyntaxError, ValueError) as e:
+            errors.append(f"{path}: {e}")
+    return converted, errors
+
+
+@dataclass
+class BenchmarkResult:
+    files: int = 0
+    literal_size: int = 0
+    marshal_size: int = 0
+    literal_seconds: float = 0.0
+    marshal_seconds: float = 0.0
+
+    def add(self, raw: bytes, rounds: int) -> None:
+        """Compare reading the data of a file in both formats"""
+        data = store.DimSerializer.deserialize(raw)
+        literal = store.DimSerializer().serialize(data)
+        marshalled = store.MarshalSerializer.serialize(data)
+        self.files += 1
+        self.literal_size += len(literal)
+        self.marshal_size += len(marshalled)
+        self.literal_seconds += _time_deserialize(literal, rounds)
+        self.marshal_seconds += _time_deserialize(marshalled, rounds)
+
+    def render(self) -> str:
+        speedup = self.literal_seconds / self.marshal_seconds if self.marshal_seconds else 0.0
+        return (
+            f"Files:   {self.files}\n"
+            f"Literal: {self.literal_size} bytes, {self.literal_seconds * 1000:.1f} ms\n"
+            f"Marshal: {self.marshal_size} bytes, {self.marshal_seconds * 1000:.1f} ms\n"
+            f"Speedup: {speedup:.1f}x\n"
+        )
+
+
+def _time_deserialize(raw: bytes, rounds: int) -> float:
+    start = time.perf_counter()
+    for _nr in range(rounds):
+        store.DimSerializer.deserialize(raw)
+    return (time.perf_counter() - start) / rounds
+
+
+def benchmark_object_files(paths: Iterable[Path], *, rounds: int) -> BenchmarkResult:
+    result = BenchmarkResult()
+    for path in paths:
+        try:
+            if raw := store.load_bytes_from_file(path, default=b""):
+                result.add(raw, rounds)
+        except (MKGeneralException, SyntaxError, ValueError):
+            continue
+    return result
+
+
+def parse_arguments(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python3 -m cmk.utils.object_files", description=__doc__.split("\n", 1)[0]
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_convert = subparsers.add_parser("convert", help="Convert the files")
+    parser_convert.add_argument("paths", nargs="*", type=Path)
+
+    parser_benchmark = subparsers.add_parser(
+        "benchmark", help="Compare reading the files in both formats"
+    )
+    parser_benchmark.add_argument("--rounds", type=int, default=10)
+    parser_benchmark.add_argument("paths", nargs="*", type=Path)
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = parse_arguments(argv)
+    paths = args.paths or site_object_files(cmk.utils.paths.omd_root)
+
+    if args.command == "benchmark":
+        sys.stdout.write(benchmark_object_files(paths, rounds=args.rounds).render())
+        return 0
+
+    converted, errors = convert_object_files(paths)
+    for error in errors:
+        sys.stderr.write(f"{error}\n")
+    sys.stdout.write(f"Converted {converted} of {len(paths)} files\n")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
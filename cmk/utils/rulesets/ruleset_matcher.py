@@ -5,12 +5,14 @@
 """This module provides generic Check_MK ruleset processing functionality"""
 
 import contextlib
-from collections.abc import Callable, Iterable, Iterator, Mapping, Sequence
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
 from dataclasses import dataclass
 from re import Pattern
 from typing import (
     Any,
     cast,
+    Final,
     Generic,
     NotRequired,
     TypeAlias,
@@ -162,6 +164,8 @@ class RulesetMatcher:
         all_configured_hosts: frozenset[HostName],
         clusters_of: Mapping[HostName, Sequence[HostName]],
         nodes_of: Mapping[HostName, Sequence[HostName]],
+        matching_hosts_cache: "MatchingHostsCache | None" = None,
+        service_match_cache_size: int | None = None,
     ) -> None:
         super().__init__()
 
@@ -172,18 +176,14 @@ class RulesetMatcher:
             all_configured_hosts,
             clusters_of,
             nodes_of,
+            matching_hosts_cache,
         )
 
-        self._service_match_cache: dict[
-            tuple[
-                tuple[ServiceName | None, int], PreprocessedPattern, tuple[tuple[str, object], ...]
-            ],
-            object,
-        ] = {}
+        self.service_match_cache: Final = ServiceMatchCache(service_match_cache_size)
 
     def clear_caches(self) -> None:
         # clear caches that don't work properly (the ruleset optimizer ignores host labels).
-        # self._service_match_cache works also in the case of changed labels, so we DON'T need to clear it.
+        # self.service_match_cache works also in the case of changed labels, so we DON'T need to clear it.
         self.ruleset_optimizer.clear_caches()
 
     def get_host_bool_value(
@@ -349,21 +349,61 @@ class RulesetMatcher:
                 service_label_groups_cache_id,
             )
 
-            if service_cache_id in self._service_match_cache:
-                match = self._service_match_cache[service_cache_id]
-            else:
+            match = self.service_match_cache.get(service_cache_id)
+            if match is None:
                 match = _matches_service_conditions(
                     service_description_condition,
                     service_label_groups,
                     match_text,
                     service_labels,
                 )
-                self._service_match_cache[service_cache_id] = match
+                self.service_match_cache.add(service_cache_id, match)
 
             if match:
                 yield value
 
 
+_ServiceCacheID: TypeAlias = tuple[
+    tuple[ServiceName | None, int], PreprocessedPattern, tuple[tuple[str, object], ...]
+]
+
+
+class ServiceMatchCache:
+    """The results of matching services against the service conditions of rules
+
+    The cache is unbounded by default.  With a maximum size, the least
+    recently used results are dropped, so long running processes matching
+    many different services do not grow without limit.
+    """
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(maxsize)
+        self.maxsize: Final = maxsize
+        self._results: Final[OrderedDict[_ServiceCacheID, bool]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    def get(self, cache_id: _ServiceCacheID) -> bool | None:
+        try:
+            match = self._results[cache_id]
+        except KeyError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.maxsize is not None:
+            self._results.move_to_end(cache_id)
+        return match
+
+    def add(self, cache_id: _ServiceCacheID, match: bool) -> None:
+        self._results[cache_id] = match
+        if self.maxsize is not None and len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+
 # TODO: improve and cleanup types
 _ConditionCacheID: TypeAlias = tuple[
     tuple[str, ...],
@@ -373,6 +413,248 @@ _ConditionCacheID: TypeAlias = tuple[
 ]
 
 
+class HostIndex:
+    """Host sets as bitmaps for the evaluation of rule conditions
+
+    Every host gets a dense integer ID, and a set of hosts is an int with the
+    bits of its hosts set.  There is one bitmap per tag and per folder, so the
+    tag and folder conditions of a rule are evaluated by a few bitwise
+    operations over all hosts at once instead of testing every host.
+    """
+
+    def __init__(
+        self,
+        host_names: Iterable[HostName],
+        host_tags: Mapping[HostName, Iterable[tuple[TagGroupID, TagID]]],
+        host_paths: Mapping[HostName, str],
+    ) -> None:
+        self._host_names: Final = sorted(host_names)
+        self._ids: Final = {host_name: nr for nr, host_name in enumerate(self._host_names)}
+        self.all: Final = (1 << len(self._host_names)) - 1
+
+        self._by_tag: Final[dict[tuple[TagGroupID, TagID], int]] = {}
+        self._by_path: Final[dict[str, int]] = {}
+        for nr, host_name in enumerate(self._host_names):
+            bit = 1 << nr
+            for tag in host_tags.get(host_name, ()):
+                self._by_tag[tag] = self._by_tag.get(tag, 0) | bit
+            path = host_paths.get(host_name, "/")
+            self._by_path[path] = self._by_path.get(path, 0) | bit
+
+        self._by_folder: Final[dict[str, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._host_names)
+
+    def bitmap(self, host_names: Collection[HostName]) -> int:
+        """The bitmap of the given hosts, unknown hosts are ignored"""
+        if len(host_names) < 100:
+            bitmap = 0
+            for host_name in host_names:
+                if (nr := self._ids.get(host_name)) is not None:
+                    bitmap |= 1 << nr
+            return bitmap
+        # Every shift and "or" copies the whole big int, parsing the digits at once is linear.
+        digits = bytearray(b"0" * len(self._host_names))
+        for host_name in host_names:
+            if (nr := self._ids.get(host_name)) is not None:
+                digits[nr] = ord("1")
+        digits.reverse()
+        return int(digits, 2) if digits else 0
+
+    def hosts(self, bitmap: int) -> set[HostName]:
+        # Finding the ones in the binary representation is much faster than
+        # shifting and masking a big int bit by bit.
+        bits = bin(bitmap)[:1:-1]
+        host_names = self._host_names
+        result = set()
+        nr = bits.find("1")
+        while nr != -1:
+            result.add(host_names[nr])
+            nr = bits.find("1", nr + 1)
+        return result
+
+    def folder(self, folder_path: str) -> int:
+        """The hosts in the folder, including its subfolders"""
+        try:
+            return self._by_folder[folder_path]
+        except KeyError:
+            pass
+        bitmap = 0
+        for path, hosts in self._by_path.items():
+            if path.startswith(folder_path):
+                bitmap |= hosts
+        return self._by_folder.setdefault(folder_path, bitmap)
+
+    def tags(self, tag_conditions: Mapping[TagGroupID, TagCondition]) -> int:
+        """The hosts matching all tag conditions"""
+        bitmap = self.all
+        for taggroup_id, tag_condition in tag_conditions.items():
+            bitmap &= self._tag_condition(taggroup_id, tag_condition)
+            if not bitmap:
+                break
+        return bitmap
+
+    def _tag_condition(self, taggroup_id: TagGroupID, tag_condition: TagCondition) -> int:
+        if isinstance(tag_condition, dict):
+            if "$ne" in tag_condition:
+                return self.all & ~self._tag(
+                    taggroup_id, cast(TagConditionNE, tag_condition)["$ne"]
+                )
+
+            if "$or" in tag_condition:
+                return self._any_tag(taggroup_id, cast(TagConditionOR, tag_condition)["$or"])
+
+            if "$nor" in tag_condition:
+                return self.all & ~self._any_tag(taggroup_id, tag_condition["$nor"])
+
+            raise NotImplementedError()
+
+        return self._tag(taggroup_id, tag_condition)
+
+    def _tag(self, taggroup_id: TagGroupID, tag_id: TagID | None) -> int:
+        return self._by_tag.get((taggroup_id, cast(TagID, tag_id)), 0)
+
+    def _any_tag(self, taggroup_id: TagGroupID, tag_ids: Iterable[TagID | None]) -> int:
+        bitmap = 0
+        for tag_id in tag_ids:
+            bitmap |= self._tag(taggroup_id, tag_id)
+        return bitmap
+
+
+# sorted tags and folder of a host
+_HostMatchingInputs: TypeAlias = tuple[tuple[tuple[TagGroupID, TagID], ...], str]
+
+
+@dataclass(frozen=True)
+class _CachedCondition:
+    host_conditions: HostOrServiceConditions | None
+    tag_conditions: Mapping[TagGroupID, TagCondition]
+    folder: str
+    hosts: set[HostName]
+
+    def matches_tags(self, host_tags: set[tuple[TagGroupID, TagID]]) -> bool:
+        return matches_host_tags(host_tags, self.tag_conditions)
+
+    def matches_host(self, host_name: HostName, folder: str) -> bool:
+        return (
+            self.host_conditions != []  # Empty host list -> Nothing matches
+            and folder.startswith(self.folder)
+            and matches_host_name(self.host_conditions, host_name)
+        )
+
+
+class MatchingHostsCache:
+    """Content addressed cache of the hosts matching the host conditions of rules
+
+    The caches of a RulesetOptimizer are bound to the rulesets and hosts of
+    one configuration, so every config reload starts from scratch.  This
+    cache outlives the optimizers: It is keyed by the content of the
+    conditions (not by the rules) and it knows the tags and folders of the
+    hosts the cached results have been computed for.  When a new
+    configuration is loaded, only the hosts whose tags or folder changed are
+    evaluated again for the cached conditions, and only new conditions are
+    evaluated for all hosts.
+
+    The results cover all configured hosts, the optimizer narrows them down
+    to the hosts it is interested in.  Only conditions with regular
+    expressions on the host names are worth caching, all others are evaluated
+    on the host bitmaps.  Conditions on host labels are not cached here,
+    since the labels of the hosts are computed from rules themselves.
+
+    With a maximum size, the least recently used conditions are dropped, so
+    the conditions of rules which have been changed or deleted don't pile up.
+    """
+
+    def __init__(self, maxsize: int | None = None) -> None:
+        if maxsize is not None and maxsize < 1:
+            raise ValueError(maxsize)
+        self.maxsize: Final = maxsize
+        self._host_inputs: dict[HostName, _HostMatchingInputs] = {}
+        self._hosts_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], set[HostName]] = {}
+        self._conditions: Final[OrderedDict[_ConditionCacheID, _CachedCondition]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._conditions)
+
+    def update_hosts(self, host_inputs: Mapping[HostName, _HostMatchingInputs]) -> int:
+        """Make the cached results valid for the given hosts
+
+        Returns the number of hosts which needed to be evaluated again.
+        """
+        changed = {
+            host_name
+            for host_name in self._host_inputs.keys() | host_inputs.keys()
+            if self._host_inputs.get(host_name) != host_inputs.get(host_name)
+        }
+        if not changed:
+            return 0
+
+        for host_name in changed:
+            if (old_inputs := self._host_inputs.get(host_name)) is not None:
+                self._hosts_by_tags[old_inputs[0]].discard(host_name)
+                if not self._hosts_by_tags[old_inputs[0]]:
+                    del self._hosts_by_tags[old_inputs[0]]
+            if (new_inputs := host_inputs.get(host_name)) is not None:
+                self._hosts_by_tags.setdefault(new_inputs[0], set()).add(host_name)
+        self._host_inputs = dict(host_inputs)
+
+        to_evaluate = [
+            (host_name, set(host_inputs[host_name][0]), host_inputs[host_name][1])
+            for host_name in changed
+            if host_name in host_inputs
+        ]
+        for condition in self._conditions.values():
+            condition.hosts.difference_update(changed)
+            condition.hosts.update(
+                host_name
+                for host_name, tags, folder in to_evaluate
+                if condition.matches_tags(tags) and condition.matches_host(host_name, folder)
+            )
+        return len(to_evaluate)
+
+    def matching_hosts(
+        self,
+        cache_id: _ConditionCacheID,
+        host_conditions: HostOrServiceConditions | None,
+        tag_conditions: Mapping[TagGroupID, TagCondition],
+        folder: str,
+    ) -> set[HostName]:
+        """The configured hosts matching the condition, the result must not be modified"""
+        with contextlib.suppress(KeyError):
+            condition = self._conditions[cache_id]
+            self.hits += 1
+            if self.maxsize is not None:
+                self._conditions.move_to_end(cache_id)
+            return condition.hosts
+
+        self.misses += 1
+        condition = _CachedCondition(host_conditions, tag_conditions, folder, set())
+        for tags, host_names in self._hosts_by_tags.items():
+            if not condition.matches_tags(set(tags)):
+                continue
+            condition.hosts.update(
+                host_name
+                for host_name in host_names
+                if condition.matches_host(host_name, self._host_inputs[host_name][1])
+            )
+        self._conditions[cache_id] = condition
+        if self.maxsize is not None and len(self._conditions) > self.maxsize:
+            self._conditions.popitem(last=False)
+        return condition.hosts
+
+
+def _has_host_name_regexes(host_conditions: HostOrServiceConditions | None) -> bool:
+    """Whether the host names have to be matched one by one, negated lists included"""
+    if not host_conditions:
+        return False
+    return isinstance(host_conditions, dict) or any(
+        isinstance(condition, dict) for condition in host_conditions
+    )
+
+
 class RulesetOptimizer:
     """Performs some precalculations on the configured rulesets to improve the
     processing performance"""
@@ -385,6 +667,7 @@ class RulesetOptimizer:
         all_configured_hosts: frozenset[HostName],
         clusters_of: Mapping[HostName, Sequence[HostName]],
         nodes_of: Mapping[HostName, Sequence[HostName]],
+        matching_hosts_cache: MatchingHostsCache | None = None,
     ) -> None:
         super().__init__()
         self._ruleset_matcher = ruleset_matcher
@@ -394,16 +677,13 @@ class RulesetOptimizer:
         self._nodes_of = nodes_of
 
         self._all_configured_hosts = all_configured_hosts
+        self._host_index: Final = HostIndex(all_configured_hosts, self._host_tags, host_paths)
 
         # Contains all hostnames which are currently relevant for this cache.
         # Every active host or a subset of the active hosts when multiprocessing
         # is enabled.
         self._all_processed_hosts = self._all_configured_hosts
-
-        # A factor which indicates how much hosts share the same host tag configuration (excluding folders).
-        # len(all_processed_hosts) / len(different tag combinations)
-        # It is used to determine the best rule evualation method
-        self._all_processed_hosts_similarity = 1.0
+        self._all_processed_hosts_bitmap = self._host_index.all
 
         self.__service_ruleset_cache: dict[
             tuple[int, bool], Sequence[_PreprocessedServiceRule[Any]]
@@ -413,17 +693,24 @@ class RulesetOptimizer:
             tuple[_ConditionCacheID, bool], set[HostName]
         ] = {}
 
-        # Reference dirname -> hosts in this dir including subfolders
-        self._folder_host_lookup: dict[tuple[bool, str], set[HostName]] = {}
-
-        # Provides a list of hosts with the same hosttags, excluding the folder
-        self._hosts_grouped_by_tags: dict[tuple[tuple[TagGroupID, TagID], ...], set[HostName]] = {}
         # Reference hostname -> tag group reference
         self._host_grouped_ref: dict[HostName, tuple[tuple[TagGroupID, TagID], ...]] = {}
 
         # TODO: Clean this one up?
         self._initialize_host_lookup()
 
+        self._matching_hosts_cache = matching_hosts_cache
+        if matching_hosts_cache is not None:
+            matching_hosts_cache.update_hosts(
+                {
+                    hostname: (
+                        self._host_grouped_ref[hostname],
+                        self._host_paths.get(hostname, "/"),
+                    )
+                    for hostname in self._all_configured_hosts
+                }
+            )
+
     def clear_ruleset_caches(self) -> None:
         self.__host_ruleset_cache.clear()
         self.__service_ruleset_cache.clear()
@@ -448,24 +735,7 @@ class RulesetOptimizer:
         # Only add references to configured hosts
         nodes_and_clusters.intersection_update(self._all_configured_hosts)
         self._all_processed_hosts = frozenset(nodes_and_clusters)
-
-        # The folder host lookup includes a list of all -processed- hosts within a given
-        # folder. Any update with set_all_processed hosts invalidates this cache, because
-        # the scope of relevant hosts has changed. This is -good-, since the values in this
-        # lookup are iterated one by one later on in all_matching_hosts
-        self._folder_host_lookup = {}
-
-        used_groups = {
-            self._host_grouped_ref.get(hostname, ()) for hostname in self._all_processed_hosts
-        }
-
-        if not used_groups:
-            self._all_processed_hosts_similarity = 1.0
-            return
-
-        self._all_processed_hosts_similarity = (
-            1.0 * len(self._all_processed_hosts) / len(used_groups)
-        )
+        self._all_processed_hosts_bitmap = self._host_index.bitmap(self._all_processed_hosts)
 
     def get_host_ruleset(
         self,
@@ -601,12 +871,29 @@ class RulesetOptimizer:
         except KeyError:
             pass
 
+        # Determine match candidates.
+        # If the rule is located in a folder we only need the hosts in that folder.
+        hosts_in_rule_scope = self._host_index.folder(rule_path) & (
+            self._host_index.all if with_foreign_hosts else self._all_processed_hosts_bitmap
+        )
+
+        if (
+            self._matching_hosts_cache is not None
+            and not label_conditions
+            and _has_host_name_regexes(host_conditions)
+        ):
+            cached = self._matching_hosts_cache.matching_hosts(
+                cache_id[0], host_conditions, tag_conditions, rule_path
+            )
+            return self._all_matching_hosts_match_cache.setdefault(
+                cache_id,
+                self._host_index.hosts(hosts_in_rule_scope & self._host_index.bitmap(cached)),
+            )
+
         return self._all_matching_hosts_match_cache.setdefault(
             cache_id,
             self._all_matching_hosts_computation(
-                # Determine match candidates.
-                # If the rule is located in a folder we only need the hosts in that folder.
-                self._get_hosts_within_folder(rule_path, with_foreign_hosts),
+                hosts_in_rule_scope,
                 host_conditions,
                 tag_conditions,
                 label_conditions,
@@ -616,17 +903,14 @@ class RulesetOptimizer:
 
     def _all_matching_hosts_computation(
         self,
-        hosts_in_rule_scope: set[HostName],
+        hosts_in_rule_scope: int,
         host_conditions: HostOrServiceConditions | None,
         tag_conditions: Mapping[TagGroupID, TagCondition],
         label_conditions: LabelGroups,
         labels_of_host: Callable[[HostName], Labels],
     ) -> set[HostName]:
-        if tag_conditions and host_conditions is None and not label_conditions:
-            # TODO: Labels could also be optimized like the tags
-            matched_by_tags = self._match_hosts_by_tags(hosts_in_rule_scope, tag_conditions)
-            if matched_by_tags is not None:
-                return matched_by_tags
+        if host_conditions == []:
+            return set()  # Empty host list -> Nothing matches
 
         only_specific_hosts = (
             host_conditions is not None
@@ -634,38 +918,18 @@ class RulesetOptimizer:
             and all(not isinstance(x, dict) for x in host_conditions)
         )
 
-        if host_conditions == []:
-            return set()  # Empty host list -> Nothing matches
-
-        if not tag_conditions and not label_conditions and not host_conditions:
-            # If no tags are specified and the hostlist only include @all (all hosts)
-            return hosts_in_rule_scope
-
-        if (
-            not tag_conditions
-            and not label_conditions
-            and only_specific_hosts
-            and host_conditions is not None
-        ):
-            # If no tags are specified and there are only specific hosts we already have the matches
-            return hosts_in_rule_scope.intersection(host_conditions)
-
-        # If the rule has only exact host restrictions, we can thin out the list of hosts to check
+        # Tags and exact host restrictions are evaluated on all hosts in the scope at once
+        hosts_to_check = hosts_in_rule_scope
+        if tag_conditions:
+            hosts_to_check &= self._host_index.tags(tag_conditions)
         if only_specific_hosts and host_conditions is not None:
-            hosts_to_check = hosts_in_rule_scope.intersection(host_conditions)
-        else:
-            hosts_to_check = hosts_in_rule_scope
+            hosts_to_check &= self._host_index.bitmap(cast(Sequence[HostName], host_conditions))
 
-        matching: set[HostName] = set()
-        for hostname in hosts_to_check:
-            # When no tag matching is requested, do not filter by tags. Accept all hosts
-            # and filter only by hostlist
-            if tag_conditions and not matches_host_tags(
-                self._host_tags[hostname],
-                tag_conditions,
-            ):
-                continue
+        if not label_conditions and (not host_conditions or only_specific_hosts):
+            return self._host_index.hosts(hosts_to_check)
 
+        matching: set[HostName] = set()
+        for hostname in self._host_index.hosts(hosts_to_check):
             if label_conditions:
                 host_labels = labels_of_host(hostname)
                 if not matches_labels(host_labels, label_conditions):
@@ -712,95 +976,9 @@ class RulesetOptimizer:
             rule_path,
         )
 
-    # TODO: Generalize this optimization: Build some kind of key out of the tag conditions
-    # (positive, negative, ...). Make it work with the new tag group based "$or" handling.
-    def _match_hosts_by_tags(
-        self,
-        valid_hosts: set[HostName],
-        tag_conditions: Mapping[TagGroupID, TagCondition],
-    ) -> set[HostName] | None:
-        matching = set()
-        negative_match_tags = set()
-        positive_match_tags = set()
-        for taggroup_id, tag_condition in tag_conditions.items():
-            if isinstance(tag_condition, dict):
-                if "$ne" in tag_condition:
-                    negative_match_tags.add(
-                        (
-                            taggroup_id,
-                            cast(TagConditionNE, tag_condition)["$ne"],
-                        )
-                    )
-                    continue
-
-                if "$or" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
-
-                if "$nor" in tag_condition:
-                    return None  # Can not be optimized, makes _all_matching_hosts proceed
-
-                raise NotImplementedError()
-
-            positive_match_tags.add((taggroup_id, tag_condition))
-
-        # TODO:
-        # if has_specific_folder_tag or self._all_processed_hosts_similarity < 3.0:
-        if self._all_processed_hosts_similarity < 3.0:
-            # Without shared folders
-            for hostname in valid_hosts:
-                if positive_match_tags <= self._host_tags[
-                    hostname
-                ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                    matching.add(hostname)
-
-            return matching
-
-        # With shared folders
-        checked_hosts: set[str] = set()
-        for hostname in valid_hosts:
-            if hostname in checked_hosts:
-                continue
-
-            hosts_with_same_tag = self._filter_hosts_with_same_tags_as_host(hostname, valid_hosts)
-            checked_hosts.update(hosts_with_same_tag)
-
-            if positive_match_tags <= self._host_tags[
-                hostname
-            ] and not negative_match_tags.intersection(self._host_tags[hostname]):
-                matching.update(hosts_with_same_tag)
-
-        return matching
-
-    def _filter_hosts_with_same_tags_as_host(
-        self,
-        hostname: HostName,
-        hosts: set[HostName],
-    ) -> set[HostName]:
-        return self._hosts_grouped_by_tags[self._host_grouped_ref[hostname]].intersection(hosts)
-
-    def _get_hosts_within_folder(self, folder_path: str, with_foreign_hosts: bool) -> set[HostName]:
-        cache_id = with_foreign_hosts, folder_path
-        if cache_id not in self._folder_host_lookup:
-            hosts_in_folder = set()
-            relevant_hosts = (
-                self._all_configured_hosts if with_foreign_hosts else self._all_processed_hosts
-            )
-
-            for hostname in relevant_hosts:
-                host_path = self._host_paths.get(hostname, "/")
-                if host_path.startswith(folder_path):
-                    hosts_in_folder.add(hostname)
-
-            self._folder_host_lookup[cache_id] = hosts_in_folder
-            return hosts_in_folder
-
-        return self._folder_host_lookup[cache_id]
-
     def _initialize_host_lookup(self) -> None:
         for hostname in self._all_configured_hosts:
-            group_ref = tuple(sorted(self._host_tags[hostname]))
-            self._hosts_grouped_by_tags.setdefault(group_ref, set()).add(hostname)
-            self._host_grouped_ref[hostname] = group_ref
+            self._host_grouped_ref[hostname] = tuple(sorted(self._host_tags[hostname]))
 
 
 def _tags_cache_id(tag_or_label_spec: object) -> object:
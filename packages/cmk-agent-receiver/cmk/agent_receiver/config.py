@@ -18,6 +18,8 @@ class Config(BaseModel):
     task_ttl: float = 120.0
     max_tasks_per_relay: int = 10
     site_url: str = "http://localhost"
+    # Threads per worker decompressing and storing the received agent data
+    agent_data_workers: int = 4
 
     @classmethod
     def load(cls, path: Path | None = None) -> Config:
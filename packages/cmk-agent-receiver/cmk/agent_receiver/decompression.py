@@ -3,16 +3,49 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from collections.abc import Iterable, Iterator
 from enum import Enum
-from zlib import decompress
+from typing import Protocol
+from zlib import decompress, decompressobj
 from zlib import error as zlibError
 
+try:
+    import zstandard  # type: ignore[import-not-found,unused-ignore]
+
+    zstandard_available = True
+except ImportError:
+    zstandard_available = False
+
 
 class DecompressionError(Exception): ...
 
 
+class StreamDecompressor(Protocol):
+    def decompress(self, data: bytes) -> bytes: ...
+
+    def flush(self) -> bytes: ...
+
+
 class Decompressor(Enum):
     ZLIB = "zlib"
+    # Only available if the zstandard module is installed
+    ZSTD = "zstd"
+
+    @classmethod
+    def supported(cls, name: str) -> "Decompressor":
+        """The decompressor of the algorithm, if it can be used
+
+        >>> Decompressor.supported("zlib")
+        <Decompressor.ZLIB: 'zlib'>
+        >>> Decompressor.supported("gzip")
+        Traceback (most recent call last):
+            ...
+        ValueError: 'gzip' is not a valid Decompressor
+        """
+        decompressor = cls(name)
+        if decompressor is cls.ZSTD and not zstandard_available:
+            raise ValueError(f"{name!r} is not available")
+        return decompressor
 
     def __call__(self, data: bytes) -> bytes:
         """
@@ -20,7 +53,40 @@ class Decompressor(Enum):
         >>> Decompressor("zlib")(compress(b"blablub"))
         b'blablub'
         """
-        return {Decompressor.ZLIB: Decompressor._zlib_decompress}[self](data)
+        if self is Decompressor.ZLIB:
+            return Decompressor._zlib_decompress(data)
+        return b"".join(self.iter_decompress([data]))
+
+    def iter_decompress(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """Decompress the data chunk by chunk, without holding all of it in memory
+
+        >>> from zlib import compress
+        >>> data = compress(b"blablub" * 3)
+        >>> b"".join(Decompressor("zlib").iter_decompress([data[:5], data[5:]]))
+        b'blablubblablubblablub'
+        >>> list(Decompressor("zlib").iter_decompress([data[:5]]))
+        Traceback (most recent call last):
+            ...
+        packages.cmk-agent-receiver.cmk.agent_receiver.decompression.DecompressionError: ...
+        """
+        stream = self._stream()
+        try:
+            for chunk in chunks:
+                if decompressed := stream.decompress(chunk):
+                    yield decompressed
+            if decompressed := stream.flush():
+                yield decompressed
+        except (zlibError, ValueError) as e:
+            raise DecompressionError(f"Decompression with {self.value} failed: {e}") from e
+
+    def _stream(self) -> StreamDecompressor:
+        match self:
+            case Decompressor.ZLIB:
+                return _ZlibStream()
+            case Decompressor.ZSTD:
+                if not zstandard_available:
+                    raise DecompressionError("Decompression with zstd is not available")
+                return _ZstdStream()
 
     @staticmethod
     def _zlib_decompress(data: bytes) -> bytes:
@@ -37,3 +103,35 @@ class Decompressor(Enum):
             return decompress(data)
         except zlibError as e:
             raise DecompressionError(f"Decompression with zlib failed: {e}") from e
+
+
+class _ZlibStream:
+    def __init__(self) -> None:
+        self._decompressor = decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        return self._decompressor.decompress(data)
+
+    def flush(self) -> bytes:
+        remaining = self._decompressor.flush()
+        # zlib.decompress() fails on truncated data, so do we
+        if not self._decompressor.eof:
+            raise ValueError("incomplete or truncated stream")
+        return remaining
+
+
+class _ZstdStream:
+    def __init__(self) -> None:
+        self._decompressor = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, data: bytes) -> bytes:
+        try:
+            return self._decompressor.decompress(data)
+        except zstandard.ZstdError as e:
+            raise ValueError(str(e)) from e
+
+    def flush(self) -> bytes:
+        remaining = self._decompressor.flush()
+        if not self._decompressor.eof:
+            raise ValueError("incomplete or truncated stream")
+        return remaining
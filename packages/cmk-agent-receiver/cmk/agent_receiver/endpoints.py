@@ -3,11 +3,13 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import asyncio
 import os
 import tempfile
-from functools import cache
+from concurrent.futures import ThreadPoolExecutor
+from functools import cache, partial
 from pathlib import Path
-from typing import assert_never
+from typing import assert_never, BinaryIO, Final
 
 from cryptography.x509 import Certificate
 from fastapi import Depends, File, Header, HTTPException, Response, UploadFile
@@ -347,9 +349,23 @@ def _validate_is_allowed(credentials: HTTPBasicCredentials, uuid: UUID4) -> None
         )
 
 
+# Size of the compressed chunks read from the uploaded file
+_AGENT_DATA_CHUNK_SIZE: Final = 64 * 1024
+
+
+@cache
+def _agent_data_executor() -> ThreadPoolExecutor:
+    # Bounded, so that many large uploads can not starve the default executor
+    return ThreadPoolExecutor(
+        max_workers=get_config().agent_data_workers,
+        thread_name_prefix="agent-data",
+    )
+
+
 def _store_agent_data(
     target_dir: Path,
-    decompressed_data: bytes,
+    compressed_data: BinaryIO,
+    decompressor: Decompressor,
 ) -> None:
     target_dir.resolve().mkdir(parents=True, exist_ok=True)
     with tempfile.NamedTemporaryFile(
@@ -357,7 +373,12 @@ def _store_agent_data(
         delete=False,
     ) as temp_file:
         try:
-            temp_file.write(decompressed_data)
+            temp_file.writelines(
+                decompressor.iter_decompress(
+                    iter(partial(compressed_data.read, _AGENT_DATA_CHUNK_SIZE), b"")
+                )
+            )
+            temp_file.flush()
             os.rename(temp_file.name, target_dir / "agent_output")
         finally:
             Path(temp_file.name).unlink(missing_ok=True)
@@ -395,7 +416,7 @@ async def agent_data(
         )
 
     try:
-        decompressor = Decompressor(compression)
+        decompressor = Decompressor.supported(compression)
     except ValueError as e:
         logger.error(
             "uuid=%s Unsupported compression algorithm: %s",
@@ -407,8 +428,15 @@ async def agent_data(
             detail=f"Unsupported compression algorithm: {compression}",
         ) from e
 
+    # Decompressing and writing large outputs would block the event loop
     try:
-        decompressed_agent_data = decompressor(monitoring_data.file.read())
+        await asyncio.get_running_loop().run_in_executor(
+            _agent_data_executor(),
+            _store_agent_data,
+            host.source_path,
+            monitoring_data.file,
+            decompressor,
+        )
     except DecompressionError as e:
         logger.error(
             "uuid=%s Decompression of agent data failed: %s",
@@ -420,11 +448,6 @@ async def agent_data(
             detail="Decompression of agent data failed",
         ) from e
 
-    _store_agent_data(
-        host.source_path,
-        decompressed_agent_data,
-    )
-
     logger.info(
         "uuid=%s Agent data saved",
         uuid,
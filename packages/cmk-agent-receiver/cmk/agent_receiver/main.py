@@ -12,7 +12,7 @@ from . import endpoints as endpoints
 from .apps_and_routers import AGENT_RECEIVER_APP, UUID_VALIDATION_ROUTER
 from .config import get_config
 from .log import configure_logger
-from .middleware import B3RequestIDMiddleware
+from .middleware import B3RequestIDMiddleware, RequestMetricsMiddleware
 
 
 def main_app() -> FastAPI:
@@ -30,6 +30,7 @@ def main_app() -> FastAPI:
 
     # Add middleware to main app BEFORE mounting sub-apps
     main_app_.add_middleware(B3RequestIDMiddleware)
+    main_app_.add_middleware(RequestMetricsMiddleware)
 
     # this must happen *after* registering the endpoints
     AGENT_RECEIVER_APP.include_router(UUID_VALIDATION_ROUTER)
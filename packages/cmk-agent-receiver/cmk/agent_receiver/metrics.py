@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Request metrics of an agent receiver worker
+
+The latency of the requests is recorded per route, the number of requests in
+flight whenever a request arrives. The histograms are written to the log now
+and then, each worker process records its own.
+"""
+
+from __future__ import annotations
+
+import bisect
+import json
+import time
+from collections.abc import Sequence
+from typing import Final
+
+from .log import logger
+
+# seconds
+LATENCY_BUCKETS: Final = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+IN_FLIGHT_BUCKETS: Final = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Histogram:
+    """Counts the observed values per bucket, the last bucket is unbounded
+
+    >>> histogram = Histogram((1, 10))
+    >>> for value in (0.5, 1, 5, 50):
+    ...     histogram.observe(value)
+    >>> histogram.snapshot()
+    {'count': 4, 'sum': 56.5, 'buckets': {'1': 2, '10': 1, '+Inf': 1}}
+    """
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds: Final = tuple(bounds)
+        self.counts: Final = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "count": sum(self.counts),
+            "sum": self.sum,
+            "buckets": {
+                **{str(bound): count for bound, count in zip(self.bounds, self.counts)},
+                "+Inf": self.counts[-1],
+            },
+        }
+
+
+class RequestMetrics:
+    """Not thread safe, only to be used from the event loop of the worker"""
+
+    def __init__(self, *, interval: float = 300.0) -> None:
+        self.interval: Final = interval
+        self.in_flight = 0
+        self.in_flight_histogram: Final = Histogram(IN_FLIGHT_BUCKETS)
+        self.latency: Final[dict[str, Histogram]] = {}
+        self._last_report = time.monotonic()
+
+    def started(self) -> None:
+        self.in_flight += 1
+        self.in_flight_histogram.observe(self.in_flight)
+
+    def finished(self, route: str, seconds: float) -> None:
+        self.in_flight -= 1
+        if (histogram := self.latency.get(route)) is None:
+            histogram = self.latency[route] = Histogram(LATENCY_BUCKETS)
+        histogram.observe(seconds)
+        if time.monotonic() - self._last_report >= self.interval:
+            self.report()
+
+    def snapshot(self) -> dict[str, object]:
+        return {
+            "in_flight": self.in_flight_histogram.snapshot(),
+            "latency": {route: histogram.snapshot() for route, histogram in self.latency.items()},
+        }
+
+    def report(self) -> None:
+        self._last_report = time.monotonic()
+        logger.info("Request metrics: %s", json.dumps(self.snapshot()))
+
+
+REQUEST_METRICS: Final = RequestMetrics()
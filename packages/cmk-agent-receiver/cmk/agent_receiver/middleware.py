@@ -5,14 +5,17 @@
 from __future__ import annotations
 
 import secrets
+import time
 from collections.abc import Awaitable, Callable
 from dataclasses import dataclass
 from typing import Final, final, Literal, NewType, override
 
 from fastapi import Request, Response
 from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from cmk.agent_receiver.log import bound_contextvars
+from cmk.agent_receiver.metrics import REQUEST_METRICS, RequestMetrics
 
 TraceID = NewType("TraceID", str)
 HeaderName = Literal["b3", "x-b3-traceid", "x-trace-id", "x-request-id", "traceparent"]
@@ -70,6 +73,34 @@ class B3RequestIDMiddleware(BaseHTTPMiddleware):
         return _TraceExtractionResult(trace_id=_generate_otel_trace_id(), original_header=None)
 
 
+@final
+class RequestMetricsMiddleware:
+    """Middleware that records the latency per route and the number of requests in flight.
+
+    A plain ASGI middleware, it runs for every request and should not add the
+    overhead of BaseHTTPMiddleware.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: RequestMetrics = REQUEST_METRICS) -> None:
+        self._app = app
+        self._metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self._app(scope, receive, send)
+            return
+
+        self._metrics.started()
+        start = time.perf_counter()
+        try:
+            await self._app(scope, receive, send)
+        finally:
+            # The routers of the (sub-)apps add the matched route to the scope
+            self._metrics.finished(
+                getattr(scope.get("route"), "path", "unmatched"), time.perf_counter() - start
+            )
+
+
 @dataclass(frozen=True, slots=True)
 class _TraceHeader:
     name: HeaderName
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Local load test of the agent data uploads, in the manner of locust
+
+Simulated push agents upload their compressed output to an in-process agent
+receiver, while other clients query their registration status. Since both run
+on the same event loop, the latency of the status queries shows how much the
+uploads block the loop.
+
+    python3 tests/benchmark/agent_data.py --agents 200 --output-size 2000000 --duration 30
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from pathlib import Path
+from uuid import uuid4
+
+import httpx
+
+
+@dataclass
+class Stats:
+    latencies: list[float] = field(default_factory=list)
+    failures: int = 0
+
+    def render(self, name: str, duration: float) -> str:
+        if not self.latencies:
+            return f"{name:<20} {0:>8} {self.failures:>8}"
+        quantiles = statistics.quantiles(self.latencies, n=100) if len(self.latencies) > 1 else []
+        p95, p99 = (quantiles[94], quantiles[98]) if quantiles else (0.0, 0.0)
+        return (
+            f"{name:<20} {len(self.latencies):>8} {self.failures:>8}"
+            f" {statistics.median(self.latencies) * 1000:>10.1f}"
+            f" {p95 * 1000:>10.1f} {p99 * 1000:>10.1f}"
+            f" {len(self.latencies) / duration:>10.1f}"
+        )
+
+
+async def _user(
+    client: httpx.AsyncClient,
+    uuid: str,
+    stats: Stats,
+    stop_at: float,
+    upload: bytes | None,
+    wait: float,
+) -> None:
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        if upload is None:
+            response = await client.get(
+                f"/registration_status/{uuid}", headers={"verified-uuid": uuid}
+            )
+        else:
+            response = await client.post(
+                f"/agent_data/{uuid}",
+                headers={"compression": "zlib", "verified-uuid": uuid},
+                files={"monitoring_data": ("monitoring_data", upload)},
+            )
+        if response.is_success:
+            stats.latencies.append(time.perf_counter() - start)
+        else:
+            stats.failures += 1
+        await asyncio.sleep(wait)
+
+
+async def run(args: argparse.Namespace, omd_root: Path) -> dict[str, Stats]:
+    # Import late, the configuration is read from the environment
+    from cmk.agent_receiver.main import main_app
+
+    agent_output_dir = omd_root / "var/agent-receiver/received-outputs"
+    uuids = [str(uuid4()) for _nr in range(args.agents + args.pollers)]
+    for uuid in uuids:
+        (target := omd_root / "push-agent" / uuid).mkdir(parents=True)
+        (agent_output_dir / uuid).symlink_to(target)
+
+    # Agent outputs compress well, but not arbitrarily well
+    line = os.urandom(32).hex().encode() + b"\n"
+    upload = zlib.compress((line * (args.output_size // len(line) + 1))[: args.output_size])
+
+    stats = {"POST agent_data": Stats(), "GET registration": Stats()}
+    stop_at = time.monotonic() + args.duration
+    async with httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main_app()),
+        base_url=f"http://localhost/{os.environ['OMD_SITE']}/agent-receiver",
+        timeout=None,
+    ) as client:
+        await asyncio.gather(
+            *(
+                _user(client, uuid, stats["POST agent_data"], stop_at, upload, args.wait)
+                for uuid in uuids[: args.agents]
+            ),
+            *(
+                _user(client, uuid, stats["GET registration"], stop_at, None, args.wait)
+                for uuid in uuids[args.agents :]
+            ),
+        )
+    return stats
+
+
+def parse_arguments(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--agents", type=int, default=50, help="Uploading push agents")
+    parser.add_argument("--pollers", type=int, default=10, help="Clients querying their status")
+    parser.add_argument("--output-size", type=int, default=1_000_000, help="Bytes per output")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds")
+    parser.add_argument("--wait", type=float, default=0.0, help="Seconds between requests")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = parse_arguments(argv)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        omd_root = Path(tmp_dir)
+        (omd_root / "var/agent-receiver/received-outputs").mkdir(parents=True)
+        (omd_root / "var/log/agent-receiver").mkdir(parents=True)
+        os.environ["OMD_ROOT"] = str(omd_root)
+        os.environ.setdefault("OMD_SITE", "benchmark")
+        stats = asyncio.run(run(args, omd_root))
+
+    sys.stdout.write(
+        f"{'Name':<20} {'# reqs':>8} {'# fails':>8} {'Median ms':>10}"
+        f" {'95% ms':>10} {'99% ms':>10} {'req/s':>10}\n"
+    )
+    for name, request_stats in stats.items():
+        sys.stdout.write(f"{request_stats.render(name, args.duration)}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
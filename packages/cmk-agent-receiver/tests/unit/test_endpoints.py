@@ -4,6 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import io
+import os
 import stat
 from collections.abc import MutableMapping
 from pathlib import Path
@@ -20,6 +21,7 @@ from pytest_mock import MockerFixture
 from cmk.agent_receiver.certs import serialize_to_pem
 from cmk.agent_receiver.checkmk_rest_api import CMKEdition, HostConfiguration, RegisterResponse
 from cmk.agent_receiver.config import get_config
+from cmk.agent_receiver.decompression import zstandard_available
 from cmk.agent_receiver.models import ConnectionMode, R4RStatus, RequestForRegistration
 from cmk.agent_receiver.utils import R4R
 
@@ -685,6 +687,64 @@ def test_agent_data_success(
     assert response.status_code == 204
 
 
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_success_in_chunks(
+    tmp_path: Path,
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: MutableMapping[str, str],
+) -> None:
+    # Incompressible data spanning several chunks of the upload
+    agent_output = os.urandom(300 * 1024)
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers=agent_data_headers,
+        files={"monitoring_data": ("filename", io.BytesIO(compress(agent_output)))},
+    )
+
+    assert response.status_code == 204
+    assert (tmp_path / "push-agent" / "hostname" / "agent_output").read_bytes() == agent_output
+
+
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_truncated_data(
+    tmp_path: Path,
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: MutableMapping[str, str],
+) -> None:
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers=agent_data_headers,
+        files={"monitoring_data": ("filename", io.BytesIO(compress(b"mock file" * 100)[:-10]))},
+    )
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Decompression of agent data failed"}
+    # Neither the agent output nor the temporary file are left behind
+    assert not list((tmp_path / "push-agent" / "hostname").iterdir())
+
+
+@pytest.mark.skipif(zstandard_available, reason="zstandard is installed")
+@pytest.mark.usefixtures("symlink_push_host")
+def test_agent_data_zstd_not_available(
+    client: TestClient,
+    uuid: UUID4,
+    agent_data_headers: MutableMapping[str, str],
+    compressed_agent_data: io.BytesIO,
+) -> None:
+    response = client.post(
+        f"/agent_data/{uuid}",
+        headers={
+            **agent_data_headers,
+            "compression": "zstd",
+        },
+        files={"monitoring_data": ("filename", compressed_agent_data)},
+    )
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Unsupported compression algorithm: zstd"}
+
+
 @pytest.fixture(name="registration_status_headers")
 def fixture_registration_status_headers(uuid: UUID4) -> dict[str, str]:
     return {
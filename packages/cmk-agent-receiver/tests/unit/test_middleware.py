@@ -9,7 +9,8 @@ import pytest
 from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
-from cmk.agent_receiver.middleware import B3RequestIDMiddleware
+from cmk.agent_receiver.metrics import RequestMetrics
+from cmk.agent_receiver.middleware import B3RequestIDMiddleware, RequestMetricsMiddleware
 
 
 @pytest.fixture
@@ -218,3 +219,27 @@ def test_header_preservation_only_uses_the_primary_trace_header(
             and other_header != expected_preserved_header
         ):
             assert other_header not in response.headers
+
+
+def test_request_metrics_per_route() -> None:
+    metrics = RequestMetrics()
+    app = FastAPI()
+    app.add_middleware(RequestMetricsMiddleware, metrics=metrics)
+
+    @app.get("/hosts/{name}")
+    async def host_endpoint(name: str) -> dict[str, str]:
+        return {"name": name}
+
+    client = TestClient(app)
+    client.get("/hosts/heute")
+    client.get("/hosts/morgen")
+    client.get("/unknown")
+
+    assert metrics.in_flight == 0
+    assert {
+        route: histogram.snapshot()["count"] for route, histogram in metrics.latency.items()
+    } == {
+        "/hosts/{name}": 2,
+        "unmatched": 1,
+    }
+    assert metrics.in_flight_histogram.snapshot()["count"] == 3
@@ -7,7 +7,8 @@ from __future__ import annotations
 
 import os
 import posix
-from collections.abc import Callable
+import resource
+from collections.abc import Callable, Sequence
 from dataclasses import dataclass
 
 
@@ -27,6 +28,17 @@ class Snapshot:
     def take(cls) -> Snapshot:
         return cls(os.times())
 
+    @classmethod
+    def take_thread(cls) -> Snapshot:
+        """Like take(), but with the user and system times of the calling thread only
+
+        The times of the children can not be told apart per thread, they are the
+        ones of the whole process.
+        """
+        thread = resource.getrusage(resource.RUSAGE_THREAD)
+        process = os.times()
+        return cls(posix.times_result((thread.ru_utime, thread.ru_stime, *process[2:])))
+
     @classmethod
     def deserialize(cls, serialized: object) -> Snapshot:
         try:
@@ -52,10 +64,35 @@ class Snapshot:
         return self != Snapshot.null()
 
 
+def apportion(total: Snapshot, parts: Sequence[Snapshot]) -> list[Snapshot]:
+    """Split the total in proportion to the parts, e.g. overlapping in time
+
+    >>> [p.process.elapsed for p in apportion(
+    ...     Snapshot(posix.times_result((0.0, 0.0, 0.0, 0.0, 3.0))),
+    ...     [
+    ...         Snapshot(posix.times_result((0.0, 0.0, 0.0, 0.0, 2.0))),
+    ...         Snapshot(posix.times_result((0.0, 0.0, 0.0, 0.0, 4.0))),
+    ...     ],
+    ... )]
+    [1.0, 2.0]
+    """
+    sums = [sum(field) for field in zip(*(part.process for part in parts))]
+    return [
+        Snapshot(
+            posix.times_result(
+                total_time * time / sum_ if sum_ else total_time / len(parts)
+                for total_time, time, sum_ in zip(total.process, part.process, sums)
+            )
+        )
+        for part in parts
+    ]
+
+
 class CPUTracker:
-    def __init__(self, log: Callable[[str], None]) -> None:
+    def __init__(self, log: Callable[[str], None], *, per_thread: bool = False) -> None:
         super().__init__()
         self._log = log
+        self._take: Callable[[], Snapshot] = Snapshot.take_thread if per_thread else Snapshot.take
         self._start: Snapshot = Snapshot.null()
         self._end: Snapshot = Snapshot.null()
 
@@ -63,12 +100,12 @@ class CPUTracker:
         return "%s()" % type(self).__name__
 
     def __enter__(self) -> CPUTracker:
-        self._start = Snapshot.take()
+        self._start = self._take()
         self._log(f"[cpu_tracking] Start [{id(self):x}]")
         return self
 
     def __exit__(self, *exc_info: object) -> None:
-        self._end = Snapshot.take()
+        self._end = self._take()
         self._log(f"[cpu_tracking] Stop [{id(self):x} - {self.duration}]")
 
     @property
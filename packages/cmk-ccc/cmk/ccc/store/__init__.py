@@ -6,22 +6,29 @@
 functionality is the locked file opening realized with the File() context
 manager."""
 
+import fnmatch
+import hashlib
 import logging
+import marshal
 import pickle
 import pprint
+import re
 import shutil
-from collections.abc import Mapping
+from collections.abc import Callable, Hashable, Mapping
 from contextlib import AbstractContextManager, nullcontext
 from pathlib import Path
 from threading import Lock
-from typing import Any
+from typing import Any, cast, Final, Protocol
 
 from cmk.ccc.exceptions import MKGeneralException, MKTerminate, MKTimeout
 from cmk.ccc.i18n import _
+from cmk.ccc.store._cache import file_key, ReadCache, ReadCacheMetrics
 from cmk.ccc.store._file import (
     BytesSerializer,
     DimSerializer,
     FileIo,
+    is_marshal_object_file,
+    MarshalSerializer,
     ObjectStore,
     PickleSerializer,
     RealIo,
@@ -47,8 +54,14 @@ __all__ = [
     "BytesSerializer",
     "DimSerializer",
     "FileIo",
+    "FAST_OBJECT_FILES",
+    "is_fast_object_file",
+    "is_marshal_object_file",
+    "MarshalSerializer",
     "ObjectStore",
     "PickleSerializer",
+    "ReadCache",
+    "ReadCacheMetrics",
     "RealIo",
     "Serializer",
     "TextSerializer",
@@ -66,6 +79,10 @@ __all__ = [
 logger = logging.getLogger("cmk.store")
 
 
+class _Span(Protocol):
+    def set_attributes(self, attributes: Mapping[str, int | bool]) -> None: ...
+
+
 class LazyTracer:
     def __init__(self):
         self._lock = Lock()
@@ -75,7 +92,7 @@ class LazyTracer:
     # would need to pull in OpenTelemetry stuff unconditionally or do some other hacks.
     def span(
         self, name: str, *, attributes: Mapping[str, str]
-    ) -> AbstractContextManager[object, bool | None]:
+    ) -> AbstractContextManager[_Span, bool | None]:
         with self._lock:
             if self._tracer is None:
                 from cmk.trace import get_tracer
@@ -83,12 +100,64 @@ class LazyTracer:
                 self._tracer = get_tracer()
         return self._tracer.span(name, attributes=attributes)
 
-    def simple_span(self, name: str, path: Path) -> AbstractContextManager[object, bool | None]:
+    def simple_span(self, name: str, path: Path) -> AbstractContextManager[_Span, bool | None]:
         return self.span(f"{name}[{path}]", attributes={"cmk.file.path": str(path)})
 
 
 tracer = LazyTracer()
 
+# See enable_read_cache()
+_read_cache: ReadCache | None = None
+
+
+def enable_read_cache(*, max_size: int = 64 * 1024 * 1024) -> ReadCache:
+    """Keep the contents of the files read by this process
+
+    Afterwards load_object_from_file(), load_text_from_file() and load_mk_file()
+    only stat() files which did not change since they were read. Objects are
+    kept marshalled, every caller gets its own copy. The cache counters are
+    added to the spans of the loaders.
+    """
+    global _read_cache
+    if _read_cache is None or _read_cache.max_size != max_size:
+        _read_cache = ReadCache(max_size=max_size)
+    return _read_cache
+
+
+def disable_read_cache() -> None:
+    global _read_cache
+    _read_cache = None
+
+
+def _read_through(
+    span: _Span,
+    key: Hashable,
+    path: Path,
+    load: Callable[[], Any],
+    *,
+    marshalled: bool,
+) -> Any:
+    """Load the file, unless its contents are in the read cache
+
+    Empty files are not cached, the loaders return the default of the caller for them.
+    """
+    if (cache := _read_cache) is None or (version := file_key(path)) is None or not version[2]:
+        return load()
+
+    if (cached := cache.get(key, version)) is not None:
+        span.set_attributes({"cmk.store.read_cache.hit": True, **cache.metrics().span_attributes()})
+        return marshal.loads(cached) if marshalled else cached
+
+    value = load()
+    # Do not keep the contents if the file was replaced while reading it
+    if file_key(path) == version:
+        try:
+            cache.put(key, version, marshal.dumps(value) if marshalled else value)
+        except ValueError:
+            pass  # not marshallable
+    span.set_attributes({"cmk.store.read_cache.hit": False, **cache.metrics().span_attributes()})
+    return value
+
 
 # TODO: Make all methods handle paths the same way. e.g. mkdir() and makedirs()
 # care about encoding a path to UTF-8. The others don't to that.
@@ -114,7 +183,7 @@ tracer = LazyTracer()
 # generalize the exception handling for all file IO. This function handles all those files
 # that are read with exec().
 def load_mk_file(path: Path, *, default: Mapping[str, object], lock: bool) -> Mapping[str, object]:
-    with tracer.simple_span("load_mk_file", path):
+    with tracer.simple_span("load_mk_file", path) as span:
         if default is None:  # leave this for now, we still have a lot of `Any`s flying around
             raise MKGeneralException(
                 _(
@@ -127,17 +196,43 @@ def load_mk_file(path: Path, *, default: Mapping[str, object], lock: bool) -> Ma
         if lock:
             acquire_lock(path)
 
+        if _read_cache is None:
+            _exec_mk_file(path, default)
+            return default
+
+        # The result depends on the defaults the file is executed with. The keys do not count
+        # against the size of the read cache, so only a digest of the defaults is kept.
+        config = cast(dict[str, Any], default)
         try:
-            exec(compile(path.read_bytes(), path, "exec"), globals(), default)  # nosec B102 # BNS:aee528
-        except FileNotFoundError:
-            pass
-        except (MKTerminate, MKTimeout):
-            raise
-        except Exception as e:
-            # TODO: How to handle debug mode or logging?
-            raise MKGeneralException(_('Cannot read configuration file "%s": %s') % (path, e))
+            key: Hashable = (
+                "load_mk_file",
+                str(path),
+                hashlib.blake2b(marshal.dumps(config), digest_size=16).digest(),
+            )
+        except ValueError:
+            _exec_mk_file(path, config)
+            return config
+
+        def load() -> dict[str, Any]:
+            _exec_mk_file(path, config)
+            return config
+
+        # Keep updating the defaults of the caller, like exec() does
+        if (loaded := _read_through(span, key, path, load, marshalled=True)) is not config:
+            config.update(loaded)
+        return config
+
 
-        return default
+def _exec_mk_file(path: Path, config: Mapping[str, object]) -> None:
+    try:
+        exec(compile(path.read_bytes(), path, "exec"), globals(), config)  # nosec B102 # BNS:aee528
+    except FileNotFoundError:
+        pass
+    except (MKTerminate, MKTimeout):
+        raise
+    except Exception as e:
+        # TODO: How to handle debug mode or logging?
+        raise MKGeneralException(_('Cannot read configuration file "%s": %s') % (path, e))
 
 
 # A simple wrapper for cases where you only have to read a single value from a .mk file.
@@ -181,10 +276,16 @@ def save_to_mk_file(path: Path, *, key: str, value: object, pprint_value: bool =
 # TODO: Consolidate with load_mk_file?
 def load_object_from_file(path: Path, *, default: Any, lock: bool = False) -> Any:
     with (
-        tracer.simple_span("load_object_from_file", path),
+        tracer.simple_span("load_object_from_file", path) as span,
         _leave_locked_unless_exception(path) if lock else nullcontext(),
     ):
-        return ObjectStore(path, serializer=DimSerializer()).read_obj(default=default)
+        return _read_through(
+            span,
+            ("load_object_from_file", str(path)),
+            path,
+            lambda: ObjectStore(path, serializer=DimSerializer()).read_obj(default=default),
+            marshalled=True,
+        )
 
 
 def load_object_from_pickle_file(path: Path, *, default: Any, lock: bool = False) -> Any:
@@ -197,10 +298,17 @@ def load_object_from_pickle_file(path: Path, *, default: Any, lock: bool = False
 
 def load_text_from_file(path: Path, *, default: str = "", lock: bool = False) -> str:
     with (
-        tracer.simple_span("load_text_from_file", path),
+        tracer.simple_span("load_text_from_file", path) as span,
         _leave_locked_unless_exception(path) if lock else nullcontext(),
     ):
-        return ObjectStore(path, serializer=TextSerializer()).read_obj(default=default)
+        text: str = _read_through(
+            span,
+            ("load_text_from_file", str(path)),
+            path,
+            lambda: ObjectStore(path, serializer=TextSerializer()).read_obj(default=default),
+            marshalled=False,
+        )
+        return text
 
 
 def load_bytes_from_file(path: Path, *, default: bytes) -> bytes:
@@ -208,12 +316,52 @@ def load_bytes_from_file(path: Path, *, default: bytes) -> bytes:
         return ObjectStore(path, serializer=BytesSerializer()).read_obj(default=default)
 
 
+# The object files saved in the format of the MarshalSerializer, see save_object_to_file().
+# The shell patterns are matched against the end of the paths, "*" also matches "/". All
+# readers of these files have to use load_object_from_file() or evaluate the Python literal.
+FAST_OBJECT_FILES: Final = (
+    "etc/check_mk/conf.d/wato/*.wato",
+    "tmp/check_mk/snmp_scan_cache/*",
+    "var/check_mk/snmp_cache/*/*",
+    "var/check_mk/web/*/*.mk",
+)
+_FAST_OBJECT_FILES_RE: Final = re.compile(
+    "|".join(fnmatch.translate(f"*/{pattern}") for pattern in FAST_OBJECT_FILES)
+)
+
+
+def is_fast_object_file(path: Path) -> bool:
+    """Whether save_object_to_file() writes the file in the format of the MarshalSerializer"""
+    return _FAST_OBJECT_FILES_RE.match(path.as_posix()) is not None
+
+
 def save_object_to_file(path: Path, data: object, *, pprint_value: bool = False) -> None:
-    store = ObjectStore(path, serializer=DimSerializer(pretty=pprint_value))
+    """Save the data as Python literal, fast to read for the FAST_OBJECT_FILES"""
+    store = ObjectStore(
+        path,
+        serializer=DimSerializer(pretty=pprint_value, fast=is_fast_object_file(path)),
+    )
     with tracer.simple_span("save_object_to_file", path), store.locked():
         store.write_obj(data)
 
 
+def convert_object_file(path: Path) -> bool:
+    """Convert a file to the format save_object_to_file() writes for it
+
+    Returns whether the file had to be converted. The fast files written by another
+    version of Python are converted as well.
+    """
+    if not path.exists():
+        return False
+    fast = is_fast_object_file(path)
+    store = ObjectStore(path, serializer=DimSerializer(fast=fast))
+    with tracer.simple_span("convert_object_file", path), store.locked():
+        if path.stat().st_size == 0 or is_marshal_object_file(path) is fast:
+            return False
+        store.write_obj(store.read_obj(default=None))
+    return True
+
+
 def save_object_to_pickle_file(path: Path, data: object) -> None:
     store = ObjectStore(path, serializer=PickleSerializer[object]())
     with tracer.simple_span("save_object_to_pickle_file", path), store.locked():
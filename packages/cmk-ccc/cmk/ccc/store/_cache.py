@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Per process cache of the contents of the files read by the store
+
+Processes like the GUI read the same unchanged files again and again. The
+cache keeps their deserialized contents, so reading an unchanged file only
+needs a stat() call.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+__all__ = ["FileKey", "file_key", "ReadCache", "ReadCacheMetrics"]
+
+# path, modification time (ns), size and inode
+FileKey = tuple[str, int, int, int]
+
+
+def file_key(path: Path) -> FileKey | None:
+    """Identifies the contents of the file, None if it does not exist
+
+    Files written by the store are replaced atomically, see RealIo.write(), so
+    their inode changes even if modification time and size do not.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return str(path), stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+@dataclass(frozen=True)
+class ReadCacheMetrics:
+    hits: int
+    misses: int
+    evictions: int
+    entries: int
+    size: int
+
+    def span_attributes(self) -> dict[str, int]:
+        return {
+            "cmk.store.read_cache.hits": self.hits,
+            "cmk.store.read_cache.misses": self.misses,
+            "cmk.store.read_cache.evictions": self.evictions,
+            "cmk.store.read_cache.entries": self.entries,
+            "cmk.store.read_cache.size": self.size,
+        }
+
+
+class ReadCache:
+    """Thread safe LRU cache of file contents, bounded by their size
+
+    Each entry remembers the version of the file it was read from, a newer
+    version of the file replaces it. The cached values must be immutable, e.g.
+    a str or the marshalled bytes of an object, since they are handed out to
+    all readers of the file. Entries bigger than max_entry_size are not cached
+    at all.
+    """
+
+    def __init__(self, *, max_size: int, max_entry_size: int | None = None) -> None:
+        self.max_size: Final = max_size
+        self.max_entry_size: Final = max_size // 8 if max_entry_size is None else max_entry_size
+        self._lock: Final = threading.Lock()
+        self._entries: OrderedDict[Hashable, tuple[FileKey, str | bytes, int]] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable, version: FileKey) -> str | bytes | None:
+        """The cached value, if it was read from this version of the file"""
+        with self._lock:
+            if (entry := self._entries.get(key)) is None or entry[0] != version:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key: Hashable, version: FileKey, value: str | bytes) -> None:
+        if (size := len(value)) > self.max_entry_size:
+            return
+        with self._lock:
+            if (old := self._entries.pop(key, None)) is not None:
+                self._size -= old[2]
+            self._entries[key] = (version, value, size)
+            self._size += size
+            while self._size > self.max_size:
+                self._size -= self._entries.popitem(last=False)[1][2]
+                self._evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def metrics(self) -> ReadCacheMetrics:
+        with self._lock:
+            return ReadCacheMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                entries=len(self._entries),
+                size=self._size,
+            )
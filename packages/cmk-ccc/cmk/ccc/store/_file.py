@@ -2,8 +2,11 @@
 # Copyright (C) 2019 Checkmk GmbH - License: GNU General Public License v2
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
+import binascii
+import marshal
 import pickle
 import pprint
+import sys
 import tempfile
 from ast import literal_eval
 from collections.abc import Iterator
@@ -23,6 +26,8 @@ __all__ = [
     "BytesSerializer",
     "DimSerializer",
     "FileIo",
+    "is_marshal_object_file",
+    "MarshalSerializer",
     "ObjectStore",
     "PickleSerializer",
     "RealIo",
@@ -32,6 +37,18 @@ __all__ = [
 
 TObject = TypeVar("TObject")
 
+# Object files starting with this magic contain the marshalled data in a comment line in
+# front of the Python literal. The marshal format may change with every Python version, so
+# the header also contains the version of our format, of marshal and of Python writing it.
+# Other versions ignore the comment and evaluate the literal.
+_MARSHAL_MAGIC: Final = b"# cmk-marshal "
+_MARSHAL_HEADER: Final = _MARSHAL_MAGIC + b"%d %d %d.%d " % (
+    3,
+    marshal.version,
+    sys.version_info.major,
+    sys.version_info.minor,
+)
+
 
 class Serializer(Protocol[TObject]):
     def serialize(self, data: TObject) -> bytes: ...
@@ -60,20 +77,105 @@ class TextSerializer:
 
 
 class DimSerializer:
-    """A dangerous serializer that is not very bright and returns `Any`"""
+    """A dangerous serializer that is not very bright and returns `Any`
+
+    Reads both the Python literals and the format of the MarshalSerializer,
+    writes the latter if asked to be fast.
+    """
 
-    def __init__(self, *, pretty: bool = False) -> None:
+    def __init__(self, *, pretty: bool = False, fast: bool = False) -> None:
         self.pretty: Final = pretty
+        self.fast: Final = fast and not pretty
 
     def serialize(self, data: Any) -> bytes:
+        if self.fast:
+            return MarshalSerializer.serialize(data)
         data_str = pprint.pformat(data) if self.pretty else repr(data)
         return f"{data_str}\n".encode()
 
     @staticmethod
     def deserialize(raw: bytes) -> Any:
+        if raw.startswith(_MARSHAL_MAGIC):
+            return MarshalSerializer.deserialize(raw)
         return literal_eval(raw.decode("utf-8"))
 
 
+class MarshalSerializer:
+    """A serializer for the data written by the DimSerializer, but a lot faster
+
+    The marshalled data is put in a comment line in front of the Python literal,
+    so the data stays readable by everything evaluating the literal. Subclasses
+    of the builtin types are marshalled as their base type, just like their
+    repr() would be read. Like pickle, marshal must not be used for files of
+    others, see _raise_for_permissions().
+
+    Python does not guarantee the marshal format to be stable across its versions,
+    so for data written by another version the literal is evaluated instead.
+    """
+
+    @staticmethod
+    def serialize(data: Any, literal: bytes | None = None) -> bytes:
+        """Put the marshalled data in front of the literal, by default the repr() of the data"""
+        if literal is None:
+            literal = f"{data!r}\n".encode()
+        try:
+            marshalled = marshal.dumps(data)
+        except ValueError:
+            try:
+                marshalled = marshal.dumps(_to_builtin_types(data))
+            except ValueError:
+                return literal  # Only the literal can be read
+        return b"%s%s\n%s" % (
+            _MARSHAL_HEADER,
+            binascii.b2a_base64(marshalled, newline=False),
+            literal,
+        )
+
+    @staticmethod
+    def deserialize(raw: bytes) -> Any:
+        if not raw.startswith(_MARSHAL_HEADER) or (end := raw.find(b"\n")) == -1:
+            return literal_eval(raw.decode("utf-8"))
+        try:
+            return marshal.loads(binascii.a2b_base64(memoryview(raw)[len(_MARSHAL_HEADER) : end]))
+        except (binascii.Error, EOFError, TypeError, ValueError) as e:
+            raise ValueError(f"Invalid marshalled data: {e}") from e
+
+
+def is_marshal_object_file(path: Path) -> bool:
+    """Whether the file was written by the MarshalSerializer of this version of Python"""
+    try:
+        with path.open("rb") as f:
+            return f.read(len(_MARSHAL_HEADER)) == _MARSHAL_HEADER
+    except FileNotFoundError:
+        return False
+
+
+def _to_builtin_types(data: object) -> Any:
+    match data:
+        # bool is a subclass of int, but marshal handles it
+        case bool() | None:
+            return data
+        case str():
+            return str.__str__(data)
+        case int():
+            return int(data)
+        case float():
+            return float(data)
+        case bytes():
+            return bytes(data)
+        case dict():
+            return {_to_builtin_types(k): _to_builtin_types(v) for k, v in data.items()}
+        case list():
+            return [_to_builtin_types(v) for v in data]
+        case tuple():
+            return tuple(_to_builtin_types(v) for v in data)
+        case set():
+            return {_to_builtin_types(v) for v in data}
+        case frozenset():
+            return frozenset(_to_builtin_types(v) for v in data)
+    return data
+
+
 class PickleSerializer(Generic[TObject]):
     """A dangerous serializer that uses pickle"""
 
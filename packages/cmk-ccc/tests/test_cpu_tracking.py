@@ -4,10 +4,11 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import json
+import posix
 
 import pytest
 
-from cmk.ccc.cpu_tracking import Snapshot
+from cmk.ccc.cpu_tracking import apportion, CPUTracker, Snapshot
 
 
 def json_identity(serializable: object) -> object:
@@ -50,3 +51,28 @@ class TestCpuTracking:
 
     def test_json_serialization_now(self, now: Snapshot) -> None:
         assert Snapshot.deserialize(json_identity(now.serialize())) == now
+
+
+def _snapshot(*times: float) -> Snapshot:
+    return Snapshot(posix.times_result(times))
+
+
+def test_apportion_sums_up_to_total() -> None:
+    total = _snapshot(1.0, 0.5, 2.0, 0.0, 10.0)
+    parts = apportion(
+        total,
+        [_snapshot(0.3, 0.1, 2.0, 0.0, 8.0), _snapshot(0.7, 0.1, 2.0, 0.0, 2.0)],
+    )
+    assert [p.process.user for p in parts] == pytest.approx([0.3, 0.7])
+    assert [p.process.system for p in parts] == pytest.approx([0.25, 0.25])
+    assert [p.process.children_user for p in parts] == pytest.approx([1.0, 1.0])
+    # nothing to split in proportion to
+    assert [p.process.children_system for p in parts] == [0.0, 0.0]
+    assert [p.process.elapsed for p in parts] == pytest.approx([8.0, 2.0])
+
+
+def test_cpu_tracker_per_thread() -> None:
+    with CPUTracker(lambda _msg: None, per_thread=True) as tracker:
+        sum(range(1000000))
+    assert tracker.duration.process.user + tracker.duration.process.system > 0.0
+    assert tracker.duration.process.elapsed >= 0.0
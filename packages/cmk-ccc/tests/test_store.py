@@ -3,6 +3,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import ast
 import enum
 import errno
 import importlib.machinery
@@ -196,6 +197,108 @@ def test_save_data_to_file(tmp_path: Path, data: None | Sequence[str | int]) ->
     assert store.load_object_from_file(path, default=None) == data
 
 
+class _Name(str):
+    pass
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        None,
+        [2, 3.5, True],
+        {"föö": ("bar", {1, 2}), 3: [b"foob\xc3\xa4r", None]},
+        {_Name("host"): [_Name("a")]},
+    ],
+)
+def test_marshal_serializer(data: object) -> None:
+    raw = store.MarshalSerializer.serialize(data)
+    assert store.MarshalSerializer.deserialize(raw) == data
+    assert store.DimSerializer.deserialize(raw) == data
+    assert store.DimSerializer.deserialize(store.DimSerializer().serialize(data)) == data
+
+
+def test_marshal_serializer_invalid_data() -> None:
+    raw = store.MarshalSerializer.serialize([1, 2])
+    with pytest.raises(ValueError):
+        store.MarshalSerializer.deserialize(raw[: raw.index(b"\n") - 3] + raw[raw.index(b"\n") :])
+
+
+def test_marshal_serializer_keeps_literal() -> None:
+    raw = store.MarshalSerializer.serialize({"a": [1]}, b"{\n  'a': [1],\n}\n")
+    assert raw.endswith(b"\n{\n  'a': [1],\n}\n")
+    assert ast.literal_eval(raw.decode()) == {"a": [1]}
+    assert store.MarshalSerializer.deserialize(raw) == {"a": [1]}
+    assert store.MarshalSerializer.deserialize(b"{'a': [1]}\n") == {"a": [1]}
+
+
+def test_marshal_serializer_unmarshallable_data() -> None:
+    class Unmarshallable:
+        def __repr__(self) -> str:
+            return "1"
+
+    assert store.MarshalSerializer.serialize(Unmarshallable()) == b"1\n"
+
+
+def test_marshal_serializer_other_python_version(tmp_path: Path) -> None:
+    raw = store.MarshalSerializer.serialize({"a": [1]})
+    # Pretend the minor version of Python did not match
+    raw = raw.replace(b".%d " % sys.version_info.minor, b".%d " % (sys.version_info.minor + 1), 1)
+    (path := tmp_path / "lala").write_bytes(raw)
+
+    # The literal is read instead
+    assert not store.is_marshal_object_file(path)
+    assert store.MarshalSerializer.deserialize(raw) == {"a": [1]}
+    assert store.load_object_from_file(path, default={}) == {"a": [1]}
+
+
+@pytest.mark.parametrize(
+    "path, fast",
+    [
+        ("/omd/sites/heute/var/check_mk/web/harry/treestates.mk", True),
+        ("/omd/sites/heute/etc/check_mk/conf.d/wato/.wato", True),
+        ("/omd/sites/heute/etc/check_mk/conf.d/wato/a/b/.wato", True),
+        ("/omd/sites/heute/tmp/check_mk/snmp_scan_cache/heute.127.0.0.1", True),
+        ("/omd/sites/heute/var/check_mk/snmp_cache/heute/OID.1.3.6-abc", True),
+        ("/omd/sites/heute/var/check_mk/web/harry", False),
+        ("/omd/sites/heute/etc/check_mk/conf.d/wato/hosts.mk", False),
+        ("/omd/sites/heute/var/check_mk/autochecks/heute.mk", False),
+    ],
+)
+def test_is_fast_object_file(path: str, fast: bool) -> None:
+    assert store.is_fast_object_file(Path(path)) is fast
+
+
+def test_save_object_to_fast_file(tmp_path: Path) -> None:
+    path = tmp_path / "var/check_mk/web/harry/treestates.mk"
+    path.parent.mkdir(parents=True)
+    store.save_object_to_file(path, {"a": [1]})
+    assert store.is_marshal_object_file(path)
+    assert store.load_object_from_file(path, default=None) == {"a": [1]}
+    assert ast.literal_eval(path.read_text()) == {"a": [1]}
+
+    # Unless readable output is requested
+    store.save_object_to_file(path, {"a": [3]}, pprint_value=True)
+    assert not store.is_marshal_object_file(path)
+
+
+def test_convert_object_file(tmp_path: Path) -> None:
+    path = tmp_path / "var/check_mk/web/harry/treestates.mk"
+    path.parent.mkdir(parents=True)
+    assert not store.convert_object_file(path)
+
+    path.write_text("{'a': [1]}\n")
+    assert store.convert_object_file(path)
+    assert not store.convert_object_file(path)
+    assert store.is_marshal_object_file(path)
+    assert store.load_object_from_file(path, default=None) == {"a": [1]}
+
+    other = tmp_path / "lala"
+    other.write_bytes(path.read_bytes())
+    assert store.convert_object_file(other)
+    assert not store.convert_object_file(other)
+    assert other.read_text() == "{'a': [1]}\n"
+
+
 @pytest.mark.parametrize(
     "data",
     [
@@ -707,3 +810,77 @@ def test_non_blocking_decorated_locking_while_already_locked(
         assert result is False
         assert store.have_lock(path) is False
     assert store.have_lock(path) is False
+
+
+@pytest.fixture(name="read_cache")
+def fixture_read_cache() -> Iterator[store.ReadCache]:
+    yield store.enable_read_cache(max_size=1024)
+    store.disable_read_cache()
+
+
+def test_read_cache_objects(tmp_path: Path, read_cache: store.ReadCache) -> None:
+    path = tmp_path / "object"
+    store.save_object_to_file(path, {"a": [1]})
+
+    first = store.load_object_from_file(path, default=None)
+    first["a"].append(2)
+    assert store.load_object_from_file(path, default=None) == {"a": [1]}
+    assert read_cache.metrics().hits == 1
+
+    store.save_object_to_file(path, {"a": [3]})
+    assert store.load_object_from_file(path, default=None) == {"a": [3]}
+    assert read_cache.metrics().misses == 2
+    assert read_cache.metrics().entries == 1
+
+    # Empty files are not cached, the default is up to the caller
+    path.write_text("")
+    assert store.load_object_from_file(path, default=[]) == []
+    assert store.load_object_from_file(path, default={}) == {}
+
+
+def test_read_cache_texts(tmp_path: Path, read_cache: store.ReadCache) -> None:
+    path = tmp_path / "text"
+    store.save_text_to_file(path, "föö")
+    assert store.load_text_from_file(path) == "föö"
+    assert store.load_text_from_file(path) == "föö"
+    assert read_cache.metrics().hits == 1
+
+    # The oldest entries are evicted, too big entries are not cached at all
+    store.save_text_to_file(tmp_path / "big", "x" * 129)
+    store.load_text_from_file(tmp_path / "big")
+    assert read_cache.metrics().entries == 1
+    for nr in range(10):
+        store.save_text_to_file(tmp_path / f"text{nr}", "x" * 128)
+        store.load_text_from_file(tmp_path / f"text{nr}")
+    metrics = read_cache.metrics()
+    assert (metrics.entries, metrics.evictions, metrics.size) == (8, 3, 1024)
+
+
+def test_read_cache_mk_files(tmp_path: Path, read_cache: store.ReadCache) -> None:
+    path = tmp_path / "test.mk"
+    store.save_mk_file(path, "a += [2]\nb = 'x'")
+
+    assert store.load_mk_file(path, default={"a": [1]}, lock=False) == {"a": [1, 2], "b": "x"}
+    config = {"a": [1]}
+    assert store.load_mk_file(path, default=config, lock=False) is config
+    assert config == {"a": [1, 2], "b": "x"}
+    assert read_cache.metrics().hits == 1
+
+    # The result depends on the defaults
+    assert store.load_mk_file(path, default={"a": []}, lock=False) == {"a": [2], "b": "x"}
+    assert read_cache.metrics().hits == 1
+
+
+def test_read_cache_mk_files_keys_digest_defaults(tmp_path: Path) -> None:
+    read_cache = store.enable_read_cache(max_size=1024 * 1024)
+    try:
+        path = tmp_path / "test.mk"
+        store.save_mk_file(path, "b = 'x'")
+        default = {"a": ["x" * 1024] * 16}
+
+        assert store.load_mk_file(path, default={**default}, lock=False)["b"] == "x"
+        assert store.load_mk_file(path, default={**default}, lock=False)["b"] == "x"
+        assert read_cache.metrics().hits == 1
+        assert all(len(repr(key)) < 256 for key in read_cache._entries)  # noqa: SLF001
+    finally:
+        store.disable_read_cache()
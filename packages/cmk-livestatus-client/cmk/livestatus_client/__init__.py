@@ -12,22 +12,26 @@ import json
 import os
 import re
 import select
+import selectors
 import socket
 import ssl
 import threading
 import time
-from collections.abc import Callable, Iterator, Sequence
+import weakref
+from collections.abc import Callable, Generator, Iterable, Iterator, Sequence
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
 from functools import cache
 from io import BytesIO
-from typing import Any, Literal, NamedTuple, NewType, NotRequired, override, TypedDict
+from typing import Any, Final, Literal, NamedTuple, NewType, NotRequired, override, TypedDict
 
 from cmk import trace
 from cmk.ccc.site import SiteId
 
+from .columnar import ColumnarResponse, decode_columnar_response, MalformedColumnarResponse
 from .commands import Command
+from .result_cache import normalize_query, QueryResultCache, ResultCacheKey
 
 UserId = NewType("UserId", str)
 
@@ -149,6 +153,8 @@ LivestatusResponse = NewType("LivestatusResponse", list[LivestatusRow])
 class LivestatusOutputFormat(Enum):
     PYTHON = "python3"
     JSON = "json"
+    # Only for query_columns(), see columnar.py
+    BINARY = "binary"
 
 
 class LivestatusTestingError(RuntimeError):
@@ -175,6 +181,12 @@ persistent_connections: dict[str, socket.socket] = {}
 # Regular expression for removing Cache: headers if caching is not allowed
 remove_cache_regex = re.compile("\nCache:[^\n]*")
 
+# Timeout for receiving the content of a response once its header has arrived
+CONTENT_TIMEOUT: Final = 30.0
+
+# Size of the pieces in which the content of a response is read by query_iter()
+_CHUNK_SIZE: Final = 65536
+
 # Pattern for allowed UserId values
 validate_user_id_regex = re.compile(r"^[\w$][-@.+\w$]*$", re.UNICODE)
 
@@ -304,6 +316,9 @@ class Helpers:
     def query(self, query: QueryTypes, add_headers: str = "") -> LivestatusResponse:
         raise NotImplementedError()
 
+    def query_iter(self, query: QueryTypes, add_headers: str = "") -> Generator[LivestatusRow]:
+        raise NotImplementedError()
+
     def query_value(self, query: QueryTypes, deflt: Any = no_default) -> LivestatusColumn:
         """Issues a query that returns exactly one line and one columns and returns
         the response as a single value"""
@@ -507,6 +522,199 @@ QueryTypes = str | Query
 OnlySites = list[SiteId] | None
 DeadSite = dict[str, str | int | Exception | SiteConfiguration]
 
+# .
+#   .--Pool----------------------------------------------------------------.
+#   |                           ____             _                         |
+#   |                          |  _ \ ___   ___ | |                        |
+#   |                          | |_) / _ \ / _ \| |                        |
+#   |                          |  __/ (_) | (_) | |                        |
+#   |                          |_|   \___/ \___/|_|                        |
+#   |                                                                      |
+#   +----------------------------------------------------------------------+
+#   |  Sockets kept open between the connection objects of a process.      |
+#   '----------------------------------------------------------------------'
+
+# Everything that makes a difference for the socket: URL and TLS settings
+PoolKey = tuple[str, bool, bool, str | None]
+
+
+@dataclass(frozen=True)
+class ConnectionPoolMetrics:
+    created: int
+    reused: int
+    # Idle sockets closed because they were dead, expired or in excess
+    discarded: int
+    # Acquisitions which had to wait for the concurrency limit of their site
+    waits: int
+    timeouts: int
+    idle: int
+    in_use: int
+
+
+@dataclass
+class _SiteSockets:
+    # Idle sockets together with the time they were released, most recent last
+    idle: list[tuple[socket.socket, float]] = field(default_factory=list)
+    in_use: int = 0
+
+
+class ConnectionPool:
+    """Thread safe pool of idle Livestatus sockets, keyed by the site configuration
+
+    A socket is only handed back to the pool if no response is pending on it,
+    see SingleSiteConnection.disconnect(). Before an idle socket is reused, it
+    is checked not to be readable: Livestatus never sends anything unasked, so
+    a readable socket has been closed by the peer.
+
+    Idle sockets occupy a client thread of the Livestatus server, so none are
+    kept by default: Many processes keeping a few each would use up the
+    livestatus_threads of the site. Processes querying over and over opt in
+    via max_idle_per_site, the sockets are then kept for a limited time. The
+    server closes idle connections after its idle_timeout (default: 300
+    seconds) anyway.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_idle_time: float = 30.0,
+        max_idle_per_site: int = 0,
+        max_connections_per_site: int | None = None,
+        acquire_timeout: float = 30.0,
+    ) -> None:
+        self.max_idle_time = max_idle_time
+        self.max_idle_per_site = max_idle_per_site
+        # Maximum number of sockets used at the same time, None: unlimited
+        self.max_connections_per_site = max_connections_per_site
+        self.acquire_timeout = acquire_timeout
+        self._condition = threading.Condition()
+        self._sites: dict[PoolKey, _SiteSockets] = {}
+        self._created = 0
+        self._reused = 0
+        self._discarded = 0
+        self._waits = 0
+        self._timeouts = 0
+
+    def acquire(
+        self,
+        key: PoolKey,
+        connect: Callable[[], socket.socket],
+        timeout: float | None = None,
+    ) -> tuple[socket.socket, bool]:
+        """Return an idle socket or a new one created by connect, and whether it is reused
+
+        Each acquired socket has to be given back by release() or discard().
+        """
+        timeout = self.acquire_timeout if timeout is None else timeout
+        with self._condition:
+            site = self._sites.setdefault(key, _SiteSockets())
+            if not self._has_capacity(site):
+                self._waits += 1
+                if not self._condition.wait_for(lambda: self._has_capacity(site), timeout):
+                    self._timeouts += 1
+                    raise MKLivestatusSocketError(
+                        f"Timeout while waiting for a free connection to '{key[0]}'"
+                    )
+            site.in_use += 1
+            self._close_expired(site, time.monotonic())
+            while site.idle:
+                sock, _released = site.idle.pop()
+                if _is_healthy(sock):
+                    self._reused += 1
+                    return sock, True
+                self._close(sock)
+
+        try:
+            sock = connect()
+        except BaseException:
+            self.discard(key)
+            raise
+        with self._condition:
+            self._created += 1
+        return sock, False
+
+    def release(self, key: PoolKey, sock: socket.socket) -> None:
+        """Give back an acquired socket which is ready for the next query"""
+        with self._condition:
+            if (site := self._sites.get(key)) is None:
+                # Acquired before forking
+                self._close(sock)
+                return
+            site.in_use -= 1
+            site.idle.append((sock, time.monotonic()))
+            while len(site.idle) > self.max_idle_per_site:
+                self._close(site.idle.pop(0)[0])
+            self._condition.notify_all()
+
+    def discard(self, key: PoolKey) -> None:
+        """Forget an acquired socket, which has been closed by its user"""
+        with self._condition:
+            if (site := self._sites.get(key)) is not None:
+                site.in_use -= 1
+                self._condition.notify_all()
+
+    def prune(self) -> None:
+        """Close all sockets which have been idle for too long"""
+        with self._condition:
+            now = time.monotonic()
+            for site in self._sites.values():
+                self._close_expired(site, now)
+
+    def reset_after_fork(self) -> None:
+        """Forget about the sockets of the parent process, they must not be shared"""
+        self._condition = threading.Condition()
+        for site in self._sites.values():
+            for sock, _released in site.idle:
+                with contextlib.suppress(OSError):
+                    sock.close()
+        self._sites.clear()
+
+    def metrics(self) -> ConnectionPoolMetrics:
+        with self._condition:
+            return ConnectionPoolMetrics(
+                created=self._created,
+                reused=self._reused,
+                discarded=self._discarded,
+                waits=self._waits,
+                timeouts=self._timeouts,
+                idle=sum(len(s.idle) for s in self._sites.values()),
+                in_use=sum(s.in_use for s in self._sites.values()),
+            )
+
+    def _has_capacity(self, site: _SiteSockets) -> bool:
+        return self.max_connections_per_site is None or (
+            site.in_use < self.max_connections_per_site
+        )
+
+    def _close_expired(self, site: _SiteSockets, now: float) -> None:
+        while site.idle and now - site.idle[0][1] > self.max_idle_time:
+            self._close(site.idle.pop(0)[0])
+
+    def _close(self, sock: socket.socket) -> None:
+        self._discarded += 1
+        with contextlib.suppress(OSError):
+            sock.close()
+
+
+def _discard_abandoned(pool: ConnectionPool, key: PoolKey, sock: socket.socket) -> None:
+    """Close the socket of a connection which has been garbage collected without disconnecting"""
+    with contextlib.suppress(OSError):
+        sock.close()
+    pool.discard(key)
+
+
+def _is_healthy(sock: socket.socket) -> bool:
+    try:
+        return sock.fileno() != -1 and not is_socket_readable(sock, 0)
+    except (OSError, ValueError):
+        return False
+
+
+# The pool used by all connections of this process
+connection_pool = ConnectionPool()
+os.register_at_fork(after_in_child=connection_pool.reset_after_fork)
+
+
 # .
 #   .--SingleSiteConn------------------------------------------------------.
 #   |  ____  _             _      ____  _ _        ____                    |
@@ -592,6 +800,17 @@ class SingleSiteConnection(Helpers):
         self.timeout: int | None = None
         self.successful_persistence = False
         self._output_format = LivestatusOutputFormat.PYTHON
+        # Connections which are not persisted share the sockets of the connection pool
+        self.pool: ConnectionPool | None = None if persist else connection_pool
+        # Set while self.socket has been acquired from self.pool: Gives the socket back when the
+        # connection is garbage collected without being disconnected
+        self._pooled: (
+            weakref.finalize[[ConnectionPool, PoolKey, socket.socket], SingleSiteConnection] | None
+        ) = None
+        # Whether a query has been sent whose response has not been received completely
+        self._awaiting_response = False
+        # Opt-in: Answer repeated queries from the results of recent ones
+        self.result_cache: QueryResultCache | None = None
 
         # Whether to establish an encrypted connection
         self.tls = tls
@@ -621,12 +840,29 @@ class SingleSiteConnection(Helpers):
         return None
 
     def connect(self) -> None:
+        if self.pool is not None:
+            self._connect_pooled(self.pool)
+            return
+
         if (site_socket := self._try_get_persisted_connection()) is None:
             site_socket = self._create_new_socket_connection()
             if self.persist:
                 persistent_connections[self.socketurl] = site_socket
         self.socket = site_socket
 
+    def _connect_pooled(self, pool: ConnectionPool) -> None:
+        if self._pooled is not None:
+            self._close_socket()
+        key = self._pool_key()
+        self.socket, self.successful_persistence = pool.acquire(
+            key, self._create_new_socket_connection, self.timeout
+        )
+        self._pooled = weakref.finalize(self, _discard_abandoned, pool, key, self.socket)
+        self._awaiting_response = False
+
+    def _pool_key(self) -> PoolKey:
+        return (self.socketurl, self.tls, self.tls_verify, self._tls_ca_file_path)
+
     def _create_new_socket_connection(self) -> socket.socket:
         self.successful_persistence = False
         family, address = parse_socket_url(self.socketurl)
@@ -695,6 +931,14 @@ class SingleSiteConnection(Helpers):
         )
 
     def disconnect(self) -> None:
+        """Close the socket, or hand it back to the connection pool if it is ready for reuse"""
+        if self._pooled is not None and not self._awaiting_response and self.pool is not None:
+            assert self.socket is not None
+            self._pooled.detach()
+            self.pool.release(self._pool_key(), self.socket)
+            self.socket = None
+            self._pooled = None
+            return
         self._close_socket()
 
     def _close_socket(self) -> None:
@@ -708,6 +952,11 @@ class SingleSiteConnection(Helpers):
 
             self.socket = None
 
+        if self._pooled is not None and self.pool is not None:
+            self._pooled.detach()
+            self.pool.discard(self._pool_key())
+            self._pooled = None
+
         if self.persist:
             self.successful_persistence = False
             try:
@@ -762,6 +1011,83 @@ class SingleSiteConnection(Helpers):
                 self.disconnect()
                 raise
 
+    def do_query_iter(self, query: Query, add_headers: str = "") -> Generator[LivestatusRow]:
+        with _livestatus_output_format_switcher(query, self):
+            with tracer.span(
+                "do_query_iter",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "cmk.livestatus.target_site_id": str(self.site_name),
+                },
+            ) as span:
+                str_query = self.build_query(query, add_headers)
+                span.set_attribute("cmk.livestatus.query", str_query)
+                self.send_query(str_query)
+                chunks = self._receive_response_stream(str_query, query.suppress_exceptions)
+            loads = (
+                json.loads
+                if self._output_format is LivestatusOutputFormat.JSON
+                else ast.literal_eval
+            )
+
+            complete = False
+            try:
+                yield from _decode_rows(chunks, loads)
+                complete = True
+                self._awaiting_response = False
+            except MKLivestatusQueryError:
+                raise
+            except (MKLivestatusSocketClosed, OSError) as e:
+                raise MKLivestatusSocketError(f"Connection broke down while receiving: {e}")
+            finally:
+                if not complete:
+                    # The rest of the response would be mistaken for the response to the
+                    # next query.
+                    self.disconnect()
+
+    def _receive_response_stream(
+        self, query: str, suppress_exceptions: tuple[type[Exception], ...]
+    ) -> Iterable[bytes]:
+        """Receive the header of the response and return the content to be read piece by piece
+
+        Error responses are received completely. In case the connection has to be
+        re-established, the content is read completely as well.
+        """
+        content_length: list[int] = []
+
+        def receive_header() -> tuple[str, bytes]:
+            code, length = self.parse_response_header(self.receive_data(16))
+            if code != "200":
+                return code, self.receive_data(length, CONTENT_TIMEOUT)
+            content_length.append(length)
+            return code, b""
+
+        try:
+            data = self.complete_raw_response(query, suppress_exceptions, receive_header)
+        except MKLivestatusQueryError:
+            self.disconnect()
+            raise
+        if content_length:
+            self._awaiting_response = True
+            return self._receive_chunks(content_length[0])
+        return [data]
+
+    def _receive_chunks(self, size: int) -> Iterator[bytes]:
+        if self.socket is None:
+            raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
+
+        # Unlike receive_data(), the timeout applies to each piece: The time the caller
+        # needs to process the rows must not count.
+        self.socket.settimeout(CONTENT_TIMEOUT)
+        while size > 0:
+            packet = self.socket.recv(min(size, _CHUNK_SIZE))
+            if not packet:
+                raise MKLivestatusSocketClosed(
+                    "Read zero data from socket, remote peer closed connection."
+                )
+            size -= len(packet)
+            yield packet
+
     def build_query(self, query_obj: Query, add_headers: str) -> str:
         # Prevent injection of further livestatus commands inside AuthUser header.
         if "\n" in self.auth_header[:-1]:
@@ -790,6 +1116,7 @@ class SingleSiteConnection(Helpers):
             raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
 
         try:
+            self._awaiting_response = True
             self.socket.sendall(query.encode("utf-8") + b"\n\n")
             if getattr(self.collect_queries, "active", False):
                 self.collect_queries.queries.append(query)
@@ -813,25 +1140,46 @@ class SingleSiteConnection(Helpers):
         suppress_exceptions: tuple[type[Exception], ...],
         timeout_at: float | None = None,
     ) -> bytes:
+        return self.complete_raw_response(
+            query, suppress_exceptions, self._receive_response, timeout_at
+        )
+
+    def _receive_response(self) -> tuple[str, bytes]:
+        # Headers are always ASCII encoded
+        code, length = self.parse_response_header(self.receive_data(16))
+        # Apply a lower timeout for the content because the data is already available
+        # in the socket. The liveproxyd (same system) has the complete data available
+        # while the data from a standard connection can still take some time.
+        # 30 seconds should be more than enough for the maximum telegram size of 100MB
+        return code, self.receive_data(length, CONTENT_TIMEOUT)
+
+    def parse_response_header(self, resp: bytes) -> tuple[str, int]:
+        """Return the status code and the length of the content"""
+        code = resp[0:3].decode("ascii")
         try:
-            # Headers are always ASCII encoded
-            resp = self.receive_data(16)
-            code = resp[0:3].decode("ascii")
-            try:
-                length = int(resp[4:15].lstrip())
-            except Exception:
-                self.disconnect()
-                raise MKLivestatusSocketError(
-                    f"Malformed response header {resp!r}. Livestatus TCP socket might be "
-                    "unreachable or wrong encryption settings are used."
-                )
+            return code, int(resp[4:15].lstrip())
+        except Exception:
+            self.disconnect()
+            raise MKLivestatusSocketError(
+                f"Malformed response header {resp!r}. Livestatus TCP socket might be "
+                "unreachable or wrong encryption settings are used."
+            )
 
-            # Apply a lower timeout for the content because the data is already available
-            # in the socket. The liveproxyd (same system) has the complete data available
-            # while the data from a standard connection can still take some time.
-            # 30 seconds should be more than enough for the maximum telegram size of 100MB
-            data = self.receive_data(length, 30)
+    def complete_raw_response(
+        self,
+        query: str,
+        suppress_exceptions: tuple[type[Exception], ...],
+        receive: Callable[[], tuple[str, bytes]],
+        timeout_at: float | None = None,
+    ) -> bytes:
+        """Check the status code and content returned by receive, handle errors
 
+        In case the connection broke down, the query is sent again and the
+        response is received the regular way.
+        """
+        try:
+            code, data = receive()
+            self._awaiting_response = False
             if code == "200":
                 return data
 
@@ -932,12 +1280,97 @@ class SingleSiteConnection(Helpers):
                 normalized_query.suppress_exceptions,
             )
 
+        if self.result_cache is not None:
+            cache_key = self._result_cache_key(normalized_query, normalized_add_headers)
+            if (cached := self.result_cache.get(cache_key)) is not None:
+                return LivestatusResponse([LivestatusRow(row) for row in cached])
+
         response = self.do_query(normalized_query, normalized_add_headers)
         if self.prepend_site:
             for row in response:
                 row.insert(0, b"")
+        if self.result_cache is not None:
+            self.result_cache.put(cache_key, response)
         return response
 
+    def _result_cache_key(self, query: Query, add_headers: str) -> ResultCacheKey:
+        return ResultCacheKey(
+            query=normalize_query(str(query)),
+            add_headers=normalize_query(add_headers),
+            auth_header=self.auth_header,
+            sites=(self.site_name,),
+            options=(
+                self.socketurl,
+                self._output_format,
+                query.supports_json_format(),
+                self.prepend_site,
+            ),
+        )
+
+    def query_columns(self, query: QueryTypes, add_headers: str = "") -> ColumnarResponse:
+        """Query in the binary columnar output format
+
+        Numeric columns of the response can be used as arrays without decoding
+        every single cell, see columnar.py. prepend_site is not applied.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        if self.limit is not None:
+            normalized_query = Query(
+                "%sLimit: %d\n" % (normalized_query, self.limit),
+                normalized_query.suppress_exceptions,
+            )
+
+        previous_format = self.get_output_format()
+        self.set_output_format(LivestatusOutputFormat.BINARY)
+        try:
+            with tracer.span(
+                "do_query_columns",
+                kind=trace.SpanKind.CLIENT,
+                attributes={
+                    "cmk.livestatus.target_site_id": str(self.site_name),
+                },
+            ) as span:
+                str_query = self.build_query(normalized_query, add_headers)
+                span.set_attribute("cmk.livestatus.query", str_query)
+                self.send_query(str_query)
+                try:
+                    raw_response = self.receive_raw_response(
+                        str_query, normalized_query.suppress_exceptions
+                    )
+                except MKLivestatusQueryError:
+                    self.disconnect()
+                    raise
+        finally:
+            self.set_output_format(previous_format)
+
+        try:
+            return decode_columnar_response(raw_response)
+        except MalformedColumnarResponse as e:
+            raise MKLivestatusQueryError(f"Malformed raw response output: {e}")
+
+    @override
+    def query_iter(self, query: QueryTypes, add_headers: str = "") -> Generator[LivestatusRow]:
+        """Like query(), but yield the rows one by one while the response is received
+
+        The response is never held in memory as a whole, so the memory needed
+        does not depend on the number of rows. Once rows have been yielded, a
+        broken connection can not be retried transparently anymore and raises
+        MKLivestatusSocketError.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        if self.limit is not None:
+            normalized_query = Query(
+                "%sLimit: %d\n" % (normalized_query, self.limit),
+                normalized_query.suppress_exceptions,
+            )
+
+        for row in self.do_query_iter(normalized_query, add_headers):
+            if self.prepend_site:
+                row.insert(0, b"")
+            yield row
+
     def command(
         self,
         command: str,
@@ -956,6 +1389,8 @@ class SingleSiteConnection(Helpers):
             },
         ):
             self.send_command(f"COMMAND {command_str}")
+        if self.result_cache is not None:
+            self.result_cache.invalidate([self.site_name])
 
     def command_obj(
         self,
@@ -1027,6 +1462,91 @@ class ConnectedSite(NamedTuple):
 ConnectedSites = list[ConnectedSite]
 
 
+class _PendingResponse(NamedTuple):
+    query: str
+    span: trace.Span
+    site: ConnectedSite
+
+
+class _ResponseReceiver:
+    """Receives the response of one site piece by piece, whenever its socket is readable
+
+    This way the responses of all sites are received at the same time and a
+    slow site does not hold up the others.
+    """
+
+    def __init__(self, connection: SingleSiteConnection, deadline: float | None) -> None:
+        self._connection: Final = connection
+        self._deadline = deadline
+        self._code: str | None = None
+        self._missing = 16  # the header
+        self._data = bytearray()
+        self._error: Exception | None = None
+        self.done = False
+
+    @property
+    def deadline(self) -> float | None:
+        return self._deadline
+
+    def on_readable(self) -> None:
+        if (sock := self._connection.socket) is None:
+            self._fail(
+                MKLivestatusSocketError(
+                    "Socket to '%s' is not connected" % self._connection.socketurl
+                )
+            )
+            return
+        try:
+            while True:
+                packet = sock.recv(min(self._missing, 65536))
+                if not packet:
+                    raise MKLivestatusSocketClosed(
+                        "Read zero data from socket, remote peer closed connection."
+                    )
+                self._data += packet
+                self._missing -= len(packet)
+                if self._missing == 0 and self._code is None:
+                    self._code, self._missing = self._connection.parse_response_header(
+                        bytes(self._data)
+                    )
+                    self._data.clear()
+                    content_deadline = time.time() + CONTENT_TIMEOUT
+                    self._deadline = (
+                        content_deadline
+                        if self._deadline is None
+                        else min(self._deadline, content_deadline)
+                    )
+                if self._missing == 0:
+                    self.done = True
+                    return
+                # Data lingering in the SSL buffer does not make the socket readable.
+                if not (isinstance(sock, ssl.SSLSocket) and sock.pending()):
+                    return
+        except Exception as e:
+            self._fail(e)
+
+    def expire(self, now: float) -> bool:
+        if self._deadline is None or now <= self._deadline:
+            return False
+        self._fail(
+            MKLivestatusSocketError(
+                "Timeout while reading data from socket. "
+                f"Received data: {len(self._data)}/{len(self._data) + self._missing} bytes"
+            )
+        )
+        return True
+
+    def _fail(self, error: Exception) -> None:
+        self._error = error
+        self.done = True
+
+    def result(self) -> tuple[str, bytes]:
+        if self._error is not None:
+            raise self._error
+        assert self._code is not None
+        return self._code, bytes(self._data)
+
+
 class MultiSiteConnection(Helpers):
     def __init__(
         self,
@@ -1046,6 +1566,11 @@ class MultiSiteConnection(Helpers):
         self.only_sites: OnlySites = None
         self.limit: int | None = None
         self.parallelize = True
+        # Maximum time to wait for the response of a site to a parallel query. Sites not
+        # answering in time are considered dead. None: Wait as long as it takes.
+        self.response_timeout: float | None = None
+        # Opt-in: Answer repeated queries from the results of recent ones
+        self.result_cache: QueryResultCache | None = None
         self._only_sites_postprocess = only_sites_postprocess
 
         # Status host: A status host helps to prevent trying to connect
@@ -1199,6 +1724,7 @@ class MultiSiteConnection(Helpers):
         i = 0
         for connected_site in self.connections:
             if connected_site.id == sitename:
+                connected_site.connection.disconnect()
                 del self.connections[i]
                 return
             i += 1
@@ -1254,10 +1780,82 @@ class MultiSiteConnection(Helpers):
         normalized_add_headers = add_headers
         normalized_query = Query(query) if not isinstance(query, Query) else query
 
-        with _livestatus_output_format_switcher(normalized_query, self):
+        if self.result_cache is None:
+            return self._query(normalized_query, normalized_add_headers)
+
+        cache_key = self._result_cache_key(normalized_query, normalized_add_headers)
+        if (cached := self.result_cache.get(cache_key)) is not None:
+            return LivestatusResponse([LivestatusRow(row) for row in cached])
+        response = self._query(normalized_query, normalized_add_headers)
+        # Results missing the rows of sites which died in the meantime are not cached
+        if self._result_cache_key(normalized_query, normalized_add_headers) == cache_key:
+            self.result_cache.put(cache_key, response)
+        return response
+
+    def _query(self, query: Query, add_headers: str) -> LivestatusResponse:
+        with _livestatus_output_format_switcher(query, self):
             if self.parallelize:
-                return self.query_parallel(normalized_query, normalized_add_headers)
-            return self.query_non_parallel(normalized_query, normalized_add_headers)
+                return self.query_parallel(query, add_headers)
+            return self.query_non_parallel(query, add_headers)
+
+    def _result_cache_key(self, query: Query, add_headers: str) -> ResultCacheKey:
+        queried = [
+            c for c in self.connections if self.only_sites is None or c.id in self.only_sites
+        ]
+        return ResultCacheKey(
+            query=normalize_query(str(query)),
+            add_headers=normalize_query(add_headers),
+            auth_header="".join(sorted({c.connection.auth_header for c in queried})),
+            sites=tuple(c.id for c in queried),
+            options=(
+                self.get_output_format(),
+                query.supports_json_format(),
+                self.prepend_site,
+                self.limit,
+                self.parallelize,
+            ),
+        )
+
+    @override
+    def query_iter(self, query: QueryTypes, add_headers: str = "") -> Generator[LivestatusRow]:
+        """Like query_non_parallel(), but yield the rows one by one while they are received
+
+        The sites are queried one after the other, each of them streaming its
+        response. A site failing in the middle of its response is marked dead,
+        the rows it yielded up to then are not taken back.
+        """
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        dead: set[SiteId] = set()
+        limit = self.limit
+        try:
+            with _livestatus_output_format_switcher(normalized_query, self):
+                for connected_site in list(self.connections):
+                    if self.only_sites is not None and connected_site.id not in self.only_sites:
+                        continue  # state unknown, assume still alive
+                    limit_header = "Limit: %d\n" % limit if limit is not None else ""
+                    try:
+                        with contextlib.closing(
+                            connected_site.connection.query_iter(
+                                normalized_query, add_headers + limit_header
+                            )
+                        ) as rows:
+                            for row in rows:
+                                if self.prepend_site:
+                                    row.insert(0, connected_site.id)
+                                if limit is not None:
+                                    limit -= 1  # Account for portion of limit used by this site
+                                yield row
+                    except LivestatusTestingError:
+                        raise
+                    except Exception as e:
+                        connected_site.connection.disconnect()
+                        dead.add(connected_site.id)
+                        self.deadsites[connected_site.id] = {
+                            "exception": e,
+                            "site": connected_site.config,
+                        }
+        finally:
+            self.connections = [c for c in self.connections if c.id not in dead]
 
     def query_non_parallel(self, query: Query, add_headers: str = "") -> LivestatusResponse:
         result = LivestatusResponse([])
@@ -1298,6 +1896,24 @@ class MultiSiteConnection(Helpers):
         Limit: is simply applied to all sites - resulting in possibly more results then Limit
         requests.
         """
+        rows_of_site = dict(self._query_parallel(query, add_headers))
+        # Keep the order of the sites, no matter which one answered first
+        return LivestatusResponse(
+            [row for c in self.connections for row in rows_of_site.get(c.id, [])]
+        )
+
+    def query_parallel_iter(
+        self, query: QueryTypes, add_headers: str = ""
+    ) -> Iterator[tuple[SiteId, LivestatusResponse]]:
+        """Like query_parallel(), but yield the rows of every site as soon as it has answered"""
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+        with _livestatus_output_format_switcher(normalized_query, self):
+            for site_id, rows in self._query_parallel(normalized_query, add_headers):
+                yield site_id, LivestatusResponse(rows)
+
+    def _query_parallel(
+        self, query: Query, add_headers: str
+    ) -> Iterator[tuple[SiteId, list[LivestatusRow]]]:
         stillalive = []
         if self.only_sites is not None:
             connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
@@ -1306,28 +1922,43 @@ class MultiSiteConnection(Helpers):
         else:
             connect_to_sites = self.connections
 
+        alive: set[SiteId] = set()
+        answered: set[SiteId] = set()
         with tracer.span("query_parallel", attributes={"cmk.livestatus.query": str(query)}):
             # First send all queries
-            retrieve_responses = self._send_queries(
+            pending = self._send_queries(
                 query,
                 add_headers,
                 connect_to_sites,
                 limit_header="Limit: %d\n" % self.limit if self.limit is not None else "",
             )
 
-            # Then retrieve all raw responses. We will be as slow as the slowest of all connections.
-            site_responses = self._retrieve_responses(query, retrieve_responses, stillalive)
-
-            # Convert responses to python format
-            result = self._parse_responses(query, site_responses, stillalive)
-
-        self.connections = stillalive
-        return LivestatusResponse(result)
+            # Then receive all responses at the same time and parse them as soon as they are
+            # complete. We will still be as slow as the slowest of all connections.
+            try:
+                for pending_response, receiver in self._receive_responses(pending):
+                    answered.add(pending_response.site.id)
+                    if (rows := self._parse_response(query, pending_response, receiver)) is None:
+                        continue
+                    alive.add(pending_response.site.id)
+                    if rows:
+                        yield pending_response.site.id, rows
+            finally:
+                # In case the caller stopped iterating, the sites that have not answered yet
+                # are not dead. Their responses are still on the way, so their sockets can not
+                # be used for the next query. They are reconnected on demand.
+                for c in pending:
+                    if c.site.id not in answered:
+                        c.site.connection.disconnect()
+                stillalive.extend(
+                    c.site for c in pending if c.site.id in alive or c.site.id not in answered
+                )
+                self.connections = stillalive
 
     def _send_queries(
         self, query: Query, add_headers: str, connect_to_sites: ConnectedSites, limit_header: str
-    ) -> list[tuple[str, trace.Span, ConnectedSite]]:
-        retrieve_responses: list[tuple[str, trace.Span, ConnectedSite]] = []
+    ) -> list[_PendingResponse]:
+        pending: list[_PendingResponse] = []
         for connected_site in connect_to_sites:
             with tracer.span(
                 f"send_query_to_site[{connected_site.id}]",
@@ -1342,74 +1973,75 @@ class MultiSiteConnection(Helpers):
                     )
                     span.set_attribute("cmk.livestatus.query", str_query)
                     connected_site.connection.send_query(str_query)
-                    retrieve_responses.append((str_query, span, connected_site))
-                except LivestatusTestingError:
-                    raise
-                except Exception as e:
-                    self.deadsites[connected_site.id] = {
-                        "exception": e,
-                        "site": connected_site.config,
-                    }
-        return retrieve_responses
-
-    def _retrieve_responses(
-        self,
-        query: Query,
-        retrieve_responses: list[tuple[str, trace.Span, ConnectedSite]],
-        stillalive: ConnectedSites,
-    ) -> list[tuple[ConnectedSite, bytes]]:
-        site_responses: list[tuple[ConnectedSite, bytes]] = []
-        for str_query, request_span, connected_site in retrieve_responses:
-            with tracer.span(
-                f"receive_from_site[{connected_site.id}]",
-                kind=trace.SpanKind.CONSUMER,
-                links=[trace.Link(request_span.get_span_context())],
-                attributes={
-                    "cmk.livestatus.query": str_query,
-                    "cmk.livestatus.target_site_id": str(connected_site.id),
-                },
-            ):
-                try:
-                    site_responses.append(
-                        (
-                            connected_site,
-                            connected_site.connection.receive_raw_response(
-                                str_query, query.suppress_exceptions
-                            ),
-                        )
-                    )
-                except query.suppress_exceptions:
-                    # Mostly handles exception types MKLivestatusTableNotFoundError
-                    stillalive.append(connected_site)
-                    continue
+                    pending.append(_PendingResponse(str_query, span, connected_site))
                 except LivestatusTestingError:
                     raise
                 except Exception as e:
-                    connected_site.connection.disconnect()
                     self.deadsites[connected_site.id] = {
                         "exception": e,
                         "site": connected_site.config,
                     }
-        return site_responses
-
-    def _parse_responses(
-        self,
-        query: Query,
-        site_responses: list[tuple[ConnectedSite, bytes]],
-        stillalive: ConnectedSites,
-    ) -> list[LivestatusRow]:
-        result: list[LivestatusRow] = []
-        for connected_site, raw_response in site_responses:
+        return pending
+
+    def _receive_responses(
+        self, pending: Sequence[_PendingResponse]
+    ) -> Iterator[tuple[_PendingResponse, _ResponseReceiver]]:
+        """Yield the responses in the order they are completed (or failed)"""
+        deadline = None if self.response_timeout is None else time.time() + self.response_timeout
+        with selectors.DefaultSelector() as selector:
             try:
-                rows = connected_site.connection.parse_raw_response(raw_response, query)
-                stillalive.append(connected_site)
-                if self.prepend_site:
-                    for row in rows:
-                        row.insert(0, connected_site.id)
-                result.extend(rows)
+                for pending_response in pending:
+                    receiver = _ResponseReceiver(pending_response.site.connection, deadline)
+                    if (sock := pending_response.site.connection.socket) is None:
+                        receiver.on_readable()  # fails right away
+                        yield pending_response, receiver
+                        continue
+                    selector.register(sock, selectors.EVENT_READ, (pending_response, receiver))
+
+                while keys := list(selector.get_map().values()):
+                    deadlines = [d for k in keys if (d := k.data[1].deadline) is not None]
+                    timeout = max(0.0, min(deadlines) - time.time()) if deadlines else None
+                    for key, _events in selector.select(timeout):
+                        key.data[1].on_readable()
+                        if key.data[1].done:
+                            selector.unregister(key.fileobj)
+                            yield key.data
+
+                    now = time.time()
+                    for key in list(selector.get_map().values()):
+                        if key.data[1].expire(now):
+                            selector.unregister(key.fileobj)
+                            yield key.data
+            finally:
+                # Responses which have not been read completely would be mistaken for the
+                # response to the next query.
+                for key in selector.get_map().values():
+                    key.data[0].site.connection.disconnect()
+
+    def _parse_response(
+        self, query: Query, pending_response: _PendingResponse, receiver: _ResponseReceiver
+    ) -> list[LivestatusRow] | None:
+        """The rows of the site or None, in case the site is dead"""
+        str_query, request_span, connected_site = pending_response
+        with tracer.span(
+            f"receive_from_site[{connected_site.id}]",
+            kind=trace.SpanKind.CONSUMER,
+            links=[trace.Link(request_span.get_span_context())],
+            attributes={
+                "cmk.livestatus.query": str_query,
+                "cmk.livestatus.target_site_id": str(connected_site.id),
+            },
+        ):
+            try:
+                rows = connected_site.connection.parse_raw_response(
+                    connected_site.connection.complete_raw_response(
+                        str_query, query.suppress_exceptions, receiver.result
+                    ),
+                    query,
+                )
             except query.suppress_exceptions:
-                stillalive.append(connected_site)
-                continue
+                # Mostly handles exception types MKLivestatusTableNotFoundError
+                return []
             except LivestatusTestingError:
                 raise
             except Exception as e:
@@ -1418,7 +2050,12 @@ class MultiSiteConnection(Helpers):
                     "exception": e,
                     "site": connected_site.config,
                 }
-        return result
+                return None
+
+        if self.prepend_site:
+            for row in rows:
+                row.insert(0, connected_site.id)
+        return rows
 
     def command(self, command: str, sitename: SiteId | None = SiteId("local")) -> None:
         if sitename in self.deadsites:
@@ -1431,6 +2068,8 @@ class MultiSiteConnection(Helpers):
                 "Cannot send command to unconfigured site '%s'" % sitename
             )
         conn[0].command(command)
+        if self.result_cache is not None:
+            self.result_cache.invalidate([sitename])
 
     def command_obj(self, command: Command, sitename: SiteId | None = SiteId("local")) -> None:
         self.command(self._serialize_command(command), sitename)
@@ -1450,6 +2089,50 @@ class MultiSiteConnection(Helpers):
         raise KeyError("Connection does not exist")
 
 
+def _decode_rows(chunks: Iterable[bytes], loads: Callable[[str], Any]) -> Iterator[LivestatusRow]:
+    r"""Decode a response in the JSON or Python format while it is received
+
+    Livestatus puts every row on a line of its own ("[row1,\nrow2,\nrow3]\n"),
+    line breaks within the rows are always escaped. So all complete lines of
+    the data received so far can be decoded at once, except for the last one,
+    which may end the response. Responses on a single line are decoded as a
+    whole.
+
+    >>> list(_decode_rows([b'[["a",1],\n["b', b'",2],\n["c",[3]]]\n'], json.loads))
+    [['a', 1], ['b', 2], ['c', [3]]]
+    >>> list(_decode_rows([b"[['a', b'x']]"], ast.literal_eval))
+    [['a', b'x']]
+    >>> list(_decode_rows([b"[]\n"], json.loads))
+    []
+    """
+    first = True
+    pending = b""
+    for chunk in chunks:
+        pending += chunk
+        # Keep the last complete line (and an incomplete one) back
+        cut = pending.rfind(b"\n", 0, max(0, pending.rfind(b"\n"))) + 1
+        if cut == 0:
+            continue
+        lines = pending[:cut].decode("utf-8").rstrip()
+        pending = pending[cut:]
+        # Cut off the "[" starting the response and the "," after the last row
+        yield from _loads_rows(loads, "[%s]" % (lines[1:-1] if first else lines[:-1]))
+        first = False
+
+    lines = pending.decode("utf-8").rstrip()
+    if lines:
+        # The last line still contains the "]" ending the response
+        yield from _loads_rows(loads, lines if first else "[" + lines)
+
+
+def _loads_rows(loads: Callable[[str], Any], text: str) -> list[LivestatusRow]:
+    try:
+        rows: list[LivestatusRow] = loads(text)
+        return rows
+    except (ValueError, SyntaxError):
+        raise MKLivestatusQueryError("Malformed raw response output")
+
+
 @contextlib.contextmanager
 def _livestatus_output_format_switcher(
     query: Query, connection: MultiSiteConnection | SingleSiteConnection
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Decoder for the binary columnar output format of Livestatus ("OutputFormat: binary")
+
+The response is transferred column by column (all numbers little endian,
+all blocks aligned to 8 bytes)::
+
+    header    "LQB1", number of columns (uint32), number of rows (uint64)
+    column    type (uint8), 7 bytes padding, length of the payload (uint64),
+              payload padded to a multiple of 8 bytes
+
+    int64, float64   one value per row, nulls in float64 columns are NaN
+    string, blob     (rows + 1) offsets (uint64) into the data following them
+    tagged           one tagged cell per row, for columns with mixed types
+
+The numeric columns are not decoded at all: Column.numbers() is a view on
+the response, which can be handed to numpy.frombuffer() or used like an
+array without creating a Python object per cell.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import struct
+import sys
+from array import array
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, Final, Literal
+
+_MAGIC: Final = b"LQB1"
+_HEADER: Final = struct.Struct("<4sIQ")
+_COLUMN_HEADER: Final = struct.Struct("<B7xQ")
+_CELL_LENGTH: Final = struct.Struct("<I")
+
+
+class ColumnType(IntEnum):
+    INT64 = 1
+    FLOAT64 = 2
+    STRING = 3
+    BLOB = 4
+    TAGGED = 5
+
+
+class CellTag(IntEnum):
+    NULL = 0
+    INTEGER = 1
+    FLOATING = 2
+    STRING = 3
+    BLOB = 4
+    JSON = 5
+
+
+class MalformedColumnarResponse(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Column:
+    type: ColumnType
+    num_rows: int
+    # The payload of the column, starting with the offsets for strings and blobs
+    payload: memoryview
+
+    def __len__(self) -> int:
+        return self.num_rows
+
+    def numbers(self) -> memoryview[Any] | array[Any]:
+        """The values of an int64 or float64 column, without copying them if possible"""
+        if self.type not in (ColumnType.INT64, ColumnType.FLOAT64):
+            raise TypeError(f"{self.type.name} column has no numbers")
+        return _from_le_bytes("q" if self.type is ColumnType.INT64 else "d", self.payload)
+
+    def to_list(self) -> list[Any]:
+        """The values as Python objects, like the JSON output format would have them"""
+        match self.type:
+            case ColumnType.INT64:
+                return self.numbers().tolist()
+            case ColumnType.FLOAT64:
+                return [None if math.isnan(v) else v for v in self.numbers().tolist()]
+            case ColumnType.STRING:
+                return [bytes(v).decode("utf-8", errors="replace") for v in self._slices()]
+            case ColumnType.BLOB:
+                return [bytes(v) for v in self._slices()]
+            case ColumnType.TAGGED:
+                return list(_decode_tagged_cells(self.payload))
+
+    def _slices(self) -> Iterator[memoryview]:
+        offsets = _from_le_bytes("Q", self.payload[: 8 * (self.num_rows + 1)])
+        data = self.payload[8 * (self.num_rows + 1) :]
+        for nr in range(self.num_rows):
+            yield data[offsets[nr] : offsets[nr + 1]]
+
+
+@dataclass(frozen=True)
+class ColumnarResponse:
+    num_rows: int
+    columns: Sequence[Column]
+
+    def rows(self) -> list[list[Any]]:
+        """The response in the usual row oriented form"""
+        return [list(row) for row in zip(*(c.to_list() for c in self.columns))]
+
+
+def decode_columnar_response(data: bytes) -> ColumnarResponse:
+    """Split the response into its columns, the values are only decoded on demand"""
+    view = memoryview(data)
+    try:
+        magic, num_columns, num_rows = _HEADER.unpack_from(view)
+    except struct.error:
+        raise MalformedColumnarResponse("Truncated header")
+    if magic != _MAGIC:
+        raise MalformedColumnarResponse(f"Invalid magic {magic!r}")
+
+    columns = []
+    offset = _HEADER.size
+    for _nr in range(num_columns):
+        try:
+            raw_type, length = _COLUMN_HEADER.unpack_from(view, offset)
+            column_type = ColumnType(raw_type)
+        except (struct.error, ValueError) as e:
+            raise MalformedColumnarResponse(f"Invalid column header: {e}")
+        offset += _COLUMN_HEADER.size
+        if offset + length > len(view):
+            raise MalformedColumnarResponse("Truncated column")
+        columns.append(Column(column_type, num_rows, view[offset : offset + length]))
+        offset += length + -length % 8
+    return ColumnarResponse(num_rows, columns)
+
+
+def _decode_tagged_cells(cells: memoryview) -> Iterator[Any]:
+    pos = 0
+    while pos < len(cells):
+        tag = CellTag(cells[pos])
+        pos += 1
+        if tag is CellTag.NULL:
+            yield None
+            continue
+        if tag in (CellTag.INTEGER, CellTag.FLOATING):
+            yield struct.unpack_from("<q" if tag is CellTag.INTEGER else "<d", cells, pos)[0]
+            pos += 8
+            continue
+        (length,) = _CELL_LENGTH.unpack_from(cells, pos)
+        pos += _CELL_LENGTH.size
+        value = bytes(cells[pos : pos + length])
+        pos += length
+        if tag is CellTag.BLOB:
+            yield value
+        elif tag is CellTag.STRING:
+            yield value.decode("utf-8", errors="replace")
+        else:
+            yield json.loads(value)
+
+
+def _from_le_bytes(
+    typecode: Literal["q", "Q", "d"], raw: memoryview
+) -> memoryview[Any] | array[Any]:
+    if sys.byteorder == "little":
+        return raw.cast("d") if typecode == "d" else raw.cast(typecode)
+    values = array(typecode, raw.tobytes())
+    values.byteswap()
+    return values
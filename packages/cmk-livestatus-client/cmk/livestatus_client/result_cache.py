@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Client side cache for the results of Livestatus queries
+
+Dashboards send the same queries within a short time, often for many users
+at once. A QueryResultCache handed to a connection answers them from memory
+for a few seconds instead of sending them to the core again. The cache is
+opt-in, because the results may be slightly out of date.
+
+An entry is identified by the normalized query text, the additional headers,
+the AuthUser and the sites the query is sent to, see ResultCacheKey. Sending
+a command to a site drops all entries containing results of that site.
+"""
+
+import sys
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import Any, Final, NamedTuple
+
+from cmk.ccc.site import SiteId
+
+# Tables whose contents only change by appending to them, caching is pointless
+_UNCACHED_TABLES: Final = {"log": 0.0, "statehist": 0.0}
+
+
+class ResultCacheKey(NamedTuple):
+    query: str
+    add_headers: str
+    auth_header: str
+    sites: tuple[SiteId | None, ...]
+    # Everything else changing the rows: output format, prepend_site and limit
+    options: tuple[object, ...]
+
+
+@dataclass(frozen=True)
+class QueryResultCacheMetrics:
+    hits: int
+    misses: int
+    # Entries dropped to stay within the memory bound
+    evictions: int
+    # Entries dropped because of commands sent to their sites
+    invalidations: int
+    entries: int
+    size: int
+
+
+class _Entry(NamedTuple):
+    rows: list[list[Any]]
+    size: int
+    expires: float
+
+
+class QueryResultCache:
+    """Thread safe LRU cache of query results with a time to live per table
+
+    The size of the results is estimated, results bigger than a quarter of
+    max_size are not cached at all.
+    """
+
+    def __init__(
+        self,
+        *,
+        default_ttl: float = 1.0,
+        table_ttls: Mapping[str, float] | None = None,
+        max_size: int = 16 * 1024 * 1024,
+    ) -> None:
+        self.default_ttl = default_ttl
+        self.table_ttls = {**_UNCACHED_TABLES, **(table_ttls or {})}
+        self.max_size = max_size
+        self._lock: Final = threading.Lock()
+        self._entries: OrderedDict[ResultCacheKey, _Entry] = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._invalidations = 0
+
+    def ttl(self, query: str) -> float:
+        return self.table_ttls.get(query_table(query), self.default_ttl)
+
+    def get(self, key: ResultCacheKey) -> list[list[Any]] | None:
+        """A copy of the cached rows, None if there are none or they are out of date"""
+        with self._lock:
+            if (entry := self._entries.get(key)) is None or entry.expires < time.monotonic():
+                if entry is not None:
+                    self._drop(key)
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return [list(row) for row in entry.rows]
+
+    def put(self, key: ResultCacheKey, rows: Sequence[Sequence[Any]]) -> None:
+        if (ttl := self.ttl(key.query)) <= 0:
+            return
+        if (size := _estimate_size(rows, self.max_size // 4)) is None:
+            return
+        entry = _Entry([list(row) for row in rows], size, time.monotonic() + ttl)
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = entry
+            self._size += size
+            while self._size > self.max_size:
+                self._drop(next(iter(self._entries)))
+                self._evictions += 1
+
+    def invalidate(self, sites: Iterable[SiteId | None] | None = None) -> None:
+        """Drop the entries of the given sites, or all entries"""
+        with self._lock:
+            affected = None if sites is None else set(sites)
+            for key in [
+                k for k in self._entries if affected is None or affected.intersection(k.sites)
+            ]:
+                self._drop(key)
+                self._invalidations += 1
+
+    def metrics(self) -> QueryResultCacheMetrics:
+        with self._lock:
+            return QueryResultCacheMetrics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                invalidations=self._invalidations,
+                entries=len(self._entries),
+                size=self._size,
+            )
+
+    def _drop(self, key: ResultCacheKey) -> None:
+        self._size -= self._entries.pop(key).size
+
+
+def normalize_query(query: str) -> str:
+    """The query without the whitespace at its end, which is not sent to Livestatus anyway
+
+    Everything else is kept, an empty line for example ends the query.
+
+    >>> normalize_query("GET hosts\\nColumns: name\\nFilter: state = 0 \\n\\n")
+    'GET hosts\\nColumns: name\\nFilter: state = 0'
+    >>> normalize_query("GET hosts\\n\\nColumns: name")
+    'GET hosts\\n\\nColumns: name'
+    """
+    return query.rstrip()
+
+
+def query_table(query: str) -> str:
+    """The table queried by a normalized query
+
+    >>> query_table("GET services\\nStats: state = 0")
+    'services'
+    """
+    first_line = query.split("\n", 1)[0]
+    return first_line[4:].strip() if first_line.startswith("GET ") else ""
+
+
+def _estimate_size(rows: Sequence[Sequence[Any]], limit: int) -> int | None:
+    """Roughly the memory used by the rows, None if it exceeds the limit"""
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row) + sum(map(sys.getsizeof, row))
+        if size > limit:
+            return None
+    return size
@@ -14,6 +14,7 @@
 #include <memory>
 #include <ostream>
 #include <string>
+#include <type_traits>
 #include <vector>
 
 #include "livestatus/OStreamStateSaver.h"
@@ -24,7 +25,7 @@ enum class Encoding;
 class Logger;
 enum class RecurringKind : int32_t;
 
-enum class OutputFormat { csv, broken_csv, json, python3 };
+enum class OutputFormat { csv, broken_csv, json, python3, binary };
 
 struct Null {};
 
@@ -42,10 +43,14 @@ public:
 
     virtual ~Renderer() = default;
 
-    // default implementation for (un)signed int/long
+    // (un)signed int/long
     template <typename T>
     void output(T value) {
-        _os << std::to_string(value);
+        if constexpr (std::is_signed_v<T>) {
+            outputInteger(static_cast<int64_t>(value));
+        } else {
+            outputUnsignedInteger(static_cast<uint64_t>(value));
+        }
     }
 
     void output(double value);
@@ -113,6 +118,12 @@ private:
     virtual void outputBlob(const std::vector<char> &value) = 0;
     virtual void outputString(const std::string &value) = 0;
 
+    // The text formats share the representation of numbers and row fragments.
+    virtual void outputInteger(int64_t value);
+    virtual void outputUnsignedInteger(uint64_t value);
+    virtual void outputDouble(double value);
+    virtual void outputRowFragment(const RowFragment &value);
+
     template <typename T>
     std::ostream &outputHex(char prefix, int width, T value) {
         const OStreamStateSaver s(_os);
@@ -0,0 +1,125 @@
+// Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+// This file is part of Checkmk (https://checkmk.com). It is subject to the
+// terms and conditions defined in the file COPYING, which is part of this
+// source code package.
+
+#ifndef RendererBinary_h
+#define RendererBinary_h
+
+#include <array>
+#include <cstddef>
+#include <cstdint>
+#include <iosfwd>
+#include <sstream>
+#include <string>
+#include <string_view>
+#include <vector>
+
+#include "livestatus/Renderer.h"
+#include "livestatus/RendererJSON.h"
+
+enum class Encoding;
+class Logger;
+
+// A binary format transferring the response column by column, so clients can
+// use numeric columns as arrays without decoding every single cell.
+//
+// All numbers are little endian and all blocks are aligned to 8 bytes:
+//
+//   header   "LQB1", number of columns (uint32), number of rows (uint64)
+//   column   type (uint8), 7 bytes padding, length of the payload (uint64),
+//            payload padded to a multiple of 8 bytes
+//
+// The payload depends on the type of the column:
+//
+//   int64, float64   one value per row, nulls in float64 columns are NaN
+//   string, blob     (rows + 1) offsets (uint64) into the data following them,
+//                    strings are UTF-8 encoded
+//   tagged           one tagged cell per row, for columns with mixed types
+//
+// A tagged cell is its tag (uint8) followed by an int64 or a double, or by
+// the length (uint32) and the bytes of a string, a blob or the JSON text of a
+// list or dictionary.
+//
+// The cells are collected column by column until the end of the query. Row
+// fragments (rendered without a query) consist of the tagged cells.
+class RendererBinary : public Renderer {
+public:
+    enum class ColumnType : uint8_t {
+        int64 = 1,
+        float64 = 2,
+        string = 3,
+        blob = 4,
+        tagged = 5,
+    };
+
+    enum class CellTag : uint8_t {
+        null = 0,
+        integer = 1,
+        floating = 2,
+        string = 3,
+        blob = 4,
+        json = 5,
+    };
+
+    RendererBinary(std::ostream &os, Logger *logger, Encoding data_encoding);
+
+    [[nodiscard]] bool useSurrogatePairs() const override;
+    void outputNull() override;
+    void outputBlob(const std::vector<char> &value) override;
+    void outputString(const std::string &value) override;
+    void outputInteger(int64_t value) override;
+    void outputUnsignedInteger(uint64_t value) override;
+    void outputDouble(double value) override;
+    void outputRowFragment(const RowFragment &value) override;
+
+    void beginQuery() override;
+    void separateQueryElements() override;
+    void endQuery() override;
+
+    void beginRow() override;
+    void beginRowElement() override;
+    void endRowElement() override;
+    void separateRowElements() override;
+    void endRow() override;
+
+    void beginList() override;
+    void separateListElements() override;
+    void endList() override;
+
+    void beginSublist() override;
+    void separateSublistElements() override;
+    void endSublist() override;
+
+    void beginDict() override;
+    void separateDictElements() override;
+    void separateDictKeyValue() override;
+    void endDict() override;
+
+private:
+    struct Column {
+        std::string cells;
+        size_t size{0};
+        std::array<size_t, 6> tag_counts{};
+    };
+
+    // Lists and dictionaries are rendered as JSON
+    std::ostringstream nested_os_;
+    RendererJSON nested_;
+    int depth_{0};
+
+    bool in_query_{false};
+    std::vector<Column> columns_;
+    size_t column_{0};
+    uint64_t rows_{0};
+
+    void addCell(CellTag tag);
+    void addCell(CellTag tag, uint64_t bits);
+    void addCell(CellTag tag, std::string_view bytes);
+    void addTaggedCell(const std::string &cell);
+    void beginNested();
+    void endNested();
+    void writeColumn(const Column &column);
+};
+
+#endif  // RendererBinary_h
@@ -394,6 +394,7 @@ namespace {
 // NOLINTNEXTLINE(cert-err58-cpp)
 const std::map<std::string_view, OutputFormat> formats{
     {"CSV"sv, OutputFormat::csv},
+    {"binary"sv, OutputFormat::binary},
     {"csv"sv, OutputFormat::broken_csv},
     {"json"sv, OutputFormat::json},
     {"python"sv, OutputFormat::python3},  // just an alias, deprecate?
@@ -9,6 +9,7 @@
 #include <cstdint>
 
 #include "livestatus/Logger.h"
+#include "livestatus/RendererBinary.h"
 #include "livestatus/RendererBrokenCSV.h"
 #include "livestatus/RendererCSV.h"
 #include "livestatus/RendererJSON.h"
@@ -30,6 +31,8 @@ std::unique_ptr<Renderer> Renderer::make(OutputFormat format, std::ostream &os,
             return std::make_unique<RendererJSON>(os, logger, data_encoding);
         case OutputFormat::python3:
             return std::make_unique<RendererPython3>(os, logger, data_encoding);
+        case OutputFormat::binary:
+            return std::make_unique<RendererBinary>(os, logger, data_encoding);
     }
     return nullptr;  // unreachable
 }
@@ -38,11 +41,23 @@ void Renderer::output(double value) {
     if (std::isnan(value)) {
         output(Null());
     } else {
-        _os << value;
+        outputDouble(value);
     }
 }
 
-void Renderer::output(const RowFragment &value) { _os << value._str; }
+void Renderer::output(const RowFragment &value) { outputRowFragment(value); }
+
+void Renderer::outputInteger(int64_t value) { _os << std::to_string(value); }
+
+void Renderer::outputUnsignedInteger(uint64_t value) {
+    _os << std::to_string(value);
+}
+
+void Renderer::outputDouble(double value) { _os << value; }
+
+void Renderer::outputRowFragment(const RowFragment &value) {
+    _os << value._str;
+}
 
 void Renderer::outputUnicodeChar(char32_t value) {
     const uint_least32_t number{value};
@@ -66,10 +81,12 @@ void Renderer::output(std::chrono::system_clock::time_point value) {
     output(std::chrono::system_clock::to_time_t(value));
 }
 
-void Renderer::output(CommentType value) { _os << static_cast<int32_t>(value); }
+void Renderer::output(CommentType value) {
+    output(static_cast<int32_t>(value));
+}
 
 void Renderer::output(RecurringKind value) {
-    _os << static_cast<int32_t>(value);
+    output(static_cast<int32_t>(value));
 }
 
 namespace {
@@ -0,0 +1,343 @@
+// Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+// This file is part of Checkmk (https://checkmk.com). It is subject to the
+// terms and conditions defined in the file COPYING, which is part of this
+// source code package.
+
+#include "livestatus/RendererBinary.h"
+
+#include <bit>
+#include <limits>
+#include <ostream>
+
+#include "livestatus/data_encoding.h"
+
+namespace {
+void putLittleEndian(std::string &out, uint64_t value, size_t size) {
+    for (size_t i = 0; i < size; ++i) {
+        out.push_back(static_cast<char>((value >> (8 * i)) & 0xFFU));
+    }
+}
+
+uint64_t getLittleEndian(std::string_view in, size_t pos, size_t size) {
+    uint64_t value = 0;
+    for (size_t i = 0; i < size; ++i) {
+        value |= static_cast<uint64_t>(static_cast<unsigned char>(in[pos + i]))
+                 << (8 * i);
+    }
+    return value;
+}
+
+void padTo8(std::string &out) { out.append((8 - out.size() % 8) % 8, '\0'); }
+
+size_t cellSize(std::string_view cells, size_t pos) {
+    switch (static_cast<RendererBinary::CellTag>(cells[pos])) {
+        case RendererBinary::CellTag::null:
+            return 1;
+        case RendererBinary::CellTag::integer:
+        case RendererBinary::CellTag::floating:
+            return 1 + 8;
+        case RendererBinary::CellTag::string:
+        case RendererBinary::CellTag::blob:
+        case RendererBinary::CellTag::json:
+            return 1 + 4 + getLittleEndian(cells, pos + 1, 4);
+    }
+    return 1;  // unreachable
+}
+
+void appendLatin1(std::string &out, unsigned char ch) {
+    if (ch < 0x80U) {
+        out.push_back(static_cast<char>(ch));
+    } else {
+        out.push_back(static_cast<char>(0xC0U | (ch >> 6)));
+        out.push_back(static_cast<char>(0x80U | (ch & 0x3FU)));
+    }
+}
+
+// See Renderer::outputMixed()
+std::string toUTF8(const std::string &value, Encoding data_encoding) {
+    if (data_encoding == Encoding::utf8) {
+        return value;
+    }
+    std::string result;
+    result.reserve(value.size());
+    for (size_t i = 0; i < value.size(); ++i) {
+        const unsigned char ch0 = value[i];
+        if (data_encoding == Encoding::mixed && (ch0 & 0xE0U) == 0xC0U &&
+            i + 1 < value.size() &&
+            (static_cast<unsigned char>(value[i + 1]) & 0xC0U) == 0x80U) {
+            result.push_back(value[i]);
+            result.push_back(value[++i]);
+        } else {
+            appendLatin1(result, ch0);
+        }
+    }
+    return result;
+}
+}  // namespace
+
+RendererBinary::RendererBinary(std::ostream &os, Logger *logger,
+                               Encoding data_encoding)
+    : Renderer(os, logger, data_encoding)
+    , nested_{nested_os_, logger, data_encoding} {}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::beginQuery() {
+    in_query_ = true;
+    columns_.clear();
+    rows_ = 0;
+}
+
+void RendererBinary::separateQueryElements() {}
+
+void RendererBinary::endQuery() {
+    std::string header{"LQB1"};
+    putLittleEndian(header, columns_.size(), 4);
+    putLittleEndian(header, rows_, 8);
+    _os << header;
+    for (const auto &column : columns_) {
+        writeColumn(column);
+    }
+    in_query_ = false;
+    columns_.clear();
+}
+
+void RendererBinary::writeColumn(const Column &column) {
+    auto count = [&column](CellTag tag) {
+        return column.tag_counts[static_cast<size_t>(tag)];
+    };
+    ColumnType type{ColumnType::tagged};
+    if (count(CellTag::integer) == column.size) {
+        type = ColumnType::int64;
+    } else if (count(CellTag::integer) + count(CellTag::floating) +
+                   count(CellTag::null) ==
+               column.size) {
+        type = ColumnType::float64;
+    } else if (count(CellTag::string) == column.size) {
+        type = ColumnType::string;
+    } else if (count(CellTag::blob) == column.size) {
+        type = ColumnType::blob;
+    }
+
+    std::string payload;
+    if (type == ColumnType::tagged) {
+        payload = column.cells;
+    } else if (type == ColumnType::int64 || type == ColumnType::float64) {
+        payload.reserve(8 * column.size);
+        for (size_t pos = 0; pos < column.cells.size();
+             pos += cellSize(column.cells, pos)) {
+            const auto tag = static_cast<CellTag>(column.cells[pos]);
+            const auto bits = getLittleEndian(column.cells, pos + 1, 8);
+            if (type == ColumnType::int64 || tag == CellTag::floating) {
+                putLittleEndian(payload, bits, 8);
+            } else if (tag == CellTag::integer) {
+                putLittleEndian(payload,
+                                std::bit_cast<uint64_t>(static_cast<double>(
+                                    static_cast<int64_t>(bits))),
+                                8);
+            } else {
+                putLittleEndian(
+                    payload,
+                    std::bit_cast<uint64_t>(
+                        std::numeric_limits<double>::quiet_NaN()),
+                    8);
+            }
+        }
+    } else {
+        std::string data;
+        payload.reserve(8 * (column.size + 1));
+        putLittleEndian(payload, 0, 8);
+        for (size_t pos = 0; pos < column.cells.size();
+             pos += cellSize(column.cells, pos)) {
+            data.append(column.cells, pos + 1 + 4,
+                        getLittleEndian(column.cells, pos + 1, 4));
+            putLittleEndian(payload, data.size(), 8);
+        }
+        payload += data;
+    }
+
+    std::string header;
+    putLittleEndian(header, static_cast<uint8_t>(type), 1);
+    header.append(7, '\0');
+    putLittleEndian(header, payload.size(), 8);
+    padTo8(payload);
+    _os << header << payload;
+}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::beginRow() { column_ = 0; }
+void RendererBinary::beginRowElement() {}
+void RendererBinary::endRowElement() {}
+void RendererBinary::separateRowElements() {}
+
+void RendererBinary::endRow() {
+    // Every row must have a cell in every column.
+    while (column_ < columns_.size()) {
+        addCell(CellTag::null);
+    }
+    ++rows_;
+}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::beginList() {
+    beginNested();
+    nested_.beginList();
+}
+
+void RendererBinary::separateListElements() { nested_.separateListElements(); }
+
+void RendererBinary::endList() {
+    nested_.endList();
+    endNested();
+}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::beginSublist() {
+    beginNested();
+    nested_.beginSublist();
+}
+
+void RendererBinary::separateSublistElements() {
+    nested_.separateSublistElements();
+}
+
+void RendererBinary::endSublist() {
+    nested_.endSublist();
+    endNested();
+}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::beginDict() {
+    beginNested();
+    nested_.beginDict();
+}
+
+void RendererBinary::separateDictElements() { nested_.separateDictElements(); }
+
+void RendererBinary::separateDictKeyValue() { nested_.separateDictKeyValue(); }
+
+void RendererBinary::endDict() {
+    nested_.endDict();
+    endNested();
+}
+
+void RendererBinary::beginNested() {
+    if (depth_++ == 0) {
+        nested_os_.str("");
+    }
+}
+
+void RendererBinary::endNested() {
+    if (--depth_ == 0) {
+        addCell(CellTag::json, nested_os_.str());
+    }
+}
+
+// --------------------------------------------------------------------------
+
+bool RendererBinary::useSurrogatePairs() const { return false; }
+
+void RendererBinary::outputNull() {
+    if (depth_ > 0) {
+        nested_.output(Null{});
+    } else {
+        addCell(CellTag::null);
+    }
+}
+
+void RendererBinary::outputBlob(const std::vector<char> &value) {
+    if (depth_ > 0) {
+        nested_.output(value);
+    } else {
+        addCell(CellTag::blob, std::string_view{value.data(), value.size()});
+    }
+}
+
+void RendererBinary::outputString(const std::string &value) {
+    if (depth_ > 0) {
+        nested_.output(value);
+    } else {
+        addCell(CellTag::string, toUTF8(value, _data_encoding));
+    }
+}
+
+void RendererBinary::outputInteger(int64_t value) {
+    if (depth_ > 0) {
+        nested_.output(value);
+    } else {
+        addCell(CellTag::integer, static_cast<uint64_t>(value));
+    }
+}
+
+void RendererBinary::outputUnsignedInteger(uint64_t value) {
+    if (depth_ > 0) {
+        nested_.output(value);
+    } else if (value <=
+               static_cast<uint64_t>(std::numeric_limits<int64_t>::max())) {
+        addCell(CellTag::integer, value);
+    } else {
+        addCell(CellTag::floating,
+                std::bit_cast<uint64_t>(static_cast<double>(value)));
+    }
+}
+
+void RendererBinary::outputDouble(double value) {
+    if (depth_ > 0) {
+        nested_.output(value);
+    } else {
+        addCell(CellTag::floating, std::bit_cast<uint64_t>(value));
+    }
+}
+
+void RendererBinary::outputRowFragment(const RowFragment &value) {
+    const std::string_view cells{value._str};
+    for (size_t pos = 0; pos < cells.size(); pos += cellSize(cells, pos)) {
+        addTaggedCell(std::string{cells.substr(pos, cellSize(cells, pos))});
+    }
+}
+
+// --------------------------------------------------------------------------
+
+void RendererBinary::addCell(CellTag tag) {
+    addTaggedCell(std::string(1, static_cast<char>(tag)));
+}
+
+void RendererBinary::addCell(CellTag tag, uint64_t bits) {
+    std::string cell;
+    putLittleEndian(cell, static_cast<uint8_t>(tag), 1);
+    putLittleEndian(cell, bits, 8);
+    addTaggedCell(cell);
+}
+
+void RendererBinary::addCell(CellTag tag, std::string_view bytes) {
+    std::string cell;
+    putLittleEndian(cell, static_cast<uint8_t>(tag), 1);
+    putLittleEndian(cell, bytes.size(), 4);
+    cell += bytes;
+    addTaggedCell(cell);
+}
+
+void RendererBinary::addTaggedCell(const std::string &cell) {
+    if (!in_query_) {
+        _os << cell;
+        return;
+    }
+    if (column_ == columns_.size()) {
+        // A column showing up late, the previous rows have no cell in it.
+        Column column;
+        for (uint64_t row = 0; row < rows_; ++row) {
+            column.cells.push_back(static_cast<char>(CellTag::null));
+        }
+        column.size = rows_;
+        column.tag_counts[static_cast<size_t>(CellTag::null)] = rows_;
+        columns_.push_back(std::move(column));
+    }
+    auto &column = columns_[column_++];
+    column.cells += cell;
+    column.size++;
+    column.tag_counts[static_cast<size_t>(cell[0])]++;
+}
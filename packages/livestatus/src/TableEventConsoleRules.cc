@@ -8,6 +8,7 @@
 #include <memory>
 
 #include "livestatus/Column.h"
+#include "livestatus/DoubleColumn.h"
 #include "livestatus/IntColumn.h"
 #include "livestatus/StringColumn.h"
 
@@ -18,6 +19,15 @@ TableEventConsoleRules::TableEventConsoleRules() {
 
     addColumn(ECRow::makeIntColumn(
         "rule_hits", "The times rule matched an incoming message", offsets));
+
+    addColumn(ECRow::makeIntColumn(
+        "rule_tries", "The times rule was tried on an incoming message",
+        offsets));
+
+    addColumn(ECRow::makeDoubleColumn(
+        "rule_average_match_time",
+        "The average time in seconds needed to try the rule on a message",
+        offsets));
 }
 
 std::string TableEventConsoleRules::name() const { return "eventconsolerules"; }
@@ -118,6 +118,34 @@ TableEventConsoleStatus::TableEventConsoleStatus() {
     addColumn(ECRow::makeIntColumn(
         "status_event_limit_active_overall",
         "Whether or not the overall event limit is in effect (0/1)", offsets));
+
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_workers",
+        "The number of worker processes parsing UDP syslog messages (0: parsing in the event server)",
+        offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_batch_size",
+        "The maximum number of UDP syslog messages parsed as one batch",
+        offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_queue_length",
+        "The maximum number of UDP syslog message batches waiting for a worker",
+        offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_queue_size",
+        "The number of UDP syslog message batches currently waiting for a worker",
+        offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_batches",
+        "The number of UDP syslog message batches received since startup of the Event Console",
+        offsets));
+    addColumn(ECRow::makeDoubleColumn(
+        "status_ingestion_average_batch_size",
+        "The average number of UDP syslog messages per batch", offsets));
+    addColumn(ECRow::makeIntColumn(
+        "status_ingestion_drops",
+        "The number of UDP syslog messages dropped because the ingestion queue was full",
+        offsets));
 }
 
 std::string TableEventConsoleStatus::name() const {
@@ -0,0 +1,174 @@
+// Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+// This file is part of Checkmk (https://checkmk.com). It is subject to the
+// terms and conditions defined in the file COPYING, which is part of this
+// source code package.
+
+#include <bit>
+#include <cstdint>
+#include <limits>
+#include <memory>
+#include <sstream>
+#include <string>
+#include <vector>
+
+#include "gtest/gtest.h"
+#include "livestatus/Logger.h"
+#include "livestatus/Renderer.h"
+#include "livestatus/RendererBinary.h"
+#include "livestatus/RendererBrokenCSV.h"
+#include "livestatus/data_encoding.h"
+
+using namespace std::string_literals;
+
+namespace {
+std::string le(uint64_t value, size_t size) {
+    std::string result;
+    for (size_t i = 0; i < size; ++i) {
+        result.push_back(static_cast<char>((value >> (8 * i)) & 0xFFU));
+    }
+    return result;
+}
+
+std::string columnHeader(RendererBinary::ColumnType type, uint64_t length) {
+    return le(static_cast<uint8_t>(type), 1) + std::string(7, '\0') +
+           le(length, 8);
+}
+
+std::string doubleBits(double value) {
+    return le(std::bit_cast<uint64_t>(value), 8);
+}
+
+std::unique_ptr<Renderer> makeRenderer(
+    std::ostream &os, Encoding data_encoding = Encoding::utf8) {
+    return Renderer::make(OutputFormat::binary, os, Logger::getLogger("test"),
+                          CSVSeparators{"\n", ";", ",", "|"}, data_encoding);
+}
+
+template <typename T>
+void outputRow(Renderer &renderer, T first, double second,
+               const std::string &third) {
+    renderer.beginRow();
+    renderer.output(first);
+    renderer.output(second);
+    renderer.output(third);
+    renderer.endRow();
+}
+}  // namespace
+
+TEST(RendererBinary, TypedColumns) {
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os);
+        const QueryRenderer q{*renderer, EmitBeginEnd::on};
+        outputRow(*renderer, 1, 0.5, "foo");
+        outputRow(*renderer, -2L, 3, "bär");
+    }
+    EXPECT_EQ("LQB1"s + le(3, 4) + le(2, 8) +
+                  columnHeader(RendererBinary::ColumnType::int64, 16) +
+                  le(1, 8) + le(static_cast<uint64_t>(-2L), 8) +
+                  columnHeader(RendererBinary::ColumnType::float64, 16) +
+                  doubleBits(0.5) + doubleBits(3.0) +
+                  columnHeader(RendererBinary::ColumnType::string, 31) +
+                  le(0, 8) + le(3, 8) + le(7, 8) + "foob\xC3\xA4r" +
+                  std::string(1, '\0'),
+              os.str());
+}
+
+TEST(RendererBinary, NullsInNumericColumn) {
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os);
+        const QueryRenderer q{*renderer, EmitBeginEnd::on};
+        renderer->beginRow();
+        renderer->output(Null{});
+        renderer->endRow();
+        renderer->beginRow();
+        renderer->output(42U);
+        renderer->endRow();
+    }
+    EXPECT_EQ("LQB1"s + le(1, 4) + le(2, 8) +
+                  columnHeader(RendererBinary::ColumnType::float64, 16) +
+                  doubleBits(std::numeric_limits<double>::quiet_NaN()) +
+                  doubleBits(42.0),
+              os.str());
+}
+
+TEST(RendererBinary, MixedAndNestedValues) {
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os);
+        const QueryRenderer q{*renderer, EmitBeginEnd::on};
+        renderer->beginRow();
+        renderer->beginList();
+        renderer->output("a\nb"s);
+        renderer->separateListElements();
+        renderer->beginSublist();
+        renderer->output(1);
+        renderer->endSublist();
+        renderer->endList();
+        renderer->endRow();
+        renderer->beginRow();
+        renderer->output(std::vector<char>{'\xff'});
+        renderer->endRow();
+    }
+    const auto json = R"(["a\u000ab",[1]])"s;
+    EXPECT_EQ("LQB1"s + le(1, 4) + le(2, 8) +
+                  columnHeader(RendererBinary::ColumnType::tagged,
+                               5 + json.size() + 6) +
+                  le(5, 1) + le(json.size(), 4) + json + le(4, 1) + le(1, 4) +
+                  "\xff" + std::string(5, '\0'),
+              os.str());
+}
+
+TEST(RendererBinary, RowFragments) {
+    // Stats queries pre-render the grouping columns as row fragments.
+    std::ostringstream fragment_os;
+    {
+        auto renderer = makeRenderer(fragment_os);
+        QueryRenderer q{*renderer, EmitBeginEnd::off};
+        const RowRenderer r{q};
+        renderer->output("host"s);
+        renderer->output(3);
+    }
+
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os);
+        QueryRenderer q{*renderer, EmitBeginEnd::on};
+        RowRenderer r{q};
+        r.output(RowFragment{fragment_os.str()});
+        r.output(2.5);
+    }
+    EXPECT_EQ("LQB1"s + le(3, 4) + le(1, 8) +
+                  columnHeader(RendererBinary::ColumnType::string, 20) +
+                  le(0, 8) + le(4, 8) + "host" + std::string(4, '\0') +
+                  columnHeader(RendererBinary::ColumnType::int64, 8) +
+                  le(3, 8) +
+                  columnHeader(RendererBinary::ColumnType::float64, 8) +
+                  doubleBits(2.5),
+              os.str());
+}
+
+TEST(RendererBinary, Latin1Strings) {
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os, Encoding::latin1);
+        const QueryRenderer q{*renderer, EmitBeginEnd::on};
+        renderer->beginRow();
+        renderer->output("b\xE4r"s);
+        renderer->endRow();
+    }
+    EXPECT_EQ("LQB1"s + le(1, 4) + le(1, 8) +
+                  columnHeader(RendererBinary::ColumnType::string, 20) +
+                  le(0, 8) + le(4, 8) + "b\xC3\xA4r" + std::string(4, '\0'),
+              os.str());
+}
+
+TEST(RendererBinary, EmptyQuery) {
+    std::ostringstream os;
+    {
+        auto renderer = makeRenderer(os);
+        const QueryRenderer q{*renderer, EmitBeginEnd::on};
+    }
+    EXPECT_EQ("LQB1"s + le(0, 4) + le(0, 8), os.str());
+}
@@ -355,8 +355,10 @@ TEST_F(ColumnNamesAndTypesTest, TableEventConsoleHistory) {
 namespace {
 ColumnDefinitions event_console_rules_columns() {
     return {
+        {"rule_average_match_time", ColumnType::double_},
         {"rule_hits", ColumnType::int_},
         {"rule_id", ColumnType::string},
+        {"rule_tries", ColumnType::int_},
     };
 }
 }  // namespace
@@ -393,6 +395,13 @@ ColumnDefinitions event_console_status_columns() {
         {"status_event_limit_rule", ColumnType::int_},
         {"status_event_rate", ColumnType::double_},
         {"status_events", ColumnType::int_},
+        {"status_ingestion_average_batch_size", ColumnType::double_},
+        {"status_ingestion_batch_size", ColumnType::int_},
+        {"status_ingestion_batches", ColumnType::int_},
+        {"status_ingestion_drops", ColumnType::int_},
+        {"status_ingestion_queue_length", ColumnType::int_},
+        {"status_ingestion_queue_size", ColumnType::int_},
+        {"status_ingestion_workers", ColumnType::int_},
         {"status_message_rate", ColumnType::double_},
         {"status_messages", ColumnType::int_},
         {"status_num_open_events", ColumnType::int_},
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Local benchmark of the TCP agent fetchers against a fake agent
+
+The fake agent answers every connection with the same output after a delay,
+like an agent that takes a while to collect its data. The hosts are fetched
+either by helper processes running one TCPFetcher after the other, or by the
+bulk fetcher in a single process.
+
+    python3 tests/performance/tcp_fetchers.py --hosts 2000 --delay 0.2 --helpers 1 4 16 64
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from pathlib import Path
+
+from cmk.ccc.hostaddress import HostAddress, HostName
+from cmk.fetchers import (
+    fetch_bulk,
+    Mode,
+    PlainFetcherTrigger,
+    TCPEncryptionHandling,
+    TCPFetcher,
+    TLSConfig,
+)
+from cmk.fetchers.filecache import AgentFileCache, FileCacheMode, MaxAge
+from cmk.helper_interface import AgentRawData
+
+
+def _fake_agent(sock: socket.socket, output: bytes, delay: float) -> None:
+    async def handle(_reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        await asyncio.sleep(delay)
+        writer.write(output)
+        await writer.drain()
+        writer.close()
+
+    async def serve() -> None:
+        server = await asyncio.start_server(handle, sock=sock, backlog=4096)
+        await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+def _job(port: int, cache_dir: Path, nr: int) -> tuple[TCPFetcher, AgentFileCache]:
+    return (
+        TCPFetcher(
+            family=socket.AF_INET,
+            address=(HostAddress("127.0.0.1"), port),
+            host_name=HostName(f"host{nr}"),
+            timeout=60.0,
+            encryption_handling=TCPEncryptionHandling.ANY_AND_PLAIN,
+            uuid_file=cache_dir / "uuid",
+            pre_shared_secret=None,
+            tls_config=TLSConfig(cas_dir=cache_dir, ca_store=cache_dir, site_crt=cache_dir),
+        ),
+        AgentFileCache(
+            path_template=str(cache_dir / "{mode}" / f"host{nr}"),
+            max_age=MaxAge(checking=3600, discovery=3600, inventory=3600),
+            simulation=False,
+            use_only_cache=False,
+            file_cache_mode=FileCacheMode.READ_WRITE,
+        ),
+    )
+
+
+def _helper(port: int, cache_dir: Path, numbers: Sequence[int]) -> int:
+    """Fetch the hosts one after the other, like a fetcher helper, and count the failures"""
+    failures = 0
+    for nr in numbers:
+        fetcher, file_cache = _job(port, cache_dir, nr)
+        with fetcher:
+            if PlainFetcherTrigger().get_raw_data(file_cache, fetcher, Mode.CHECKING).is_error():
+                failures += 1
+    return failures
+
+
+def run_helpers(port: int, cache_dir: Path, hosts: int, helpers: int) -> int:
+    with multiprocessing.Pool(helpers) as pool:
+        return sum(
+            pool.starmap(
+                _helper, [(port, cache_dir, range(nr, hosts, helpers)) for nr in range(helpers)]
+            )
+        )
+
+
+def run_bulk(port: int, cache_dir: Path, hosts: int, max_concurrency: int) -> int:
+    results = fetch_bulk(
+        [_job(port, cache_dir, nr) for nr in range(hosts)],
+        mode=Mode.CHECKING,
+        max_concurrency=max_concurrency,
+    )
+    return sum(1 for raw_data in results if raw_data.is_error())
+
+
+def parse_arguments(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--hosts", type=int, default=1000, help="Hosts fetched per run")
+    parser.add_argument("--output-size", type=int, default=100_000, help="Bytes per output")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds until the agent answers")
+    parser.add_argument(
+        "--helpers", type=int, nargs="+", default=[1, 4, 16, 64], help="Helper processes"
+    )
+    parser.add_argument("--max-concurrency", type=int, default=1000, help="Of the bulk fetcher")
+    return parser.parse_args(argv)
+
+
+def main(argv: Sequence[str]) -> int:
+    args = parse_arguments(argv)
+    output = AgentRawData(
+        b"<<<check_mk>>>\nVersion: 2.5.0\n"
+        + b"<<<df>>>\n/dev/sda1 ext4 41152736 22104140 17144252 57% /\n" * (args.output_size // 60)
+    )
+
+    sock = socket.create_server(("127.0.0.1", 0), backlog=4096)
+    port = sock.getsockname()[1]
+    agent = multiprocessing.Process(target=_fake_agent, args=(sock, output, args.delay))
+    agent.start()
+    sock.close()
+
+    runs = [
+        *((f"{helpers} helpers", run_helpers, helpers) for helpers in args.helpers),
+        ("bulk fetcher", run_bulk, args.max_concurrency),
+    ]
+    sys.stdout.write(f"{'Fetched by':<20} {'# hosts':>8} {'# fails':>8} {'fetches/s':>10}\n")
+    try:
+        for name, run, concurrency in runs:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                start = time.perf_counter()
+                failures = run(port, Path(tmp_dir), args.hosts, concurrency)
+                duration = time.perf_counter() - start
+            sys.stdout.write(
+                f"{name:<20} {args.hosts:>8} {failures:>8} {args.hosts / duration:>10.1f}\n"
+            )
+    finally:
+        agent.terminate()
+        agent.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
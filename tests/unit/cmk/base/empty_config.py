@@ -82,6 +82,7 @@ EMPTY_CONFIG = LoadedConfigFragment(
         "cmk.smartping": 5,
     },
     cluster_max_cachefile_age=90,
+    service_match_cache_size=None,
 )
 
 
@@ -4,6 +4,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 
+import threading
 import time
 from collections.abc import Iterable, Mapping
 from typing import Literal
@@ -18,13 +19,16 @@ from cmk.agent_based.prediction_backend import (
 from cmk.agent_based.v1 import Metric, Result, State
 from cmk.agent_based.v2 import CheckResult
 from cmk.base import checkers
+from cmk.base.sources import Source
 from cmk.ccc.hostaddress import HostName
 from cmk.checkengine.checkerplugin import ConfiguredService
 from cmk.checkengine.checkresults import ServiceCheckResult, SubmittableServiceCheckResult
 from cmk.checkengine.fetcher import HostKey
 from cmk.checkengine.parameters import TimespecificParameters, TimespecificParameterSet
 from cmk.checkengine.plugins import CheckPluginName
-from cmk.helper_interface import SourceType
+from cmk.fetchers import Fetcher, Mode, PlainFetcherTrigger
+from cmk.fetchers.filecache import FileCache, FileCacheOptions, NoCache
+from cmk.helper_interface import AgentRawData, FetcherType, SourceInfo, SourceType
 from cmk.utils.servicename import ServiceName
 
 
@@ -242,3 +246,65 @@ def test_prediction_injection() -> None:
             ("my_reference_metric", *prediction),
         )
     }
+
+
+class _SlowFetcher(Fetcher[AgentRawData]):
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, ident: str) -> None:
+        self.ident = ident
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _fetch_from_io(self, mode: Mode) -> AgentRawData:
+        with self.lock:
+            _SlowFetcher.running += 1
+            _SlowFetcher.max_running = max(_SlowFetcher.max_running, _SlowFetcher.running)
+        time.sleep(0.2)
+        with self.lock:
+            _SlowFetcher.running -= 1
+        return AgentRawData(self.ident.encode())
+
+
+class _SlowSource(Source[AgentRawData]):
+    def __init__(self, ident: str) -> None:
+        self.ident = ident
+
+    def source_info(self) -> SourceInfo:
+        return SourceInfo(HostName("heute"), None, self.ident, FetcherType.PROGRAM, SourceType.HOST)
+
+    def fetcher(self) -> Fetcher[AgentRawData]:
+        return _SlowFetcher(self.ident)
+
+    def file_cache(
+        self, *, simulation: bool, file_cache_options: FileCacheOptions
+    ) -> FileCache[AgentRawData]:
+        return NoCache()
+
+
+def test_fetch_all_concurrently() -> None:
+    _SlowFetcher.max_running = 0
+    start = time.monotonic()
+    fetched = checkers._fetch_all(
+        PlainFetcherTrigger(),
+        [_SlowSource(f"source{nr}") for nr in range(4)],
+        simulation=False,
+        file_cache_options=FileCacheOptions(),
+        mode=Mode.CHECKING,
+        max_concurrency=2,
+    )
+    elapsed = time.monotonic() - start
+
+    assert [(source_info.ident, raw_data.ok) for source_info, raw_data, _duration in fetched] == [
+        (f"source{nr}", f"source{nr}".encode()) for nr in range(4)
+    ]
+    assert _SlowFetcher.max_running == 2
+    assert elapsed < 0.7
+    # The durations of the sources add up to the time it took to fetch them all
+    assert sum(duration.process.elapsed for _s, _r, duration in fetched) <= elapsed + 0.05
@@ -24,11 +24,19 @@ def autochecks_dir(monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
     monkeypatch.setattr(cmk.utils.paths, "autochecks_dir", tmp_path)
 
 
+def _literal(raw: bytes) -> bytes:
+    """The Python literal behind the comment line with the marshalled data"""
+    comment, literal = raw.split(b"\n", 1)
+    assert comment.startswith(b"# ")
+    return literal
+
+
 class TestAutochecksSerializer:
     def test_empty(self) -> None:
         serial = b"[\n]\n"
         obj: list[AutocheckEntry] = []
-        assert AutochecksSerializer.serialize(obj) == serial
+        assert _literal(raw := AutochecksSerializer.serialize(obj)) == serial
+        assert AutochecksSerializer.deserialize(raw) == obj
         assert AutochecksSerializer.deserialize(serial) == obj
 
     def test_with_item(self) -> None:
@@ -37,7 +45,8 @@ class TestAutochecksSerializer:
             b" 'parameters': {}, 'service_labels': {}},\n]\n"
         )
         obj = [AutocheckEntry(CheckPluginName("norris"), "abc", {}, {})]
-        assert AutochecksSerializer.serialize(obj) == serial
+        assert _literal(raw := AutochecksSerializer.serialize(obj)) == serial
+        assert AutochecksSerializer.deserialize(raw) == obj
         assert AutochecksSerializer.deserialize(serial) == obj
 
     def test_without_item(self) -> None:
@@ -46,7 +55,8 @@ class TestAutochecksSerializer:
             b" 'parameters': {}, 'service_labels': {}},\n]\n"
         )
         obj = [AutocheckEntry(CheckPluginName("norris"), None, {}, {})]
-        assert AutochecksSerializer.serialize(obj) == serial
+        assert _literal(raw := AutochecksSerializer.serialize(obj)) == serial
+        assert AutochecksSerializer.deserialize(raw) == obj
         assert AutochecksSerializer.deserialize(serial) == obj
 
 
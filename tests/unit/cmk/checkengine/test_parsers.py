@@ -21,7 +21,13 @@ from cmk.checkengine.parser import (
     SectionStore,
     SNMPParser,
 )
-from cmk.checkengine.parser._agent import ParserState
+from cmk.checkengine.parser._agent import (
+    make_decoded_sections,
+    make_section_info,
+    NOOPParser,
+    ParserState,
+    split_at_markers,
+)
 from cmk.checkengine.parser._markers import PiggybackMarker, SectionMarker
 from cmk.checkengine.plugins import SectionName
 from cmk.helper_interface import AgentRawData
@@ -731,6 +737,73 @@ class TestAgentParser:
         }
         assert store.load() == {}
 
+    @pytest.mark.parametrize(
+        "raw_data",
+        [
+            b"",
+            b"no section\n",
+            b"<<<a>>>\r\n 1  2 \r\n\n   \n<<<b:nostrip()>>>\n 3  4 \n<<<>>>\nignored\n",
+            b"<<<a>>>\n<<<a\n<<a>>>\n x<<<a>>>\n<<<a>>>\r\r\n1\n<<<a>>>",
+            b"<<<<piggy>>>>\n<<<a>>>\n 1 \n<<<<>>>>\n<<<b>>>\n2\n<<<<testhost>>>>\n3\n",
+            b"<<<<piggy>>>>\n<<<a>>>\n1\n<<<<.>>>>\n<<<b>>>\n2\n<<<<other>>>>\n<<<c>>>\n3",
+            b"<<<a:cached(1,2)>>>\n1\n<<<<piggy>>>>\n<<<b:persist(5)>>>\n2\n<<<<>>>>\n4",
+            b"<<<a:sep(0)>>>\n1\x002\n<<<:invalid>>>\n3\n<<<a:invalid(>>>\n4\n<<<<>>>>>\n",
+        ],
+    )
+    def test_parse_host_section_like_line_by_line(
+        self, parser: AgentParser, raw_data: AgentRawData
+    ) -> None:
+        state: ParserState = NOOPParser(
+            parser.hostname,
+            [],
+            {},
+            translation=parser.translation,
+            encoding_fallback=parser.encoding_fallback,
+            logger=parser._logger,
+        )
+        for line in raw_data.split(b"\n"):
+            state = state(line.rstrip(b"\r"))
+
+        assert parser._parse_host_section(raw_data, NO_SELECTION) == (
+            state.sections,
+            state.piggyback_sections,
+        )
+
+    @pytest.mark.parametrize(
+        "raw_data",
+        [
+            b"<<<a>>>\n1\n<<<b>>>\n2\n<<<a>>>\n3\n<<<c:persist(9)>>>\n4\n",
+            b"<<<b>>>\n1\n<<<<piggy>>>>\n<<<b>>>\n2\n<<<a>>>\n3\n<<<<>>>>\n<<<b>>>\n4\n",
+            b"<<<a:cached(1,2)>>>\n1\n<<<b>>>\n<<<<testhost>>>>\n2\n<<<a:cached(3,4)>>>\n5\n",
+        ],
+    )
+    def test_parse_host_section_skips_unselected_sections(
+        self, parser: AgentParser, raw_data: AgentRawData
+    ) -> None:
+        selection = frozenset({SectionName("a"), SectionName("c")})
+        all_sections, all_piggybacked = parser._parse_host_section(raw_data, NO_SELECTION)
+
+        sections, piggybacked = parser._parse_host_section(raw_data, selection)
+
+        assert make_decoded_sections(sections) == make_decoded_sections(
+            [s for s in all_sections if s.header.name in selection]
+        )
+        assert make_section_info(sections) == make_section_info(
+            [s for s in all_sections if s.header.name in selection]
+        )
+        assert piggybacked == all_piggybacked
+
+    def test_split_at_markers(self) -> None:
+        raw_data = b"1\n<<<a>>>\r\n2\n3\n<<<a\n<<<<b>>>>"
+        assert [
+            (is_marker, raw_data[start:end]) for is_marker, start, end in split_at_markers(raw_data)
+        ] == [
+            (False, b"1\n"),
+            (True, b"<<<a>>>"),
+            (False, b"2\n3\n<<<a\n"),
+            (True, b"<<<<b>>>>"),
+        ]
+
 
 class ParserStateAdapter(ParserState):
     def __init__(self, *, translation: TranslationOptions | None = None):
@@ -3,12 +3,14 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-from collections.abc import Mapping
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
 from pathlib import Path
 
 import pytest
 
 from cmk.agent_based.v1.value_store import get_value_store, set_value_store_manager
+from cmk.ccc import store
 from cmk.ccc.hostaddress import HostName
 from cmk.checkengine import value_store
 from cmk.checkengine.plugins import CheckPluginName, ServiceID
@@ -70,6 +72,80 @@ class TestAllValueStoresStore:
             (HostName("host1"), "service2", None): {"key": "new_value2"},
         }
 
+    def test_update_appends_changes(self, tmp_path: Path) -> None:
+        file = tmp_path / "file"
+        avss = self._get_avss(file)
+        compacted = file.read_text()
+
+        avss.update(
+            {
+                (HostName("host1"), "service1", "item"): {"key": "value1"},
+                (HostName("host1"), "service2", None): {"key": "new_value2"},
+            }
+        )
+
+        assert file.read_text() == compacted
+        assert value_store.journal_path(file).read_text() == (
+            '[["host1", "service2", null], {"key": "new_value2"}]\n'
+        )
+        assert value_store.AllValueStoresStore(file).load()[
+            (HostName("host1"), "service2", None)
+        ] == {"key": "new_value2"}
+
+    def test_update_skips_broken_journal_entries(self, tmp_path: Path) -> None:
+        file = tmp_path / "file"
+        avss = self._get_avss(file)
+        journal = value_store.journal_path(file)
+        journal.write_text('[["host1", "service1", "item"], {"key": "lost"}]\n[["host1", "serv')
+
+        avss.update({(HostName("host1"), "service3", None): {"key": "value3"}})
+
+        assert value_store.AllValueStoresStore(file).load() == {
+            (HostName("host1"), "service1", "item"): {"key": "lost"},
+            (HostName("host1"), "service2", None): {"key": "value2"},
+            (HostName("host1"), "service3", None): {"key": "value3"},
+        }
+
+    def test_update_compacts(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+        monkeypatch.setattr(value_store, "_COMPACTION_MIN_SIZE", 0)
+        file = tmp_path / "file"
+        avss = self._get_avss(file)
+        journal = value_store.journal_path(file)
+
+        journal_lengths = []
+        for nr in range(3):
+            avss.update({(HostName("host1"), "service1", "item"): {"key": "x" * 100 + str(nr)}})
+            journal_lengths.append(len(journal.read_text().splitlines()) if journal.exists() else 0)
+
+        # Every other update makes the journal bigger than the file, and compacts it
+        assert journal_lengths == [0, 1, 0]
+        assert "x2" in file.read_text()
+
+        assert value_store.AllValueStoresStore(file).load() == {
+            (HostName("host1"), "service1", "item"): {"key": "x" * 100 + "2"},
+            (HostName("host1"), "service2", None): {"key": "value2"},
+        }
+
+    def test_update_locks_the_journal(
+        self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # The compacted file is replaced when compacting, so locking it would not be exclusive
+        monkeypatch.setattr(value_store, "_COMPACTION_MIN_SIZE", 0)
+        file = tmp_path / "file"
+        avss = self._get_avss(file)
+        locked = []
+
+        @contextmanager
+        def fake_locked(path: Path) -> Iterator[None]:
+            locked.append(path)
+            yield
+
+        monkeypatch.setattr(store, "locked", fake_locked)
+        avss.update({(HostName("host1"), "service1", "item"): {"key": "x" * 1000}})
+
+        assert locked == [value_store.journal_path(file)]
+        assert not value_store.journal_path(file).exists()
+
 
 class _BrokenRepr(str):
     def __repr__(self) -> str:
@@ -139,6 +215,12 @@ class Test_ValueStore:
         with pytest.raises(SyntaxError):
             _ = next_times_vs["rogue"]
 
+    def test_export_keeps_serialized_form(self) -> None:
+        vs = value_store._ValueStore({"immutable": "(1,  'a')", "mutable": "[1]"})
+        assert vs["immutable"] == (1, "a")
+        assert vs["mutable"] == [1]
+        assert vs.export() == {"immutable": "(1,  'a')", "mutable": "[1]"}
+
 
 _TEST_HOST = HostName("test-host")
 _SERVICE_INNER = ServiceID(CheckPluginName("unit_test_inner"), None)
@@ -199,3 +281,23 @@ class TestValueStoreManager:
 
         assert store.inspect_updated is not None
         assert _KEY_OUTER not in store.inspect_updated
+
+    @staticmethod
+    def test_skip_unchanged() -> None:
+        store = _AllValueStoresStoreSpy()
+        store.load = lambda: {  # type: ignore[method-assign]
+            _KEY_OUTER: {"key": "'outer'"},
+            _KEY_INNER: {"key": "'inner'"},
+        }
+        vsm = value_store.ValueStoreManager(_TEST_HOST, store)
+
+        with vsm.namespace(_SERVICE_OUTER):
+            assert vsm.active_service_interface is not None
+            assert vsm.active_service_interface["key"] == "outer"
+        with vsm.namespace(_SERVICE_INNER):
+            assert vsm.active_service_interface is not None
+            vsm.active_service_interface["key"] = "changed"
+
+        vsm.save()
+
+        assert store.inspect_updated == {_KEY_INNER: {"key": "'changed'"}}
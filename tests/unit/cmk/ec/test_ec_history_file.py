@@ -10,6 +10,7 @@ import shlex
 from pathlib import Path
 from zoneinfo import ZoneInfo
 
+import pytest
 import time_machine
 
 import cmk.ec.export as ec
@@ -22,6 +23,7 @@ from cmk.ec.history_file import (
     FileHistory,
     parse_history_file,
 )
+from cmk.ec.history_index import HistoryFileIndex, index_path_for, read_header
 from cmk.ec.main import StatusTableHistory
 from cmk.ec.query import QueryFilter, QueryGET, StatusTable
 
@@ -55,6 +57,81 @@ def test_file_add_get(history: FileHistory) -> None:
     assert row[column_index("event_host")] == "ABC1"
 
 
+def _query_history(history: FileHistory, *filters: str) -> list[dict[str, object]]:
+    logger = logging.getLogger("cmk.mkeventd")
+    table = StatusTableHistory(logger, history)
+    query = QueryGET(
+        lambda name: table,
+        ["GET history", "Columns: history_line event_host", *(f"Filter: {f}" for f in filters)],
+        logger,
+    )
+    return [dict(zip(table.column_names, row)) for row in history.get(query)]
+
+
+def test_file_get_via_index(history: FileHistory, settings: ec.Settings) -> None:
+    """Filtered queries use (and update) the index of the history files."""
+    for host in ["ABC1", "ABC2", "ABC1"]:
+        history.add(event=ec.Event(host=HostName(host), text="Event text"), what="NEW")
+
+    rows = _query_history(history, "event_host = ABC1")
+    assert [(row["history_line"], row["event_host"]) for row in rows] == [(3, "ABC1"), (1, "ABC1")]
+    (path,) = settings.paths.history_dir.value.glob("*.log")
+    assert not index_path_for(path).exists()  # only saved by the housekeeping
+
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event text"), what="NEW")
+    assert [row["history_line"] for row in _query_history(history, "event_host = ABC1")] == [
+        4,
+        3,
+        1,
+    ]
+    assert [row["history_line"] for row in _query_history(history, "event_host ~ ^ABC")] == [
+        4,
+        3,
+        2,
+        1,
+    ]
+    assert [row["history_line"] for row in _query_history(history, "history_time > 0")] == [
+        4,
+        3,
+        2,
+        1,
+    ]
+    assert not _query_history(history, "event_host = ABC1", "history_time < 0")
+
+
+def test_file_get_via_cached_index(
+    history: FileHistory, settings: ec.Settings, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event text"), what="NEW")
+    history.housekeeping()
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event text"), what="NEW")
+
+    def deserialize(raw: bytes) -> HistoryFileIndex:
+        raise AssertionError("index file read again")
+
+    assert [row["history_line"] for row in _query_history(history, "event_host = ABC1")] == [2, 1]
+    monkeypatch.setattr(HistoryFileIndex, "deserialize", deserialize)
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event text"), what="NEW")
+    assert [row["history_line"] for row in _query_history(history, "event_host = ABC1")] == [
+        3,
+        2,
+        1,
+    ]
+
+
+def test_housekeeping_updates_index(history: FileHistory, settings: ec.Settings) -> None:
+    history.add(event=ec.Event(host=HostName("ABC1"), text="Event text"), what="NEW")
+    (path,) = settings.paths.history_dir.value.glob("*.log")
+
+    history.housekeeping()
+
+    stat = path.stat()
+    assert read_header(index_path_for(path)) == (stat.st_ino, stat.st_size)
+
+    history.flush()
+    assert not index_path_for(path).exists()
+
+
 def test_current_history_period(config: Config) -> None:
     """timestamp of the beginning of the current history period correctly returned."""
     with time_machine.travel(datetime.datetime.fromtimestamp(1550000000.0, tz=ZoneInfo("CET"))):
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import pytest
+
+from cmk.ccc.hostaddress import HostName
+from cmk.ec.event import Event
+from cmk.ec.event_store import EventStore
+
+
+def _event(eid: int, rule_id: str, host: str, application: str = "app") -> Event:
+    return Event(
+        id=eid,
+        rule_id=rule_id,
+        host=HostName(host),
+        core_host=HostName(host),
+        application=application,
+    )
+
+
+def test_keeps_creation_order() -> None:
+    events = [_event(3, "r1", "h1"), _event(1, "r2", "h1"), _event(2, "r1", "h2")]
+    store = EventStore(events)
+
+    assert store.as_list() == events
+    assert list(store) == events
+    assert store.oldest() is events[0]
+    assert list(store.of_rule("r1")) == [events[0], events[2]]
+    assert list(store.of_host(HostName("h1"), HostName("h1"))) == [events[0], events[1]]
+    assert list(store.of_rule_host_application("r1", HostName("h2"), "app")) == [events[2]]
+
+
+def test_get_and_remove() -> None:
+    event = _event(1, "r1", "h1")
+    store = EventStore([event])
+
+    assert store.get(1) is event
+    store.remove(event)
+
+    assert store.get(1) is None
+    assert not store.of_rule("r1")
+    assert store.oldest() is None
+    with pytest.raises(ValueError):
+        store.remove(event)
+
+
+def test_add_duplicate_id() -> None:
+    replaced, other, event = _event(1, "r1", "h1"), _event(2, "r1", "h1"), _event(1, "r1", "h2")
+    store = EventStore([replaced, other, event])
+
+    assert store.as_list() == [other, event]
+    assert list(store.of_rule("r1")) == [other, event]
+    assert list(store.of_host(HostName("h1"), HostName("h1"))) == [other]
+
+
+def test_iteration_allows_removal() -> None:
+    store = EventStore([_event(1, "r1", "h1"), _event(2, "r1", "h1")])
+    for event in store:
+        store.remove(event)
+    assert len(store) == 0
+
+
+def test_reindex_keeps_order() -> None:
+    first, second, third = _event(1, "r1", "h1"), _event(2, "r1", "h2"), _event(3, "r1", "h2")
+    store = EventStore([first, second, third])
+
+    first["host"] = HostName("h2")
+    store.reindex(first)
+
+    assert list(store.of_rule_host_application("r1", HostName("h1"), "app")) == []
+    assert list(store.of_rule_host_application("r1", HostName("h2"), "app")) == [
+        first,
+        second,
+        third,
+    ]
+    assert list(store.of_host(HostName("h2"), HostName("h1"))) == [first]
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import operator
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+from cmk.ec.history_index import BLOCK_SIZE, HistoryFileIndex, read_lines
+from cmk.ec.query import OperatorName, QueryFilter
+
+_FIELD_POSITIONS = {"event_id": 1, "event_host": 2, "event_application": 3}
+
+
+def _line(nr: int) -> bytes:
+    return b"%d.5\t%d\thost%d\tapp\n" % (1000 + nr, nr, nr % 3)
+
+
+def _filter(column: str, value: object, operator_name: OperatorName = "=") -> QueryFilter:
+    operator_function: Callable[[Any, Any], bool] = {"=": operator.eq, ">=": operator.ge}[
+        operator_name
+    ]
+    return QueryFilter(
+        column_name=column,
+        operator_name=operator_name,
+        predicate=lambda x: operator_function(x, value),
+        argument=value,
+    )
+
+
+def _index(num_lines: int) -> tuple[bytes, HistoryFileIndex]:
+    data = b"".join(_line(nr) for nr in range(num_lines))
+    index = HistoryFileIndex.empty(inode=42)
+    index.update(data, _FIELD_POSITIONS)
+    return data, index
+
+
+def test_update_skips_incomplete_line() -> None:
+    index = HistoryFileIndex.empty(inode=42)
+
+    assert index.update(_line(0) + b"1001.0\t1\tho", _FIELD_POSITIONS)
+
+    assert len(index) == 1
+    assert index.size == len(_line(0))
+    assert not index.update(b"st1\tapp", _FIELD_POSITIONS)
+
+
+def test_update_incrementally() -> None:
+    data, index = _index(2 * BLOCK_SIZE + 3)
+    incremental = HistoryFileIndex.empty(inode=42)
+
+    for start in range(0, len(data), 1000):
+        chunk = data[incremental.size : start + 1000]
+        incremental.update(chunk, _FIELD_POSITIONS)
+
+    assert incremental.serialize() == index.serialize()
+
+
+def test_candidates() -> None:
+    _data, index = _index(3 * BLOCK_SIZE)
+
+    assert index.candidates((None, None), []) == list(reversed(range(3 * BLOCK_SIZE)))
+    assert index.candidates((None, None), [_filter("event_id", 7)]) == [7]
+    assert (
+        index.candidates((None, None), [_filter("event_id", 7), _filter("event_host", "host2")])
+        == []
+    )
+    assert index.candidates((None, None), [_filter("event_host", "no such host")]) == []
+    # Time ranges are applied to whole blocks
+    assert index.candidates((1000.5 + BLOCK_SIZE, 1000.5 + BLOCK_SIZE), []) == list(
+        reversed(range(BLOCK_SIZE, 2 * BLOCK_SIZE))
+    )
+    assert index.candidates((1000.0 + BLOCK_SIZE, None), [_filter("event_host", "host0")]) == [
+        nr for nr in reversed(range(BLOCK_SIZE, 3 * BLOCK_SIZE)) if nr % 3 == 0
+    ]
+
+
+def test_candidates_by_id() -> None:
+    _data, index = _index(3 * BLOCK_SIZE)
+    index.update(b"1000.5\tnot a number\thost0\tapp\n", _FIELD_POSITIONS)
+
+    assert index.candidates((None, None), [_filter("event_id", 7)]) == [3 * BLOCK_SIZE, 7]
+    assert index.candidates((None, None), [_filter("event_id", 2**64)]) == [3 * BLOCK_SIZE]
+    assert index.candidates((None, None), [_filter("event_id", 3 * BLOCK_SIZE - 2, ">=")]) == [
+        3 * BLOCK_SIZE,
+        3 * BLOCK_SIZE - 1,
+        3 * BLOCK_SIZE - 2,
+    ]
+
+
+def test_serialize_roundtrip(tmp_path: Path) -> None:
+    data, index = _index(BLOCK_SIZE + 1)
+    path = tmp_path / "history.log"
+    path.write_bytes(data)
+
+    loaded = HistoryFileIndex.deserialize(index.serialize())
+
+    assert loaded.serialize() == index.serialize()
+    assert list(read_lines(path, loaded, [BLOCK_SIZE, 3, 2, 0])) == [
+        (BLOCK_SIZE, _line(BLOCK_SIZE).rstrip(b"\n")),
+        (3, _line(3).rstrip(b"\n")),
+        (2, _line(2).rstrip(b"\n")),
+        (0, _line(0).rstrip(b"\n")),
+    ]
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import select
+import socket
+from collections.abc import Iterator
+from concurrent.futures import Future
+
+import pytest
+
+from cmk.ec.event import Event
+from cmk.ec.ingestion import parse_datagrams, SyslogIngestion
+
+
+@pytest.fixture(name="udp_socket")
+def fixture_udp_socket() -> Iterator[socket.socket]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    yield sock
+    sock.close()
+
+
+def _parse_address(address: object) -> tuple[str, int]:
+    assert isinstance(address, tuple)
+    return address[0], address[1]
+
+
+def _status(ingestion: SyslogIngestion) -> dict[str, object]:
+    return {
+        name: value
+        for (name, _default), value in zip(SyslogIngestion.status_columns(), ingestion.get_status())
+    }
+
+
+def _ingestion(sock: socket.socket, *, workers: int = 1, queue_length: int = 4) -> SyslogIngestion:
+    return SyslogIngestion(
+        sock=sock,
+        parse_address=_parse_address,
+        workers=workers,
+        batch_size=2,
+        queue_length=queue_length,
+        logger=logging.getLogger("cmk.mkeventd"),
+    )
+
+
+def test_parse_datagrams() -> None:
+    events = parse_datagrams(
+        [(b"<78>May 26 13:45:01 Klapprechner CRON[8046]:  message....", ("10.0.0.1", 514))]
+    )
+    assert len(events) == 1
+    assert events[0]["host"] == "Klapprechner"
+    assert events[0]["application"] == "CRON"
+    assert events[0]["ipaddress"] == "10.0.0.1"
+
+
+def test_ingestion_parses_all_messages(udp_socket: socket.socket) -> None:
+    ingestion = _ingestion(udp_socket)
+    ingestion.start()
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+            for nr in range(5):
+                sender.sendto(
+                    b"<78>May 26 13:45:01 host%d app: text" % nr, udp_socket.getsockname()
+                )
+
+        events: list[Event] = []
+        while len(events) < 5:
+            assert select.select([ingestion.wakeup_fd], [], [], 30)[0], "timeout"
+            events.extend(ingestion.pop_events())
+
+        assert [e["host"] for e in events] == [f"host{nr}" for nr in range(5)]
+        assert all(e["ipaddress"] == "127.0.0.1" for e in events)
+        status = _status(ingestion)
+        assert status["status_ingestion_workers"] == 1
+        assert status["status_ingestion_batches"] in (3, 4, 5)
+        assert status["status_ingestion_drops"] == 0
+    finally:
+        ingestion.stop()
+
+
+def test_full_queue_drops_batches(udp_socket: socket.socket) -> None:
+    # Not started, so nobody takes the batches out of the queue.
+    ingestion = _ingestion(udp_socket, queue_length=1)
+    ingestion._enqueue([(b"1", ("127.0.0.1", 1)), (b"2", ("127.0.0.1", 1))])
+    ingestion._enqueue([(b"3", ("127.0.0.1", 1))])
+    ingestion.stop()
+
+    status = _status(ingestion)
+    assert status["status_ingestion_queue_size"] == 1
+    assert status["status_ingestion_batches"] == 1
+    assert status["status_ingestion_average_batch_size"] == 2.0
+    assert status["status_ingestion_drops"] == 1
+
+
+def _parsed(*hosts: str) -> Future[list[Event]]:
+    future: Future[list[Event]] = Future()
+    future.set_result(
+        parse_datagrams(
+            [(b"<78>May 26 13:45:01 %s app: text" % h.encode(), ("127.0.0.1", 1)) for h in hosts]
+        )
+    )
+    return future
+
+
+def test_batches_are_released_in_order(udp_socket: socket.socket) -> None:
+    ingestion = _ingestion(udp_socket, workers=2)
+    for _nr in range(3):
+        ingestion._in_flight.acquire()
+    try:
+        # The workers finish the batches in the reverse order
+        ingestion._collect(2, 1, _parsed("host3"))
+        ingestion._collect(1, 2, _parsed("host1", "host2"))
+        assert not ingestion.pop_events()
+
+        ingestion._collect(0, 1, _parsed("host0"))
+        assert [e["host"] for e in ingestion.pop_events()] == ["host0", "host1", "host2", "host3"]
+    finally:
+        ingestion.stop()
+
+
+def test_failed_batch_does_not_block_the_following(udp_socket: socket.socket) -> None:
+    ingestion = _ingestion(udp_socket)
+    for _nr in range(2):
+        ingestion._in_flight.acquire()
+    failed: Future[list[Event]] = Future()
+    failed.set_exception(RuntimeError("worker died"))
+    try:
+        ingestion._collect(1, 1, _parsed("host1"))
+        ingestion._collect(0, 2, failed)
+
+        assert [e["host"] for e in ingestion.pop_events()] == ["host1"]
+        assert _status(ingestion)["status_ingestion_drops"] == 2
+    finally:
+        ingestion.stop()
@@ -33,6 +33,22 @@ def test_perfcounters_count_time() -> None:
     assert c._times["processing"] == 1.04
 
 
+def test_perfcounters_count_rule_times() -> None:
+    c = Perfcounters(logger)
+    assert not c.get_rule_times()
+    c.count_rule_times([("rule", 1.0), ("other", 2.0)])
+    assert c.get_rule_times() == {"rule": (1, 1.0), "other": (1, 2.0)}
+    c.count_rule_times([("rule", 5.0)])
+    assert c.get_rule_times() == {"rule": (2, 1.04), "other": (1, 2.0)}
+
+
+def test_perfcounters_forget_rule_times() -> None:
+    c = Perfcounters(logger)
+    c.count_rule_times([("rule", 1.0), ("other", 2.0)])
+    c.forget_rule_times({"rule", "new"})
+    assert c.get_rule_times() == {"rule": (1, 1.0)}
+
+
 def test_perfcounters_do_statistics(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setattr("time.time", lambda: 1.0)
 
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import itertools
+
+import pytest
+
+import cmk.ec.export as ec
+from cmk.ccc.hostaddress import HostName
+from cmk.ccc.site import SiteId
+from cmk.ec.event import Event
+from cmk.ec.rule_index import RuleIndex
+from cmk.ec.rule_matcher import compile_rule, MatchSuccess
+from tests.unit.cmk.ec.helpers import new_event
+
+
+def _rules() -> list[ec.Rule]:
+    rules = [
+        ec.Rule(id="any", pack="p1"),
+        ec.Rule(id="literal_host", pack="p1", match_host="Host1"),
+        ec.Rule(id="regex_host", pack="p1", match_host="host[0-9]"),
+        ec.Rule(id="application", pack="p1", match_application="sshd"),
+        ec.Rule(id="cancel_app", pack="p1", match_application="sshd", cancel_application="cron"),
+        ec.Rule(id="network", pack="p2", match_ipaddress="10.1.0.0/16"),
+        ec.Rule(id="all_networks", pack="p2", match_ipaddress="0.0.0.0/0"),
+        ec.Rule(id="bad_network", pack="p2", match_ipaddress="no network"),
+        ec.Rule(id="literal_message", pack="p2", match="disk full"),
+        ec.Rule(id="regex_message", pack="p3", match="^error ([0-9]+)"),
+        ec.Rule(id="regex_ok", pack="p3", match="^failed", match_ok="recovered$"),
+        ec.Rule(id="backref", pack="p3", match=r"(a+)\1"),
+        ec.Rule(id="named", pack="p3", match=r"(?P<x>b)c"),
+        ec.Rule(id="inverted", pack="p3", match="^never", invert_matching=True),
+    ]
+    for rule in rules:
+        compile_rule(rule)
+    return rules
+
+
+_EVENTS = [
+    new_event(Event(host=HostName(host), application=app, ipaddress=ip, text=text))
+    for host, app, ip, text in itertools.product(
+        ["host1", "HOST1", "other"],
+        ["", "/usr/sbin/sshd", "cron"],
+        ["10.1.2.3", "10.2.0.1", "", "::1"],
+        ["", "Error 42 occurred", "DISK FULL", "failed", "is recovered", "aa", "bc", "never"],
+    )
+]
+
+
+@pytest.mark.parametrize("event", _EVENTS)
+def test_candidates_contain_all_matching_rules(event: Event) -> None:
+    rules = _rules()
+    index = RuleIndex(rules)
+    matcher = ec.RuleMatcher(None, SiteId("test_site"), lambda time_period_name: True)
+
+    candidates = list(index.candidates(event, index.mask_of(rules)))
+
+    assert candidates == [r for r in rules if r in candidates]  # rule order is kept
+    assert [
+        r["id"] for r in rules if isinstance(matcher.event_rule_matches(r, event), MatchSuccess)
+    ] == [
+        r["id"]
+        for r in candidates
+        if isinstance(matcher.event_rule_matches(r, event), MatchSuccess)
+    ]
+
+
+def test_candidates_are_filtered() -> None:
+    rules = _rules()
+    index = RuleIndex(rules)
+    event = new_event(
+        Event(host=HostName("other"), application="", ipaddress="10.2.0.1", text="nothing")
+    )
+
+    assert [r["id"] for r in index.candidates(event, index.mask_of(rules))] == [
+        "any",
+        "regex_host",
+        "cancel_app",
+        "all_networks",
+        "backref",
+        "named",
+        "inverted",
+    ]
+
+
+def test_candidates_respect_preselection() -> None:
+    rules = _rules()
+    index = RuleIndex(rules)
+    event = new_event(Event(text="nothing"))
+
+    assert [r["id"] for r in index.candidates(event, index.mask_of(rules[1:3]))] == ["regex_host"]
@@ -10,7 +10,26 @@ from pathlib import Path
 import pytest
 
 import cmk.fetchers.snmp_backend._utils as utils
-from cmk.fetchers.snmp_backend import StoredWalkSNMPBackend
+from cmk.ccc.hostaddress import HostAddress, HostName
+from cmk.fetchers.snmp_backend import IndexedStoredWalkSNMPBackend, StoredWalkSNMPBackend
+from cmk.fetchers.snmp_backend.indexed_walk import index_path_for, WalkIndex
+from cmk.snmplib import SNMPBackendEnum, SNMPHostConfig, SNMPVersion
+
+SNMP_HOST_CONFIG = SNMPHostConfig(
+    is_ipv6_primary=False,
+    hostname=HostName("unittest"),
+    ipaddress=HostAddress("127.0.0.1"),
+    credentials="",
+    port=0,
+    bulkwalk_enabled=True,
+    snmp_version=SNMPVersion.V2C,
+    bulk_walk_size_of=0,
+    timing={},
+    oid_range_limits={},
+    snmpv3_contexts=[],
+    character_encoding=None,
+    snmp_backend=SNMPBackendEnum.STORED_WALK,
+)
 
 
 @pytest.mark.parametrize(
@@ -58,6 +77,71 @@ class TestStoredWalkSNMPBackend:
         ]
 
 
+class TestIndexedStoredWalkSNMPBackend:
+    WALK = (
+        "garbage before the first OID\n"
+        ".1.2.3 foo\n"
+        ".1.2.4.1 bar\nfoobar\n"
+        '.1.2.4.2 "B2 E0 7D "\n'
+        ".1.2.10 baz\n"
+        ".1.3\n"
+    )
+
+    @pytest.fixture(name="walk")
+    def fixture_walk(self, tmp_path: Path) -> Path:
+        walk = tmp_path / "host"
+        walk.write_text(self.WALK)
+        return walk
+
+    @pytest.mark.parametrize(
+        "oid",
+        [
+            ".1.2",
+            "1.2",
+            ".1.2.3",
+            ".1.2.4",
+            ".1.2.4.*",
+            ".1.2.1",
+            ".1.3",
+            ".1.4",
+            ".2",
+        ],
+    )
+    def test_walk_same_as_stored_walk(self, walk: Path, oid: str) -> None:
+        logger = logging.getLogger("test")
+        expected = StoredWalkSNMPBackend(SNMP_HOST_CONFIG, logger, walk).walk(oid, context="")
+        assert (
+            IndexedStoredWalkSNMPBackend(SNMP_HOST_CONFIG, logger, walk).walk(oid, context="")
+            == expected
+        )
+
+    def test_get(self, walk: Path) -> None:
+        backend = IndexedStoredWalkSNMPBackend(SNMP_HOST_CONFIG, logging.getLogger("test"), walk)
+        assert backend.get(".1.2.3", context="") == b"foo"
+        assert backend.get(".1.2.4.*", context="") == b"bar\nfoobar"
+        assert backend.get(".1.2", context="") is None
+
+    def test_index_is_persisted(self, walk: Path) -> None:
+        IndexedStoredWalkSNMPBackend(SNMP_HOST_CONFIG, logging.getLogger("test"), walk).walk(
+            ".1", context=""
+        )
+        index = WalkIndex.deserialize(index_path_for(walk).read_bytes())
+        assert index.oids == [(1, 2, 3), (1, 2, 4, 1), (1, 2, 4, 2), (1, 2, 10), (1, 3)]
+        assert index.size == walk.stat().st_size
+
+    def test_index_is_invalidated(self, walk: Path) -> None:
+        backend = IndexedStoredWalkSNMPBackend(SNMP_HOST_CONFIG, logging.getLogger("test"), walk)
+        assert backend.walk(".1.2.3", context="") == [(".1.2.3", b"foo")]
+        walk.write_text(".1.2.3 changed\n")
+        assert backend.walk(".1.2.3", context="") == [(".1.2.3", b"changed")]
+
+    def test_unsorted_walk(self, tmp_path: Path) -> None:
+        walk = tmp_path / "host"
+        walk.write_text(".1.2.2 b\n.1.2.1 a\n")
+        backend = IndexedStoredWalkSNMPBackend(SNMP_HOST_CONFIG, logging.getLogger("test"), walk)
+        assert backend.walk(".1.2", context="") == [(".1.2.1", b"a"), (".1.2.2", b"b")]
+
+
 @pytest.fixture
 def create_files(tmpdir):
     tmpdir.mkdir("walkdata")
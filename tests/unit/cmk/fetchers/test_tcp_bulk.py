@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import socket
+import ssl
+import threading
+import zlib
+from binascii import unhexlify
+from collections.abc import Callable, Iterator
+from pathlib import Path
+
+import pytest
+
+import cmk.ccc.resulttype as result
+from cmk.ccc.hostaddress import HostAddress, HostName
+from cmk.crypto.certificate import CertificateWithPrivateKey, SubjectAlternativeNames
+from cmk.crypto.x509 import SAN
+from cmk.fetchers import fetch_bulk, Mode, TCPEncryptionHandling, TCPFetcher, TLSConfig
+from cmk.fetchers.filecache import AgentFileCache, FileCacheMode, MaxAge
+from cmk.helper_interface import AgentRawData, FetcherError
+
+_UUID = "8e2d9a27-e4e3-4e2a-9b79-6d5e0c6c0f9a"
+
+
+def _serve(handle: Callable[[socket.socket], None], connections: int) -> Iterator[int]:
+    with socket.create_server(("127.0.0.1", 0)) as server:
+
+        def run() -> None:
+            for _nr in range(connections):
+                conn, _addr = server.accept()
+                with conn:
+                    handle(conn)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        yield server.getsockname()[1]
+        thread.join(timeout=10)
+
+
+def _fetcher(
+    port: int, tls_config: TLSConfig, uuid_file: Path, pre_shared_secret: str | None = None
+) -> TCPFetcher:
+    return TCPFetcher(
+        family=socket.AF_INET,
+        address=(HostAddress("127.0.0.1"), port),
+        host_name=HostName("heute"),
+        timeout=5.0,
+        encryption_handling=TCPEncryptionHandling.ANY_AND_PLAIN,
+        uuid_file=uuid_file,
+        pre_shared_secret=pre_shared_secret,
+        tls_config=tls_config,
+    )
+
+
+def _file_cache(path: Path) -> AgentFileCache:
+    return AgentFileCache(
+        path_template=str(path / "{mode}" / "heute"),
+        max_age=MaxAge(checking=3600, discovery=3600, inventory=3600),
+        simulation=False,
+        use_only_cache=False,
+        file_cache_mode=FileCacheMode.READ_WRITE,
+    )
+
+
+@pytest.fixture(name="tls_config")
+def fixture_tls_config(tmp_path: Path) -> TLSConfig:
+    # Unused as long as the agents send in plain text
+    return TLSConfig(cas_dir=tmp_path, ca_store=tmp_path / "ca.pem", site_crt=tmp_path)
+
+
+# Larger than the initial buffers, to have them grow
+_OUTPUT = AgentRawData(b"<<<check_mk>>>\nVersion: 2.5.0\n" + b"<<<df>>>\n/ 42 23\n" * 40_000)
+
+
+class TestPlain:
+    @pytest.fixture
+    def port(self) -> Iterator[int]:
+        yield from _serve(lambda conn: conn.sendall(_OUTPUT), connections=3)
+
+    def test_fetch(self, port: int, tls_config: TLSConfig, tmp_path: Path) -> None:
+        jobs = [
+            (_fetcher(port, tls_config, tmp_path / "uuid"), _file_cache(tmp_path / str(nr)))
+            for nr in range(3)
+        ]
+
+        assert fetch_bulk(jobs, mode=Mode.CHECKING, max_concurrency=2) == [result.OK(_OUTPUT)] * 3
+        for nr in range(3):
+            assert (tmp_path / str(nr) / "checking" / "heute").read_bytes() == _OUTPUT
+
+
+def test_fetch_encrypted(tls_config: TLSConfig, tmp_path: Path) -> None:
+    # printf "<<<cmk_test>>>" | ./doc/treasures/agent_legacy_encryption/encrypt.sh "v05" "cmk"
+    encrypted = b"05" + unhexlify(
+        b"ea0e2c10f91aef7e"
+        b"64ad79f9ae130ac80ad544b891738aa8f5b6317167e78a706864a819656f75db"
+        b"5f1aacfa62eef34dd84fb737009b3892"
+    )
+    for port in _serve(lambda conn: conn.sendall(encrypted), connections=1):
+        (raw_data,) = fetch_bulk(
+            [(_fetcher(port, tls_config, tmp_path / "uuid", "cmk"), _file_cache(tmp_path))],
+            mode=Mode.CHECKING,
+        )
+
+    assert raw_data == result.OK(AgentRawData(b"<<<cmk_test>>>"))
+
+
+def test_fetch_from_cache(tls_config: TLSConfig, tmp_path: Path) -> None:
+    file_cache = _file_cache(tmp_path)
+    file_cache.write(AgentRawData(b"<<<cached>>>"), Mode.CHECKING)
+
+    # Nobody listens on port 1
+    (raw_data,) = fetch_bulk(
+        [(_fetcher(1, tls_config, tmp_path / "uuid"), file_cache)], mode=Mode.CHECKING
+    )
+
+    assert raw_data == result.OK(AgentRawData(b"<<<cached>>>"))
+
+
+def test_connection_refused(tls_config: TLSConfig, tmp_path: Path) -> None:
+    (raw_data,) = fetch_bulk(
+        [(_fetcher(1, tls_config, tmp_path / "uuid"), _file_cache(tmp_path))], mode=Mode.CHECKING
+    )
+
+    assert raw_data.is_error()
+    assert isinstance(raw_data.error, FetcherError)
+    assert "Communication failed" in str(raw_data.error)
+
+
+def test_timeout(tls_config: TLSConfig, tmp_path: Path) -> None:
+    hang_up = threading.Event()
+
+    def handle(_conn: socket.socket) -> None:
+        hang_up.wait(10)
+
+    port_iter = _serve(handle, connections=1)
+    port = next(port_iter)
+    try:
+        (raw_data,) = fetch_bulk(
+            [(_fetcher(port, tls_config, tmp_path / "uuid"), _file_cache(tmp_path))],
+            mode=Mode.CHECKING,
+            timeout=0.1,
+        )
+    finally:
+        hang_up.set()
+        next(port_iter, None)
+
+    assert raw_data.is_error()
+    assert str(raw_data.error) == "Communication failed: timed out"
+
+
+class TestTLS:
+    @pytest.fixture
+    def tls_config(self, tmp_path: Path) -> TLSConfig:
+        ca = CertificateWithPrivateKey.generate_self_signed(
+            common_name="Site CA", organization="Checkmk Testing", is_ca=True, key_size=2048
+        )
+        (tmp_path / "ca.pem").write_text(ca.certificate.dump_pem().str)
+        (tmp_path / "site.pem").write_text(
+            ca.certificate.dump_pem().str + ca.private_key.dump_pem(None).str
+        )
+        agent = ca.issue_new_certificate(
+            common_name=_UUID,
+            organization="Checkmk Testing",
+            subject_alternative_names=SubjectAlternativeNames([SAN.dns_name(_UUID)]),
+            key_size=2048,
+        )
+        (tmp_path / "agent.pem").write_text(
+            agent.certificate.dump_pem().str + agent.private_key.dump_pem(None).str
+        )
+        (tmp_path / "uuid").symlink_to(_UUID)
+        return TLSConfig(
+            cas_dir=tmp_path, ca_store=tmp_path / "ca.pem", site_crt=tmp_path / "site.pem"
+        )
+
+    @pytest.fixture
+    def port(self, tls_config: TLSConfig) -> Iterator[int]:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(tls_config.cas_dir / "agent.pem")
+
+        # version, compression type and the payload: the output in plain text
+        messages = iter(
+            (b"\x00\x00" + b"\x00" + _OUTPUT, b"\x00\x00" + b"\x01" + zlib.compress(_OUTPUT))
+        )
+
+        def handle(conn: socket.socket) -> None:
+            conn.sendall(b"16")
+            try:
+                with context.wrap_socket(conn, server_side=True) as tls:
+                    tls.sendall(next(messages))
+            except OSError:
+                pass  # the fetcher hung up
+
+        yield from _serve(handle, connections=2)
+
+    def test_fetch(self, port: int, tls_config: TLSConfig, tmp_path: Path) -> None:
+        jobs = [
+            (_fetcher(port, tls_config, tmp_path / "uuid"), _file_cache(tmp_path / str(nr)))
+            for nr in range(2)
+        ]
+
+        # One after the other, so that the buffers are reused
+        assert fetch_bulk(jobs, mode=Mode.CHECKING, max_concurrency=1) == [result.OK(_OUTPUT)] * 2
+
+    def test_not_registered(self, port: int, tls_config: TLSConfig, tmp_path: Path) -> None:
+        (tmp_path / "uuid").unlink()
+        jobs = [
+            (_fetcher(port, tls_config, tmp_path / "uuid"), _file_cache(tmp_path / str(nr)))
+            for nr in range(2)
+        ]
+
+        for raw_data in fetch_bulk(jobs, mode=Mode.CHECKING):
+            assert raw_data.is_error()
+            assert isinstance(raw_data.error, FetcherError)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from pathlib import Path
+
+from cmk.ccc.hostaddress import HostName
+from cmk.gui.watolib.host_search_index import HostSearchIndex
+
+
+def _index(tmp_path: Path) -> HostSearchIndex:
+    index = HostSearchIndex(tmp_path)
+    index.update(
+        "",
+        (1, 2, 3),
+        {
+            HostName("web-01"): {".name": "web-01", "ipaddress": "10.0.0.1", "labels": ("os",)},
+            HostName("web-02"): {".name": "web-02", "labels": ("os", "env")},
+        },
+    )
+    index.update(
+        "dc/db",
+        (4, 5, 6),
+        {HostName("DB-01"): {".name": "DB-01", "ipaddress": "10.0.1.1", "labels": ()}},
+    )
+    return index
+
+
+def test_lookups(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+    assert index.folder_path(HostName("DB-01")) == "dc/db"
+    assert index.hosts_with_value("ipaddress", "10.0.0.1") == {"web-01"}
+    assert index.hosts_with_prefix(".name", "WEB") == {"web-01", "web-02"}
+    assert index.hosts_with_prefix("ipaddress", "10.0.") == {"web-01", "DB-01"}
+    assert index.hosts_matching_regex(".name", "^db-0[0-9]$") == {"DB-01"}
+    assert index.hosts_matching_regex(".name", "-02") == {"web-02"}
+    assert index.hosts_matching("ipaddress", lambda value: value.endswith(".1")) == {
+        "web-01",
+        "DB-01",
+    }
+    assert index.hosts_with_members("labels", ["os"]) == {"web-01", "web-02"}
+    assert index.hosts_with_members("labels", ["os", "env"]) == {"web-02"}
+    assert index.hosts_with_members("labels", []) == {"web-01", "web-02", "DB-01"}
+    assert index.hosts_without("ipaddress") == {"web-02"}
+    assert index.hosts_without(".name") == set()
+
+
+def test_update_and_retain(tmp_path: Path) -> None:
+    index = _index(tmp_path)
+
+    # web-02 was moved to dc/db, the root folder was not updated yet
+    index.update(
+        "dc/db",
+        (4, 5, 7),
+        {
+            HostName("DB-01"): {".name": "DB-01", "ipaddress": "10.0.1.1", "labels": ()},
+            HostName("web-02"): {".name": "web-02", "ipaddress": "10.0.1.2", "labels": ()},
+        },
+    )
+    assert index.folder_path(HostName("web-02")) == "dc/db"
+    assert index.hosts_with_members("labels", ["env"]) == set()
+    assert index.hosts_with_prefix(".name", "web") == {"web-01", "web-02"}
+
+    index.retain({"dc/db"})
+    assert index.folder_path(HostName("web-01")) is None
+    assert index.hosts_with_prefix(".name", "") == {"DB-01", "web-02"}
+    assert len(list(tmp_path.iterdir())) == 1
+
+
+def test_shards_are_shared(tmp_path: Path) -> None:
+    _index(tmp_path)
+    index = HostSearchIndex(tmp_path)
+
+    assert not index.is_current("", (1, 2, 4))
+    assert index.is_current("", (1, 2, 3))
+    assert index.is_current("dc/db", (4, 5, 6))
+    assert index.hosts_with_prefix(".name", "") == {"web-01", "web-02", "DB-01"}
+
+    for shard_path in tmp_path.iterdir():
+        shard_path.write_bytes(b"broken")
+    assert not HostSearchIndex(tmp_path).is_current("", (1, 2, 3))
@@ -1220,3 +1220,42 @@ def test_subfolder_cache_invalidated() -> None:
     # subfolders are part of the tree
     with pytest.raises(AssertionError):
         assert subfolder.effective_attributes()["alias"] == "other_alias"
+
+
+def test_search_folder_uses_host_search_index() -> None:
+    tree = folder_tree()
+    root = tree.root_folder()
+    subfolder = root.create_subfolder("sub", "sub", {}, pprint_value=False, use_git=False)
+    root.create_hosts(
+        [(HostName("web-1"), {"ipaddress": HostAddress("10.0.0.1")}, None)],
+        pprint_value=False,
+        use_git=False,
+    )
+    subfolder.create_hosts(
+        [
+            (HostName("web-2"), {"ipaddress": HostAddress("10.0.0.2")}, None),
+            (HostName("db-1"), {}, None),
+        ],
+        pprint_value=False,
+        use_git=False,
+    )
+    assert hosts_and_folders.host_search_index().folder_path(HostName("web-2")) == "sub"
+
+    def search(base_folder: Folder, criteria: dict[str, object]) -> list[HostName]:
+        return sorted(
+            hosts_and_folders.SearchFolder(tree, base_folder, {".name": None, **criteria}).hosts()
+        )
+
+    assert search(root, {".name": "WEB"}) == ["web-1", "web-2"]
+    assert search(root, {".name": "~^db"}) == ["db-1"]
+    assert search(root, {"ipaddress": "10.0.0.2"}) == ["web-2"]
+    assert search(subfolder, {".name": "web"}) == ["web-2"]
+
+    subfolder.delete_hosts(
+        [HostName("web-2")],
+        automation=lambda *args: MagicMock(),
+        pprint_value=False,
+        debug=False,
+        use_git=False,
+    )
+    assert search(root, {".name": "web"}) == ["web-1"]
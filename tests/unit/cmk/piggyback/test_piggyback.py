@@ -4,12 +4,18 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 
+import contextlib
 import pprint
+import time
+from pathlib import Path
+
+import pytest
 
 import cmk.utils.log
 import cmk.utils.paths
 from cmk.ccc.hostaddress import HostAddress
 from cmk.piggyback import backend
+from cmk.piggyback.backend import _segments, _storage
 
 _TEST_HOST_NAME = HostAddress("test-host")
 
@@ -222,6 +228,85 @@ def test_get_source_and_piggyback_hosts() -> None:
     }
 
 
+def test_store_piggyback_segment() -> None:
+    omd_root = cmk.utils.paths.omd_root
+    backend.store_piggyback_raw_data(
+        HostAddress("source1"),
+        {HostAddress("migrated-host"): _PAYLOAD},
+        message_timestamp=_REF_TIME - 20,
+        contact_timestamp=_REF_TIME - 20,
+        omd_root=omd_root,
+    )
+    backend.store_piggyback_segment(
+        HostAddress("source1"),
+        {_TEST_HOST_NAME: _PAYLOAD},
+        message_timestamp=_REF_TIME - 10,
+        contact_timestamp=_REF_TIME - 10,
+        omd_root=omd_root,
+    )
+    backend.store_piggyback_segment(
+        HostAddress("source1"),
+        {HostAddress("test-host2"): (b"line1", b"line2")},
+        message_timestamp=_REF_TIME,
+        contact_timestamp=_REF_TIME,
+        omd_root=omd_root,
+    )
+
+    # The payload files of the source were migrated to its segment
+    assert not (omd_root / "tmp/check_mk/piggyback/migrated-host/source1").exists()
+    assert [
+        (message.meta.piggybacked, message.meta.last_update, message.raw_data)
+        for host_name in ("migrated-host", "test-host", "test-host2")
+        for message in backend.get_messages_for(HostAddress(host_name), omd_root)
+    ] == [
+        (HostAddress("migrated-host"), int(_REF_TIME - 20), b"pay\nload\n"),
+        (_TEST_HOST_NAME, int(_REF_TIME - 10), b"pay\nload\n"),
+        (HostAddress("test-host2"), int(_REF_TIME), b"line1\nline2\n"),
+    ]
+    assert _get_only_raw_data_element(_TEST_HOST_NAME).meta.last_contact == int(_REF_TIME)
+    assert set(backend.get_piggybacked_host_with_sources(omd_root)) == {
+        HostAddress("migrated-host"),
+        _TEST_HOST_NAME,
+        HostAddress("test-host2"),
+    }
+
+    backend.cleanup_piggyback_files(int(time.time() - _REF_TIME + 5), [], omd_root)
+    assert not backend.get_messages_for(_TEST_HOST_NAME, omd_root)
+    assert backend.get_messages_for(HostAddress("test-host2"), omd_root)
+
+    assert backend.move_for_host_rename(omd_root, "test-host2", "renamed-host") == (
+        "piggyback-load",
+    )
+    assert _get_only_raw_data_element(HostAddress("renamed-host")).raw_data == b"line1\nline2\n"
+
+
+def test_segments_are_changed_while_locked(monkeypatch: pytest.MonkeyPatch) -> None:
+    omd_root = cmk.utils.paths.omd_root
+    segment = omd_root / "tmp/check_mk/piggyback_segments/source1"
+    locked = []
+    original = _segments.locked_segment
+
+    def locked_segment(path: Path) -> contextlib.AbstractContextManager[None]:
+        locked.append(path)
+        return original(path)
+
+    monkeypatch.setattr(_storage, "locked_segment", locked_segment)
+    backend.store_piggyback_segment(
+        HostAddress("source1"),
+        {_TEST_HOST_NAME: _PAYLOAD},
+        message_timestamp=_REF_TIME,
+        contact_timestamp=_REF_TIME,
+        omd_root=omd_root,
+    )
+    assert locked == [segment]
+
+    # Cleaning up a segment removed in the meantime leaves no file created for locking behind
+    segment.unlink()
+    _storage._cleanup_old_segment_payloads([segment], _REF_TIME)
+    assert locked == [segment, segment]
+    assert not segment.exists()
+
+
 class TestPiggybackMetaData:
     def test_serialization_roundtrip(self) -> None:
         pmd = backend.PiggybackMetaData(
@@ -3,9 +3,16 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import json
 import logging
+import queue
+from multiprocessing import Event as make_event
+from pathlib import Path
+from types import SimpleNamespace
 from unittest.mock import Mock
 
+import pytest
+
 import cmk.utils.paths
 from cmk.ccc.hostaddress import HostName
 from cmk.messaging import DeliveryTag
@@ -15,6 +22,8 @@ from cmk.piggyback.backend import (
     PiggybackMetaData,
 )
 from cmk.piggyback.hub import _payload as payload
+from cmk.piggyback.hub._batch import PiggybackBatch, ThroughputMetrics
+from cmk.piggyback.hub._config import ConfigType, PiggybackHubConfig
 
 
 def test__on_message() -> None:
@@ -42,3 +51,115 @@ def test__on_message() -> None:
     ]
     actual_payload = get_messages_for(HostName("target"), cmk.utils.paths.omd_root)
     assert actual_payload == expected_payload
+
+
+def _message(piggybacked: str, raw_data: bytes, last_contact: int | None) -> PiggybackMessage:
+    return PiggybackMessage(
+        meta=PiggybackMetaData(
+            source=HostName("source"),
+            piggybacked=HostName(piggybacked),
+            last_update=1640000020,
+            last_contact=last_contact,
+        ),
+        raw_data=raw_data,
+    )
+
+
+def test_batch_roundtrip() -> None:
+    messages = [
+        _message("target1", b"line1\nline2\n", 1640000000),
+        _message("target2", b"", None),
+    ]
+    batch = PiggybackBatch.from_messages("remote", messages)
+
+    received = PiggybackBatch.model_validate_json(batch.model_dump_json())
+
+    assert received.site == "remote"
+    assert received.messages() == messages
+
+
+def test__on_batch_message() -> None:
+    test_logger = logging.getLogger("test")
+    omd_root = cmk.utils.paths.omd_root
+    on_message = payload.save_batch_on_message(test_logger, omd_root)
+    channel = Mock()
+
+    on_message(
+        channel,
+        DeliveryTag(23),
+        PiggybackBatch.from_messages(
+            "remote",
+            [
+                _message("target1", b"line1\nline2\n", 1640000000),
+                _message("target2", b"line3\n", 1640000000),
+            ],
+        ),
+    )
+
+    channel.acknowledge.assert_called_once_with(DeliveryTag(23))
+    assert [m.raw_data for m in get_messages_for(HostName("target1"), omd_root)] == [
+        b"line1\nline2\n"
+    ]
+    assert get_messages_for(HostName("target2"), omd_root) == [
+        _message("target2", b"line3\n", 1640000000)
+    ]
+
+
+def test_publish_batches(tmp_path: Path) -> None:
+    process = payload.SendingPayloadProcess(
+        logging.getLogger("test"), tmp_path / "central", Mock(), Mock(), batch_window=1.0
+    )
+    metrics = ThroughputMetrics(tmp_path / "metrics.json")
+    channel = Mock()
+    pending = {
+        "remote1": [_message("target1", b"data1\n", 1640000000)],
+        "remote2": [
+            _message("target2", b"data2\n", 1640000000),
+            _message("target3", b"data3\n", 1640000000),
+        ],
+    }
+
+    process._publish_batches(channel, pending, metrics)
+
+    assert not pending
+    assert [
+        (call.args[0], len(call.args[1].messages())) for call in channel.publish_for_site.mock_calls
+    ] == [("remote1", 1), ("remote2", 2)]
+    assert metrics.sites["remote2"].messages == 2
+    assert metrics.sites["remote2"].raw_bytes == 12
+
+    metrics.save()
+    assert json.loads((tmp_path / "metrics.json").read_text())["remote1"]["batches"] == 1
+
+
+class _Stop(Exception):
+    pass
+
+
+def test_send_batches_enforces_window_under_steady_stream(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # A new message every second, the queue never runs empty
+    clock = iter(range(1000))
+    monkeypatch.setattr(payload, "time", SimpleNamespace(monotonic=lambda: next(clock)))
+    new_messages: queue.SimpleQueue[PiggybackMessage | Exception] = queue.SimpleQueue()
+    for _nr in range(20):
+        new_messages.put(_message("piggybacked", b"<<<section>>>\n", None))
+    new_messages.put(_Stop())
+    process = payload.SendingPayloadProcess(
+        logging.getLogger("test"), tmp_path, make_event(), lambda: "", batch_window=5.0
+    )
+    channel = Mock()
+
+    with pytest.raises(_Stop):
+        process._send_batches(
+            channel,
+            PiggybackHubConfig(
+                type=ConfigType.PERSISTED, locations={HostName("piggybacked"): "other_site"}
+            ),
+            new_messages,
+            {},
+            ThroughputMetrics(tmp_path / "metrics.json", interval=3600.0),
+        )
+
+    assert channel.publish_for_site.call_count > 1
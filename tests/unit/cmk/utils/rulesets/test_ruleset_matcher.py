@@ -11,11 +11,16 @@ import pytest
 from pytest import MonkeyPatch
 
 from cmk.ccc.hostaddress import HostName
+from cmk.utils.regex import regex
 from cmk.utils.rulesets.ruleset_matcher import (
+    HostIndex,
+    matches_host_tags,
     matches_tag_condition,
+    MatchingHostsCache,
     RuleConditionsSpec,
     RulesetMatcher,
     RuleSpec,
+    ServiceMatchCache,
     SingleHostRulesetMatcher,
     TagCondition,
 )
@@ -523,6 +528,135 @@ def test_ruleset_matcher_get_host_values_tags(
     )
 
 
+_TAGGED_HOSTS: Mapping[HostName, Mapping[TagGroupID, TagID]] = {
+    HostName("host1"): {
+        TagGroupID("criticality"): TagID("prod"),
+        TagGroupID("agent"): TagID("cmk-agent"),
+        TagGroupID("networking"): TagID("lan"),
+    },
+    HostName("host2"): {
+        TagGroupID("criticality"): TagID("test"),
+        TagGroupID("networking"): TagID("wan"),
+    },
+    HostName("host3"): {
+        TagGroupID("criticality"): TagID("test"),
+        TagGroupID("networking"): TagID("dmz"),
+    },
+}
+
+
+def _tag_matcher(
+    host_tags: Mapping[HostName, Mapping[TagGroupID, TagID]],
+    cache: MatchingHostsCache | None,
+    host_paths: Mapping[HostName, str] | None = None,
+) -> RulesetMatcher:
+    return RulesetMatcher(
+        host_tags=host_tags,
+        host_paths=host_paths or {},
+        all_configured_hosts=frozenset(host_tags),
+        clusters_of={},
+        nodes_of={},
+        matching_hosts_cache=cache,
+    )
+
+
+def _all_host_values(
+    matcher: RulesetMatcher, rules: Sequence[RuleSpec[str]]
+) -> dict[HostName, list[str]]:
+    return {
+        hostname: list(
+            matcher.get_host_values_all(hostname, ruleset=rules, labels_of_host=lambda hn: {})
+        )
+        for hostname in (HostName("host1"), HostName("host2"), HostName("host3"))
+    }
+
+
+_regex_ruleset: Sequence[RuleSpec[str]] = [
+    {
+        "id": "regex",
+        "value": "REGEX",
+        "condition": {"host_name": [{"$regex": "host[12]"}]},
+    },
+    {
+        "id": "negated",
+        "value": "NEGATED",
+        "condition": {
+            "host_name": {"$nor": [{"$regex": "host1"}]},
+            "host_tags": {TagGroupID("networking"): TagID("dmz")},
+        },
+    },
+    {
+        "id": "folder",
+        "value": "FOLDER",
+        "condition": {"host_name": [{"$regex": "host"}, "host3"], "host_folder": "/lvl1/"},
+    },
+]
+
+
+def test_matching_hosts_cache_gives_same_results() -> None:
+    cache = MatchingHostsCache()
+    rules = [*tag_ruleset, *ruleset, *_regex_ruleset]
+    expected = _all_host_values(_tag_matcher(_TAGGED_HOSTS, None), rules)
+
+    assert _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), rules) == expected
+    # Only the conditions with regexes are cached
+    assert cache.misses == len(cache) == len(_regex_ruleset)
+    assert cache.hits == 0
+
+    # A new config with the same hosts only has cache hits
+    assert _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), rules) == expected
+    assert cache.hits == cache.misses
+
+
+def test_matching_hosts_cache_drops_least_recently_used() -> None:
+    cache = MatchingHostsCache(maxsize=2)
+    expected = _all_host_values(_tag_matcher(_TAGGED_HOSTS, None), _regex_ruleset)
+
+    assert _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), _regex_ruleset) == expected
+    assert len(cache) == 2
+    assert _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), _regex_ruleset[1:]) == {
+        host_name: values[1:] if values[:1] == ["REGEX"] else values
+        for host_name, values in expected.items()
+    }
+    assert cache.hits == 2
+
+
+def test_matching_hosts_cache_reevaluates_changed_hosts() -> None:
+    cache = MatchingHostsCache()
+    _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), _regex_ruleset)
+
+    changed_tags = {
+        **_TAGGED_HOSTS,
+        HostName("host3"): {
+            TagGroupID("criticality"): TagID("test"),
+            TagGroupID("networking"): TagID("lan"),
+        },
+    }
+    changed_paths = {HostName("host1"): "/lvl1/hosts.mk"}
+    misses = cache.misses
+    matcher = _tag_matcher(changed_tags, cache, changed_paths)
+
+    assert _all_host_values(matcher, [*ruleset, *_regex_ruleset]) == _all_host_values(
+        _tag_matcher(changed_tags, None, changed_paths), [*ruleset, *_regex_ruleset]
+    )
+    assert cache.misses == misses
+
+
+def test_matching_hosts_cache_update_hosts() -> None:
+    cache = MatchingHostsCache()
+    _all_host_values(_tag_matcher(_TAGGED_HOSTS, cache), _regex_ruleset)
+
+    assert (
+        cache.update_hosts(
+            {
+                HostName("host1"): (tuple(sorted(_TAGGED_HOSTS[HostName("host1")].items())), "/"),
+                HostName("host2"): ((), "/"),
+            }
+        )
+        == 1
+    )  # host2 changed, host3 is gone
+
+
 @pytest.mark.parametrize(
     "rule_spec, expected_result",
     [
@@ -703,6 +837,55 @@ def test_ruleset_matcher_get_service_ruleset_values_labels(
     )
 
 
+@pytest.mark.parametrize("maxsize", [None, 1])
+def test_ruleset_matcher_service_match_cache(maxsize: int | None) -> None:
+    matcher = RulesetMatcher(
+        host_tags={HostName("host1"): {}},
+        host_paths={},
+        all_configured_hosts=frozenset([HostName("host1")]),
+        clusters_of={},
+        nodes_of={},
+        service_match_cache_size=maxsize,
+    )
+    service_ruleset: Sequence[RuleSpec[str]] = [
+        {"id": "1", "value": "cpu", "condition": {"service_description": [{"$regex": "CPU"}]}},
+        {"id": "2", "value": "all", "condition": {}},
+    ]
+
+    def values(service_name: str) -> list[str]:
+        return matcher.get_service_values_all(
+            HostName("host1"),
+            ServiceName(service_name),
+            {},
+            ruleset=service_ruleset,
+            labels_of_host=lambda hn: {},
+        )
+
+    assert values("CPU load") == ["cpu", "all"]
+    assert values("Memory") == ["all"]
+    assert values("CPU load") == ["cpu", "all"]
+
+    cache = matcher.service_match_cache
+    assert cache.misses + cache.hits == 6
+    assert (cache.hits, len(cache)) == ((2, 4) if maxsize is None else (0, 1))
+
+
+def test_service_match_cache_drops_least_recently_used() -> None:
+    cache = ServiceMatchCache(maxsize=2)
+    key_a, key_b, key_c = (
+        ((ServiceName(name), 0), (False, regex("")), ()) for name in ("a", "b", "c")
+    )
+    cache.add(key_a, True)
+    cache.add(key_b, False)
+    assert cache.get(key_a) is True  # a is now more recently used than b
+    cache.add(key_c, True)
+
+    assert cache.get(key_b) is None
+    assert cache.get(key_a) is True
+    assert cache.get(key_c) is True
+    assert (cache.hits, cache.misses, len(cache)) == (3, 1, 2)
+
+
 @pytest.mark.parametrize(
     "taggroud_id, tag_condition, expected_result",
     [
@@ -800,6 +983,28 @@ def test_matches_tag_condition(
     )
 
 
+def test_host_index_bitmaps() -> None:
+    index = HostIndex(
+        _TAGGED_HOSTS,
+        {hn: tags.items() for hn, tags in _TAGGED_HOSTS.items()},
+        {HostName("host1"): "/lvl1/hosts.mk", HostName("host2"): "/lvl1/lvl2/hosts.mk"},
+    )
+
+    assert len(index) == 3
+    assert index.hosts(index.all) == set(_TAGGED_HOSTS)
+    assert index.hosts(index.bitmap([HostName("host2"), HostName("unknown")])) == {"host2"}
+    assert index.hosts(index.folder("/lvl1/")) == {"host1", "host2"}
+    assert index.hosts(index.folder("/lvl1/lvl2/")) == {"host2"}
+    assert index.hosts(index.folder("/")) == set(_TAGGED_HOSTS)
+    for rule in tag_ruleset:
+        tag_conditions = rule["condition"].get("host_tags", {})
+        assert index.hosts(index.tags(tag_conditions)) == {
+            hn
+            for hn, tags in _TAGGED_HOSTS.items()
+            if matches_host_tags(set(tags.items()), tag_conditions)
+        }
+
+
 def test_ruleset_matcher_get_host_values_compute_labels_lazily() -> None:
     def _make_new_matcher(host_name: HostName) -> RulesetMatcher:
         return RulesetMatcher(
@@ -3,9 +3,12 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from pathlib import Path
+
 import pytest
 
 from cmk.utils.host_storage import (
+    CompiledHostsIndex,
     get_hosts_file_variables,
     get_standard_hosts_storage,
     StandardStorageLoader,
@@ -91,3 +94,39 @@ def tests_standard_format_loader():
     variables = get_hosts_file_variables()
     standard_loader.apply(_hosts_mk_test_data, variables)
     assert variables["all_hosts"] == ["test"]
+
+
+def test_compiled_hosts_index(tmp_path: Path) -> None:
+    hosts_files = [tmp_path / f"folder{nr}" / "hosts.mk" for nr in range(3)]
+    for hosts_file in hosts_files[:2]:
+        hosts_file.parent.mkdir()
+        hosts_file.write_text("all_hosts += []\n")
+    loaded: list[Path] = []
+
+    def load(hosts_file: Path) -> dict[str, object]:
+        loaded.append(hosts_file)
+        return {"all_hosts": [hosts_file.parent.name]}
+
+    index = CompiledHostsIndex(tmp_path / "index")
+    assert index.compile(hosts_files, load) == 3
+    assert index.load(hosts_files[0]) == {"all_hosts": ["folder0"]}
+    # Folders without hosts file are indexed as well
+    assert index.load(hosts_files[2]) == {"all_hosts": ["folder2"]}
+
+    hosts_files[1].write_text("all_hosts += ['changed']\n")
+    assert index.load(hosts_files[1]) is None
+
+    # Other processes see the new index, unchanged folders are not loaded again
+    loaded.clear()
+    assert CompiledHostsIndex(index.path).compile(hosts_files, load) == 1
+    assert loaded == [hosts_files[1]]
+    assert index.load(hosts_files[1]) is None
+    index.refresh()
+    assert index.load(hosts_files[1]) == {"all_hosts": ["folder1"]}
+
+
+def test_compiled_hosts_index_broken(tmp_path: Path) -> None:
+    (index_path := tmp_path / "index").write_bytes(b"CMKHIDX1\xff")
+    index = CompiledHostsIndex(index_path)
+    index.refresh()
+    assert index.load(tmp_path / "hosts.mk") is None
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Copyright (C) 2025 Checkmk GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+from pathlib import Path
+
+import pytest
+
+import cmk.utils.paths
+from cmk.ccc import store
+from cmk.utils import object_files
+
+
+def _site_files(omd_root: Path) -> list[Path]:
+    profile_dir = omd_root / "var/check_mk/web/harry"
+    profile_dir.mkdir(parents=True)
+    (profile_dir / "treestates.mk").write_text("{('foo', 'bar'): 'on'}\n")
+    (profile_dir / "tableoptions.mk").write_text("{'hosts': {'rows': 20}}\n")
+    (wato_dir := omd_root / "etc/check_mk/conf.d/wato/folder").mkdir(parents=True)
+    (wato_dir / ".wato").write_text("{'title': 'Folder', 'num_hosts': 2}\n")
+    # Not read by load_object_from_file()
+    store.save_text_to_file(omd_root / "etc/check_mk/conf.d/wato/hosts.mk", "all_hosts = []\n")
+    (omd_root / "var/check_mk/autochecks").mkdir(parents=True)
+    return [profile_dir / "tableoptions.mk", profile_dir / "treestates.mk", wato_dir / ".wato"]
+
+
+def test_site_object_files(tmp_path: Path) -> None:
+    paths = _site_files(tmp_path)
+    assert object_files.site_object_files(tmp_path) == sorted(paths)
+
+
+def test_convert(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(cmk.utils.paths, "omd_root", tmp_path)
+    paths = _site_files(tmp_path)
+    broken = tmp_path / "var/check_mk/web/harry/broken.mk"
+    broken.write_text("{")
+
+    assert object_files.main(["convert", *map(str, paths)]) == 0
+    assert all(store.is_marshal_object_file(path) for path in paths)
+    assert store.load_object_from_file(paths[1], default=None) == {("foo", "bar"): "on"}
+    assert object_files.main(["convert"]) == 1
+    assert object_files.main(["convert", *map(str, paths)]) == 0
+
+    # Files not saved in the fast format are converted back
+    other = tmp_path / "var/check_mk/other.mk"
+    other.write_bytes(store.MarshalSerializer.serialize({"title": "Folder"}))
+    assert object_files.main(["convert", str(other)]) == 0
+    assert other.read_text() == "{'title': 'Folder'}\n"
+
+
+def test_benchmark(tmp_path: Path) -> None:
+    result = object_files.benchmark_object_files(_site_files(tmp_path), rounds=2)
+    assert result.files == 3
+    assert result.marshal_seconds > 0
+    assert "Speedup" in result.render()
@@ -4,10 +4,16 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 
+import contextlib
 import errno
+import gc
+import json
 import socket
 import ssl
-from collections.abc import Sequence
+import struct
+import threading
+import time
+from collections.abc import Iterator, Sequence
 from contextlib import closing
 from pathlib import Path
 
@@ -16,6 +22,7 @@ from pytest import MonkeyPatch
 
 import livestatus
 
+import cmk.livestatus_client
 from cmk.ccc.site import SiteId
 from cmk.utils.certs import SiteCA
 from cmk.utils.livestatus_helpers.testing import MockLiveStatusConnection
@@ -47,6 +54,429 @@ def sock_path(monkeypatch: MonkeyPatch, tmp_path: Path) -> Path:
     return sock_path
 
 
+class _SiteServers:
+    """Livestatus servers answering every query with a fixed response after a delay"""
+
+    def __init__(self, tmp_path: Path) -> None:
+        self._tmp_path = tmp_path
+        self._stopped = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self.accepted: dict[str, int] = {}
+        self.queries: dict[str, int] = {}
+
+    def add(
+        self, site_id: str, delay: float, response: bytes, code: int = 200
+    ) -> livestatus.SiteConfiguration:
+        path = self._tmp_path / site_id
+        sock = socket.socket(socket.AF_UNIX)
+        sock.bind(str(path))
+        sock.listen(1)
+        sock.settimeout(0.05)
+        self.accepted[site_id] = 0
+        self.queries[site_id] = 0
+        thread = threading.Thread(
+            target=self._serve, args=(site_id, sock, delay, code, response), daemon=True
+        )
+        thread.start()
+        self._threads.append(thread)
+        return livestatus.SiteConfiguration({"socket": f"unix:{path}"})  # type: ignore[typeddict-item]
+
+    def _serve(
+        self, site_id: str, sock: socket.socket, delay: float, code: int, response: bytes
+    ) -> None:
+        with sock:
+            while not self._stopped.is_set():
+                try:
+                    conn = sock.accept()[0]
+                except TimeoutError:
+                    continue
+                self.accepted[site_id] += 1
+                with conn, contextlib.suppress(ConnectionError):
+                    conn.settimeout(0.05)
+                    while (query := self._receive_query(conn)) is not None:
+                        if query.startswith(b"COMMAND "):
+                            continue
+                        self.queries[site_id] += 1
+                        if self._stopped.wait(delay):
+                            return
+                        conn.sendall(b"%d %11d\n" % (code, len(response)) + response)
+
+    def _receive_query(self, conn: socket.socket) -> bytes | None:
+        query = b""
+        while not query.endswith(b"\n\n"):
+            try:
+                if not (data := conn.recv(4096)):
+                    return None
+            except TimeoutError:
+                if self._stopped.is_set():
+                    return None
+                continue
+            query += data
+        return query
+
+    def stop(self) -> None:
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+
+
+@pytest.fixture(name="site_server")
+def fixture_site_server(tmp_path: Path) -> Iterator[_SiteServers]:
+    servers = _SiteServers(tmp_path)
+    yield servers
+    servers.stop()
+
+
+def test_query_parallel_receives_responses_concurrently(site_server: _SiteServers) -> None:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId(f"site{nr}"): site_server.add(f"site{nr}", 0.3, b'[["%d"]]\n' % nr)
+                for nr in range(5)
+            }
+        )
+    )
+    live.set_prepend_site(True)
+
+    start = time.monotonic()
+    assert live.query("GET hosts\nColumns: name\n") == [[f"site{nr}", str(nr)] for nr in range(5)]
+    # The sites are waited for at the same time, not one after the other.
+    assert time.monotonic() - start < 1.2
+    assert not live.dead_sites()
+
+
+def test_query_parallel_iter_yields_sites_as_they_answer(site_server: _SiteServers) -> None:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId("slow"): site_server.add("slow", 0.5, b'[["slow"]]\n'),
+                SiteId("fast"): site_server.add("fast", 0.0, b'[["fast"]]\n'),
+            }
+        )
+    )
+
+    assert list(live.query_parallel_iter("GET hosts\nColumns: name\n")) == [
+        (SiteId("fast"), [["fast"]]),
+        (SiteId("slow"), [["slow"]]),
+    ]
+    assert [c.id for c in live.connections] == [SiteId("slow"), SiteId("fast")]
+
+
+def test_query_parallel_iter_abandoned(site_server: _SiteServers) -> None:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId("slow"): site_server.add("slow", 0.3, b'[["slow"]]\n'),
+                SiteId("fast"): site_server.add("fast", 0.0, b'[["fast"]]\n'),
+            }
+        )
+    )
+
+    responses = live.query_parallel_iter("GET hosts\nColumns: name\n")
+    assert next(responses) == (SiteId("fast"), [["fast"]])
+    responses.close()
+
+    # The slow site is neither dead nor left with the abandoned response on its socket
+    assert not live.dead_sites()
+    assert [c.id for c in live.connections] == [SiteId("slow"), SiteId("fast")]
+    assert live.query("GET hosts\nColumns: name\n") == [["slow"], ["fast"]]
+    assert site_server.accepted[SiteId("slow")] == 2
+
+
+def test_query_parallel_site_timeout(site_server: _SiteServers) -> None:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId("hanging"): site_server.add("hanging", 60.0, b"[]\n"),
+                SiteId("fast"): site_server.add("fast", 0.0, b'[["fast"]]\n'),
+            }
+        )
+    )
+    live.response_timeout = 0.2
+
+    assert live.query("GET hosts\nColumns: name\n") == [["fast"]]
+    assert list(live.dead_sites()) == [SiteId("hanging")]
+    assert "Timeout" in str(live.dead_sites()[SiteId("hanging")]["exception"])
+    assert [c.id for c in live.connections] == [SiteId("fast")]
+
+
+def _many_rows(site_id: str) -> tuple[list[list[object]], bytes]:
+    rows: list[list[object]] = [
+        [f"{site_id}-{nr}", nr, ["a\nb", {"x": None}]] for nr in range(5000)
+    ]
+    return rows, b"[" + b",\n".join(json.dumps(row).encode() for row in rows) + b"]\n"
+
+
+def test_single_site_query_iter(site_server: _SiteServers) -> None:
+    rows, response = _many_rows("site")
+    live = livestatus.SingleSiteConnection(site_server.add("site", 0.0, response)["socket"])
+    live.set_output_format(livestatus.LivestatusOutputFormat.JSON)
+
+    assert list(live.query_iter("GET hosts\nColumns: name\n")) == rows
+    assert live.socket is not None
+
+
+def test_single_site_query_iter_abandoned(site_server: _SiteServers) -> None:
+    _rows, response = _many_rows("site")
+    live = livestatus.SingleSiteConnection(site_server.add("site", 0.0, response)["socket"])
+    live.set_output_format(livestatus.LivestatusOutputFormat.JSON)
+
+    rows = live.query_iter("GET hosts\nColumns: name\n")
+    assert next(rows) == ["site-0", 0, ["a\nb", {"x": None}]]
+    rows.close()
+    # The rest of the response must not be taken for the response to the next query
+    assert live.socket is None
+
+
+def test_multi_site_query_iter(site_server: _SiteServers) -> None:
+    rows1, response1 = _many_rows("site1")
+    rows2, response2 = _many_rows("site2")
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId("site1"): site_server.add("site1", 0.0, response1),
+                SiteId("broken"): site_server.add("broken", 0.0, b"Invalid query", code=400),
+                SiteId("site2"): site_server.add("site2", 0.0, response2),
+            }
+        )
+    )
+    live.set_output_format(livestatus.LivestatusOutputFormat.JSON)
+    live.set_prepend_site(True)
+
+    assert list(live.query_iter("GET hosts\nColumns: name\n")) == [
+        [site_id, *row] for site_id, rows in (("site1", rows1), ("site2", rows2)) for row in rows
+    ]
+    assert list(live.dead_sites()) == [SiteId("broken")]
+    assert [c.id for c in live.connections] == [SiteId("site1"), SiteId("site2")]
+
+
+def test_query_iter_python_format(
+    patch_omd_site: None, mock_livestatus: MockLiveStatusConnection
+) -> None:
+    live = mock_livestatus
+    live.set_sites(["NO_SITE"])
+    live.add_table("hosts", [{"name": "heute"}, {"name": "morgen"}])
+    live.expect_query("GET hosts\nColumns: name")
+    with mock_livestatus(expect_status_query=False):
+        assert list(livestatus.LocalConnection().query_iter("GET hosts\nColumns: name")) == [
+            ["heute"],
+            ["morgen"],
+        ]
+
+
+def _columnar_response() -> bytes:
+    def column(column_type: int, payload: bytes) -> bytes:
+        return struct.pack("<B7xQ", column_type, len(payload)) + payload + bytes(-len(payload) % 8)
+
+    return b"".join(
+        [
+            struct.pack("<4sIQ", b"LQB1", 4, 3),
+            column(1, struct.pack("<3q", 1, -2, 3)),
+            column(2, struct.pack("<3d", 0.5, float("nan"), 2.0)),
+            column(3, struct.pack("<4Q", 0, 4, 4, 7) + "höst".encode()),
+            column(
+                5,
+                b"\x00"
+                + b"\x05"
+                + struct.pack("<I", 9)
+                + b'["a",[1]]'
+                + b"\x04"
+                + struct.pack("<I", 1)
+                + b"\xff",
+            ),
+        ]
+    )
+
+
+def test_decode_columnar_response() -> None:
+    response = livestatus.decode_columnar_response(_columnar_response())
+
+    assert response.num_rows == 3
+    assert list(response.columns[0].numbers()) == [1, -2, 3]
+    assert response.columns[1].numbers()[0] == 0.5
+    assert response.rows() == [
+        [1, 0.5, "hös", None],
+        [-2, None, "", ["a", [1]]],
+        [3, 2.0, "t", b"\xff"],
+    ]
+    with pytest.raises(TypeError):
+        response.columns[2].numbers()
+
+
+def test_decode_columnar_response_truncated() -> None:
+    with pytest.raises(livestatus.MalformedColumnarResponse):
+        livestatus.decode_columnar_response(_columnar_response()[:-16])
+
+
+def test_query_columns(site_server: _SiteServers) -> None:
+    live = livestatus.SingleSiteConnection(
+        site_server.add("site", 0.0, _columnar_response())["socket"]
+    )
+
+    response = live.query_columns("GET services\nColumns: state\n")
+
+    assert list(response.columns[0].numbers()) == [1, -2, 3]
+    assert live.get_output_format() is livestatus.LivestatusOutputFormat.PYTHON
+
+
+@pytest.fixture(name="pool")
+def fixture_pool(monkeypatch: MonkeyPatch) -> livestatus.ConnectionPool:
+    pool = livestatus.ConnectionPool(max_idle_per_site=2)
+    monkeypatch.setattr(cmk.livestatus_client, "connection_pool", pool)
+    return pool
+
+
+def test_connections_share_pooled_sockets(
+    site_server: _SiteServers, pool: livestatus.ConnectionPool
+) -> None:
+    sites = livestatus.SiteConfigurations({SiteId("site"): site_server.add("site", 0.0, b"[]\n")})
+    for _nr in range(3):
+        live = livestatus.MultiSiteConnection(sites)
+        assert live.query("GET hosts\nColumns: name\n") == []
+        live.disconnect()
+
+    assert site_server.accepted["site"] == 1
+    metrics = pool.metrics()
+    assert (metrics.created, metrics.reused, metrics.idle, metrics.in_use) == (1, 2, 1, 0)
+
+
+def test_no_idle_sockets_by_default(site_server: _SiteServers, monkeypatch: MonkeyPatch) -> None:
+    pool = livestatus.ConnectionPool()
+    monkeypatch.setattr(cmk.livestatus_client, "connection_pool", pool)
+    live = livestatus.SingleSiteConnection(site_server.add("site", 0.0, b"[]\n")["socket"])
+
+    assert live.query("GET hosts\nColumns: name\n") == []
+    live.disconnect()
+
+    assert (pool.metrics().idle, pool.metrics().in_use) == (0, 0)
+
+
+def test_garbage_collected_connection_gives_back_its_socket(
+    site_server: _SiteServers, pool: livestatus.ConnectionPool
+) -> None:
+    live = livestatus.SingleSiteConnection(site_server.add("site", 0.0, b"[]\n")["socket"])
+    assert live.query("GET hosts\nColumns: name\n") == []
+    assert pool.metrics().in_use == 1
+
+    del live
+    gc.collect()
+
+    assert (pool.metrics().idle, pool.metrics().in_use) == (0, 0)
+
+
+def test_incomplete_response_is_not_pooled(
+    site_server: _SiteServers, pool: livestatus.ConnectionPool
+) -> None:
+    _rows, response = _many_rows("site")
+    live = livestatus.SingleSiteConnection(site_server.add("site", 0.0, response)["socket"])
+    live.set_output_format(livestatus.LivestatusOutputFormat.JSON)
+
+    with closing(live.query_iter("GET hosts\nColumns: name\n")) as rows:
+        next(rows)
+    live.disconnect()
+
+    assert pool.metrics().idle == 0
+    assert pool.metrics().in_use == 0
+
+
+def test_pool_discards_closed_and_expired_sockets() -> None:
+    pool = livestatus.ConnectionPool(max_idle_time=60.0)
+    key: livestatus.PoolKey = ("unix:/dev/null", False, True, None)
+    ours, theirs = socket.socketpair()
+    with theirs:
+        assert pool.acquire(key, lambda: ours) == (ours, False)
+        pool.release(key, ours)
+    # The peer has closed the connection in the meantime
+    assert pool.acquire(key, socket.socket)[1] is False
+    assert pool.metrics().discarded == 1
+
+    pool.max_idle_time = 0.0
+    sock, peer = socket.socketpair()
+    with sock, peer:
+        pool.release(key, sock)
+        time.sleep(0.01)
+        assert pool.acquire(key, socket.socket)[0] is not sock
+    assert pool.metrics().discarded == 2
+
+
+def test_pool_limits_connections_per_site() -> None:
+    pool = livestatus.ConnectionPool(
+        max_idle_per_site=1, max_connections_per_site=1, acquire_timeout=0.05
+    )
+    key: livestatus.PoolKey = ("unix:/dev/null", False, True, None)
+    sock, peer = socket.socketpair()
+    with sock, peer:
+        pool.acquire(key, lambda: sock)
+
+        with pytest.raises(livestatus.MKLivestatusSocketError):
+            pool.acquire(key, socket.socket)
+        # Other sites are not affected
+        pool.acquire(("unix:/other", False, True, None), socket.socket)
+
+        threading.Timer(0.01, pool.release, (key, sock)).start()
+        assert pool.acquire(key, socket.socket, timeout=5.0) == (sock, True)
+    metrics = pool.metrics()
+    assert (metrics.waits, metrics.timeouts, metrics.in_use) == (2, 1, 2)
+
+
+def test_result_cache_answers_repeated_queries(site_server: _SiteServers) -> None:
+    live = livestatus.MultiSiteConnection(
+        livestatus.SiteConfigurations(
+            {
+                SiteId("site1"): site_server.add("site1", 0.0, b'[["a"]]\n'),
+                SiteId("site2"): site_server.add("site2", 0.0, b'[["b"]]\n'),
+            }
+        )
+    )
+    live.result_cache = livestatus.QueryResultCache(default_ttl=60.0)
+    live.set_prepend_site(True)
+
+    assert live.query("GET hosts\nColumns: name\n") == [["site1", "a"], ["site2", "b"]]
+    rows = live.query("GET hosts\nColumns: name\n\n")
+    assert rows == [["site1", "a"], ["site2", "b"]]
+    rows[0].append("modified by the caller")
+    assert live.query("GET hosts\nColumns: name\n") == [["site1", "a"], ["site2", "b"]]
+    assert site_server.queries == {"site1": 1, "site2": 1}
+
+    # Other users and other sites have their own entries
+    live.set_auth_user("read", livestatus.UserId("harry"))
+    live.set_auth_domain("read")
+    live.query("GET hosts\nColumns: name\n")
+    live.set_only_sites([SiteId("site2")])
+    live.query("GET hosts\nColumns: name\n")
+    assert site_server.queries == {"site1": 2, "site2": 3}
+
+    # Commands invalidate the results of their site
+    live.command("[1] DISABLE_NOTIFICATIONS", SiteId("site2"))
+    live.query("GET hosts\nColumns: name\n")
+    assert site_server.queries == {"site1": 2, "site2": 4}
+
+    metrics = live.result_cache.metrics()
+    assert (metrics.hits, metrics.misses, metrics.invalidations) == (2, 4, 3)
+
+
+def test_result_cache_expiry_and_eviction() -> None:
+    cache = livestatus.QueryResultCache(default_ttl=60.0, table_ttls={"services": 0.0})
+
+    def key(query: str) -> livestatus.ResultCacheKey:
+        return livestatus.ResultCacheKey(query, "", "", (SiteId("site"),), ())
+
+    cache.put(key("GET services"), [[1]])
+    cache.put(key("GET log"), [[1]])
+    assert cache.metrics().entries == 0
+
+    cache.put(key("GET hosts"), [["x" * 50]])
+    cache.max_size = 9 * cache.metrics().size // 2  # Room for four entries
+    for nr in range(4):
+        cache.put(key(f"GET hosts\nColumns: {nr}"), [["x" * 50]])
+    assert cache.get(key("GET hosts\nColumns: 0")) is not None
+    cache.put(key("GET hosts\nColumns: 4"), [["x" * 50]])
+    # The least recently used entries are evicted
+    assert cache.get(key("GET hosts\nColumns: 1")) is None
+    assert cache.get(key("GET hosts\nColumns: 0")) is not None
+    assert cache.metrics().evictions == 2
+
+
 @pytest.mark.parametrize(
     "query_part",
     [